@@ -391,6 +391,11 @@ if ($Activate) {
 
     Move-Item -Path $newIndexPath -Destination $indexTargetPath -Force
     Write-Host ("  OK Activated new index: {0}" -f $indexTargetPath) -ForegroundColor Green
+
+    # Build stamp of the active index: part of the app's corpus epoch (services/corpus_epoch.py)
+    $stampPath = Join-Path $blacklabRoot "index.stamp"
+    Set-Content -Path "$stampPath.tmp" -Value ("{0} {1}" -f (Get-Date -Format "yyyy-MM-dd_HHmmss"), $PID) -Encoding UTF8
+    Move-Item -Path "$stampPath.tmp" -Destination $stampPath -Force
 } else {
     Write-Host ("  INFO: Index built but NOT activated: {0}" -f $newIndexPath) -ForegroundColor Cyan
 }
@@ -26,7 +26,8 @@ INDEX_DIR_JSON="${BLACKLAB_ROOT}/quarantine/index_json"
 INDEX_DIR_NEW_JSON="${BLACKLAB_ROOT}/quarantine/index_json.build"
 BACKUP_DIR_ROOT="${BLACKLAB_ROOT}/backups"
 QUARANTINE_DIR_ROOT="${BLACKLAB_ROOT}/quarantine"
-BLF_CONFIG="${WEBAPP_ROOT}/config/blacklab/corapan-tsv.blf.yaml"
+# corapan-tsv-docmeta.blf.yaml: document fields as linked metadata (export with --doc-metadata)
+BLF_CONFIG="${BLF_CONFIG:-${WEBAPP_ROOT}/config/blacklab/corapan-tsv.blf.yaml}"
 LOG_FILE="${WEBAPP_ROOT}/logs/bls/index_build.log"
 
 FORMAT="${1:-tsv}"
@@ -162,7 +163,11 @@ elif [ "$FORMAT" = "json" ]; then
     log "Exporting JSON -> TSV to $JSON_TSV_DIR"
     (
         cd "$WEBAPP_ROOT"
-        python -m src.scripts.blacklab_index_creation --in "$CORAPAN_JSON_DIR" --out "$JSON_TSV_DIR" --docmeta "$JSON_TSV_DIR/docmeta.jsonl" --format tsv --workers "$WORKERS"
+        EXPORT_FLAGS=()
+        case "$(basename "$BLF_CONFIG")" in
+            *docmeta*) EXPORT_FLAGS+=(--doc-metadata) ;;
+        esac
+        python -m src.scripts.blacklab_index_creation --in "$CORAPAN_JSON_DIR" --out "$JSON_TSV_DIR" --docmeta "$JSON_TSV_DIR/docmeta.jsonl" --format tsv --workers "$WORKERS" "${EXPORT_FLAGS[@]}"
     ) 2>&1 | tee -a "$LOG_FILE"
 
     # prepare clean TSV dir inside json_tsv dir
@@ -212,6 +217,12 @@ fi
 mv "$INDEX_DIR_NEW" "$INDEX_DIR"
 log "Index activated: $INDEX_DIR"
 
+# Build stamp of the active index: part of the app's corpus epoch, so cached
+# search/stats/atlas responses are dropped (services/corpus_epoch.py)
+printf '%s %s\n' "$TIMESTAMP" "$$" > "${BLACKLAB_ROOT}/index.stamp.tmp"
+mv "${BLACKLAB_ROOT}/index.stamp.tmp" "${BLACKLAB_ROOT}/index.stamp"
+log "Index build stamp written: ${BLACKLAB_ROOT}/index.stamp"
+
 # Step 7: Cleanup (optional)
 log "Cleaning up export directory..."
 # Note: keep export files for troubleshooting; comment out to auto-clean
@@ -616,6 +616,12 @@ assert_index_activation_target
 
 log "Index swap verified successfully"
 
+# Build stamp of the active index: part of the app's corpus epoch, so cached
+# search/stats/atlas responses are dropped (services/corpus_epoch.py)
+printf '%s %s\n' "$TIMESTAMP" "$$" > "${BLACKLAB_ROOT}/index.stamp.tmp"
+mv "${BLACKLAB_ROOT}/index.stamp.tmp" "${BLACKLAB_ROOT}/index.stamp"
+log "Index build stamp written: $(quote_path "${BLACKLAB_ROOT}/index.stamp")"
+
 # Step 8: Cleanup
 log "Cleaning up temporary directories..."
 
@@ -14,6 +14,8 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 
 from .branding import BRANDING, format_page_title
 from .extensions import register_extensions
+from .extensions.bls_resilience import BlackLabUnavailable
+from .extensions.bulkheads import BulkheadFull
 from .routes import register_blueprints
 from .runtime_paths import get_logs_dir
 
@@ -154,6 +156,7 @@ def create_app(env_name: str | None = None) -> Flask:
     register_maintenance_commands(app)
     register_error_handlers(app)
     setup_logging(app)
+    warm_media_catalog(app)
 
     return app
 
@@ -175,6 +178,33 @@ def register_maintenance_commands(app: Flask) -> None:
         count = services.anonymize_soft_deleted_users_older_than(days)
         app.logger.info(f"Anonymized {count} users soft-deleted older than {days} days")
 
+    @app.cli.command("media-catalog-refresh")
+    @with_appcontext
+    def media_catalog_refresh_command():
+        """Rebuild the in-memory media catalog (audio, transcripts, peaks, HLS).
+
+        Usage: flask media-catalog-refresh
+        """
+        from .services import media_store
+
+        for catalog in media_store.all_catalogs():
+            count = catalog.build()
+            print(f"{catalog.kind}: {count} files ({catalog.base_dir})")
+
+
+def warm_media_catalog(app: Flask) -> None:
+    """Build the media catalog at startup so the first requests hit a warm index."""
+    from .services import media_store
+
+    with app.app_context():
+        for catalog in media_store.all_catalogs():
+            try:
+                catalog.refresh_if_stale(force_check=True)
+            except Exception as exc:  # noqa: BLE001
+                app.logger.warning(
+                    "Media catalog warmup failed for %s: %s", catalog.kind, exc
+                )
+
 
 def register_context_processors(app: Flask) -> None:
     """Expose helpers to the template engine."""
@@ -425,6 +455,21 @@ def register_error_handlers(app: Flask) -> None:
             return jsonify({"error": "Internal server error"}), 500
         return render_template("errors/500.html"), 500
 
+    @app.errorhandler(BlackLabUnavailable)
+    @app.errorhandler(BulkheadFull)
+    def search_unavailable(error):
+        """BlackLab circuit breaker open or bulkhead full: fail fast with 503 + Retry-After."""
+        headers = {"Retry-After": str(error.retry_after)}
+        if (
+            request.path.startswith("/api/")
+            or request.path.startswith("/atlas/")
+            or request.accept_mimetypes.best == "application/json"
+        ):
+            code = "overloaded" if isinstance(error, BulkheadFull) else "upstream_overloaded"
+            payload = {"error": code, "message": str(error)}
+            return jsonify(payload), 503, headers
+        return render_template("errors/503.html", message=str(error)), 503, headers
+
 
 def setup_logging(app: Flask) -> None:
     """Configure application logging."""
@@ -17,6 +17,8 @@ from ..runtime_paths import (
     get_data_root,
     get_media_root,
     get_metadata_dir,
+    get_hls_dir,
+    get_peaks_dir,
     get_runtime_root,
     get_stats_dir,
     get_stats_temp_dir,
@@ -153,6 +155,10 @@ class BaseConfig:
         "BLS_BASE_URL", "http://localhost:8081/blacklab-server"
     ).rstrip("/")
     BLS_CORPUS = os.getenv("BLS_CORPUS", "")
+    # Index stores document-scoped fields (country, scope, radio, city, date)
+    # as document metadata (linked JSON) instead of per-token annotations.
+    # Requires an index built with `blacklab_index_creation --doc-metadata`.
+    BLS_DOC_METADATA = os.getenv("BLS_DOC_METADATA", "false").lower() == "true"
 
     # Flask
     SECRET_KEY = os.getenv("FLASK_SECRET_KEY", DEFAULT_SECRET_SENTINEL)
@@ -209,6 +215,28 @@ class BaseConfig:
     AUDIO_FULL_DIR = get_audio_full_dir()
     AUDIO_SPLIT_DIR = get_audio_split_dir()
     AUDIO_TEMP_DIR = get_audio_temp_dir()
+    PEAKS_DIR = get_peaks_dir()
+    HLS_DIR = get_hls_dir()
+
+    # Media catalog: minimum seconds between directory mtime checks on lookups
+    MEDIA_CATALOG_REFRESH_SECONDS = float(
+        os.getenv("MEDIA_CATALOG_REFRESH_SECONDS", "5")
+    )
+
+    # Transcript range endpoint: maximum segments per response
+    TRANSCRIPT_RANGE_MAX_SEGMENTS = int(
+        os.getenv("TRANSCRIPT_RANGE_MAX_SEGMENTS", "200")
+    )
+
+    # Memory budget (MB) for cached transcript bodies incl. gzip/brotli variants
+    PRECOMPRESSED_CACHE_MB = float(os.getenv("PRECOMPRESSED_CACHE_MB", "64"))
+
+    # File delivery offload: "off" (stream via Flask), "x-accel" (nginx
+    # X-Accel-Redirect) or "x-sendfile". See services/file_delivery.py.
+    FILE_OFFLOAD_MODE = os.getenv("FILE_OFFLOAD_MODE", "off").strip().lower()
+    FILE_OFFLOAD_INTERNAL_PREFIX = os.getenv(
+        "FILE_OFFLOAD_INTERNAL_PREFIX", "/_protected"
+    )
 
     # Public statistics directory (RUNTIME-ONLY)
     # Statistics are runtime data generated by 05_publish_corpus_statistics.py
@@ -70,7 +70,7 @@ def register_jwt_handlers() -> None:
         """
         # Safety check: Public (infra) and optional-auth routes should not reach here
         PUBLIC_PREFIXES = ("/static/", "/favicon", "/robots.txt", "/health")
-        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/atlas", "/media")
+        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/search/suggest", "/atlas", "/media")
         if request.path.startswith(PUBLIC_PREFIXES) or request.path.startswith(
             OPTIONAL_PREFIXES
         ):
@@ -127,7 +127,7 @@ def register_jwt_handlers() -> None:
         """
         # Safety check: Public (infra) and optional-auth routes should not reach here
         PUBLIC_PREFIXES = ("/static/", "/favicon", "/robots.txt", "/health")
-        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/atlas", "/media")
+        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/search/suggest", "/atlas", "/media")
         if request.path.startswith(PUBLIC_PREFIXES) or request.path.startswith(
             OPTIONAL_PREFIXES
         ):
@@ -182,7 +182,7 @@ def register_jwt_handlers() -> None:
         """
         # Safety check: Public (infra) and optional-auth routes should never reach here
         PUBLIC_PREFIXES = ("/static/", "/favicon", "/robots.txt", "/health")
-        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/atlas", "/media")
+        OPTIONAL_PREFIXES = ("/corpus", "/search/advanced", "/search/suggest", "/atlas", "/media")
         if request.path.startswith(PUBLIC_PREFIXES) or request.path.startswith(
             OPTIONAL_PREFIXES
         ):
@@ -0,0 +1,170 @@
+"""Replica selection for read-only BlackLab Servers serving the same index.
+
+Configuration:
+    BLS_REPLICAS: Comma-separated base URLs of BlackLab replicas
+        - Example: http://bls1:8080/blacklab-server,http://bls2:8080/blacklab-server
+        - Default: only BLS_BASE_URL
+        - All replicas must serve the same corpora; callers keep building URLs
+          from BLS_BASE_URL, which is rewritten to the chosen replica.
+
+    BLS_EJECT_FAILURES: Consecutive failures before a replica is ejected (default 3)
+    BLS_EJECT_SECONDS: How long an ejected replica is skipped (default 30)
+
+Selection:
+    - Requests for a query (``patt`` + ``filter``) are pinned to one replica
+      via rendezvous hashing, so paging through the results, sorting and
+      grouping reuse that replica's hits cache. If the pinned replica is
+      ejected, the query moves to the next replica in its ranking only.
+    - Other requests go to the less busy of two random replicas
+      (power of two choices on outstanding requests).
+    - Passive health: failures (connection errors, timeouts, 5xx) are
+      observed on live traffic; no separate health-check thread. After
+      ``BLS_EJECT_SECONDS`` the replica takes traffic again and is ejected
+      again on the next failures. If every replica is ejected, all are used.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from .http_client import BLS_BASE_URL
+
+
+class Replica:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+
+def _replica_urls() -> list[str]:
+    raw = os.environ.get("BLS_REPLICAS", "")
+    urls = [u.strip().rstrip("/") for u in raw.split(",") if u.strip()]
+    return list(dict.fromkeys(urls)) or [BLS_BASE_URL]
+
+
+def affinity_key(params: Any) -> Optional[str]:
+    """Pinning key for a BlackLab query: pattern and document filter (no paging/sort)."""
+    if not params or not hasattr(params, "get"):
+        return None
+
+    def first(value: Any) -> str:
+        if isinstance(value, (list, tuple)):
+            value = value[0] if value else ""
+        return "" if value is None else str(value)
+
+    patt = first(params.get("patt"))
+    if not patt:
+        return None
+    return f"{patt}\x00{first(params.get('filter'))}"
+
+
+def _score(key: str, url: str) -> int:
+    digest = hashlib.blake2b(f"{key}\x00{url}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class ReplicaPool:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        eject_failures: int = 3,
+        eject_seconds: float = 30.0,
+        primary: str = BLS_BASE_URL,
+    ) -> None:
+        self.replicas = [Replica(url) for url in urls]
+        self.primary = primary.rstrip("/")
+        self.eject_failures = max(1, eject_failures)
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def choose(self, affinity: Optional[str] = None, exclude: Iterable[Replica] = ()) -> Replica:
+        """Pick a replica and count it as outstanding (pair with :meth:`release`)."""
+        now = time.monotonic()
+        with self._lock:
+            excluded = set(map(id, exclude))
+            candidates = [r for r in self.replicas if id(r) not in excluded] or self.replicas
+            healthy = [r for r in candidates if r.available(now)] or candidates
+            if len(healthy) == 1:
+                replica = healthy[0]
+            elif affinity is not None:
+                replica = max(healthy, key=lambda r: _score(affinity, r.url))
+            else:
+                a, b = self._random.sample(healthy, 2)
+                replica = a if a.outstanding <= b.outstanding else b
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, ok: bool | None) -> None:
+        """End a request; ``ok=None`` frees the slot without judging the replica."""
+        now = time.monotonic()
+        with self._lock:
+            replica.outstanding = max(0, replica.outstanding - 1)
+            if ok is None:
+                return
+            if ok:
+                replica.consecutive_failures = 0
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            if len(self.replicas) > 1 and replica.consecutive_failures >= self.eject_failures and replica.available(now):
+                replica.ejected_until = now + self.eject_seconds
+                replica.ejections += 1
+                replica.consecutive_failures = 0
+
+    def rewrite(self, url: str, replica: Replica) -> str:
+        """Point a URL built from BLS_BASE_URL at ``replica``."""
+        if replica.url != self.primary and url.startswith(self.primary):
+            return replica.url + url[len(self.primary) :]
+        return url
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": r.url,
+                    "outstanding": r.outstanding,
+                    "requests": r.requests,
+                    "failures": r.failures,
+                    "ejections": r.ejections,
+                    "ejected_for_s": round(max(0.0, r.ejected_until - now), 1),
+                }
+                for r in self.replicas
+            ]
+
+
+_POOL: Optional[ReplicaPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_replica_pool() -> ReplicaPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ReplicaPool(
+                _replica_urls(),
+                eject_failures=int(os.environ.get("BLS_EJECT_FAILURES", "3")),
+                eject_seconds=float(os.environ.get("BLS_EJECT_SECONDS", "30")),
+            )
+        return _POOL
+
+
+def reset_replica_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        _POOL = None
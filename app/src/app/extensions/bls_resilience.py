@@ -0,0 +1,432 @@
+"""Resilience layer for BlackLab calls made through the shared httpx client.
+
+With two sync gunicorn workers, a slow BlackLab must not hold every worker
+for a full read timeout. All BlackLab requests therefore go through
+:func:`send`, which adds:
+
+- a latency histogram per endpoint (``hits``, ``docs``, ``termfreq`` ...)
+  with a rolling window for percentiles;
+- adaptive read timeouts per endpoint: a multiple of the observed p99,
+  clamped to ``[BLS_TIMEOUT_MIN, BLS_TIMEOUT_MAX]``;
+- a circuit breaker that opens after ``BLS_BREAKER_FAILURES`` consecutive
+  failures (timeouts, connection errors, 5xx) or when the windowed p95
+  exceeds ``BLS_BREAKER_SLOW_P95_MS``. While open, requests fail fast with
+  :class:`BlackLabUnavailable` (503 + friendly message); after
+  ``BLS_BREAKER_OPEN_SECONDS`` one probe request is let through;
+- a retry budget for idempotent GETs: connection errors and 502/503/504
+  are retried once, but retries may not exceed ``BLS_RETRY_BUDGET_RATIO``
+  of the request volume, so retries cannot amplify an overload.
+
+Read timeouts are never retried: they are the expensive failure mode.
+
+Queries already known to be slow (the ``slow`` lane of
+``search/query_cost.py``) run inside :func:`slow_calls`: they get that
+explicit read timeout instead of the adaptive one, and their latencies,
+timeouts and 5xx neither reach the circuit breaker, the replica ejection
+nor the per-endpoint histograms (they are kept apart, ``slow_endpoints`` in
+``snapshot()``). Otherwise a handful of expensive regex searches would
+clamp the timeout for everyone and open the breaker.
+With several replicas (``BLS_REPLICAS``, see ``bls_replicas``) each attempt
+is routed to a replica, and a retry goes to a different one.
+Settings come from the environment (like ``http_client``); the layer is
+process-global and thread-safe, so it also works from worker threads
+without an app context.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import httpx
+
+from .bls_replicas import affinity_key, get_replica_pool, reset_replica_pool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets (ms); the last bucket is open-ended
+BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+WINDOW_SIZE = 200
+MIN_SAMPLES = 20
+
+RETRYABLE_STATUS = {502, 503, 504}
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# Read timeout (s) of the enclosing slow_calls() block, None outside
+_SLOW_READ_TIMEOUT: ContextVar[Optional[float]] = ContextVar("bls_slow_read_timeout", default=None)
+
+USER_MESSAGE = "El motor de búsqueda está sobrecargado o no responde en este momento. Por favor, inténtelo de nuevo en unos segundos."
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@contextmanager
+def slow_calls(read_timeout: float) -> Iterator[None]:
+    """Mark BlackLab calls in this block (and bulkhead tasks it starts) as known-slow."""
+    token = _SLOW_READ_TIMEOUT.set(read_timeout)
+    try:
+        yield
+    finally:
+        _SLOW_READ_TIMEOUT.reset(token)
+
+
+class BlackLabUnavailable(RuntimeError):
+    """Raised instead of calling BlackLab while the circuit breaker is open."""
+
+    def __init__(self, message: str = USER_MESSAGE, retry_after: int = 5) -> None:
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after))
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts plus a rolling window for percentiles."""
+
+    def __init__(self, window: int = WINDOW_SIZE) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.window: deque[float] = deque(maxlen=window)
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.window.append(ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self.window) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.window)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict[str, Any]:
+        labels = [f"le_{b}" for b in BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.total,
+            "buckets": dict(zip(labels, self.counts)),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+        }
+
+
+class CircuitBreaker:
+    """Closed -> open (fail fast) -> half-open (one probe) -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, open_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self.reason = ""
+        self._probe_in_flight = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.open_seconds - (now - self.opened_at))
+
+    def success(self) -> bool:
+        """Record a success; returns True if this closed the breaker."""
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self._probe_in_flight = False
+            self.reason = ""
+            return True
+        return False
+
+    def failure(self, now: float) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            self.trip(now, "probe failed")
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self.trip(now, f"{self.consecutive_failures} consecutive failures")
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot after a request that proved nothing."""
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def trip(self, now: float, reason: str) -> None:
+        self.state = self.OPEN
+        self.opened_at = now
+        self.open_count += 1
+        self.reason = reason
+        self._probe_in_flight = False
+        logger.warning("BlackLab circuit breaker opened: %s", reason)
+
+
+class RetryBudget:
+    """Token bucket: every request deposits ``ratio`` tokens, a retry costs one."""
+
+    def __init__(self, ratio: float, min_tokens: float = 3.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.balance = min_tokens
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        self.balance = min(self.max_tokens, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.balance >= 1.0:
+            self.balance -= 1.0
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+
+def endpoint_key(url: str) -> str:
+    """Endpoint name for metrics/timeouts: ``/corpora/x/hits`` -> ``hits``."""
+    path = httpx.URL(url).path.rstrip("/")
+    parts = [p for p in path.split("/") if p]
+    if "corpora" in parts:
+        rest = parts[parts.index("corpora") + 1 :]
+        if len(rest) >= 2:
+            return rest[1]
+        return "corpus" if rest else "corpora"
+    return parts[-1] if parts else "root"
+
+
+class BlackLabResilience:
+    def __init__(self) -> None:
+        self.timeout_min = _env_float("BLS_TIMEOUT_MIN", 5.0)
+        self.timeout_max = _env_float("BLS_TIMEOUT_MAX", 30.0)
+        self.timeout_factor = _env_float("BLS_TIMEOUT_P99_FACTOR", 3.0)
+        self.slow_p95_ms = _env_float("BLS_BREAKER_SLOW_P95_MS", 20000.0)
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(_env_float("BLS_BREAKER_FAILURES", 5)),
+            open_seconds=_env_float("BLS_BREAKER_OPEN_SECONDS", 15.0),
+        )
+        self.budget = RetryBudget(ratio=_env_float("BLS_RETRY_BUDGET_RATIO", 0.1))
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.slow_histograms: dict[str, LatencyHistogram] = {}
+        self.fast_failures = 0
+        self._lock = threading.Lock()
+
+    # -- timeouts -----------------------------------------------------------
+
+    def read_timeout(self, endpoint: str) -> float:
+        with self._lock:
+            histogram = self.histograms.get(endpoint)
+            p99 = histogram.percentile(0.99) if histogram else None
+        return self._clamp_timeout(p99)
+
+    def _clamp_timeout(self, p99: Optional[float]) -> float:
+        if p99 is None:
+            return self.timeout_max
+        adaptive = p99 / 1000.0 * self.timeout_factor
+        return min(self.timeout_max, max(self.timeout_min, adaptive))
+
+    def timeout_for(self, endpoint: str) -> httpx.Timeout:
+        return httpx.Timeout(connect=5.0, read=self.read_timeout(endpoint), write=5.0, pool=5.0)
+
+    # -- bookkeeping --------------------------------------------------------
+
+    def _before_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not self.breaker.allow(now):
+                self.fast_failures += 1
+                raise BlackLabUnavailable(retry_after=self.breaker.retry_after(now) or 1)
+            self.budget.deposit()
+
+    def _observe(self, endpoint: str, started: float, ok: bool, slow: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if slow:
+                self.slow_histograms.setdefault(endpoint, LatencyHistogram()).observe((now - started) * 1000.0)
+                if ok:
+                    self.breaker.success()
+                else:
+                    self.breaker.release_probe()
+                return
+            histogram = self.histograms.setdefault(endpoint, LatencyHistogram())
+            histogram.observe((now - started) * 1000.0)
+            if not ok:
+                self.breaker.failure(now)
+                return
+            if self.breaker.success():
+                # Recovered: judge the new latency on fresh samples
+                for h in self.histograms.values():
+                    h.window.clear()
+                return
+            p95 = histogram.percentile(0.95)
+            if p95 is not None and p95 > self.slow_p95_ms:
+                self.breaker.trip(now, f"{endpoint} p95 {p95:.0f} ms")
+                histogram.window.clear()
+
+    def _may_retry(self, method: str, attempt: int) -> bool:
+        if method.upper() != "GET" or attempt > 0:
+            return False
+        with self._lock:
+            return self.budget.withdraw()
+
+    # -- public -------------------------------------------------------------
+
+    def send(
+        self,
+        client: httpx.Client,
+        method: str,
+        url: str,
+        *,
+        timeout: Any = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        ``client.request`` guarded by breaker, retry budget and adaptive timeout.
+
+        Returns the response without ``raise_for_status``. Raises
+        :class:`BlackLabUnavailable` while the breaker is open, otherwise the
+        original httpx exception. Inside :func:`slow_calls` the slow-lane
+        read timeout applies unless ``timeout`` is given.
+        """
+        endpoint = endpoint_key(url)
+        slow_timeout = _SLOW_READ_TIMEOUT.get()
+        if timeout is None and slow_timeout is not None:
+            timeout = httpx.Timeout(connect=5.0, read=slow_timeout, write=5.0, pool=5.0)
+        self._before_request()
+        try:
+            return self._send(client, method, url, endpoint, timeout, kwargs, slow=slow_timeout is not None)
+        except BaseException:
+            # Every exit without a response: if this request was the half-open
+            # probe and nothing was observed, let the next request probe
+            with self._lock:
+                self.breaker.release_probe()
+            raise
+
+    def _send(
+        self,
+        client: httpx.Client,
+        method: str,
+        url: str,
+        endpoint: str,
+        timeout: Any,
+        kwargs: dict[str, Any],
+        slow: bool = False,
+    ) -> httpx.Response:
+        if timeout is None:
+            timeout = self.timeout_for(endpoint)
+        # Failures of slow-lane queries say nothing about the replica
+        failed = None if slow else False
+
+        pool = get_replica_pool()
+        affinity = affinity_key(kwargs.get("params")) if method.upper() == "GET" else None
+        tried = []
+        attempt = 0
+        while True:
+            replica = pool.choose(affinity, exclude=tried)
+            tried.append(replica)
+            started = time.monotonic()
+            try:
+                response = client.request(method, pool.rewrite(url, replica), timeout=timeout, **kwargs)
+            except RETRYABLE_ERRORS as exc:
+                pool.release(replica, ok=failed)
+                self._observe(endpoint, started, ok=False, slow=slow)
+                if self._may_retry(method, attempt):
+                    logger.info("Retrying BlackLab %s after %s", endpoint, type(exc).__name__)
+                    attempt += 1
+                    time.sleep(0.05)
+                    continue
+                raise
+            except (httpx.TimeoutException, httpx.TransportError):
+                pool.release(replica, ok=failed)
+                self._observe(endpoint, started, ok=False, slow=slow)
+                raise
+            except BaseException:
+                # Not an upstream health signal (InvalidURL, TooManyRedirects,
+                # DecodingError, interrupts): only free the replica slot
+                pool.release(replica, ok=None)
+                raise
+
+            ok = response.status_code < 500
+            pool.release(replica, ok=ok or failed)
+            self._observe(endpoint, started, ok=ok, slow=slow)
+            if response.status_code in RETRYABLE_STATUS and self._may_retry(method, attempt):
+                logger.info("Retrying BlackLab %s after HTTP %s", endpoint, response.status_code)
+                response.close()
+                attempt += 1
+                time.sleep(0.05)
+                continue
+            return response
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "breaker": {
+                    "state": self.breaker.state,
+                    "reason": self.breaker.reason,
+                    "consecutive_failures": self.breaker.consecutive_failures,
+                    "open_count": self.breaker.open_count,
+                    "retry_after_s": round(self.breaker.retry_after(now), 1) if self.breaker.state != CircuitBreaker.CLOSED else 0,
+                    "fast_failures": self.fast_failures,
+                },
+                "retry_budget": {
+                    "balance": round(self.budget.balance, 2),
+                    "retries": self.budget.retries,
+                    "denied": self.budget.denied,
+                },
+                "endpoints": {
+                    name: {
+                        **h.snapshot(),
+                        "read_timeout_s": round(self._clamp_timeout(h.percentile(0.99)), 2),
+                    }
+                    for name, h in self.histograms.items()
+                },
+                "slow_endpoints": {name: h.snapshot() for name, h in self.slow_histograms.items()},
+                "replicas": get_replica_pool().snapshot(),
+            }
+
+
+_RESILIENCE: Optional[BlackLabResilience] = None
+_RESILIENCE_LOCK = threading.Lock()
+
+
+def get_resilience() -> BlackLabResilience:
+    global _RESILIENCE
+    with _RESILIENCE_LOCK:
+        if _RESILIENCE is None:
+            _RESILIENCE = BlackLabResilience()
+        return _RESILIENCE
+
+
+def reset_resilience() -> None:
+    """Drop all state (tests, or after reconfiguring the environment)."""
+    global _RESILIENCE
+    with _RESILIENCE_LOCK:
+        _RESILIENCE = None
+    reset_replica_pool()
+
+
+def send(client: httpx.Client, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Shortcut for ``get_resilience().send(...)``."""
+    return get_resilience().send(client, method, url, **kwargs)
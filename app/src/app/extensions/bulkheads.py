@@ -0,0 +1,259 @@
+"""Process-wide bounded executor with named bulkheads.
+
+Each kind of work gets its own bulkhead, so a burst of one kind (e.g. stats
+charts or exports) cannot take every thread and every BlackLab connection
+from the others:
+
+    search   BlackLab searches: each shard request of the fan-out
+             (``search/shards.py``), unsharded searches of the request
+             handlers (``/search/advanced/data``, ``/token/search``, stats
+             totals)
+    stats    stats group-by fan-out (``/search/advanced/stats[/csv]``),
+             ``/api/stats`` aggregation and batch sub-queries
+             (``/search/advanced/batch``)
+    export   streaming exports (one slot per running download)
+    proxy    ``/bls/**`` proxy requests
+    snippet  audio snippet generation (ffmpeg)
+    jobs     background jobs (collocation analyses, ``services/collocations.py``)
+    stream   prefetch of the next hit window of ``/search/advanced/stream``
+             (``search/streaming.py``; the stream itself holds an ``export`` slot)
+
+A bulkhead admits at most ``concurrency`` running and ``queue`` waiting
+tasks. Beyond that, or after waiting ``BULKHEAD_QUEUE_TIMEOUT`` seconds for
+a running slot, work is rejected with :class:`BulkheadFull` (503 +
+Retry-After) instead of piling up.
+
+Work runs either on the bulkhead's own thread pool (:meth:`Bulkhead.submit`,
+:meth:`Bulkhead.map` for fan-out) or in the calling thread
+(:meth:`Bulkhead.slot` / :meth:`Bulkhead.acquire` for request handlers);
+both share the same limits. Pool tasks run in a copy of the submitting
+thread's ``contextvars`` context. Fan-out tasks must not submit to their own
+bulkhead (``stats``, ``jobs`` and ``stream`` tasks may use ``search``,
+``search`` tasks are leaves).
+
+Configuration (environment, like ``bls_resilience``):
+    BULKHEAD_<NAME>: ``concurrency:queue``, e.g. ``BULKHEAD_STATS=8:32``
+    BULKHEAD_QUEUE_TIMEOUT: Max. seconds a task waits for a slot (default 10)
+
+Admissions, rejections and wait times per bulkhead: ``snapshot()``, shown in
+``/health/bls``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from .bls_resilience import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# name -> (concurrency, queue)
+DEFAULT_LIMITS = {
+    "search": (16, 64),
+    "stats": (8, 32),
+    "export": (2, 2),
+    "proxy": (16, 32),
+    "snippet": (4, 16),
+    "jobs": (2, 8),
+    "stream": (4, 4),
+}
+
+USER_MESSAGE = "El servidor está atendiendo demasiadas solicitudes de este tipo. Por favor, inténtelo de nuevo en unos segundos."
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _limits(name: str) -> tuple[int, int]:
+    concurrency, queue = DEFAULT_LIMITS[name]
+    raw = os.environ.get(f"BULKHEAD_{name.upper()}", "").strip()
+    if raw:
+        try:
+            first, _, second = raw.partition(":")
+            concurrency = int(first)
+            queue = int(second) if second else queue
+        except ValueError:
+            logger.warning("Invalid BULKHEAD_%s=%r, using defaults", name.upper(), raw)
+    return max(1, concurrency), max(0, queue)
+
+
+class BulkheadFull(RuntimeError):
+    """Raised when a bulkhead has no running or queue slot left."""
+
+    def __init__(self, name: str, retry_after: int, message: str = USER_MESSAGE) -> None:
+        super().__init__(message)
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A running slot; :meth:`release` is idempotent."""
+
+    def __init__(self, bulkhead: "Bulkhead") -> None:
+        self._bulkhead = bulkhead
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._bulkhead._leave()
+
+
+class Bulkhead:
+    def __init__(self, name: str, concurrency: int, queue: int, queue_timeout: float = 10.0) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.inflight = 0  # admitted, not finished (waiting + running)
+        self.active = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.wait = LatencyHistogram()
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.queue_timeout))
+
+    # -- admission ----------------------------------------------------------
+
+    def _admit(self, n: int = 1) -> None:
+        with self._lock:
+            if self.inflight + n > self.concurrency + self.queue:
+                self.rejected_full += 1
+                logger.warning("Bulkhead %s full (%s in flight), rejecting %s task(s)", self.name, self.inflight, n)
+                raise BulkheadFull(self.name, self.retry_after)
+            self.inflight += n
+            self.admitted += n
+
+    def _enter(self) -> None:
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.inflight -= 1
+                self.rejected_timeout += 1
+            raise BulkheadFull(self.name, self.retry_after)
+        with self._lock:
+            self.active += 1
+            self.wait.observe((time.monotonic() - started) * 1000.0)
+
+    def _leave(self) -> None:
+        self._slots.release()
+        with self._lock:
+            self.active -= 1
+            self.inflight -= 1
+
+    # -- calling thread -----------------------------------------------------
+
+    def acquire(self) -> Ticket:
+        """Take a running slot in the calling thread (pair with ``Ticket.release``)."""
+        self._admit()
+        self._enter()
+        return Ticket(self)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        ticket = self.acquire()
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    # -- thread pool --------------------------------------------------------
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f"bulkhead-{self.name}")
+            return self._pool
+
+    def _run(self, fn: Callable[[], Any]) -> Any:
+        self._enter()
+        try:
+            return fn()
+        finally:
+            self._leave()
+
+    def submit_all(self, calls: list[Callable[[], Any]]) -> list[Future]:
+        """Run ``calls`` on the bulkhead pool; all are admitted or none (BulkheadFull)."""
+        if not calls:
+            return []
+        self._admit(len(calls))
+        executor = self._executor()
+        # Tasks see the caller's context variables (e.g. bls_resilience.slow_calls)
+        return [executor.submit(contextvars.copy_context().run, self._run, call) for call in calls]
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self.submit_all([lambda: fn(*args, **kwargs)])[0]
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> list[Any]:
+        """``[fn(item) for item in items]`` in parallel; results in input order."""
+        futures = self.submit_all([lambda item=item: fn(item) for item in items])
+        return [future.result() for future in futures]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "queue": self.queue,
+                "active": self.active,
+                "queued": self.inflight - self.active,
+                "admitted": self.admitted,
+                "rejected_full": self.rejected_full,
+                "rejected_timeout": self.rejected_timeout,
+                "wait": self.wait.snapshot(),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_BULKHEADS: dict[str, Bulkhead] = {}
+_BULKHEADS_LOCK = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """The process-wide bulkhead ``name`` (one of ``DEFAULT_LIMITS``)."""
+    if name not in DEFAULT_LIMITS:
+        raise ValueError(f"Unknown bulkhead: {name}")
+    with _BULKHEADS_LOCK:
+        bulkhead = _BULKHEADS.get(name)
+        if bulkhead is None:
+            concurrency, queue = _limits(name)
+            bulkhead = Bulkhead(name, concurrency, queue, _env_float("BULKHEAD_QUEUE_TIMEOUT", 10.0))
+            _BULKHEADS[name] = bulkhead
+        return bulkhead
+
+
+def snapshot() -> dict[str, Any]:
+    return {name: get_bulkhead(name).snapshot() for name in DEFAULT_LIMITS}
+
+
+def reset_bulkheads() -> None:
+    """Drop all bulkheads (tests, or after reconfiguring the environment)."""
+    with _BULKHEADS_LOCK:
+        bulkheads = list(_BULKHEADS.values())
+        _BULKHEADS.clear()
+    for bulkhead in bulkheads:
+        bulkhead.shutdown()
@@ -37,9 +37,9 @@ BLS_BASE_URL = os.environ.get(
 # but the validation must happen lazily so imports do not fail during test collection.
 BLS_CORPUS = (os.environ.get("BLS_CORPUS") or "").strip()
 
-# Corpus availability cache
-_CORPORA_CACHE_TTL = 60.0
-_CORPORA_CACHE: Dict[str, object] = {"ts": 0.0, "corpora": None}
+# Corpus availability cache (dropped when the corpus epoch changes)
+_CORPORA_CACHE_TTL = 600.0
+_CORPORA_CACHE: Dict[str, object] = {"ts": 0.0, "corpora": None, "epoch": None}
 _CORPUS_CHECKED = False
 
 
@@ -91,10 +91,13 @@ def _parse_corpora_payload(payload: object) -> list[str]:
 def get_available_corpora(force: bool = False) -> list[str]:
     """Fetch available corpora from BlackLab (cached for a short TTL)."""
     global _CORPORA_CACHE
+    # Imported here: this module is also loaded standalone (no package context)
+    from ..services.corpus_epoch import corpus_epoch
 
     now = time.time()
+    epoch = corpus_epoch()
     cached = _CORPORA_CACHE.get("corpora")
-    if not force and cached is not None:
+    if not force and cached is not None and _CORPORA_CACHE.get("epoch") == epoch:
         age = now - float(_CORPORA_CACHE.get("ts", 0.0))
         if age < _CORPORA_CACHE_TTL:
             return list(cached)
@@ -109,7 +112,7 @@ def get_available_corpora(force: bool = False) -> list[str]:
         )
         response.raise_for_status()
         corpora = _parse_corpora_payload(response.json())
-        _CORPORA_CACHE = {"ts": now, "corpora": corpora}
+        _CORPORA_CACHE = {"ts": now, "corpora": corpora, "epoch": epoch}
         return list(corpora)
     except Exception as exc:
         logger.debug(f"Failed to fetch BlackLab corpora list: {exc}")
@@ -18,7 +18,7 @@ from . import (
     admin_users,
     analytics,
 )
-from ..search import advanced, advanced_api
+from ..search import advanced, advanced_api, suggest
 
 
 BLUEPRINTS = [
@@ -35,6 +35,7 @@ BLUEPRINTS = [
     advanced.bp,  # Advanced search UI: /search/advanced
     corpus.blueprint,  # Corpus informational routes (e.g. /corpus/guia)
     advanced_api.bp,  # Advanced search API: /search/advanced/data, /search/advanced/export
+    suggest.bp,  # Term suggestions: /search/suggest
     admin_users.bp,
     analytics.bp,  # Analytics API: /api/analytics/* (VARIANTE 3a: nur Zähler)
 ]
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, current_app, jsonify, redirect, url_for
+from flask import Blueprint, current_app, jsonify, redirect, request, url_for
 
 from ..extensions import cache
 from ..services.atlas import fetch_country_stats, fetch_file_metadata
+from ..services.corpus_epoch import corpus_epoch
 
 # New versioned blueprint
 blueprint = Blueprint("atlas_api", __name__, url_prefix="/api/v1/atlas")
@@ -13,11 +14,19 @@ blueprint = Blueprint("atlas_api", __name__, url_prefix="/api/v1/atlas")
 # Legacy blueprint for backwards compatibility (redirects to v1)
 legacy_blueprint = Blueprint("atlas_api_legacy", __name__, url_prefix="/atlas")
 
+# Corpus data is cached per corpus epoch: a rebuild changes the keys, so the
+# long TTL never serves data of an older build.
+CORPUS_CACHE_TIMEOUT = 24 * 3600
+
+
+def _epoch_view_key() -> str:
+    return f"view/{request.path}@{corpus_epoch()}"
+
 
 @blueprint.get("/countries")
-@cache.cached(timeout=3600)  # Cache for 1 hour
+@cache.cached(timeout=CORPUS_CACHE_TIMEOUT, key_prefix=_epoch_view_key)
 def countries():
-    """Get country-specific statistics (cached for 1 hour)."""
+    """Get country-specific statistics (cached per corpus epoch)."""
     return jsonify({"countries": fetch_country_stats()})
 
 
@@ -28,7 +37,7 @@ def files():
     In development, avoid persisting empty responses because path fixes and
     metadata refreshes should become visible immediately.
     """
-    cache_key = "atlas_files_v2"
+    cache_key = f"atlas_files_v2@{corpus_epoch()}"
 
     if not current_app.debug and not current_app.testing:
         cached = cache.get(cache_key)
@@ -40,7 +49,7 @@ def files():
     if current_app.debug or current_app.testing:
         cache.delete(cache_key)
     elif files_payload:
-        cache.set(cache_key, files_payload, timeout=3600)
+        cache.set(cache_key, files_payload, timeout=CORPUS_CACHE_TIMEOUT)
     else:
         cache.delete(cache_key)
 
@@ -5,7 +5,9 @@ from __future__ import annotations
 import logging
 from urllib.parse import urljoin
 
-from flask import Blueprint, request, Response
+from flask import Blueprint, jsonify, request, Response
+from ..extensions.bls_resilience import BlackLabUnavailable, get_resilience
+from ..extensions.bulkheads import BulkheadFull, get_bulkhead
 from ..extensions.http_client import get_http_client, BLS_BASE_URL
 
 logger = logging.getLogger(__name__)
@@ -65,15 +67,17 @@ def _proxy_request(method: str, path: str) -> Response:
             not in {"host", "connection", "transfer-encoding", "content-length"}
         }
 
-        # Make upstream request
-        upstream_response = client.request(
-            method=method,
-            url=upstream_url,
-            headers=headers,
-            params=request.args.to_dict(flat=False) if request.args else None,
-            content=request.get_data(),
-            follow_redirects=False,
-        )
+        # Make upstream request ("proxy" bulkhead, circuit breaker + adaptive timeout)
+        with get_bulkhead("proxy").slot():
+            upstream_response = get_resilience().send(
+                client,
+                method,
+                upstream_url,
+                headers=headers,
+                params=request.args.to_dict(flat=False) if request.args else None,
+                content=request.get_data(),
+                follow_redirects=False,
+            )
 
         # Remove hop-by-hop headers from response
         response_headers = _remove_hop_by_hop_headers(dict(upstream_response.headers))
@@ -87,6 +91,12 @@ def _proxy_request(method: str, path: str) -> Response:
             mimetype=upstream_response.headers.get("content-type", "application/json"),
         )
 
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        response = jsonify({"error": "upstream_overloaded", "message": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
     except Exception as e:
         logger.error(f"Proxy error: {e}")
         return Response(
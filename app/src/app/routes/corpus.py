@@ -43,12 +43,12 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     url_for,
 )
 from flask_jwt_extended import verify_jwt_in_request
 
 from ..runtime_paths import get_metadata_dir, get_stats_dir
+from ..services import file_delivery
 
 # ==============================================================================
 # BLUEPRINT SETUP
@@ -192,8 +192,10 @@ def _serve_metadata_file(
         return Response(message, status=404, mimetype="text/plain")
 
     try:
-        return send_file(
+        return file_delivery.send_runtime_file(
             metadata_path,
+            base_dir=metadata_root,
+            location=file_delivery.LOCATION_METADATA,
             mimetype=mimetype,
             as_attachment=True,
             download_name=download_name or filename,
@@ -357,9 +359,11 @@ def serve_statistics(filename: str) -> Response:
         else:
             mimetype = "application/octet-stream"
 
-        # Send file
-        response = send_file(
+        # Send file (or delegate the transfer to the reverse proxy)
+        response = file_delivery.send_runtime_file(
             target_file,
+            base_dir=stats_dir_resolved,
+            location=file_delivery.LOCATION_STATS,
             mimetype=mimetype,
             as_attachment=False,
         )
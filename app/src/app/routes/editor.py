@@ -13,6 +13,7 @@ from ..auth import Role
 from ..auth.decorators import require_role
 from ..services.database import open_db
 from ..services.media_store import transcripts_dir
+from ..services.transcript_files import transcript_io
 
 blueprint = Blueprint("editor", __name__, url_prefix="/editor")
 
@@ -21,6 +22,16 @@ def _transcripts_dir() -> Path:
     return transcripts_dir()
 
 
+def _transcript_file(file_path: str) -> tuple[Path, Path | None]:
+    """
+    Kanonischer ``.json``-Pfad eines Transcripts und die Datei mit dem
+    aktuellen Inhalt (``.json`` oder neueres ``.json.zst``; None wenn keine
+    existiert). Gespeichert wird immer als ``.json``.
+    """
+    full_path = transcript_io.plain_path(_transcripts_dir() / file_path)
+    return full_path, transcript_io.resolve_transcript(full_path)
+
+
 def _edit_log_file() -> Path:
     return _transcripts_dir() / "edit_log.jsonl"
 
@@ -66,8 +77,8 @@ def overview():
             continue
 
         files = []
-        for json_file in sorted(country_dir.glob("*.json")):
-            file_info = _get_file_info(country, json_file.name)
+        for json_file in transcript_io.iter_transcript_files(country_dir):
+            file_info = _get_file_info(country, transcript_io.plain_path(json_file).name)
             files.append(file_info)
 
         if files:
@@ -99,8 +110,8 @@ def edit_file():
         abort(400, "Invalid file path")
 
     # Verify file exists
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists() or not full_path.is_file():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         abort(404, "File not found")
 
     # Extrahiere Audio-Pfad
@@ -145,8 +156,8 @@ def save_edits():
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
@@ -157,8 +168,7 @@ def save_edits():
         # 2. Create/maintain _original backup (never deleted, never overwritten)
         original_backup_path = backup_dir / f"{full_path.stem}_original.json"
         if not original_backup_path.exists():
-            with open(full_path, "r", encoding="utf-8") as f:
-                original_data = f.read()
+            original_data = transcript_io.read_transcript_bytes(source).decode("utf-8")
             with open(original_backup_path, "w", encoding="utf-8") as f:
                 f.write(original_data)
             current_app.logger.info(
@@ -232,14 +242,13 @@ def add_bookmark():
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
         # Read current transcript
-        with open(full_path, "r", encoding="utf-8") as f:
-            transcript_data = json.load(f)
+        transcript_data = transcript_io.read_transcript(source)
 
         # Initialize bookmarks array if not exists
         if "bookmarks" not in transcript_data:
@@ -306,14 +315,13 @@ def remove_bookmark():
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
         # Read current transcript
-        with open(full_path, "r", encoding="utf-8") as f:
-            transcript_data = json.load(f)
+        transcript_data = transcript_io.read_transcript(source)
 
         # Remove bookmark if exists
         if "bookmarks" in transcript_data:
@@ -355,8 +363,8 @@ def get_history(country: str, filename: str):
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
@@ -402,8 +410,8 @@ def undo_change():
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
@@ -477,13 +485,12 @@ def get_bookmarks(country: str, filename: str):
     if ".." in file_path or file_path.startswith("/"):
         return {"success": False, "message": "Invalid file path"}, 400
 
-    full_path = _transcripts_dir() / file_path
-    if not full_path.exists():
+    full_path, source = _transcript_file(file_path)
+    if source is None:
         return {"success": False, "message": "File not found"}, 404
 
     try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            transcript_data = json.load(f)
+        transcript_data = transcript_io.read_transcript(source)
 
         bookmarks = transcript_data.get("bookmarks", [])
 
@@ -16,14 +16,29 @@ from flask import (
 import json
 
 from ..config import code_to_name
+from ..services.transcript_files import transcript_io
 from flask_jwt_extended import jwt_required
 
 from ..auth import Role
 from ..auth.decorators import require_role
-from ..services import audio_snippets, media_store
+from ..extensions.bulkheads import get_bulkhead
+from ..services import (
+    audio_snippets,
+    file_delivery,
+    media_store,
+    precompressed,
+    transcript_columnar,
+    transcript_index,
+)
 
 blueprint = Blueprint("media", __name__, url_prefix="/media")
 
+PEAKS_MAX_AGE = 24 * 3600
+HLS_PLAYLIST_MAX_AGE = 60
+# Segments requested with the current ``?v=`` version are immutable; others
+# (no or an outdated version) are revalidated on every use.
+HLS_SEGMENT_MAX_AGE = 365 * 24 * 3600
+
 
 def _secure_path(base: Path, filename: str) -> Path:
     candidate = (base / filename).resolve()
@@ -50,14 +65,35 @@ def _send_from_base(base: Path, resolved: Path, **kwargs):
         )
         abort(404)
 
-    if not resolved.exists():
+    # Paths come from the media catalog (or _secure_path); a file removed since
+    # then surfaces as FileNotFoundError instead of an extra stat per request.
+    try:
+        return file_delivery.send_runtime_file(
+            resolved,
+            base_dir=media_store.media_root(),
+            location=file_delivery.LOCATION_MEDIA,
+            **kwargs,
+        )
+    except FileNotFoundError:
         current_app.logger.warning(
             "Resolved media path missing: resolved=%s",
             resolved,
         )
         abort(404)
 
-    return send_file(resolved, conditional=True, **kwargs)
+
+def _set_cache_scope(response, public: bool) -> None:
+    """Mark cacheable media responses public or private (auth-only media)."""
+    response.cache_control.public = bool(public)
+    response.cache_control.private = not public
+
+
+def _negotiate_snippet_format(requested: str | None) -> str:
+    """Snippet encoding from ``format`` (query/body) or the Accept header."""
+    try:
+        return audio_snippets.negotiate_format(requested, request.accept_mimetypes)
+    except ValueError as exc:
+        abort(400, str(exc))
 
 
 def _temp_access_allowed() -> bool:
@@ -67,6 +103,49 @@ def _temp_access_allowed() -> bool:
     )
 
 
+def _country_display(data: dict) -> str | None:
+    """Human-readable country name from the transcript's country fields."""
+    # Look for several possible country fields and compute display name
+    raw_country = (
+        data.get("country")
+        or data.get("country_code")
+        or data.get("countryCode")
+        or data.get("country_name")
+        or data.get("countryName")
+        or data.get("location")
+        or data.get("location_code")
+        or data.get("locationCode")
+        or ""
+    )
+    if not raw_country:
+        return None
+    # code_to_name will normalize legacy codes and return a readable name
+    try:
+        return code_to_name(str(raw_country), fallback=str(raw_country))
+    except Exception:
+        return str(raw_country)
+
+
+def _send_precompressed(path: Path, variant: str, build):
+    """Cached, precompressed JSON body derived from a transcript file."""
+    return precompressed.send_cached(
+        request,
+        path,
+        variant,
+        build,
+        mimetype="application/json",
+        public=bool(current_app.config.get("ALLOW_PUBLIC_TRANSCRIPTS", False)),
+    )
+
+
+def _require_transcript_access() -> None:
+    if not (
+        getattr(g, "user", None)
+        or current_app.config.get("ALLOW_PUBLIC_TRANSCRIPTS", False)
+    ):
+        abort(401, "Authentication required to access transcripts")
+
+
 @blueprint.get("/full/<path:filename>")
 def download_full(filename: str):
     """
@@ -89,12 +168,12 @@ def download_full(filename: str):
         filename,
         current_app.config.get("AUDIO_FULL_DIR"),
     )
-    path = media_store.safe_audio_full_path(filename)
+    entry = media_store.lookup_audio_full(filename)
+    path = entry.path if entry else None
     current_app.logger.debug(
-        "Audio resolution: filename=%s resolved_path=%s exists=%s",
+        "Audio resolution: filename=%s resolved_path=%s",
         filename,
         path,
-        path.exists() if path else None,
     )
     if path is None:
         current_app.logger.warning(
@@ -121,7 +200,12 @@ def download_full(filename: str):
 @jwt_required()
 def download_split(filename: str):
     base_dir = media_store.audio_split_dir()
-    path = _secure_path(base_dir, filename)
+    path = media_store.safe_audio_split_path(filename)
+    if path is None:
+        current_app.logger.warning(
+            "Split audio not found: filename=%s base=%s", filename, base_dir
+        )
+        abort(404)
     return _send_from_base(base_dir, path, mimetype="audio/mpeg", as_attachment=False)
 
 
@@ -135,6 +219,82 @@ def download_temp(filename: str):
     return _send_from_base(base_dir, path, mimetype="audio/mpeg", as_attachment=False)
 
 
+@blueprint.get("/peaks/<path:filename>")
+def download_peaks(filename: str):
+    """
+    Serve precomputed waveform peaks (see _0_mp3/mp3_waveform_peaks.py).
+
+    Same access rule as /media/full. Accepts the .peaks name or the MP3 name.
+    Responses support Range requests so the client can fetch the header and
+    a single resolution level instead of the whole file.
+    """
+    public = current_app.config.get("ALLOW_PUBLIC_FULL_AUDIO", False)
+    if not (getattr(g, "user", None) or public):
+        abort(401, "Authentication required to access waveform peaks")
+
+    entry = media_store.lookup_peaks(filename)
+    if entry is None:
+        abort(404)
+
+    response = _send_from_base(
+        media_store.peaks_dir(),
+        entry.path,
+        mimetype="application/octet-stream",
+        as_attachment=False,
+        max_age=PEAKS_MAX_AGE,
+    )
+    # Peaks change only when the pipeline reruns; revalidation uses the ETag.
+    _set_cache_scope(response, public)
+    return response
+
+
+@blueprint.get("/hls/<path:recording>/<name>")
+def download_hls(recording: str, name: str):
+    """
+    Serve HLS-style streaming playlists and segments of full recordings.
+
+    Same access rule as /media/full. Layout (see _0_mp3/mp3_prepare_and_split.py):
+        /media/hls/ARG/2023-08-10_ARG_Mitre/index.m3u8
+        /media/hls/ARG/2023-08-10_ARG_Mitre/seg_00000.mp3?v=<version>
+    The playlist links segments with the version of the pipeline run that
+    wrote them; only segments of the current version are cached for a year.
+    """
+    public = current_app.config.get("ALLOW_PUBLIC_FULL_AUDIO", False)
+    if not (getattr(g, "user", None) or public):
+        abort(401, "Authentication required to access full audio files")
+
+    playlist = media_store.lookup_hls_playlist(recording)
+    path = media_store.safe_hls_file(recording, name)
+    if playlist is None or path is None:
+        abort(404)
+    version = media_store.hls_version(playlist)
+
+    if name == media_store.HLS_PLAYLIST_NAME:
+        try:
+            body = media_store.versioned_playlist(playlist)
+        except OSError:
+            abort(404)
+        response = current_app.response_class(body, mimetype="application/vnd.apple.mpegurl")
+        response.set_etag(version)
+        response.cache_control.max_age = HLS_PLAYLIST_MAX_AGE
+        response.make_conditional(request)
+    else:
+        current = request.args.get("v") == version
+        response = _send_from_base(
+            media_store.hls_dir(),
+            path,
+            mimetype="audio/mpeg",
+            as_attachment=False,
+            max_age=HLS_SEGMENT_MAX_AGE if current else 0,
+        )
+        if current:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+    _set_cache_scope(response, public)
+    return response
+
+
 @blueprint.post("/snippet")
 def create_snippet():
     """PUBLIC ROUTE (conditionally): Access controlled by ALLOW_PUBLIC_TEMP_AUDIO config.
@@ -162,8 +322,14 @@ def create_snippet():
         abort(400, "Invalid start/end values")
     if not filename:
         abort(400, "Filename required")
+    snippet_format = _negotiate_snippet_format(
+        payload.get("format") or request.args.get("format")
+    )
     try:
-        snippet_path = audio_snippets.build_snippet(filename, start_val, end_val)
+        with get_bulkhead("snippet").slot():
+            snippet_path = audio_snippets.build_snippet(
+                filename, start_val, end_val, snippet_format=snippet_format
+            )
     except FileNotFoundError:
         abort(404, "Audio source not found")
     except audio_snippets.AudioProcessingDependencyError as exc:
@@ -178,12 +344,14 @@ def create_snippet():
     except ValueError as exc:
         abort(400, str(exc))
     download_name = snippet_path.name
-    return send_file(
+    response = send_file(
         snippet_path,
-        mimetype="audio/mpeg",
+        mimetype=audio_snippets.snippet_mimetype(snippet_format),
         as_attachment=False,
         download_name=download_name,
     )
+    response.vary.add("Accept")
+    return response
 
 
 @blueprint.get("/transcripts/<path:filename>")
@@ -191,16 +359,15 @@ def fetch_transcript(filename: str):
     """
     Serve transcript JSON files.
 
+    The augmented JSON is cached with gzip/brotli variants per file version;
+    revalidation with ``If-None-Match`` costs a single ``stat``.
+
     PUBLIC ROUTE (conditionally): No decorator needed.
     - For authenticated users: Always allowed
     - For unauthenticated: Only if public access is enabled
     """
     # Check if user is authenticated or public access is allowed
-    if not (
-        getattr(g, "user", None)
-        or current_app.config.get("ALLOW_PUBLIC_TRANSCRIPTS", False)
-    ):
-        abort(401, "Authentication required to access transcripts")
+    _require_transcript_access()
 
     current_app.logger.debug(
         "Transcript request: filename=%s TRANSCRIPTS_DIR=%s",
@@ -209,10 +376,9 @@ def fetch_transcript(filename: str):
     )
     transcript = media_store.safe_transcript_path(filename)
     current_app.logger.debug(
-        "Transcript resolution: filename=%s resolved_path=%s exists=%s",
+        "Transcript resolution: filename=%s resolved_path=%s",
         filename,
         transcript,
-        transcript.exists() if transcript else None,
     )
     if transcript is None:
         current_app.logger.warning(
@@ -223,10 +389,18 @@ def fetch_transcript(filename: str):
         abort(404)
 
     # Load and augment transcript JSON with a human-readable country display.
+    def _build() -> bytes:
+        data = transcript_io.read_transcript(transcript)
+        display = _country_display(data)
+        if display:
+            data["country_display"] = display
+        return current_app.json.dumps(data).encode("utf-8")
+
     try:
-        with open(transcript, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
-    except Exception:
+        return _send_precompressed(transcript, "json", _build)
+    except ValueError:
+        if transcript_io.is_compressed(transcript):
+            abort(422, "Transcript cannot be decoded")
         # Fall back to sending raw file if we cannot parse it
         return _send_from_base(
             Path(current_app.config["TRANSCRIPTS_DIR"]),
@@ -235,28 +409,146 @@ def fetch_transcript(filename: str):
             as_attachment=False,
         )
 
-    # Look for several possible country fields and compute display name
-    raw_country = (
-        data.get("country")
-        or data.get("country_code")
-        or data.get("countryCode")
-        or data.get("country_name")
-        or data.get("countryName")
-        or data.get("location")
-        or data.get("location_code")
-        or data.get("locationCode")
-        or ""
+
+def _int_arg(name: str) -> int | None:
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, f"Invalid integer parameter: {name}")
+
+
+def _seconds_arg_ms(name: str) -> int | None:
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(round(float(value) * 1000))
+    except ValueError:
+        abort(400, f"Invalid time parameter: {name}")
+
+
+@blueprint.get("/transcript-segments/<path:filename>")
+def fetch_transcript_segments(filename: str):
+    """
+    Serve a window of transcript segments instead of the whole file.
+
+    Query parameters (one selection mode):
+    - ``t0``/``t1``: segments overlapping ``[t0, t1]`` (seconds)
+    - ``start``/``count``: segment index window
+    - ``token``: window starting at the segment containing ``token_id``
+
+    ``format=columnar`` encodes the window like ``/media/transcript-columns``.
+    The response carries the top-level transcript metadata, ``segment_count``,
+    ``duration_ms`` and the half-open window ``start``/``end``. Same access
+    rules as ``/media/transcripts``.
+    """
+    _require_transcript_access()
+
+    entry = media_store.lookup_transcript(filename)
+    if entry is None:
+        current_app.logger.warning("Transcript not found: filename=%s", filename)
+        abort(404)
+
+    try:
+        index = transcript_index.get_index(entry.path)
+    except (OSError, ValueError) as exc:
+        current_app.logger.warning(
+            "Transcript index failed: filename=%s error=%s", filename, exc
+        )
+        abort(422, "Transcript cannot be indexed")
+
+    max_count = int(current_app.config.get("TRANSCRIPT_RANGE_MAX_SEGMENTS", 200))
+    count = _int_arg("count")
+    count = max_count if count is None else max(1, min(count, max_count))
+
+    t0_ms = _seconds_arg_ms("t0")
+    t1_ms = _seconds_arg_ms("t1")
+    token = request.args.get("token", "").strip()
+    if t0_ms is not None or t1_ms is not None:
+        t0_ms = max(0, t0_ms or 0)
+        t1_ms = index.duration_ms if t1_ms is None else t1_ms
+        if t1_ms < t0_ms:
+            abort(400, "t1 must not be smaller than t0")
+        start, end = index.window_for_time(t0_ms, t1_ms)
+        end = min(end, start + count)
+    elif token:
+        start = index.segment_for_token(token)
+        if start is None:
+            abort(404, "Token not found in transcript")
+        end = start + count
+    else:
+        start = max(0, _int_arg("start") or 0)
+        end = start + count
+    end = min(end, index.segment_count)
+    start = min(start, end)
+
+    header = dict(index.meta)
+    display = _country_display(header)
+    if display:
+        header["country_display"] = display
+    header.update(
+        {
+            "segment_count": index.segment_count,
+            "duration_ms": index.duration_ms,
+            "start": start,
+            "end": end,
+        }
     )
+    raw_segments = index.read_segments(start, end)
+    if request.args.get("format") == transcript_columnar.FORMAT_NAME:
+        header.update(transcript_columnar.encode_segments(json.loads(raw_segments)))
+        body = transcript_columnar.dumps(
+            {
+                "format": transcript_columnar.FORMAT_NAME,
+                "version": transcript_columnar.FORMAT_VERSION,
+                **header,
+            }
+        )
+    else:
+        # Splice the raw segment bytes into the JSON envelope without re-encoding.
+        envelope = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        body = envelope[:-1] + b', "segments": ' + raw_segments + b"}"
 
-    if raw_country:
-        # code_to_name will normalize legacy codes and return a readable name
-        try:
-            display = code_to_name(str(raw_country), fallback=str(raw_country))
-        except Exception:
-            display = str(raw_country)
-        data["country_display"] = display
+    response = current_app.response_class(body, mimetype="application/json")
+    response.cache_control.no_cache = True
+    return response
 
-    return jsonify(data)
+
+@blueprint.get("/transcript-columns/<path:filename>")
+def fetch_transcript_columns(filename: str):
+    """
+    Serve the compact columnar transcript (see services/transcript_columnar.py).
+
+    Built from the transcript JSON on first request and cached (with
+    compressed variants) per file version. Same access rules as
+    ``/media/transcripts``.
+    """
+    _require_transcript_access()
+
+    entry = media_store.lookup_transcript(filename)
+    if entry is None:
+        current_app.logger.warning("Transcript not found: filename=%s", filename)
+        abort(404)
+
+    def _augment(document: dict) -> None:
+        display = _country_display(document)
+        if display:
+            document["country_display"] = display
+
+    try:
+        return _send_precompressed(
+            entry.path,
+            transcript_columnar.FORMAT_NAME,
+            lambda: transcript_columnar.encode_file(entry.path, _augment),
+        )
+    except (OSError, ValueError) as exc:
+        current_app.logger.warning(
+            "Columnar transcript failed: filename=%s error=%s", filename, exc
+        )
+        abort(422, "Transcript cannot be encoded")
 
 
 @blueprint.post("/toggle/temp")
@@ -278,6 +570,9 @@ def play_audio(filename: str):
     and is always available for clients that can reach the server. It is only
     responsible for building and returning the requested snippet. If you need
     server-side toggles for other media endpoints, use `/media/temp` or `/media/snippet`.
+
+    Encoding: ``?format=opus`` (WebM/Opus) or ``?format=mp3``; without the
+    parameter the Accept header decides. MP3 is the fallback.
     """
     start = request.args.get("start", type=float)
     end = request.args.get("end", type=float)
@@ -298,10 +593,12 @@ def play_audio(filename: str):
     current_app.logger.debug(
         f"[Media.play_audio] Request received; JWT cookie present: {has_jwt}; cookies: {list(request.cookies.keys())}"
     )
+    snippet_format = _negotiate_snippet_format(request.args.get("format"))
     try:
-        snippet_path = audio_snippets.build_snippet(
-            filename, start, end, token_id, snippet_type
-        )
+        with get_bulkhead("snippet").slot():
+            snippet_path = audio_snippets.build_snippet(
+                filename, start, end, token_id, snippet_type, snippet_format
+            )
     except FileNotFoundError:
         abort(404, "Audio source not found")
     except audio_snippets.AudioProcessingDependencyError as exc:
@@ -319,9 +616,11 @@ def play_audio(filename: str):
         abort(400, str(exc))
     download_flag = request.args.get("download")
     as_attachment = download_flag is not None
-    return send_file(
+    response = send_file(
         snippet_path,
-        mimetype="audio/mpeg",
+        mimetype=audio_snippets.snippet_mimetype(snippet_format),
         as_attachment=as_attachment,
         download_name=snippet_path.name if as_attachment else None,
     )
+    response.vary.add("Accept")
+    return response
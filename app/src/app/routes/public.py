@@ -276,10 +276,16 @@ def health_check_bls():
         "ok": true|false,
         "url": "http://localhost:8081/blacklab-server",
         "status_code": 200 | error code,
-        "error": "Connection refused" | null
+        "error": "Connection refused" | null,
+        "resilience": {breaker state, retry budget, latency per endpoint},
+        "query_lanes": {wait/run times and rejections per cost lane},
+        "bulkheads": {limits, active/queued, rejections per bulkhead}
     }
     """
+    from ..extensions import bulkheads
+    from ..extensions.bls_resilience import get_resilience
     from ..extensions.http_client import BLS_BASE_URL, get_http_client
+    from ..search import query_cost
 
     logger.debug("BlackLab diagnostic check: %s", BLS_BASE_URL)
 
@@ -294,6 +300,9 @@ def health_check_bls():
                 "url": BLS_BASE_URL,
                 "status_code": response.status_code,
                 "error": None,
+                "resilience": get_resilience().snapshot(),
+                "query_lanes": query_cost.snapshot(),
+                "bulkheads": bulkheads.snapshot(),
             }
         ), 200 if ok else 502
 
@@ -305,6 +314,9 @@ def health_check_bls():
                 "url": BLS_BASE_URL,
                 "status_code": None,
                 "error": f"Connection refused (check if BlackLab is running at {BLS_BASE_URL})",
+                "resilience": get_resilience().snapshot(),
+                "query_lanes": query_cost.snapshot(),
+                "bulkheads": bulkheads.snapshot(),
             }
         ), 502
 
@@ -316,6 +328,9 @@ def health_check_bls():
                 "url": BLS_BASE_URL,
                 "status_code": None,
                 "error": "Timeout (BlackLab not responding)",
+                "resilience": get_resilience().snapshot(),
+                "query_lanes": query_cost.snapshot(),
+                "bulkheads": bulkheads.snapshot(),
             }
         ), 504
 
@@ -329,6 +344,9 @@ def health_check_bls():
                 "url": BLS_BASE_URL,
                 "status_code": None,
                 "error": _redact_sensitive_text(f"{type(e).__name__}: {str(e)}"),
+                "resilience": get_resilience().snapshot(),
+                "query_lanes": query_cost.snapshot(),
+                "bulkheads": bulkheads.snapshot(),
             }
         ), 500
 
@@ -2,21 +2,34 @@
 
 from __future__ import annotations
 
+import csv
 import hashlib
+import io
 import json
 from datetime import datetime, timezone
 
-from flask import Blueprint, Response, current_app, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
 from ..extensions import limiter
+from ..extensions.bulkheads import BulkheadFull, get_bulkhead
 from ..runtime_paths import get_stats_temp_dir
+from ..services.corpus_epoch import corpus_epoch
+from ..services.frequencies import (
+    ANNOTATIONS,
+    FrequenciesUnavailable,
+    FrequencyParams,
+    iter_frequencies,
+    query_frequencies,
+)
 from ..services.stats_aggregator import StatsParams, aggregate_stats
 
 blueprint = Blueprint("stats", __name__, url_prefix="/api")
 
 
-# Cache directory for stats responses (runtime data)
-CACHE_TTL_SECONDS = 120  # 2 minutes
+# Cache directory for stats responses (runtime data). Keys carry the corpus
+# epoch, so a rebuilt index or stats DB never serves an old file.
+CACHE_TTL_SECONDS = 24 * 3600  # 24 hours
+_PRUNED_EPOCH: str | None = None
 
 
 def _stats_cache_dir():
@@ -86,9 +99,24 @@ def _normalize_params(args: dict) -> dict:
 
 
 def _compute_cache_key(params: dict) -> str:
-    """Compute stable cache key from normalized parameters."""
+    """Compute stable cache key (``<corpus epoch>-<hash>``) from normalized parameters."""
     param_json = json.dumps(params, sort_keys=True, ensure_ascii=False)
-    return hashlib.sha256(param_json.encode("utf-8")).hexdigest()[:16]
+    digest = hashlib.sha256(param_json.encode("utf-8")).hexdigest()[:16]
+    return f"{corpus_epoch()}-{digest}"
+
+
+def _prune_stale_epochs(epoch: str) -> None:
+    """Delete cached responses of earlier corpus epochs (once per epoch change)."""
+    global _PRUNED_EPOCH
+    if _PRUNED_EPOCH == epoch:
+        return
+    _PRUNED_EPOCH = epoch
+    for cache_file in _stats_cache_dir().glob("*.json"):
+        if not cache_file.name.startswith(f"{epoch}-"):
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
 
 
 def _get_cached_response(cache_key: str) -> tuple[dict | None, str | None]:
@@ -128,6 +156,7 @@ def _get_cached_response(cache_key: str) -> tuple[dict | None, str | None]:
 def _save_cached_response(cache_key: str, data: dict) -> None:
     """Save response to cache."""
     _ensure_cache_dir()
+    _prune_stale_epochs(cache_key.partition("-")[0])
     cache_file = _stats_cache_dir() / f"{cache_key}.json"
 
     try:
@@ -198,7 +227,9 @@ def get_stats() -> Response:
     )
 
     try:
-        stats = aggregate_stats(params)
+        # Aggregation shares the "stats" bulkhead with the BlackLab stats fan-out
+        with get_bulkhead("stats").slot():
+            stats = aggregate_stats(params)
 
         # Add metadata
         result = {
@@ -220,6 +251,12 @@ def get_stats() -> Response:
 
         return response
 
+    except BulkheadFull as e:
+        response = jsonify({"error": "overloaded", "message": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
     except Exception as e:
         current_app.logger.error(f"Stats aggregation error: {e}", exc_info=True)
         return jsonify(
@@ -227,6 +264,86 @@ def get_stats() -> Response:
         ), 500
 
 
+@blueprint.get("/frequencies")
+@limiter.limit("60 per minute")
+def get_frequencies() -> Response:
+    """
+    Frequency list of an annotation, optionally restricted to metadata slices.
+
+    Served from the precomputed stats_frequencies.db (stats pipeline), no
+    BlackLab request.
+
+    Query Parameters:
+        annotation: word, lemma (default), pos or norm
+        pais: Country code(s) - can be repeated
+        sexo: Sex filter(s) - can be repeated
+        speaker: Speaker type(s) - can be repeated
+        modo: Speech mode(s) - can be repeated
+        q: Term prefix (case- and accent-insensitive)
+        page: Page number, 1-based (default 1)
+        per_page: Rows per page (default 50, max 1000)
+        format: "csv" for the complete list as download
+
+    Returns:
+        JSON with tokens (size of the selected slices), total (matching
+        terms) and items [{rank, term, freq, per_million}], or CSV.
+    """
+    annotation = request.args.get("annotation", "lemma")
+    if annotation not in ANNOTATIONS:
+        return jsonify(
+            {
+                "error": "invalid_annotation",
+                "message": f"annotation must be one of {', '.join(ANNOTATIONS)}",
+            }
+        ), 400
+
+    params = FrequencyParams(
+        annotation=annotation,
+        countries=[c.upper() for c in request.args.getlist("pais")],
+        sexes=request.args.getlist("sexo"),
+        speaker_types=request.args.getlist("speaker"),
+        modes=request.args.getlist("modo"),
+        prefix=request.args.get("q", ""),
+    )
+
+    try:
+        if request.args.get("format") == "csv":
+            rows = iter_frequencies(params)
+
+            def generate():
+                output = io.StringIO()
+                writer = csv.writer(output)
+                writer.writerow(["rank", annotation, "freq", "per_million"])
+                for row in rows:
+                    writer.writerow([row["rank"], row["term"], row["freq"], row["per_million"]])
+                    if output.tell() > 65536:
+                        yield output.getvalue()
+                        output.seek(0)
+                        output.truncate(0)
+                yield output.getvalue()
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f"attachment; filename=frecuencias_{annotation}.csv",
+                    "Cache-Control": "public, max-age=300",
+                },
+            )
+
+        page = request.args.get("page", 1, type=int) or 1
+        per_page = request.args.get("per_page", 50, type=int) or 50
+        response = jsonify(query_frequencies(params, page=page, per_page=per_page))
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+
+    except FrequenciesUnavailable as e:
+        current_app.logger.warning(f"Frequency lists unavailable: {e}")
+        return jsonify(
+            {"error": "frequencies_unavailable", "message": "Frequency lists have not been built"}
+        ), 503
+
+
 # Ensure cache directory exists on import
 try:
     _ensure_cache_dir()
@@ -92,6 +92,14 @@ def get_stats_temp_dir(runtime_root: Path | None = None) -> Path:
     return resolved_runtime_root / "data" / "stats_temp"
 
 
+def get_results_temp_dir(runtime_root: Path | None = None) -> Path:
+    explicit = os.getenv("RESULTS_TEMP_DIR")
+    if explicit and explicit.strip():
+        return Path(explicit).expanduser()
+    resolved_runtime_root = runtime_root or get_runtime_root()
+    return resolved_runtime_root / "data" / "results_temp"
+
+
 def get_metadata_dir(runtime_root: Path | None = None) -> Path:
     resolved_runtime_root = runtime_root or get_runtime_root()
     return resolved_runtime_root / "data" / "public" / "metadata" / "latest"
@@ -113,6 +121,14 @@ def get_transcripts_dir() -> Path:
     return get_media_root() / "transcripts"
 
 
+def get_peaks_dir() -> Path:
+    return get_media_root() / "peaks"
+
+
+def get_hls_dir() -> Path:
+    return get_media_root() / "hls"
+
+
 def get_docmeta_path(runtime_root: Path | None = None) -> Path:
     explicit = os.getenv("CORAPAN_BLACKLAB_DOCMETA_PATH")
     if explicit and explicit.strip():
@@ -122,6 +138,22 @@ def get_docmeta_path(runtime_root: Path | None = None) -> Path:
     return resolved_runtime_root / "data" / "blacklab" / "export" / "docmeta.jsonl"
 
 
+def get_index_stamp_path(runtime_root: Path | None = None) -> Path:
+    explicit = os.getenv("CORAPAN_INDEX_STAMP_PATH")
+    if explicit and explicit.strip():
+        return Path(explicit).expanduser()
+
+    resolved_runtime_root = runtime_root or get_runtime_root()
+    return resolved_runtime_root / "data" / "blacklab" / "index.stamp"
+
+
+def get_vocabulary_dir(runtime_root: Path | None = None) -> Path:
+    explicit = os.getenv("CORAPAN_VOCABULARY_DIR")
+    if explicit and explicit.strip():
+        return Path(explicit).expanduser()
+    return get_docmeta_path(runtime_root).parent / "vocabulary"
+
+
 def log_resolved_paths(log: logging.Logger | None = None) -> None:
     active_logger = log or logger
     runtime_root = get_runtime_root()
@@ -4,6 +4,8 @@ Advanced Search API Endpoints - DataTables JSON and Export.
 Provides:
 - GET /search/advanced/data: DataTables Server-Side endpoint
 - GET /search/advanced/export: Streaming CSV/TSV export
+- POST /search/advanced/batch: Several searches with shared filters (counts, first hits)
+- GET /search/advanced/stream: All hits of a search as NDJSON / JSON Lines
 """
 
 from __future__ import annotations
@@ -13,8 +15,11 @@ import io
 import json
 import logging
 import os
+import threading
+from contextlib import nullcontext
 from typing import Generator, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
+from functools import partial
 import time
 from datetime import datetime, timezone
 
@@ -22,11 +27,28 @@ import httpx
 from flask import Blueprint, jsonify, request, Response, current_app
 
 from .cql import (
+    DOC_METADATA_FIELDS,
     build_cql,
+    build_document_filter,
     build_filters,
     filters_to_blacklab_query,
     resolve_countries_for_include_regional,
 )
+from .cql_canonical import add_token_constraints, canonicalize_cql, query_cache_key
+from . import batch, streaming
+from .shards import GROUP_PAGE_SIZE, fetch_groups, fetch_hits, select_shards
+from .query_cost import (
+    REFUSED,
+    TOO_EXPENSIVE_MESSAGE,
+    QueryRejected,
+    QueryTooExpensive,
+    estimate_query_cost,
+    query_lane,
+)
+from .term_expansion import expand_cql
+from .vocabulary import ANNOTATIONS as VOCABULARY_ANNOTATIONS
+from .materialized import ResultSet, country_superset_args, get_result_store, max_hits
+from .sampling import sample_info, sampling_params, with_confidence
 from .cql_validator import (
     validate_cql_pattern,
     validate_filter_values,
@@ -34,6 +56,8 @@ from .cql_validator import (
 )  # Punkt 3
 from .speaker_utils import map_speaker_attributes
 from ..extensions import limiter
+from ..extensions.bls_resilience import BlackLabUnavailable, get_resilience
+from ..extensions.bulkheads import BulkheadFull, get_bulkhead
 from ..extensions.http_client import (
     get_http_client,
     BLS_BASE_URL,
@@ -44,6 +68,14 @@ from ..extensions.http_client import (
     warn_if_configured_corpus_missing,
 )
 from ..runtime_paths import get_docmeta_path
+from ..services.collocations import (
+    MAX_WINDOW as MAX_COLLOCATION_WINDOW,
+    MEASURES,
+    compute_collocations,
+    get_collocation_jobs,
+    rank,
+)
+from ..services.corpus_epoch import corpus_epoch
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +101,18 @@ GLOBAL_HITS_CAP = 50000
 MAX_WORDS_AROUND_HIT = 40
 
 
+def _doc_metadata_enabled() -> bool:
+    """True if the index stores document-scoped fields as document metadata."""
+    return bool(current_app.config.get("BLS_DOC_METADATA", False))
+
+
+def _hit_property(field_name: str, doc_metadata: bool) -> str:
+    """BlackLab sort/group property: ``field:`` for document metadata, else ``hit:``."""
+    if doc_metadata and field_name in DOC_METADATA_FIELDS:
+        return f"field:{field_name}"
+    return f"hit:{field_name}"
+
+
 # Load docmeta.jsonl for metadata lookup (file_id -> metadata)
 def _load_docmeta():
     """Load document metadata from docmeta.jsonl."""
@@ -109,8 +153,24 @@ def _load_docmeta():
     return docmeta, country_codes_by_parent
 
 
-# Cache docmeta at module level
+# Cache docmeta at module level, reloaded when the corpus epoch changes
 _DOCMETA_CACHE, COUNTRY_CODES_BY_PARENT = _load_docmeta()
+_DOCMETA_EPOCH = corpus_epoch()
+_DOCMETA_LOCK = threading.Lock()
+
+
+def _docmeta() -> dict:
+    """docmeta.jsonl lookup (file_id -> metadata) of the current corpus epoch."""
+    global _DOCMETA_CACHE, COUNTRY_CODES_BY_PARENT, _DOCMETA_EPOCH
+    epoch = corpus_epoch()
+    if epoch != _DOCMETA_EPOCH:
+        with _DOCMETA_LOCK:
+            if epoch != _DOCMETA_EPOCH:
+                logger.info("Corpus epoch changed (%s -> %s), reloading docmeta", _DOCMETA_EPOCH, epoch)
+                _DOCMETA_CACHE, COUNTRY_CODES_BY_PARENT = _load_docmeta()
+                _DOCMETA_EPOCH = epoch
+    return _DOCMETA_CACHE or {}
+
 EXPORT_CHUNK_SIZE = 1000
 
 # Export streaming configuration
@@ -134,11 +194,8 @@ def _build_token_search_cql(token_ids: list[str]) -> str:
     if not token_ids:
         raise ValueError("At least one token ID is required")
 
-    if len(token_ids) == 1:
-        return f'[tokid="{token_ids[0]}"]'
-
     conditions = " | ".join([f'tokid="{token_id}"' for token_id in token_ids])
-    return f"[{conditions}]"
+    return canonicalize_cql(f"[{conditions}]")
 
 
 def _build_bls_url(corpus: str | None = None) -> str:
@@ -166,6 +223,7 @@ def _make_bls_request(
         httpx.Response
 
     Raises:
+        BlackLabUnavailable: While the circuit breaker is open (fail fast)
         httpx.TimeoutException: On timeout
         httpx.HTTPStatusError: On HTTP error
     """
@@ -192,13 +250,20 @@ def _make_bls_request(
     # Always request JSON from BlackLab (v5 defaults to HTML without Accept header)
     headers = {"Accept": "application/json"}
 
+    timeout = None
+    if timeout_override is not None:
+        timeout = httpx.Timeout(timeout_override, connect=5.0)
+
     try:
-        if method.upper() == "GET":
-            response = client.get(full_url, params=params, headers=headers)
-        else:
-            response = client.request(
-                method.upper(), full_url, params=params, headers=headers
-            )
+        # Breaker, retry budget and per-endpoint adaptive timeout
+        response = get_resilience().send(
+            client,
+            method.upper(),
+            full_url,
+            params=params,
+            headers=headers,
+            timeout=timeout,
+        )
 
         response.raise_for_status()
         logger.debug(
@@ -206,6 +271,9 @@ def _make_bls_request(
         )
         return response
 
+    except BlackLabUnavailable:
+        logger.warning(f"BLS circuit open, skipping {path}")
+        raise
     except httpx.TimeoutException:
         logger.error(f"BLS timeout on {path}")
         raise
@@ -223,6 +291,176 @@ def _make_bls_request(
         raise
 
 
+def _overloaded_response(exc: BlackLabUnavailable | BulkheadFull, **payload):
+    """503 JSON for a fast-failed BlackLab call (circuit breaker open, bulkhead full)."""
+    payload.update({"error": "upstream_overloaded", "message": str(exc)})
+    return jsonify(payload), 503, {"Retry-After": str(exc.retry_after)}
+
+
+def _rejected_response(exc: QueryRejected, **payload):
+    """JSON for a query refused or not admitted by the cost lanes (query_cost)."""
+    payload.update({"error": exc.code, "message": str(exc)})
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else {}
+    return jsonify(payload), exc.status, headers
+
+
+def _fetch_hits(params: dict, shards: Optional[list[str]] = None) -> dict:
+    """
+    BlackLab ``/hits`` JSON for ``params``.
+
+    ``shards`` (from build_blacklab_query_from_request / select_shards) are the
+    country-shard corpora to fan out to; None means the single BLS_CORPUS.
+    """
+    if shards is not None:
+        if params.get("group"):
+            return fetch_groups(shards, params)
+        return fetch_hits(shards, params)
+    return _make_bls_request(build_bls_corpus_path("hits"), params).json()
+
+
+def _search_slot(shards: Optional[list[str]]):
+    """
+    ``search`` bulkhead slot for an unsharded search made by a request handler.
+
+    Sharded searches take one slot per shard request (``shards._fan_out``);
+    a handler slot around them would nest the bulkhead (``search`` tasks are
+    leaves).
+    """
+    return get_bulkhead("search").slot() if shards is None else nullcontext()
+
+
+def _fetch_hits_cql(params: dict, cql_pattern: str, shards: Optional[list[str]]) -> dict:
+    """``/hits`` for ``cql_pattern``; unsharded, probe the CQL parameter name BLS accepts."""
+    if shards is not None:
+        return _fetch_hits({**params, "patt": cql_pattern}, shards)
+    for param_name in ["patt", "cql", "cql_query"]:
+        try:
+            test_params = {**params, param_name: cql_pattern}
+            response = _make_bls_request(build_bls_corpus_path("hits"), test_params)
+            logger.debug(f"CQL param '{param_name}' accepted")
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400:
+                raise
+            continue
+    raise Exception("Could not determine BLS CQL parameter")
+
+
+# DataTables column index -> row field for sorting materialized result sets
+LOCAL_SORT_COLUMNS = {
+    2: "text",
+    5: "country_code",
+    6: "speaker_type",
+    7: "speaker_sex",
+    8: "speaker_mode",
+    9: "speaker_discourse",
+    10: "token_id",
+    11: "filename",
+}
+
+
+def _result_key(query_info: dict, params: dict) -> str:
+    """Materialized result set key: the query without paging and sort."""
+    return query_cache_key(
+        query_info["patt"],
+        query_info["filter"],
+        shards=query_info["shards"],
+        wordsaroundhit=params.get("wordsaroundhit"),
+        listvalues=params.get("listvalues"),
+        sample=params.get("sample"),
+        samplenum=params.get("samplenum"),
+        sampleseed=params.get("sampleseed"),
+        epoch=corpus_epoch(),
+    )
+
+
+def _materialize(store, key: str, query_info: dict, params: dict) -> Optional[ResultSet]:
+    """Fetch the whole hit set of a query seen before and store its rows."""
+    total = store.claim(key)
+    if total is None:
+        return None
+    from ..services.blacklab_search import _hit_to_canonical as _hit2canon
+
+    try:
+        all_params = {k: v for k, v in params.items() if k != "sort"}
+        hits: list = []
+        doc_infos: dict = {}
+        summary: dict = {}
+        with query_lane(query_info["cost"]), _search_slot(query_info["shards"]):
+            # BlackLab caps ``number`` at its page maximum, so page through
+            while len(hits) < total:
+                page = {**all_params, "first": len(hits), "number": min(GROUP_PAGE_SIZE, total - len(hits))}
+                data = _fetch_hits(page, query_info["shards"])
+                more = data.get("hits", []) or []
+                if not hits:
+                    summary = data.get("summary", {}) or {}
+                doc_infos.update(data.get("docInfos", {}) or {})
+                hits.extend(more)
+                if len(more) < page["number"]:
+                    break
+        if len(hits) < max(total, summary.get("numberOfHits") or 0):
+            # The result changed since the first request (e.g. new index);
+            # forget the total so later requests do not fetch it again
+            store.forget(key)
+            return None
+        rows = _enrich_hits_with_docmeta([_hit2canon(hit) for hit in hits], hits, doc_infos, _docmeta())
+    except Exception:
+        store.release(key)
+        raise
+    result_set = ResultSet.from_rows(key, rows, summary)
+    store.put(result_set)
+    logger.info("Materialized result set %s: %s hits, %s bytes", key[:12], result_set.size, result_set.nbytes)
+    return result_set
+
+
+def _materialized_page(
+    key: str,
+    query_info: dict,
+    params: dict,
+    start: int,
+    length: int,
+    order_col_idx: int,
+    order_dir: str,
+) -> Optional[dict]:
+    """
+    DataTables page served from a materialized result set (see
+    ``materialized``), or None if the request has to go to BlackLab.
+    """
+    if not max_hits():
+        return None
+    store = get_result_store()
+    countries = None
+    result_set = store.get(key)
+    if result_set is None:
+        # Narrowing by country: filter the "all countries" set locally
+        superset_args = country_superset_args(request.args)
+        if superset_args is not None:
+            superset_key = _result_key(build_blacklab_query_from_request(superset_args), params)
+            candidate = store.get(superset_key)
+            if candidate is not None and candidate.has_column("country_code", complete=True):
+                result_set, countries = candidate, request.args.getlist("country_code")
+    if result_set is None:
+        result_set = _materialize(store, key, query_info, params)
+    if result_set is None:
+        return None
+
+    indexes = result_set.select(countries)
+    column = LOCAL_SORT_COLUMNS.get(order_col_idx)
+    if column:
+        indexes = result_set.order(indexes, column, descending=order_dir == "desc")
+    summary = dict(result_set.summary)
+    if countries:
+        summary["numberOfHits"] = len(indexes)
+    return {
+        "recordsTotal": len(indexes),
+        "recordsFiltered": len(indexes),
+        "data": [result_set.row(i) for i in indexes[start : start + length]],
+        "bls_summary": summary,
+        "facets": result_set.facets(indexes),
+        "materialized": True,
+    }
+
+
 def _enrich_hits_with_docmeta(
     items: list, hits: list, docinfos: dict, docmeta_cache: dict
 ) -> list:
@@ -256,7 +494,8 @@ def _enrich_hits_with_docmeta(
         candidate = item.get("filename")
         file_id = None
         if candidate and isinstance(candidate, str):
-            if candidate.isdigit():
+            if candidate.isdigit() or candidate in pid_to_file_id:
+                # Numeric docPid (or shard-prefixed "corpus:12")
                 file_id = pid_to_file_id.get(candidate)
             elif candidate in docmeta_cache:
                 file_id = candidate
@@ -291,6 +530,7 @@ def _enrich_hits_with_docmeta(
             # Only override filename from docmeta if not already set
             item["filename"] = item.get("filename") or docmeta.get("file_id")
             item["radio"] = item.get("radio") or docmeta.get("radio")
+            item["city"] = item.get("city") or docmeta.get("city")
             item["date"] = item.get("date") or docmeta.get("date")
         if (
             not item.get("speaker_type")
@@ -324,6 +564,31 @@ def _enrich_hits_with_docmeta(
     return items
 
 
+def _hit_listvalues(doc_metadata: bool) -> str:
+    """``listvalues`` of hit requests whose hits become DataTable rows."""
+    listvalues = [
+        "word",
+        "tokid",
+        "start_ms",
+        "end_ms",
+        "sentence_id",
+        BLS_FIELDS["country"],
+        BLS_FIELDS["speaker_type"],
+        BLS_FIELDS["sex"],
+        BLS_FIELDS["mode"],
+        BLS_FIELDS["discourse"],
+        BLS_FIELDS["file_id"],
+        BLS_FIELDS["radio"],
+        BLS_FIELDS["city"],
+        "utterance_id",
+        "speaker_code",
+    ]
+    if doc_metadata:
+        # Document fields come from docInfos / docmeta, not from token annotations
+        listvalues = [f for f in listvalues if f not in DOC_METADATA_FIELDS]
+    return ",".join(listvalues)
+
+
 @bp.route("/data", methods=["GET"])
 @limiter.limit("30 per minute")
 def datatable_data():
@@ -379,6 +644,7 @@ def datatable_data():
         query_info = build_blacklab_query_from_request(request.args)
         cql_pattern = query_info["patt"]
         filter_query = query_info["filter"]
+        doc_metadata = query_info["doc_metadata"]
         params = query_info["params_base"].copy()
 
         # Add DataTables specific params
@@ -387,25 +653,7 @@ def datatable_data():
                 "first": start,
                 "number": length,
                 "waitfortotal": "true",
-                "listvalues": ",".join(
-                    [
-                        "word",
-                        "tokid",
-                        "start_ms",
-                        "end_ms",
-                        "sentence_id",
-                        BLS_FIELDS["country"],
-                        BLS_FIELDS["speaker_type"],
-                        BLS_FIELDS["sex"],
-                        BLS_FIELDS["mode"],
-                        BLS_FIELDS["discourse"],
-                        BLS_FIELDS["file_id"],
-                        BLS_FIELDS["radio"],
-                        BLS_FIELDS["city"],
-                        "utterance_id",
-                        "speaker_code",
-                    ]
-                ),
+                "listvalues": _hit_listvalues(doc_metadata),
             }
         )
 
@@ -414,15 +662,19 @@ def datatable_data():
         if filter_query:
             params["filter"] = filter_query
 
+        # Optional random sample (approximate counts, see sampling)
+        sampling = sampling_params(request.args, cql_pattern, filter_query)
+        params.update(sampling)
+
         # Handle sorting
         order_col_idx = get_int("order[0][column]", -1)
         order_dir = get_str("order[0][dir]", "asc")
 
         # Map column index to field name
-        # For sorting by annotation values (metadata on tokens), we use "hit:<field>"
+        # Token annotations sort by "hit:<field>", document metadata by "field:<field>"
         column_map = {
             2: "hit:word",
-            5: f"hit:{BLS_FIELDS['country']}",
+            5: _hit_property(BLS_FIELDS["country"], doc_metadata),
             6: f"hit:{BLS_FIELDS['speaker_type']}",
             7: f"hit:{BLS_FIELDS['sex']}",
             8: f"hit:{BLS_FIELDS['mode']}",
@@ -438,9 +690,19 @@ def datatable_data():
             else:
                 params["sort"] = sort_field
 
-        # Execute request
-        response = _make_bls_request(build_bls_corpus_path("hits"), params)
-        data = response.json()
+        # Re-sort / page / country narrowing of a query used before: local
+        result_key = _result_key(query_info, params)
+        local = _materialized_page(
+            result_key, query_info, params, start, length, order_col_idx, order_dir
+        )
+        if local is not None:
+            if sampling:
+                local["sample"] = sample_info(sampling, local["recordsTotal"])
+            return jsonify({"draw": draw, **local})
+
+        # Execute request (in the lane its estimated cost allows)
+        with query_lane(query_info["cost"]), _search_slot(query_info["shards"]):
+            data = _fetch_hits(params, query_info["shards"])
         summary = data.get("summary", {})
         hits = data.get("hits", [])
 
@@ -448,6 +710,8 @@ def datatable_data():
         total_hits = summary.get("numberOfHits", 0)
         if not total_hits:
             total_hits = results_stats.get("hits", 0)
+        if max_hits():
+            get_result_store().note(result_key, total_hits)
 
         # Process hits
         from ..services.blacklab_search import _hit_to_canonical as _hit2canon
@@ -456,22 +720,27 @@ def datatable_data():
 
         # Enrich hits
         processed_hits = _enrich_hits_with_docmeta(
-            processed_hits, hits, data.get("docInfos", {}) or {}, _DOCMETA_CACHE or {}
+            processed_hits, hits, data.get("docInfos", {}) or {}, _docmeta()
         )
 
-        return jsonify(
-            {
-                "draw": draw,
-                "recordsTotal": total_hits,
-                "recordsFiltered": total_hits,
-                "data": processed_hits,
-                "bls_summary": summary,
-            }
-        )
+        response = {
+            "draw": draw,
+            "recordsTotal": total_hits,
+            "recordsFiltered": total_hits,
+            "data": processed_hits,
+            "bls_summary": summary,
+        }
+        if sampling:
+            response["sample"] = sample_info(sampling, total_hits)
+        return jsonify(response)
 
     except BlackLabCorpusNotFound as e:
         logger.warning(f"DataTables error: {e}")
         return jsonify({"draw": get_int("draw", 1), "error": str(e), "data": []})
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        return _overloaded_response(e, draw=get_int("draw", 1), data=[])
+    except QueryRejected as e:
+        return _rejected_response(e, draw=get_int("draw", 1), data=[])
     except Exception as e:
         logger.exception("DataTables error")
         return jsonify({"draw": get_int("draw", 1), "error": str(e), "data": []})
@@ -539,26 +808,10 @@ def token_search():
             "listvalues": "tokid,start_ms,end_ms,word,lemma,pos,country_code,country_scope,country_parent_code,country_region_code,speaker_code,speaker_type,speaker_sex,speaker_mode,speaker_discourse,file_id,radio,city,date,sentence_id",
         }
 
-        # Call BlackLab via proxy
-
-        # Try CQL parameter names
-        response = None
-        for param_name in ["patt", "cql", "cql_query"]:
-            try:
-                test_params = {**bls_params, param_name: cql_pattern}
-                response = _make_bls_request(build_bls_corpus_path("hits"), test_params)
-                break
-            except BlackLabCorpusNotFound:
-                raise
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code != 400:
-                    raise
-                continue
-
-        if response is None:
-            raise Exception("Could not determine BLS CQL parameter")
-
-        data = response.json()
+        # Token IDs carry no country: all shards when sharded
+        token_shards = select_shards({})
+        with _search_slot(token_shards):
+            data = _fetch_hits_cql(bls_params, cql_pattern, token_shards)
         summary = data.get("summary", {})
         hits = data.get("hits", [])
 
@@ -577,7 +830,7 @@ def token_search():
 
         # Enrich with docmeta
         processed_hits = _enrich_hits_with_docmeta(
-            processed_hits, hits, data.get("docInfos", {}) or {}, _DOCMETA_CACHE or {}
+            processed_hits, hits, data.get("docInfos", {}) or {}, _docmeta()
         )
 
         # Apply sentence-based context trimming
@@ -625,6 +878,11 @@ def token_search():
             }
         ), 200
 
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        return _overloaded_response(
+            e, draw=draw, recordsTotal=0, recordsFiltered=0, data=[]
+        )
+
     except httpx.ConnectError:
         logger.warning("Token search: BLS connection failed")
         return jsonify(
@@ -736,7 +994,13 @@ def export_data():
             # Return as plain text error
             return f"Filter validation error: {str(e)}", 400
 
-        filter_query = filters_to_blacklab_query(filters)
+        if _doc_metadata_enabled():
+            filter_query = build_document_filter(filters)
+        else:
+            filter_query = filters_to_blacklab_query(filters)
+        shards = select_shards(filters)
+        cql_pattern = expand_cql(cql_pattern)
+        cost = estimate_query_cost(cql_pattern, filters, _docmeta())
 
         # Output format
         export_format = request.args.get("format", "csv").lower()
@@ -767,25 +1031,8 @@ def export_data():
             if filter_query:
                 preflight_params["filter"] = filter_query
 
-            # Try CQL parameter names
-            preflight_response = None
-            for param_name in ["patt", "cql", "cql_query"]:
-                try:
-                    test_params = {**preflight_params, param_name: cql_pattern}
-                    preflight_response = _make_bls_request(
-                        build_bls_corpus_path("hits"), test_params
-                    )
-                    logger.debug(f"Export preflight: CQL param '{param_name}' accepted")
-                    break
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code != 400:
-                        raise
-                    continue
-
-            if preflight_response is None:
-                raise Exception("Could not determine BLS CQL parameter")
-
-            preflight_data = preflight_response.json()
+            with query_lane(cost):
+                preflight_data = _fetch_hits_cql(preflight_params, cql_pattern, shards)
             total_hits = preflight_data.get("summary", {}).get("numberOfHits", 0)
             logger.info(
                 f"Export initiated: format={export_format}, total_hits={total_hits}, "
@@ -795,6 +1042,11 @@ def export_data():
         except BlackLabCorpusNotFound as e:
             logger.warning(f"Export preflight error: {e}")
             return str(e), 502
+        except (BlackLabUnavailable, BulkheadFull) as e:
+            return str(e), 503, {"Retry-After": str(e.retry_after)}
+        except QueryRejected as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after else {}
+            return str(e), e.status, headers
         except httpx.ConnectError:
             logger.warning(
                 f"Export preflight failed - BLS connection refused at {BLS_BASE_URL}"
@@ -876,27 +1128,18 @@ def export_data():
                         if filter_query:
                             bls_params["filter"] = filter_query
 
-                        # Try CQL param names
-                        response = None
-                        for param_name in ["patt", "cql", "cql_query"]:
-                            try:
-                                test_params = {**bls_params, param_name: cql_pattern}
-                                response = _make_bls_request(
-                                    build_bls_corpus_path("hits"), test_params
-                                )
-                                break
-                            except httpx.HTTPStatusError as e:
-                                if e.response.status_code != 400:
-                                    raise
-                                continue
-
-                        if response is None:
-                            raise Exception("Could not determine BLS CQL parameter")
+                        # Each chunk is admitted separately, so a long export
+                        # does not hold a slow-lane slot between chunks
+                        with query_lane(cost):
+                            data = _fetch_hits_cql(bls_params, cql_pattern, shards)
 
                     except BlackLabCorpusNotFound as e:
                         logger.warning(f"Export chunk error: {e}")
                         yield f"\n# Export interrupted: {str(e)}\n"
                         break
+                    except (BlackLabUnavailable, BulkheadFull, QueryRejected) as e:
+                        yield f"\n# Export interrupted at row {total_exported}: {str(e)}\n"
+                        break
                     except httpx.ConnectError:
                         logger.error(
                             f"Export chunk connection failed at offset {first} - BLS unreachable at {BLS_BASE_URL}"
@@ -924,7 +1167,6 @@ def export_data():
                     # Punkt 8: BLS-Duration Logging
                     chunk_duration = time.time() - chunk_start
 
-                    data = response.json()
                     hits = data.get("hits", [])
 
                     logger.debug(
@@ -1011,9 +1253,15 @@ def export_data():
                     f"Unexpected error in export generator after {total_exported} rows"
                 )
                 yield f"\n# Unexpected error: {type(e).__name__}\n"
+            finally:
+                export_slot.release()
+
+        # One "export" bulkhead slot per running download; released when the
+        # stream ends or the response is closed (client disconnect)
+        export_slot = get_bulkhead("export").acquire()
 
         # Punkt 1: Content-Disposition mit sprechendem Dateinamen + Cache-Control
-        return Response(
+        response = Response(
             generate_export(),
             mimetype=mime_type,
             headers={
@@ -1023,6 +1271,8 @@ def export_data():
                 "X-Accel-Buffering": "no",  # Disable nginx/proxy buffering
             },
         )
+        response.call_on_close(export_slot.release)
+        return response
 
     except ValueError as e:
         logger.warning(f"Export CQL validation: {e}")
@@ -1032,6 +1282,9 @@ def export_data():
         logger.warning(f"Export error: {e}")
         return str(e), 502
 
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        return str(e), 503, {"Retry-After": str(e.retry_after)}
+
     except httpx.ConnectError:
         logger.error(f"Export connection failed - BLS unreachable at {BLS_BASE_URL}")
         return f"Export error: BlackLab Server is not reachable at {BLS_BASE_URL}", 502
@@ -1059,7 +1312,9 @@ def stats_data():
         query_info = build_blacklab_query_from_request(request.args)
         patt = query_info["patt"]
         filter_cql = query_info["filter"]
-        params_base = query_info["params_base"]
+        # Optional random sample (approximate counts, see sampling)
+        sampling = sampling_params(request.args, patt, filter_cql)
+        params_base = {**query_info["params_base"], **sampling}
 
         # Get total hits first
         count_params = params_base.copy()
@@ -1070,40 +1325,50 @@ def stats_data():
         count_params["number"] = 0
         count_params["waitfortotal"] = "true"
 
-        # Execute total count request
-        count_resp = _make_bls_request(build_bls_corpus_path("hits"), count_params)
-        count_data = count_resp.json()
-        total_hits = count_data.get("summary", {}).get("numberOfHits", 0)
-        if not total_hits:
-            total_hits = (
-                count_data.get("summary", {}).get("resultsStats", {}).get("hits", 0)
-            )
-
-        # Define dimensions to group by
-        dimensions = {
-            "by_country": BLS_FIELDS["country"],
-            "by_speaker_type": BLS_FIELDS["speaker_type"],
-            "by_sex": BLS_FIELDS["sex"],
-            "by_modo": BLS_FIELDS["mode"],
-            "by_discourse": BLS_FIELDS["discourse"],
-            "by_radio": BLS_FIELDS["radio"],
-            "by_city": BLS_FIELDS["city"],
-            "by_file_id": BLS_FIELDS["file_id"],
-        }
-
-        stats = {"total_hits": total_hits}
-
-        # Execute grouping requests in parallel
-        logger.info(f"STATS QUERY: patt={patt}, filter={filter_cql}")
+        # Count and grouping run in the lane of the query's estimated cost
+        with query_lane(query_info["cost"]):
+            # Execute total count request
+            with _search_slot(query_info["shards"]):
+                count_data = _fetch_hits(count_params, query_info["shards"])
+            total_hits = count_data.get("summary", {}).get("numberOfHits", 0)
+            if not total_hits:
+                total_hits = (
+                    count_data.get("summary", {}).get("resultsStats", {}).get("hits", 0)
+                )
 
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            future_to_dim = {
-                executor.submit(
-                    bls_group_by_field, field, patt, filter_cql, params_base
-                ): dim
-                for dim, field in dimensions.items()
+            # Define dimensions to group by
+            dimensions = {
+                "by_country": BLS_FIELDS["country"],
+                "by_speaker_type": BLS_FIELDS["speaker_type"],
+                "by_sex": BLS_FIELDS["sex"],
+                "by_modo": BLS_FIELDS["mode"],
+                "by_discourse": BLS_FIELDS["discourse"],
+                "by_radio": BLS_FIELDS["radio"],
+                "by_city": BLS_FIELDS["city"],
+                "by_file_id": BLS_FIELDS["file_id"],
             }
 
+            stats = {"total_hits": total_hits}
+
+            # Execute grouping requests in parallel
+            logger.info(f"STATS QUERY: patt={patt}, filter={filter_cql}")
+
+            futures = get_bulkhead("stats").submit_all(
+                [
+                    partial(
+                        bls_group_by_field,
+                        field,
+                        patt,
+                        filter_cql,
+                        params_base,
+                        doc_metadata=query_info["doc_metadata"],
+                        shards=query_info["shards"],
+                    )
+                    for field in dimensions.values()
+                ]
+            )
+            future_to_dim = dict(zip(futures, dimensions))
+
             for future in as_completed(future_to_dim):
                 dim = future_to_dim[future]
                 try:
@@ -1112,11 +1377,20 @@ def stats_data():
                     logger.error(f"Stats dimension {dim} generated an exception: {exc}")
                     stats[dim] = []
 
+        if sampling:
+            stats["sample"] = sample_info(sampling, total_hits)
+            for dim in dimensions:
+                stats[dim] = with_confidence(stats[dim], total_hits)
+
         return jsonify(stats)
 
     except BlackLabCorpusNotFound as e:
         logger.warning(f"Stats error: {e}")
         return jsonify({"error": str(e)}), 502
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        return _overloaded_response(e)
+    except QueryRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         logger.exception("Stats error")
         return jsonify({"error": str(e)}), 500
@@ -1132,7 +1406,9 @@ def stats_csv():
         query_info = build_blacklab_query_from_request(request.args)
         patt = query_info["patt"]
         filter_cql = query_info["filter"]
-        params_base = query_info["params_base"]
+        # Optional random sample (approximate counts, see sampling)
+        sampling = sampling_params(request.args, patt, filter_cql)
+        params_base = {**query_info["params_base"], **sampling}
 
         # Get total hits first
         count_params = params_base.copy()
@@ -1143,40 +1419,50 @@ def stats_csv():
         count_params["number"] = 0
         count_params["waitfortotal"] = "true"
 
-        # Execute total count request
-        count_resp = _make_bls_request(build_bls_corpus_path("hits"), count_params)
-        count_data = count_resp.json()
-        total_hits = count_data.get("summary", {}).get("numberOfHits", 0)
-        if not total_hits:
-            total_hits = (
-                count_data.get("summary", {}).get("resultsStats", {}).get("hits", 0)
-            )
-
-        # Define dimensions to group by
-        dimensions = {
-            "by_country": {"field": BLS_FIELDS["country"], "label": "Por país"},
-            "by_speaker_type": {
-                "field": BLS_FIELDS["speaker_type"],
-                "label": "Por tipo de hablante",
-            },
-            "by_sex": {"field": BLS_FIELDS["sex"], "label": "Por sexo"},
-            "by_modo": {"field": BLS_FIELDS["mode"], "label": "Por modo"},
-            "by_discourse": {"field": BLS_FIELDS["discourse"], "label": "Por discurso"},
-            "by_radio": {"field": BLS_FIELDS["radio"], "label": "Por emisora"},
-            "by_city": {"field": BLS_FIELDS["city"], "label": "Por ciudad"},
-            "by_file_id": {"field": BLS_FIELDS["file_id"], "label": "Por archivo"},
-        }
+        # Count and grouping run in the lane of the query's estimated cost
+        with query_lane(query_info["cost"]):
+            # Execute total count request
+            with _search_slot(query_info["shards"]):
+                count_data = _fetch_hits(count_params, query_info["shards"])
+            total_hits = count_data.get("summary", {}).get("numberOfHits", 0)
+            if not total_hits:
+                total_hits = (
+                    count_data.get("summary", {}).get("resultsStats", {}).get("hits", 0)
+                )
 
-        # Execute grouping requests in parallel
-        stats_results = {}
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            future_to_dim = {
-                executor.submit(
-                    bls_group_by_field, info["field"], patt, filter_cql, params_base
-                ): dim
-                for dim, info in dimensions.items()
+            # Define dimensions to group by
+            dimensions = {
+                "by_country": {"field": BLS_FIELDS["country"], "label": "Por país"},
+                "by_speaker_type": {
+                    "field": BLS_FIELDS["speaker_type"],
+                    "label": "Por tipo de hablante",
+                },
+                "by_sex": {"field": BLS_FIELDS["sex"], "label": "Por sexo"},
+                "by_modo": {"field": BLS_FIELDS["mode"], "label": "Por modo"},
+                "by_discourse": {"field": BLS_FIELDS["discourse"], "label": "Por discurso"},
+                "by_radio": {"field": BLS_FIELDS["radio"], "label": "Por emisora"},
+                "by_city": {"field": BLS_FIELDS["city"], "label": "Por ciudad"},
+                "by_file_id": {"field": BLS_FIELDS["file_id"], "label": "Por archivo"},
             }
 
+            # Execute grouping requests in parallel
+            stats_results = {}
+            futures = get_bulkhead("stats").submit_all(
+                [
+                    partial(
+                        bls_group_by_field,
+                        info["field"],
+                        patt,
+                        filter_cql,
+                        params_base,
+                        doc_metadata=query_info["doc_metadata"],
+                        shards=query_info["shards"],
+                    )
+                    for info in dimensions.values()
+                ]
+            )
+            future_to_dim = dict(zip(futures, dimensions))
+
             for future in as_completed(future_to_dim):
                 dim = future_to_dim[future]
                 try:
@@ -1204,6 +1490,9 @@ def stats_csv():
             yield f"# filters={json.dumps(filters_dict, ensure_ascii=False)}\n"
 
             yield f"# total_hits={total_hits}\n"
+            if sampling:
+                sample = sample_info(sampling, total_hits)
+                yield f"# sample={json.dumps(sample, ensure_ascii=False)}\n"
             yield "# stats_type=all_charts\n"
 
             # CSV Header
@@ -1240,15 +1529,330 @@ def stats_csv():
     except BlackLabCorpusNotFound as e:
         logger.warning(f"Stats CSV export error: {e}")
         return jsonify({"error": str(e)}), 502
+    except (BlackLabUnavailable, BulkheadFull) as e:
+        return _overloaded_response(e)
+    except QueryRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         logger.exception("Stats CSV export error")
         return jsonify({"error": str(e)}), 500
 
 
-def build_cql_with_direct_filters(params, filters):
+def _collocation_payload(job, args) -> dict:
+    """Job status plus, once done, the collocates ranked by ``measure``."""
+    payload = {"job": job.snapshot()}
+    if job.result is not None:
+        result = {k: v for k, v in job.result.items() if k != "rows"}
+        measure = args.get("measure", "log_dice")
+        result["measure"] = measure if measure in MEASURES else "log_dice"
+        result["min_freq"] = max(1, args.get("min_freq", 3, type=int) or 3)
+        result["collocates"] = rank(
+            job.result["rows"],
+            result["measure"],
+            result["min_freq"],
+            min(max(1, args.get("limit", 50, type=int) or 50), 500),
+        )
+        payload["result"] = result
+    return payload
+
+
+@bp.route("/collocations", methods=["POST"])
+@limiter.limit("10 per minute")
+def collocations_start():
+    """
+    Start (or reuse) a collocation analysis of the current search.
+
+    Takes the query and filter parameters of ``/data`` (query string or form)
+    plus ``window`` (1-10, default 5) and ``by`` (word | lemma | norm, default
+    lemma). Returns 202 with the job while it runs, 200 if a finished result
+    for the same canonical query and window is cached. Poll
+    ``GET /collocations/<id>``, cancel with ``DELETE /collocations/<id>``.
+    """
+    args = request.values
+    annotation = args.get("by", "lemma")
+    if annotation not in VOCABULARY_ANNOTATIONS:
+        return jsonify({"error": "invalid_annotation", "message": f"by must be one of {', '.join(VOCABULARY_ANNOTATIONS)}"}), 400
+    window = min(max(1, args.get("window", 5, type=int) or 5), MAX_COLLOCATION_WINDOW)
+
+    try:
+        query_info = build_blacklab_query_from_request(args)
+        if query_info["cost"].lane == REFUSED:
+            raise QueryTooExpensive(TOO_EXPENSIVE_MESSAGE)
+        patt, filter_query, shards = query_info["patt"], query_info["filter"], query_info["shards"]
+        sampling = sampling_params(args, patt, filter_query)
+        key = query_cache_key(
+            patt, filter_query, shards=shards, window=window, by=annotation, epoch=corpus_epoch(), **sampling
+        )
+        fetch = _fetch_hits
+
+        def compute(job):
+            return compute_collocations(
+                fetch,
+                patt,
+                filter_query,
+                shards,
+                window=window,
+                annotation=annotation,
+                sampling=sampling,
+                on_progress=job.set_progress,
+                cancelled=job.cancel_event,
+            )
+
+        job, _ = get_collocation_jobs().start(key, {"window": window, "by": annotation}, compute, query_info["cost"])
+    except BulkheadFull as e:
+        return _overloaded_response(e)
+    except QueryRejected as e:
+        return _rejected_response(e)
+    except ValueError as e:
+        return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
+    status = 200 if job.result is not None else 202
+    return jsonify(_collocation_payload(job, args)), status
+
+
+@bp.route("/collocations/<job_id>", methods=["GET"])
+def collocations_status(job_id: str):
+    job = get_collocation_jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "not_found", "message": "Collocation job not found or expired"}), 404
+    return jsonify(_collocation_payload(job, request.args))
+
+
+@bp.route("/collocations/<job_id>", methods=["DELETE"])
+def collocations_cancel(job_id: str):
+    job = get_collocation_jobs().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "not_found", "message": "Collocation job not found or expired"}), 404
+    return jsonify({"job": job.snapshot()})
+
+
+def _batch_query(query_info: dict, sampling: dict, hits: int) -> dict:
+    """Total (and the first ``hits`` hits as DataTable rows) of one batch sub-query."""
+    params = {**query_info["params_base"], **sampling, "first": 0, "number": hits, "waitfortotal": "true"}
+    if query_info["patt"]:
+        params["patt"] = query_info["patt"]
+    if query_info["filter"]:
+        params["filter"] = query_info["filter"]
+    if hits:
+        params["listvalues"] = _hit_listvalues(query_info["doc_metadata"])
+    with query_lane(query_info["cost"]):
+        data = _fetch_hits(params, query_info["shards"])
+    summary = data.get("summary", {}) or {}
+    total = summary.get("numberOfHits") or summary.get("resultsStats", {}).get("hits", 0)
+    result: dict = {"total": total}
+    if hits:
+        from ..services.blacklab_search import _hit_to_canonical as _hit2canon
+
+        raw_hits = data.get("hits", []) or []
+        result["hits"] = _enrich_hits_with_docmeta(
+            [_hit2canon(hit) for hit in raw_hits], raw_hits, data.get("docInfos", {}) or {}, _docmeta()
+        )
+    if sampling:
+        result["sample"] = sample_info(sampling, total)
+    return result
+
+
+def _query_error(exc: Exception) -> dict:
+    """Error entry of a query failing inside a batch or a stream (the response itself succeeds)."""
+    if isinstance(exc, QueryRejected):
+        return {"error": exc.code, "message": str(exc)}
+    if isinstance(exc, (BlackLabUnavailable, BulkheadFull)):
+        return {"error": "upstream_overloaded", "message": str(exc)}
+    if isinstance(exc, BlackLabCorpusNotFound):
+        return {"error": "corpus_not_found", "message": str(exc)}
+    logger.error("Query failed inside batch or stream: %s", exc)
+    return {"error": "search_failed", "message": str(exc)}
+
+
+@bp.route("/batch", methods=["POST"])
+@limiter.limit("10 per minute")
+def batch_search():
+    """
+    Run several searches with shared filters in one request.
+
+    JSON body::
+
+        {"filters": {"country_code": ["ARG", "CHL"], "speaker_type": ["pro"]},
+         "queries": [{"q": "casa", "mode": "lemma"}, {"q": "hogar", "mode": "lemma"}],
+         "hits": 10}
+
+    ``filters`` and every query take the parameters of ``/data`` (a query
+    overrides a shared parameter of the same name); ``hits`` (default 0) adds
+    the first hits of each query as DataTable rows. Identical queries run
+    once (``deduplicated``). Returns ``results`` in input order, each with
+    ``total`` (and ``hits``) or a per-query ``error`` (see ``batch``).
+    """
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries")
+    shared = body.get("filters") or {}
+    if not isinstance(queries, list) or not queries or not isinstance(shared, dict):
+        return jsonify({"error": "invalid_batch", "message": "Expected a non-empty list of queries and a filters object"}), 400
+    if len(queries) > batch.max_queries():
+        return jsonify({"error": "too_many_queries", "message": f"At most {batch.max_queries()} queries per batch"}), 400
+    try:
+        hits = min(max(0, int(body.get("hits") or 0)), batch.max_hits())
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid_batch", "message": "hits must be an integer"}), 400
+
+    started = time.monotonic()
+    keys: list[Optional[str]] = []
+    errors: dict[int, dict] = {}
+    tasks: dict = {}
+    for index, query in enumerate(queries):
+        keys.append(None)
+        if not isinstance(query, dict):
+            errors[index] = {"error": "invalid_query", "message": "Each query must be an object"}
+            continue
+        args = batch.merge_args(shared, query)
+        try:
+            query_info = build_blacklab_query_from_request(args)
+            sampling = sampling_params(args, query_info["patt"], query_info["filter"])
+        except ValueError as e:
+            errors[index] = {"error": "invalid_query", "message": str(e)}
+            continue
+        if query_info["cost"].lane == REFUSED:
+            errors[index] = _query_error(QueryTooExpensive(TOO_EXPENSIVE_MESSAGE))
+            continue
+        key = query_cache_key(query_info["patt"], query_info["filter"], shards=query_info["shards"], hits=hits, **sampling)
+        keys[index] = key
+        if key not in tasks:
+            tasks[key] = partial(_batch_query, query_info, sampling, hits)
+
+    outcomes = batch.run_unique(tasks, _query_error)
+    results = [
+        {"index": index, "query": query, **(errors[index] if key is None else outcomes[key])}
+        for index, (query, key) in enumerate(zip(queries, keys))
+    ]
+    return jsonify(
+        {
+            "results": results,
+            "unique": len(tasks),
+            "deduplicated": sum(key is not None for key in keys) - len(tasks),
+            "elapsed_ms": round((time.monotonic() - started) * 1000.0, 1),
+        }
+    )
+
+
+@bp.route("/stream", methods=["GET"])
+@limiter.limit("10 per minute")
+def stream_hits():
+    """
+    Stream all hits of a search as NDJSON (``format=jsonl``: JSON Lines).
+
+    Takes the query and filter parameters of ``/data`` plus ``offset``
+    (first hit, for resuming; default 0) and ``limit`` (default and maximum
+    ``STREAM_MAX_HITS``). Every line is one canonical hit with its
+    ``offset``; ``X-Total-Hits`` carries the total. An interrupted stream
+    ends with an ``error`` line holding ``resume_offset`` (see ``streaming``).
+    """
+    offset = max(0, request.args.get("offset", 0, type=int) or 0)
+    limit = min(max(0, request.args.get("limit", streaming.max_hits(), type=int) or 0), streaming.max_hits())
+    mimetype = "application/jsonl" if request.args.get("format") == "jsonl" else "application/x-ndjson"
+    use_gzip = bool(request.accept_encodings["gzip"])
+
+    try:
+        query_info = build_blacklab_query_from_request(request.args)
+        if query_info["cost"].lane == REFUSED:
+            raise QueryTooExpensive(TOO_EXPENSIVE_MESSAGE)
+    except QueryRejected as e:
+        return _rejected_response(e)
+    except ValueError as e:
+        return jsonify({"error": "invalid_query", "message": str(e)}), 400
+
+    params = {
+        **query_info["params_base"],
+        "waitfortotal": "true",
+        "listvalues": _hit_listvalues(query_info["doc_metadata"]),
+    }
+    if query_info["patt"]:
+        params["patt"] = query_info["patt"]
+    if query_info["filter"]:
+        params["filter"] = query_info["filter"]
+
+    def fetch_window(first: int, number: int) -> dict:
+        # Each window is admitted separately (like the export chunks)
+        with query_lane(query_info["cost"]):
+            return _fetch_hits({**params, "first": first, "number": number}, query_info["shards"])
+
+    try:
+        # One "export" slot per running stream; the first window is fetched
+        # before the response starts, so upstream errors get a status code
+        stream_slot = get_bulkhead("export").acquire()
+    except BulkheadFull as e:
+        return _overloaded_response(e)
+    windows = streaming.iter_windows(
+        fetch_window, get_bulkhead("stream").submit, offset, limit, streaming.window_size()
+    )
+    try:
+        window = next(windows, None)
+    except Exception as e:
+        windows.close()
+        stream_slot.release()
+        if isinstance(e, (BlackLabUnavailable, BulkheadFull)):
+            return _overloaded_response(e)
+        if isinstance(e, QueryRejected):
+            return _rejected_response(e)
+        error = _query_error(e)
+        return jsonify(error), 502
+    summary = (window[1].get("summary", {}) or {}) if window else {}
+    total = summary.get("numberOfHits") or summary.get("resultsStats", {}).get("hits", 0)
+
+    from ..services.blacklab_search import _hit_to_canonical as _hit2canon
+
+    def generate() -> Generator[str, None, None]:
+        position = offset
+        started = time.monotonic()
+        current = window
+        try:
+            while current is not None:
+                first, data = current
+                hits = data.get("hits", []) or []
+                rows = _enrich_hits_with_docmeta(
+                    [_hit2canon(hit) for hit in hits], hits, data.get("docInfos", {}) or {}, _docmeta()
+                )
+                yield streaming.ndjson_lines(first, rows)
+                position = first + len(hits)
+                if time.monotonic() - started > streaming.max_seconds():
+                    yield streaming.error_line(
+                        {"error": "time_limit", "message": "Stream duration limit reached"}, position
+                    )
+                    break
+                current = next(windows, None)
+            logger.info("Stream finished: hits %s-%s of %s", offset, position, total)
+        except GeneratorExit:
+            logger.warning("Stream aborted by client at offset %s", position)
+            raise
+        except Exception as e:
+            yield streaming.error_line(_query_error(e), position)
+        finally:
+            windows.close()
+            stream_slot.release()
+
+    body = streaming.gzip_chunks(generate()) if use_gzip else generate()
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers={
+            "Content-Type": f"{mimetype}; charset=utf-8",
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+            "X-Total-Hits": str(total),
+        },
+    )
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.call_on_close(stream_slot.release)
+    return response
+
+
+def build_cql_with_direct_filters(params, filters, doc_metadata: bool = False):
     """
     Build CQL pattern with direct field constraints (no speaker_code mapping).
     Uses BLS_FIELDS to map filter keys to index field names.
+
+    With ``doc_metadata`` only the segment-level speaker constraints are added;
+    document fields are then filtered via build_document_filter().
     """
     base_cql = build_cql(params)
 
@@ -1271,6 +1875,10 @@ def build_cql_with_direct_filters(params, filters):
             else:
                 constraints.append(f'{bls_field}="({"|".join(vals)})"')
 
+    if doc_metadata:
+        # Document fields are applied by the Lucene document filter instead
+        filters = {}
+
     # Document/Metadata fields (as token annotations)
     # country_code
     vals = filters.get("country_code", [])
@@ -1306,25 +1914,10 @@ def build_cql_with_direct_filters(params, filters):
     if val:
         constraints.append(f'date="{val}"')
 
-    if not constraints:
-        return base_cql
-
-    # Apply constraints to every token in the CQL pattern
-    import re
-
-    token_pattern = re.compile(r"\[([^\]]*)\]")
-
-    constraint_str = " & ".join(constraints)
-
-    def add_constraints(match):
-        existing = match.group(1).strip()
-        if existing:
-            return f"[{existing} & {constraint_str}]"
-        return f"[{constraint_str}]"
-
-    modified_cql = token_pattern.sub(add_constraints, base_cql)
-    logger.info(f"CQL with direct filters: {modified_cql}")
-    return modified_cql
+    # Apply constraints to every token; the result is canonical (cache key)
+    modified_cql = add_token_constraints(base_cql, constraints)
+    if constraints:
+        logger.info(f"CQL with direct filters: {modified_cql}")
     return modified_cql
 
 
@@ -1332,8 +1925,12 @@ def build_blacklab_query_from_request(req_args) -> dict:
     """
     Liest die HTTP-Parameter und erzeugt ein dict mit:
     - patt (CQL-Pattern)
-    - filter (CQL-Filter oder "")
+    - filter (Lucene-Dokumentfilter oder "")
     - params_base (dict mit fixen BLS-Parametern, ohne paging / grouping)
+    - doc_metadata (True, wenn Dokumentfelder als Dokumentmetadaten indexiert sind)
+    - shards (Länder-Shards für BLS_SHARDS, sonst None)
+    - filters (Dokument-/Sprecherfilter aus build_filters)
+    - cost (QueryCost: Kostenschätzung und Lane, siehe query_cost)
     """
     # Get mode and query
 
@@ -1361,26 +1958,52 @@ def build_blacklab_query_from_request(req_args) -> dict:
                 "ESP-SEV",
             ]
 
-    # Build document filter (likely empty now, but kept for structure)
-    filter_query = filters_to_blacklab_query(filters)
+    doc_metadata = _doc_metadata_enabled()
+    if doc_metadata:
+        # Document fields: one Lucene filter selects the documents up front
+        filter_query = build_document_filter(filters)
+    else:
+        # Token-annotation index: document fields become per-token CQL constraints
+        filter_query = filters_to_blacklab_query(filters)
 
-    # Build CQL pattern with direct filters
-    # We pass filters to build_cql_with_direct_filters which adds them to the CQL
-    cql_pattern = build_cql_with_direct_filters(req_args, filters)
+    # Build CQL pattern with direct filters; infix/suffix regexes become
+    # term alternations where the vocabulary allows it (term_expansion)
+    cql_pattern = expand_cql(
+        build_cql_with_direct_filters(req_args, filters, doc_metadata=doc_metadata)
+    )
 
     params_base = {
         "wordsaroundhit": MAX_WORDS_AROUND_HIT,
     }
 
-    return {"patt": cql_pattern, "filter": filter_query, "params_base": params_base}
+    return {
+        "patt": cql_pattern,
+        "filter": filter_query,
+        "params_base": params_base,
+        "doc_metadata": doc_metadata,
+        "shards": select_shards(filters),
+        "filters": filters,
+        # Scored on the user's pattern: the filter constraints added above
+        # are low-cardinality and count as selectivity, not as an anchor
+        "cost": estimate_query_cost(
+            expand_cql(build_cql(req_args)), filters, _docmeta()
+        ),
+    }
 
 
 def bls_group_by_field(
-    field_name: str, patt: str, filter_cql: str, base_params: dict
+    field_name: str,
+    patt: str,
+    filter_cql: str,
+    base_params: dict,
+    doc_metadata: bool = False,
+    shards: Optional[list[str]] = None,
 ) -> list[dict]:
     """
-    Ruft BlackLab mit group=hit:<field_name> auf und gibt eine Liste von
-    {'key': <groupValue>, 'n': <size>} zurück.
+    Ruft BlackLab mit group=hit:<field_name> (bzw. field:<field_name> für
+    Dokumentmetadaten) auf und gibt eine Liste von
+    {'key': <groupValue>, 'n': <size>} zurück. Mit ``shards`` werden die
+    Gruppen aller Länder-Shards summiert.
     """
     params = base_params.copy()
     if patt:
@@ -1388,8 +2011,7 @@ def bls_group_by_field(
     if filter_cql:
         params["filter"] = filter_cql
 
-    # Use 'hit:' grouping since all our metadata are stored as token annotations
-    params["group"] = f"hit:{field_name}"
+    params["group"] = _hit_property(field_name, doc_metadata)
     params["number"] = 1000  # Limit number of groups, not hits
     params["waitfortotal"] = "true"
 
@@ -1398,10 +2020,9 @@ def bls_group_by_field(
         # Log the actual params being sent for debugging
         logger.debug(f"Grouping request {field_name}: params={params}")
 
-        response = _make_bls_request(build_bls_corpus_path("hits"), params)
+        data = _fetch_hits(params, shards)
         duration = time.time() - start_time
 
-        data = response.json()
         groups = data.get("hitGroups", [])
 
         logger.debug(f"Grouping {field_name}: {len(groups)} groups in {duration:.2f}s")
@@ -0,0 +1,110 @@
+"""
+Batch search: many queries with shared filters in one request.
+
+Comparative studies (the same lemma per country, a list of verb forms) used
+to send one ``/search/advanced/data`` request per query. ``POST
+/search/advanced/batch`` takes the list at once (see ``advanced_api``):
+
+    - every query is merged with the shared filters and built like a
+      ``/data`` request (:func:`merge_args`)
+    - queries with the same canonical key (``query_cache_key``) run once
+    - the unique sub-queries run on the ``stats`` bulkhead, at most
+      ``BATCH_CONCURRENCY`` at a time per batch, each in the lane of its
+      estimated cost (``query_cost``)
+    - sub-queries not finished within ``BATCH_TIMEOUT`` seconds are reported
+      as ``budget_exceeded``; the others are returned
+
+Configuration (environment):
+    BATCH_MAX_QUERIES   Max. queries per batch (default 50)
+    BATCH_CONCURRENCY   Sub-queries of one batch running at once (default 4)
+    BATCH_TIMEOUT       Time budget of a batch in seconds (default 30)
+    BATCH_MAX_HITS      Max. first-page hits per query (default 50)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Mapping
+
+from werkzeug.datastructures import MultiDict
+
+from ..extensions.bulkheads import BulkheadFull, get_bulkhead
+
+logger = logging.getLogger(__name__)
+
+BUDGET_EXCEEDED = {"error": "budget_exceeded", "message": "Batch time budget exceeded before this query finished"}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def max_queries() -> int:
+    return max(1, int(_env_float("BATCH_MAX_QUERIES", 50)))
+
+
+def max_hits() -> int:
+    return max(0, int(_env_float("BATCH_MAX_HITS", 50)))
+
+
+def merge_args(shared: Mapping[str, Any], query: Mapping[str, Any]) -> MultiDict:
+    """Request-style args of one query: ``shared`` filters, overridden per key by ``query``."""
+    args: MultiDict = MultiDict()
+    for source in (shared, query):
+        for name, value in source.items():
+            values = value if isinstance(value, (list, tuple)) else [value]
+            args.setlist(str(name), [str(v) for v in values if v is not None])
+    return args
+
+
+def run_unique(
+    tasks: dict[str, Callable[[], dict]],
+    on_error: Callable[[Exception], dict],
+) -> dict[str, dict]:
+    """
+    Run ``tasks`` (key -> call) on the ``stats`` bulkhead within the batch
+    budget and return key -> result. Exceptions of a call become
+    ``on_error(exc)``; calls that do not finish in time ``BUDGET_EXCEEDED``.
+    """
+    concurrency = max(1, int(_env_float("BATCH_CONCURRENCY", 4)))
+    deadline = time.monotonic() + _env_float("BATCH_TIMEOUT", 30.0)
+    bulkhead = get_bulkhead("stats")
+    pending = list(tasks.items())
+    running: dict[Future, str] = {}
+    results: dict[str, dict] = {}
+
+    while pending or running:
+        while pending and len(running) < concurrency and time.monotonic() < deadline:
+            key, call = pending.pop(0)
+            try:
+                running[bulkhead.submit(call)] = key
+            except BulkheadFull as exc:
+                results[key] = on_error(exc)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if not running:
+            continue
+        done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            key = running.pop(future)
+            try:
+                results[key] = future.result()
+            except Exception as exc:
+                results[key] = on_error(exc)
+
+    if running or pending:
+        logger.warning("Batch budget exceeded: %d of %d sub-queries unfinished", len(running) + len(pending), len(tasks))
+    for future, key in running.items():
+        # Still running: finishes in the background, the slot is freed then
+        future.cancel()
+        results[key] = dict(BUDGET_EXCEEDED)
+    for key, _ in pending:
+        results[key] = dict(BUDGET_EXCEEDED)
+    return results
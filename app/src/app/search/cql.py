@@ -55,7 +55,7 @@ def build_token_cql(
 
     Args:
         token: Word/lemma to search
-        mode: 'forma_exacta' | 'forma' | 'lemma' | 'cql' (raw CQL)
+        mode: 'forma_exacta' | 'forma' | 'contains' | 'lemma' | 'cql' (raw CQL)
         sensitive: If False, use 'norm' field (case/diacritic insensitive)
         pos: POS tag constraint (optional)
 
@@ -85,6 +85,11 @@ def build_token_cql(
         # POS tag search
         field = "pos"
         value = escaped.upper()  # POS tags are uppercase
+    elif mode == "contains":
+        # Forms containing the token (infix regex; expanded to a term
+        # alternation before sending, see term_expansion)
+        field = "word" if sensitive else "norm"
+        value = f".*{escaped if sensitive else escaped.lower()}.*"
     else:  # mode == "forma"
         # forma: if sensitive=False, use 'norm', else use 'word'
         if sensitive:
@@ -164,7 +169,7 @@ def build_cql(params: Dict) -> str:
     Args:
         params: Request form data
             - q or query (str): Query string
-            - mode (str): 'forma_exacta' | 'forma' | 'lemma' | 'cql'
+            - mode (str): 'forma_exacta' | 'forma' | 'contains' | 'lemma' | 'cql'
             - sensitive (bool or str): '0'/'false' = case/diacritic insensitive
             - pos (str): Comma-separated POS tags (optional)
 
@@ -190,8 +195,8 @@ def build_cql(params: Dict) -> str:
 
     # Parse sensitive flag
     # sensitive can be string ('0', '1', 'true', 'false') or bool
-    # Default to insensitive ('0') for forma mode, sensitive for others
-    sensitive_raw = params.get("sensitive", "0" if mode == "forma" else "1")
+    # Default to insensitive ('0') for forma/contains mode, sensitive for others
+    sensitive_raw = params.get("sensitive", "0" if mode in ("forma", "contains") else "1")
     sensitive = sensitive_raw not in ("0", "false", False)
 
     # Parse POS tags
@@ -415,9 +420,10 @@ def build_filters(params: Dict) -> Dict[str, any]:
     # Fallback to 'mode' if speech_mode is empty (but exclude CQL search modes!)
     if not modes:
         mode_param = params.get("mode")
-        # Skip if mode is a search mode (forma, lemma, cql, forma_exacta, pos)
+        # Skip if mode is a search mode (forma, contains, lemma, cql, forma_exacta, pos)
         if mode_param and mode_param not in [
             "forma",
+            "contains",
             "lemma",
             "cql",
             "forma_exacta",
@@ -579,6 +585,86 @@ def filters_to_blacklab_query(filters: Dict) -> str:
     return ""
 
 
+# Document-scoped fields: identical for every token of a recording. In an index
+# built with --doc-metadata they exist only as document metadata.
+DOC_METADATA_FIELDS = frozenset(
+    {
+        "country_code",
+        "country_scope",
+        "country_parent_code",
+        "country_region_code",
+        "city",
+        "radio",
+        "date",
+        "audio_path",
+    }
+)
+
+
+def _lucene_phrase(value: str) -> str:
+    """Quote a value for a Lucene field query (exact match on untokenized fields)."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _lucene_clause(field: str, values: List[str], occur: str = "+") -> str:
+    # Sorted and de-duplicated: equal selections give equal filters (cache keys)
+    values = sorted({str(v).strip() for v in values if v and str(v).strip()})
+    if not values:
+        return ""
+    if len(values) == 1:
+        return f"{occur}{field}:{_lucene_phrase(values[0])}"
+    return f"{occur}{field}:({' '.join(_lucene_phrase(v) for v in values)})"
+
+
+def build_document_filter(filters: Dict) -> str:
+    """
+    Build a BlackLab ``filter`` (Lucene query on document metadata) from the
+    document-scoped filters.
+
+    Counterpart of the per-token CQL constraints for indexes that store
+    country/scope/radio/city/date as document metadata: BlackLab then selects
+    matching documents once instead of checking the constraint on every token.
+    Speaker filters are segment-level and stay in the CQL pattern.
+
+    Args:
+        filters: Output from build_filters() (optionally with
+            'exclude_country_code')
+
+    Returns:
+        Lucene query string, e.g.
+        '+country_code:("ARG" "VEN") +country_scope:"national"', or "".
+    """
+    if not filters:
+        return ""
+
+    clauses = [
+        _lucene_clause("country_code", filters.get("country_code") or []),
+        _lucene_clause(
+            "country_parent_code", filters.get("country_parent_code") or []
+        ),
+        _lucene_clause(
+            "country_region_code", filters.get("country_region_code") or []
+        ),
+    ]
+    for field in ("country_scope", "radio", "city", "date"):
+        value = filters.get(field)
+        if value:
+            clauses.append(_lucene_clause(field, [value]))
+    # Exclusions: a pure negative query matches nothing in Lucene, so they are
+    # only emitted together with at least one positive clause (see below).
+    excluded = _lucene_clause(
+        "country_code", filters.get("exclude_country_code") or [], occur="-"
+    )
+
+    clauses = [c for c in clauses if c]
+    if excluded:
+        if not clauses:
+            clauses.append("*:*")
+        clauses.append(excluded)
+    return " ".join(clauses)
+
+
 def resolve_countries_for_include_regional(
     countries: Optional[list], include_regional: bool
 ) -> list:
@@ -0,0 +1,403 @@
+"""
+CQL canonicalization for cache keys and query deduplication.
+
+Equivalent patterns such as ``[lemma="ir"]`` and ``[ lemma = 'ir' ]``, or
+``[a="1" & b="2"]`` and ``[b="2" & a="1"]``, are rewritten to one canonical
+string so result caches and request coalescing in front of BlackLab see them
+as the same query.
+
+Only token constraints (the part inside ``[...]``) are parsed into an AST:
+
+    expr       := or
+    or         := and ("|" and)*
+    and        := unary ("&" unary)*
+    unary      := "!" unary | "(" expr ")" | constraint
+    constraint := NAME ("=" | "!=") STRING | STRING
+
+Canonical form:
+    - whitespace normalized (``[a="x" & b="y"]``, one space between tokens)
+    - strings double-quoted
+    - nested ``&`` / ``|`` flattened, operands sorted and de-duplicated
+    - ``!`` folded into ``!=`` and double negation removed
+    - plain regex alternations in values sorted (``"(VEN|ARG)"`` -> ``"(ARG|VEN)"``)
+
+Everything outside token brackets (sequences, quantifiers, spans, ``within``,
+global constraints) keeps its structure; only whitespace is normalized.
+A token that cannot be parsed is kept verbatim, so canonicalization never
+changes what a query matches.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Union
+
+__all__ = [
+    "CQLParseError",
+    "add_token_constraints",
+    "canonicalize_cql",
+    "parse_token_expression",
+    "query_cache_key",
+    "quote",
+    "split_outer",
+    "unquote",
+]
+
+
+class CQLParseError(ValueError):
+    """Raised when a token expression cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class Constraint:
+    # Empty name: bare string (default annotation)
+    name: str
+    op: str
+    value: str
+
+    def render(self) -> str:
+        quoted = quote(self.value)
+        return f"{self.name}{self.op}{quoted}" if self.name else quoted
+
+
+@dataclass(frozen=True)
+class Not:
+    child: "Node"
+
+    def render(self) -> str:
+        inner = self.child.render()
+        if isinstance(self.child, (And, Or)):
+            inner = f"({inner})"
+        return f"!{inner}"
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple["Node", ...]
+
+    def render(self) -> str:
+        return " & ".join(
+            f"({c.render()})" if isinstance(c, Or) else c.render()
+            for c in self.children
+        )
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple["Node", ...]
+
+    def render(self) -> str:
+        return " | ".join(
+            f"({c.render()})" if isinstance(c, And) else c.render()
+            for c in self.children
+        )
+
+
+Node = Union[Constraint, Not, And, Or]
+
+
+# ---------------------------------------------------------------------------
+# Lexing / parsing of token expressions
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>!=|=|&|\||!|\(|\))
+      | (?P<name>[A-Za-z_][A-Za-z0-9_\-]*)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def unquote(literal: str) -> str:
+    """String body without quotes; escapes are kept except for the quote char."""
+    quote_char = literal[0]
+    body = literal[1:-1]
+    if quote_char == "'":
+        # \' only exists to protect the single quote
+        body = body.replace("\\'", "'")
+    return body
+
+
+def quote(value: str) -> str:
+    """Double-quoted CQL string literal for ``value``."""
+    # Escape double quotes that are not escaped yet
+    escaped = re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', value)
+    return f'"{escaped}"'
+
+
+def _lex(text: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise CQLParseError(f"Unexpected character at {pos}: {text[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, value: str | None = None) -> tuple[str, str]:
+        token = self.peek()
+        if token is None or (value is not None and token[1] != value):
+            raise CQLParseError(f"Expected {value or 'token'} at position {self.pos}")
+        self.pos += 1
+        return token
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise CQLParseError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.peek() == ("op", "|"):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def parse_and(self) -> Node:
+        children = [self.parse_unary()]
+        while self.peek() == ("op", "&"):
+            self.take()
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def parse_unary(self) -> Node:
+        token = self.peek()
+        if token == ("op", "!"):
+            self.take()
+            return Not(self.parse_unary())
+        if token == ("op", "("):
+            self.take()
+            node = self.parse_or()
+            self.take(")")
+            return node
+        if token is not None and token[0] == "string":
+            self.take()
+            return Constraint("", "=", unquote(token[1]))
+        if token is not None and token[0] == "name":
+            self.take()
+            op = self.take()
+            if op[1] not in ("=", "!="):
+                raise CQLParseError(f"Expected = or != after {token[1]!r}")
+            value = self.take()
+            if value[0] != "string":
+                raise CQLParseError(f"Expected string after {token[1]}{op[1]}")
+            return Constraint(token[1], op[1], unquote(value[1]))
+        raise CQLParseError(f"Unexpected token {token!r}")
+
+
+def parse_token_expression(text: str) -> Node | None:
+    """
+    Parse the inside of a token bracket (``lemma="ir" & pos="VERB"``).
+
+    Returns:
+        AST node, or None for the empty token ``[]``.
+
+    Raises:
+        CQLParseError: If the expression is not valid token syntax.
+    """
+    tokens = _lex(text)
+    if not tokens:
+        return None
+    return _Parser(tokens).parse()
+
+
+# ---------------------------------------------------------------------------
+# Canonicalization
+# ---------------------------------------------------------------------------
+
+_ALTERNATION_RE = re.compile(r"^\(([^()|\\]+(?:\|[^()|\\]+)+)\)$")
+
+
+def _canonical_value(value: str) -> str:
+    """Sort a plain anchored alternation ``(b|a)`` -> ``(a|b)``; single -> bare."""
+    match = _ALTERNATION_RE.match(value)
+    if not match:
+        return value
+    alternatives = sorted(set(match.group(1).split("|")))
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return f"({'|'.join(alternatives)})"
+
+
+def _canonical(node: Node) -> Node:
+    if isinstance(node, Constraint):
+        return Constraint(node.name, node.op, _canonical_value(node.value))
+    if isinstance(node, Not):
+        child = _canonical(node.child)
+        if isinstance(child, Not):
+            return child.child
+        if isinstance(child, Constraint) and child.name:
+            return Constraint(child.name, "=" if child.op == "!=" else "!=", child.value)
+        return Not(child)
+
+    cls = type(node)
+    children: list[Node] = []
+    for child in node.children:
+        child = _canonical(child)
+        # Flatten nested operators of the same kind (associativity)
+        children.extend(child.children if isinstance(child, cls) else [child])
+    # Sort (commutativity) and drop duplicates (idempotence)
+    unique = {child.render(): child for child in children}
+    ordered = tuple(unique[key] for key in sorted(unique))
+    return ordered[0] if len(ordered) == 1 else cls(ordered)
+
+
+def canonicalize_token(text: str) -> str:
+    """Canonical form of a token expression (without brackets)."""
+    node = parse_token_expression(text)
+    return "" if node is None else _canonical(node).render()
+
+
+def split_outer(cql: str) -> list[tuple[str, str]]:
+    """Split a pattern into ("token", inner), ("string", literal) and ("text", other) parts."""
+    parts: list[tuple[str, str]] = []
+    buf: list[str] = []
+    i = 0
+    n = len(cql)
+    while i < n:
+        ch = cql[i]
+        if ch in "\"'":
+            end = i + 1
+            while end < n and cql[end] != ch:
+                end += 2 if cql[end] == "\\" else 1
+            if buf:
+                parts.append(("text", "".join(buf)))
+                buf = []
+            parts.append(("string", cql[i : end + 1]))
+            i = end + 1
+        elif ch == "[":
+            end = i + 1
+            quote_char = None
+            while end < n:
+                c = cql[end]
+                if quote_char:
+                    if c == "\\":
+                        end += 1
+                    elif c == quote_char:
+                        quote_char = None
+                elif c in "\"'":
+                    quote_char = c
+                elif c == "]":
+                    break
+                end += 1
+            if buf:
+                parts.append(("text", "".join(buf)))
+                buf = []
+            parts.append(("token", cql[i + 1 : end]))
+            i = end + 1
+        else:
+            buf.append(ch)
+            i += 1
+    if buf:
+        parts.append(("text", "".join(buf)))
+    return parts
+
+
+def canonicalize_cql(cql: str) -> str:
+    """
+    Canonical string for a CQL pattern (see module docstring).
+
+    Args:
+        cql: CQL pattern, e.g. ``'[ lemma = "ir" ]  [pos="VERB" & word="va"]'``
+
+    Returns:
+        Canonical pattern, e.g. ``'[lemma="ir"] [pos="VERB" & word="va"]'``.
+        Empty or whitespace-only input returns "".
+    """
+    if not cql or not cql.strip():
+        return ""
+
+    out: list[str] = []
+    previous_is_token = False
+    for kind, text in split_outer(cql.strip()):
+        if kind == "text":
+            if text.strip():
+                out.append(re.sub(r"\s+", " ", text))
+                previous_is_token = False
+            continue
+        if kind == "token":
+            try:
+                element = f"[{canonicalize_token(text)}]"
+            except CQLParseError:
+                element = f"[{text.strip()}]"
+        else:
+            # Bare string token ("casa"); keeps its shorthand form
+            element = quote(unquote(text))
+        if previous_is_token:
+            # Consecutive token elements: exactly one separating space
+            out.append(" ")
+        out.append(element)
+        previous_is_token = True
+
+    return "".join(out).strip()
+
+
+def add_token_constraints(cql: str, constraints: list[str]) -> str:
+    """
+    AND ``constraints`` (e.g. ``['speaker_sex="f"']``) into every token of
+    ``cql`` and return the canonical pattern.
+
+    Existing alternatives keep their grouping: ``[a="1" | b="2"]`` becomes
+    ``[speaker_sex="f" & (a="1" | b="2")]`` (not ``a="1" | (b="2" & ...)``).
+    """
+    if not constraints:
+        return canonicalize_cql(cql)
+    added = " & ".join(constraints)
+    try:
+        extra_nodes = tuple(
+            node for node in map(parse_token_expression, constraints) if node
+        )
+    except CQLParseError:
+        extra_nodes = None
+
+    def constrain(inner: str) -> str:
+        try:
+            if extra_nodes is None:
+                raise CQLParseError("unparseable constraint")
+            node = parse_token_expression(inner)
+        except CQLParseError:
+            # Keep the unknown expression intact, but scoped by parentheses
+            return f"({inner.strip()}) & {added}" if inner.strip() else added
+        nodes = extra_nodes if node is None else (node,) + extra_nodes
+        return _canonical(And(nodes)).render()
+
+    out = [
+        f"[{constrain(text)}]" if kind == "token" else text
+        for kind, text in split_outer(cql)
+    ]
+    return canonicalize_cql("".join(out))
+
+
+def query_cache_key(patt: str, filter_query: str = "", **params: Any) -> str:
+    """
+    Stable cache key for a BlackLab query: canonical pattern, document filter
+    and any additional parameters (sorted). Returns a hex SHA-256 digest.
+    """
+    payload = {
+        "patt": canonicalize_cql(patt or ""),
+        "filter": " ".join((filter_query or "").split()),
+        "params": {k: params[k] for k in sorted(params) if params[k] is not None},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,380 @@
+"""
+Materialized result sets for the advanced search DataTable.
+
+Re-sorting, paging and narrowing by country in the DataTable used to send a
+new ``hits`` request to BlackLab every time. Result sets with at most
+``RESULTSET_MAX_HITS`` hits are now fetched once, converted to DataTable rows
+and kept in a columnar store keyed by ``query_cache_key`` (canonical pattern,
+document filter, shards, context parameters). Sort, page and facet counts are
+then computed locally.
+
+Lifecycle of a key:
+    1st request   served by BlackLab as before; the total is noted
+    2nd request   (page flip, new sort ...) the full hit set is fetched once
+                  (unsorted, in pages of BlackLab's page maximum) and
+                  materialized
+    later         served from the store until ``RESULTSET_TTL`` expires
+
+Only queries that are used again are materialized; one-off searches cost
+nothing extra. A request that narrows by ``country_code`` (with
+``include_regional=1``) can be served from the materialized "all countries"
+set of the same query (see :func:`country_superset_args`).
+
+Storage:
+    - columns: one list per row field; low-cardinality string columns
+      (country, speaker attributes, file names, ...) are dictionary-encoded
+    - memory budget ``RESULTSET_MEMORY_MB``: least recently used sets spill
+      to ``RESULTS_TEMP_DIR`` as gzipped JSON and are loaded back on access
+    - disk budget ``RESULTSET_DISK_MB``: oldest spilled sets are deleted
+    - ``RESULTSET_MAX_HITS=0`` disables materialization
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from ..runtime_paths import get_results_temp_dir
+from .shards import collation_key
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality row fields stored as indexes into a per-set table
+DICT_COLUMNS = (
+    "filename",
+    "country_code",
+    "country_scope",
+    "radio",
+    "city",
+    "date",
+    "speaker_type",
+    "speaker_sex",
+    "speaker_mode",
+    "speaker_discourse",
+    "sex",
+    "mode",
+    "discourse",
+    "lemma",
+)
+FACET_COLUMNS = ("country_code", "speaker_type", "speaker_sex", "speaker_mode", "speaker_discourse")
+# Queries remembered as candidates for materialization (least recently noted out)
+MAX_NOTED = 4096
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def max_hits() -> int:
+    """Largest result set that is materialized (0 disables the store)."""
+    return max(0, int(_env_float("RESULTSET_MAX_HITS", 5000)))
+
+
+class ResultSet:
+    """DataTable rows of one query, stored column by column."""
+
+    def __init__(self, key: str, columns: dict[str, list], tables: dict[str, list], summary: dict, created: Optional[float] = None) -> None:
+        self.key = key
+        self.columns = columns
+        self.tables = tables
+        self.summary = summary
+        self.created = time.time() if created is None else created
+        self.size = len(next(iter(columns.values()), []))
+        self._nbytes: Optional[int] = None
+
+    @classmethod
+    def from_rows(cls, key: str, rows: list[dict], summary: dict) -> "ResultSet":
+        names: list[str] = []
+        for row in rows:
+            for name in row:
+                if name not in names:
+                    names.append(name)
+        columns: dict[str, list] = {}
+        tables: dict[str, list] = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            if name in DICT_COLUMNS:
+                index: dict[Any, int] = {}
+                columns[name] = [index.setdefault(value, len(index)) for value in values]
+                tables[name] = list(index)
+            else:
+                columns[name] = values
+        return cls(key, columns, tables, summary)
+
+    def value(self, name: str, i: int) -> Any:
+        value = self.columns[name][i]
+        table = self.tables.get(name)
+        return table[value] if table is not None else value
+
+    def row(self, i: int) -> dict:
+        return {name: self.value(name, i) for name in self.columns}
+
+    def select(self, country_codes: Optional[Iterable[str]] = None) -> list[int]:
+        """Row indexes, optionally only those of the given countries."""
+        if not country_codes:
+            return list(range(self.size))
+        wanted = {code.upper() for code in country_codes}
+        return [i for i in range(self.size) if str(self.value("country_code", i) or "").upper() in wanted]
+
+    def has_column(self, name: str, complete: bool = False) -> bool:
+        """``complete``: every row has a non-empty value."""
+        if name not in self.columns:
+            return False
+        return not complete or all(self.value(name, i) for i in range(self.size))
+
+    def order(self, indexes: list[int], column: str, descending: bool = False) -> list[int]:
+        """Sort like BlackLab: case/accent-insensitive, stable for equal values."""
+        if column not in self.columns:
+            return indexes
+
+        def key(i: int):
+            value = self.value(column, i)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return (0, value, "")
+            return (1, 0, collation_key(str(value or "")))
+
+        return sorted(indexes, key=key, reverse=descending)
+
+    def facets(self, indexes: list[int], columns: Iterable[str] = FACET_COLUMNS) -> dict[str, dict[str, int]]:
+        result = {}
+        for name in columns:
+            if name not in self.columns:
+                continue
+            counts: dict[str, int] = {}
+            for i in indexes:
+                value = str(self.value(name, i) or "")
+                counts[value] = counts.get(value, 0) + 1
+            result[name] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return result
+
+    def to_json(self) -> bytes:
+        payload = {"key": self.key, "created": self.created, "summary": self.summary, "columns": self.columns, "tables": self.tables}
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "ResultSet":
+        payload = json.loads(raw.decode("utf-8"))
+        return cls(payload["key"], payload["columns"], payload["tables"], payload["summary"], payload["created"])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate footprint (size of the serialized form)."""
+        if self._nbytes is None:
+            self._nbytes = len(self.to_json())
+        return self._nbytes
+
+
+class ResultStore:
+    def __init__(self, memory_budget: int, disk_budget: int, ttl: float, spill_dir: Path) -> None:
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self._memory: OrderedDict[str, ResultSet] = OrderedDict()
+        self._disk: OrderedDict[str, tuple[Path, float, int]] = OrderedDict()
+        self._noted: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._building: set[str] = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+
+    def _expired(self, created: float, now: float) -> bool:
+        return now - created > self.ttl
+
+    # -- first request / materialization ------------------------------------
+
+    def note(self, key: str, total: int) -> None:
+        """Remember the total of a query served by BlackLab (candidate for materialization)."""
+        if 0 < total <= max_hits():
+            now = time.time()
+            with self._lock:
+                self._noted[key] = (total, now)
+                self._noted.move_to_end(key)
+                self._prune_noted(now)
+
+    def _prune_noted(self, now: float) -> None:
+        """Drop expired candidates and cap the rest at ``MAX_NOTED`` (oldest first)."""
+        while self._noted:
+            key, (_, noted_at) = next(iter(self._noted.items()))
+            if len(self._noted) <= MAX_NOTED and not self._expired(noted_at, now):
+                break
+            del self._noted[key]
+
+    def claim(self, key: str) -> Optional[int]:
+        """
+        Total to materialize if ``key`` was seen before and nobody is building
+        it already; pair with :meth:`put` or :meth:`release`.
+        """
+        now = time.time()
+        with self._lock:
+            self._prune_noted(now)
+            noted = self._noted.get(key)
+            if noted is None or key in self._building:
+                return None
+            self._building.add(key)
+            return noted[0]
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._building.discard(key)
+
+    def forget(self, key: str) -> None:
+        """Release ``key`` and drop its noted total (the result no longer matches it)."""
+        with self._lock:
+            self._building.discard(key)
+            self._noted.pop(key, None)
+
+    def put(self, result_set: ResultSet) -> None:
+        with self._lock:
+            self._building.discard(result_set.key)
+            self._noted.pop(result_set.key, None)
+            self._drop_disk(result_set.key)
+            self._memory[result_set.key] = result_set
+            self._memory.move_to_end(result_set.key)
+            self._spill()
+
+    # -- lookup -------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[ResultSet]:
+        now = time.time()
+        with self._lock:
+            result_set = self._memory.get(key)
+            if result_set is not None:
+                if self._expired(result_set.created, now):
+                    del self._memory[key]
+                    result_set = None
+                else:
+                    self._memory.move_to_end(key)
+            if result_set is None and key in self._disk:
+                result_set = self._load(key, now)
+            if result_set is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result_set
+
+    def _load(self, key: str, now: float) -> Optional[ResultSet]:
+        path, created, _ = self._disk[key]
+        if self._expired(created, now):
+            self._drop_disk(key)
+            return None
+        try:
+            result_set = ResultSet.from_json(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Dropping unreadable spilled result set %s: %s", path, exc)
+            self._drop_disk(key)
+            return None
+        self._drop_disk(key)
+        self._memory[key] = result_set
+        self._spill(keep=key)
+        return result_set
+
+    # -- budgets ------------------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        return sum(result_set.nbytes for result_set in self._memory.values())
+
+    def _spill(self, keep: Optional[str] = None) -> None:
+        """Move least recently used sets to disk until the memory budget holds."""
+        while len(self._memory) > 1 and self.memory_bytes() > self.memory_budget:
+            key = next(k for k in self._memory if k != keep)
+            result_set = self._memory.pop(key)
+            if self.disk_budget <= 0:
+                continue
+            try:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                path = self.spill_dir / f"{key}.json.gz"
+                data = gzip.compress(result_set.to_json(), compresslevel=1)
+                path.write_bytes(data)
+            except OSError as exc:
+                logger.warning("Could not spill result set %s: %s", key, exc)
+                continue
+            self._disk[key] = (path, result_set.created, len(data))
+            self.spills += 1
+        while self._disk and sum(size for _, _, size in self._disk.values()) > self.disk_budget:
+            self._drop_disk(next(iter(self._disk)))
+
+    def _drop_disk(self, key: str) -> None:
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            entry[0].unlink(missing_ok=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_sets": len(self._memory),
+                "memory_bytes": self.memory_bytes(),
+                "disk_sets": len(self._disk),
+                "disk_bytes": sum(size for _, _, size in self._disk.values()),
+                "noted": len(self._noted),
+                "hits": self.hits,
+                "misses": self.misses,
+                "spills": self.spills,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._disk):
+                self._drop_disk(key)
+            self._memory.clear()
+            self._noted.clear()
+            self._building.clear()
+
+
+def country_superset_args(args: Any) -> Optional[Any]:
+    """
+    Request args of the "all countries" query a ``country_code`` selection
+    narrows, or None if the selection is not a plain country filter.
+
+    With explicit ``country_code`` values the query filters on exactly those
+    codes; without them and with ``include_regional=1`` it has no country
+    filter at all, so its rows contain every row of the narrowed query.
+    Without ``include_regional=1`` the narrowed query is also restricted to
+    ``country_scope="national"`` (``filters_to_blacklab_query``), which the
+    rows cannot reproduce, so it goes to BlackLab.
+    """
+    if not args.getlist("country_code") or args.get("include_regional") != "1":
+        return None
+    if any(args.get(name) for name in ("country_scope", "country_parent_code", "country_region_code")):
+        return None
+    superset = args.copy()
+    superset.poplist("country_code")
+    superset["include_regional"] = "1"
+    return superset
+
+
+_STORE: Optional[ResultStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ResultStore(
+                memory_budget=int(_env_float("RESULTSET_MEMORY_MB", 64) * 1024 * 1024),
+                disk_budget=int(_env_float("RESULTSET_DISK_MB", 512) * 1024 * 1024),
+                ttl=_env_float("RESULTSET_TTL", 600),
+                spill_dir=get_results_temp_dir(),
+            )
+        return _STORE
+
+
+def reset_result_store() -> None:
+    """Drop all result sets (tests, or after reconfiguring)."""
+    global _STORE
+    with _STORE_LOCK:
+        store, _STORE = _STORE, None
+    if store is not None:
+        store.clear()
@@ -0,0 +1,342 @@
+"""
+Query cost estimation and admission lanes for BlackLab searches.
+
+Patterns such as ``[word=".*a.*"]``, unanchored regexes or sequences of
+empty tokens keep BlackLab (and a gunicorn worker) busy for minutes, while a
+lemma lookup takes milliseconds. Before a search is sent, its canonical CQL
+is scored and the query is admitted to a lane:
+
+    cheap    score < QUERY_COST_SLOW        runs immediately
+    slow     score < QUERY_COST_REFUSE      at most QUERY_SLOW_LANE_SLOTS
+                                            concurrent queries per process;
+                                            waits up to QUERY_SLOW_LANE_WAIT s;
+                                            BlackLab read timeout
+                                            QUERY_SLOW_TIMEOUT s, kept out of
+                                            the breaker and endpoint
+                                            histograms (bls_resilience)
+    refused  score >= QUERY_COST_REFUSE     rejected with an explanation
+
+Score (relative units, 1 = literal lookup):
+
+    constraint  literal 1; alternation of literals ``"(a|b|...)"`` 1 + 0.05
+                per alternative (expanded infix/suffix regexes, see
+                term_expansion); regex with literal prefix >= 3 chars 2,
+                shorter prefix 10; suffix/infix regex (literal run >= 3) 50;
+                regex without literal run 300; ``!=`` 100; ``pos`` literals 20
+    token       ``&`` -> cheapest operand, ``|`` -> sum, ``[]`` -> 300
+    sequence    cheapest token (the anchor) x (1 + 0.25 per extra token),
+                x max repetition of quantifiers (``{1,5}`` -> 5, ``*``/``+`` -> 10)
+    filters     x share of documents selected by the document filters
+                (from docmeta), at least 0.1
+
+Wait and run times are recorded per lane (``snapshot()``, shown in
+``/health/bls``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from ..extensions.bls_resilience import LatencyHistogram, slow_calls
+from .cql_canonical import (
+    And,
+    Constraint,
+    CQLParseError,
+    Not,
+    Or,
+    parse_token_expression,
+    split_outer,
+)
+
+logger = logging.getLogger(__name__)
+
+CHEAP = "cheap"
+SLOW = "slow"
+REFUSED = "refused"
+
+BROAD = 300.0
+NEGATION = 100.0
+LOW_CARDINALITY = {"pos": 20.0}
+MIN_SELECTIVITY = 0.1
+
+_REGEX_META = set(".^$*+?()[]{}|\\")
+_LITERAL_ALTERNATION_RE = re.compile(r"^\((?:[^.^$*+?()\[\]{}|\\]|\\.)+(?:\|(?:[^.^$*+?()\[\]{}|\\]|\\.)+)*\)$")
+_QUANTIFIER_RE = re.compile(r"\{\s*(\d*)\s*(?:,\s*(\d*)\s*)?\}|[*+]")
+
+TOO_EXPENSIVE_MESSAGE = (
+    "La consulta es demasiado costosa para el motor de búsqueda "
+    "(por ejemplo, expresiones regulares sin parte literal o secuencias de "
+    "tokens vacíos). Añada una parte literal o restrinja la búsqueda con "
+    "filtros de país."
+)
+SLOW_LANE_BUSY_MESSAGE = "Hay demasiadas consultas costosas en curso. Por favor, inténtelo de nuevo en unos segundos."
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class QueryRejected(RuntimeError):
+    """Base class for queries that are not sent to BlackLab."""
+
+    code = "query_rejected"
+    status = 400
+
+    def __init__(self, message: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueryTooExpensive(QueryRejected):
+    code = "query_too_expensive"
+    status = 400
+
+
+class SlowLaneBusy(QueryRejected):
+    code = "slow_lane_busy"
+    status = 503
+
+
+@dataclass
+class QueryCost:
+    score: float
+    lane: str
+    reasons: list[str] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Estimation
+# ---------------------------------------------------------------------------
+
+
+def _literal_prefix(value: str) -> str:
+    prefix = []
+    for ch in value:
+        if ch in _REGEX_META:
+            # "x?" / "x*" make the previous character optional
+            if ch in "?*{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(ch)
+    return "".join(prefix)
+
+
+def _longest_literal_run(value: str) -> int:
+    runs = re.split(r"\\.|[.^$*+?()\[\]{}|]", value)
+    return max((len(run) for run in runs), default=0)
+
+
+def constraint_cost(node: Constraint, reasons: list[str]) -> float:
+    value = node.value
+    if node.op == "!=":
+        reasons.append(f"negación {node.name}!=")
+        return NEGATION
+    is_regex = any(ch in _REGEX_META for ch in value.replace("\\.", ""))
+    if not is_regex:
+        return LOW_CARDINALITY.get(node.name, 1.0)
+    if _LITERAL_ALTERNATION_RE.match(value):
+        return LOW_CARDINALITY.get(node.name, 1.0) + 0.05 * (value.count("|") + 1)
+    if len(_literal_prefix(value)) >= 3:
+        return 2.0
+    if _literal_prefix(value):
+        return 10.0
+    if _longest_literal_run(value) >= 3:
+        reasons.append(f'regex sin prefijo "{value}"')
+        return 50.0
+    reasons.append(f'regex sin parte literal "{value}"')
+    return BROAD
+
+
+def node_cost(node: Any, reasons: list[str]) -> float:
+    if node is None:
+        reasons.append("token vacío []")
+        return BROAD
+    if isinstance(node, Constraint):
+        return constraint_cost(node, reasons)
+    if isinstance(node, Not):
+        reasons.append("negación !")
+        return NEGATION
+    if isinstance(node, And):
+        return min(node_cost(child, reasons) for child in node.children)
+    if isinstance(node, Or):
+        return sum(node_cost(child, reasons) for child in node.children)
+    return BROAD
+
+
+def _repetition(text: str) -> float:
+    factor = 1.0
+    for match in _QUANTIFIER_RE.finditer(text):
+        if match.group(0) in ("*", "+"):
+            factor = max(factor, 10.0)
+            continue
+        low, high = match.group(1), match.group(2)
+        if match.group(0).find(",") >= 0:
+            bound = int(high) if high else 10
+        else:
+            bound = int(low) if low else 1
+        factor = max(factor, float(max(bound, 1)))
+    return factor
+
+
+def pattern_cost(cql: str, reasons: Optional[list[str]] = None) -> float:
+    """Cost of a CQL pattern, without filter selectivity."""
+    reasons = reasons if reasons is not None else []
+    token_costs = []
+    repetition = 1.0
+    for kind, text in split_outer(cql or ""):
+        if kind in ("token", "string"):
+            # A bare string ("casa") is a token with the default annotation
+            try:
+                token_costs.append(node_cost(parse_token_expression(text), reasons))
+            except CQLParseError:
+                reasons.append("token no analizable")
+                token_costs.append(BROAD)
+        else:
+            repetition = max(repetition, _repetition(text))
+    if not token_costs:
+        return 0.0
+    if repetition > 1:
+        reasons.append(f"cuantificador x{repetition:g}")
+    anchor = min(token_costs)
+    return anchor * (1 + 0.25 * (len(token_costs) - 1)) * repetition
+
+
+def _doc_matches(doc: dict, filters: dict) -> bool:
+    code = (doc.get("country_code") or "").upper()
+    parent = (doc.get("country_parent_code") or code).upper()
+    codes = filters.get("country_code") or []
+    if codes and code not in codes and parent not in codes:
+        return False
+    parents = filters.get("country_parent_code") or []
+    if parents and parent not in parents:
+        return False
+    if code in (filters.get("exclude_country_code") or []):
+        return False
+    scope = filters.get("country_scope")
+    if scope and (doc.get("country_scope") or "").lower() not in ("", scope.lower()):
+        return False
+    for key in ("radio", "city", "date"):
+        value = filters.get(key)
+        if value and (doc.get(key) or "") != value:
+            return False
+    return True
+
+
+def filter_selectivity(filters: Optional[dict], docmeta: Optional[dict]) -> float:
+    """Share of documents selected by the document filters (1.0 if unknown)."""
+    if not filters or not docmeta:
+        return 1.0
+    matched = sum(1 for doc in docmeta.values() if _doc_matches(doc, filters))
+    return matched / len(docmeta)
+
+
+def estimate_query_cost(cql: str, filters: Optional[dict] = None, docmeta: Optional[dict] = None) -> QueryCost:
+    """Score a query and pick its lane (see module docstring)."""
+    reasons: list[str] = []
+    score = pattern_cost(cql, reasons) * max(MIN_SELECTIVITY, filter_selectivity(filters, docmeta))
+    if score >= _env_float("QUERY_COST_REFUSE", 1000.0):
+        lane = REFUSED
+    elif score >= _env_float("QUERY_COST_SLOW", 50.0):
+        lane = SLOW
+    else:
+        lane = CHEAP
+    return QueryCost(score=round(score, 2), lane=lane, reasons=reasons)
+
+
+# ---------------------------------------------------------------------------
+# Admission
+# ---------------------------------------------------------------------------
+
+
+class _LaneStats:
+    def __init__(self) -> None:
+        self.wait = LatencyHistogram()
+        self.run = LatencyHistogram()
+        self.rejected = 0
+
+
+_STATS = {CHEAP: _LaneStats(), SLOW: _LaneStats(), REFUSED: _LaneStats()}
+_STATS_LOCK = threading.Lock()
+_SLOW_LANE: Optional[threading.BoundedSemaphore] = None
+_SLOW_LANE_LOCK = threading.Lock()
+
+
+def _slow_lane() -> threading.BoundedSemaphore:
+    global _SLOW_LANE
+    with _SLOW_LANE_LOCK:
+        if _SLOW_LANE is None:
+            slots = max(1, int(_env_float("QUERY_SLOW_LANE_SLOTS", 1)))
+            _SLOW_LANE = threading.BoundedSemaphore(slots)
+        return _SLOW_LANE
+
+
+@contextmanager
+def query_lane(cost: QueryCost) -> Iterator[QueryCost]:
+    """
+    Run the enclosed BlackLab calls in the lane of ``cost``.
+
+    Raises:
+        QueryTooExpensive: For refused queries.
+        SlowLaneBusy: If no slow-lane slot frees up within QUERY_SLOW_LANE_WAIT.
+    """
+    stats = _STATS[cost.lane]
+    if cost.lane == REFUSED:
+        with _STATS_LOCK:
+            stats.rejected += 1
+        logger.info("Query refused (cost %.0f): %s", cost.score, "; ".join(cost.reasons))
+        raise QueryTooExpensive(TOO_EXPENSIVE_MESSAGE)
+
+    lane = _slow_lane() if cost.lane == SLOW else None
+    started = time.monotonic()
+    if lane is not None:
+        wait = _env_float("QUERY_SLOW_LANE_WAIT", 15.0)
+        if not lane.acquire(timeout=wait):
+            with _STATS_LOCK:
+                stats.rejected += 1
+            raise SlowLaneBusy(SLOW_LANE_BUSY_MESSAGE, retry_after=max(1, int(wait)))
+    admitted = time.monotonic()
+    try:
+        if lane is None:
+            yield cost
+        else:
+            with slow_calls(_env_float("QUERY_SLOW_TIMEOUT", 90.0)):
+                yield cost
+    finally:
+        finished = time.monotonic()
+        if lane is not None:
+            lane.release()
+        with _STATS_LOCK:
+            stats.wait.observe((admitted - started) * 1000.0)
+            stats.run.observe((finished - admitted) * 1000.0)
+
+
+def snapshot() -> dict[str, Any]:
+    with _STATS_LOCK:
+        return {
+            lane: {
+                "wait": stats.wait.snapshot(),
+                "run": stats.run.snapshot(),
+                "rejected": stats.rejected,
+            }
+            for lane, stats in _STATS.items()
+        }
+
+
+def reset() -> None:
+    """Drop lane state and metrics (tests, or after reconfiguring)."""
+    global _SLOW_LANE
+    with _SLOW_LANE_LOCK:
+        _SLOW_LANE = None
+    with _STATS_LOCK:
+        for lane in _STATS:
+            _STATS[lane] = _LaneStats()
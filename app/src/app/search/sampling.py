@@ -0,0 +1,119 @@
+"""
+Sampling mode for very frequent queries.
+
+Frequent items (``[pos="DET"]``) have millions of hits, but the distribution
+by country, sex or mode is usually what is wanted. With ``sample`` (percentage
+of hits) or ``samplenum`` (number of hits) in the request, BlackLab draws a
+random sample (``sample`` / ``samplenum`` / ``sampleseed``) and counts and
+groups are computed on the sample only.
+
+The seed makes a sample reproducible: ``sampleseed`` from the request, or
+derived from the query (pattern + document filter), so the result table and
+the statistics of one search see the same sample. Responses carry a
+``sample`` block (mode, seed, sample size, estimated total) and group rows
+get a 95 % Wilson interval for their share (``p_low`` / ``p_high``).
+
+With country shards (``BLS_SHARDS``) every shard is sampled: a percentage
+stays exact, ``samplenum`` is split across the shards in proportion to their
+(unsampled) totals (:func:`split_samplenum`), so the merged sample has the
+requested size and the same composition as a sample of one corpus.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Optional
+
+from .cql_canonical import query_cache_key
+
+Z_95 = 1.96
+MAX_SAMPLE_NUM = 50000
+
+
+def _number(value: Any, cast) -> Optional[Any]:
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sampling_params(req_args: Any, patt: str = "", filter_query: str = "") -> dict:
+    """
+    BlackLab sampling parameters for a request, or {} (no or invalid sampling).
+
+    ``sample`` wins over ``samplenum``; a percentage of 100 or more means no
+    sampling.
+    """
+    percentage = _number(req_args.get("sample"), float)
+    number = _number(req_args.get("samplenum"), int)
+    if percentage is not None and 0 < percentage < 100:
+        params: dict[str, Any] = {"sample": f"{percentage:g}"}
+    elif number is not None and number > 0:
+        params = {"samplenum": min(number, MAX_SAMPLE_NUM)}
+    else:
+        return {}
+    seed = _number(req_args.get("sampleseed"), int)
+    if seed is None:
+        seed = int(query_cache_key(patt, filter_query)[:8], 16)
+    params["sampleseed"] = seed
+    return params
+
+
+def split_samplenum(number: int, totals: list[int]) -> list[int]:
+    """
+    Shares of a ``samplenum`` sample for parts with ``totals`` hits, in
+    proportion to the totals (largest remainder; sums to ``number`` unless
+    there are fewer hits).
+    """
+    available = sum(totals)
+    if available <= number:
+        return list(totals)
+    exact = [number * total / available for total in totals]
+    shares = [int(value) for value in exact]
+    by_remainder = sorted(range(len(totals)), key=lambda i: (shares[i] - exact[i], i))
+    for i in by_remainder[: number - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+def wilson_interval(k: int, n: int, z: float = Z_95) -> tuple[float, float]:
+    """Confidence interval for the share ``k / n``."""
+    if n <= 0:
+        return 0.0, 0.0
+    p = k / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def sample_info(params: dict, sample_size: int) -> dict:
+    """Response block describing the sample drawn with ``params``."""
+    info: dict[str, Any] = {
+        "seed": params.get("sampleseed"),
+        "size": sample_size,
+        "confidence": 0.95,
+        "estimated_total": None,
+        "estimated_total_ci": None,
+    }
+    if "sample" in params:
+        fraction = float(params["sample"]) / 100
+        info.update({"mode": "percentage", "percentage": float(params["sample"])})
+        # The sample size is Binomial(N, fraction): N ~ size / fraction
+        estimate = sample_size / fraction
+        margin = Z_95 * math.sqrt(max(estimate, 1) * (1 - fraction) / fraction)
+        info["estimated_total"] = round(estimate)
+        info["estimated_total_ci"] = [max(sample_size, round(estimate - margin)), round(estimate + margin)]
+    else:
+        info.update({"mode": "number", "number": params.get("samplenum")})
+    return info
+
+
+def with_confidence(rows: list[dict], sample_size: int) -> list[dict]:
+    """Add share and Wilson interval to ``{"key", "n"}`` group rows."""
+    annotated = []
+    for row in rows:
+        low, high = wilson_interval(int(row.get("n", 0)), sample_size)
+        share = row.get("n", 0) / sample_size if sample_size else 0.0
+        annotated.append({**row, "p": round(share, 4), "p_low": round(low, 4), "p_high": round(high, 4)})
+    return annotated
@@ -0,0 +1,334 @@
+"""
+Country-sharded BlackLab deployment: one index per country group.
+
+Configuration (environment, like ``BLS_CORPUS``):
+    BLS_SHARDS: ``corpus=CODE,CODE;corpus=CODE;...``
+        - Example: ``corapan_arg=ARG,URY;corapan_esp=ESP;corapan_rest=*``
+        - A code also covers its regional codes (``ARG`` -> ``ARG-CBA``).
+        - ``*`` marks the shard for every code not listed elsewhere.
+        - Unset or empty: no sharding, all requests go to ``BLS_CORPUS``.
+
+A query is sent only to the shards holding the selected countries (all
+shards if no country is selected). Shard requests run in parallel and the
+results are combined as if they came from one corpus:
+
+    - totals (hits, docs) are summed
+    - hits: without ``sort`` the shards are concatenated in configuration
+      order and only the needed window is fetched from each shard; with
+      ``sort`` every shard returns its first ``first + number`` hits in that
+      order and the lists are merge-sorted
+    - groups (``group=...``): every shard returns all of its groups (paged
+      by ``GROUP_PAGE_SIZE``), sizes of identical identities are summed and
+      the ``first``/``number`` window is cut from the merged list
+    - ``samplenum``: split across the shards in proportion to their totals
+      (count probe without sampling first, see ``sampling.split_samplenum``)
+    - ``docPid`` is prefixed with the shard corpus (``corapan_arg:12``) in
+      hits and ``docInfos``, since Lucene document ids repeat across indexes
+
+Shards can be rebuilt independently; a single-country query touches one small
+index and its parameters are passed through unchanged.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import unicodedata
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from ..extensions.bls_resilience import get_resilience
+from ..extensions.bulkheads import get_bulkhead
+from ..extensions.http_client import (
+    BLS_BASE_URL,
+    BlackLabCorpusNotFound,
+    get_corpus_not_found_message,
+    get_http_client,
+)
+from .sampling import split_samplenum
+
+logger = logging.getLogger(__name__)
+
+SHARDS_ENV = "BLS_SHARDS"
+WILDCARD = "*"
+# BlackLab's default maximum page size (parameters.pageSize.max)
+GROUP_PAGE_SIZE = 3000
+
+
+@lru_cache(maxsize=4)
+def _parse_shard_map(raw: str) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    shards = []
+    for entry in raw.split(";"):
+        if not entry.strip():
+            continue
+        corpus, sep, codes = entry.partition("=")
+        if not sep or not corpus.strip():
+            raise ValueError(f"Invalid {SHARDS_ENV} entry: {entry!r}")
+        code_list = tuple(c.strip().upper() for c in codes.split(",") if c.strip())
+        shards.append((corpus.strip(), code_list))
+    return tuple(shards)
+
+
+def shard_map() -> tuple[tuple[str, tuple[str, ...]], ...]:
+    """Configured ``(corpus, codes)`` pairs in configuration order."""
+    return _parse_shard_map(os.environ.get(SHARDS_ENV, "").strip())
+
+
+def shards_enabled() -> bool:
+    return bool(shard_map())
+
+
+def shard_for_code(code: str) -> Optional[str]:
+    """Corpus holding ``code`` (``ARG-CBA`` falls back to ``ARG``, then ``*``)."""
+    code = code.strip().upper()
+    for candidate in (code, code.split("-")[0], WILDCARD):
+        for corpus, codes in shard_map():
+            if candidate in codes:
+                return corpus
+    return None
+
+
+def select_shards(filters: dict) -> Optional[list[str]]:
+    """
+    Corpora a query must be sent to, in configuration order.
+
+    Returns None when sharding is disabled. Countries come from
+    ``country_code`` and ``country_parent_code`` (see ``build_filters``).
+    """
+    shards = shard_map()
+    if not shards:
+        return None
+    codes = list(filters.get("country_code") or []) + list(filters.get("country_parent_code") or [])
+    if not codes:
+        return [corpus for corpus, _ in shards]
+    wanted = {shard_for_code(code) for code in codes}
+    return [corpus for corpus, _ in shards if corpus in wanted]
+
+
+# ---------------------------------------------------------------------------
+# Requests
+# ---------------------------------------------------------------------------
+
+
+def _request(corpus: str, params: dict) -> dict:
+    url = f"{BLS_BASE_URL}/corpora/{corpus}/hits"
+    response = get_resilience().send(
+        get_http_client(),
+        "GET",
+        url,
+        params=params,
+        headers={"Accept": "application/json"},
+    )
+    try:
+        response.raise_for_status()
+    except Exception as exc:
+        corpus_message = get_corpus_not_found_message(response)
+        if corpus_message:
+            raise BlackLabCorpusNotFound(corpus_message) from exc
+        raise
+    return response.json()
+
+
+def _fan_out(requests: list[tuple[str, dict]], fetch=None) -> list[dict]:
+    """Run ``(corpus, params)`` requests in parallel (``search`` bulkhead); results in input order."""
+    fetch = fetch or _request
+    if not requests:
+        return []
+    if len(requests) == 1:
+        with get_bulkhead("search").slot():
+            return [fetch(*requests[0])]
+    return get_bulkhead("search").map(lambda request: fetch(*request), requests)
+
+
+def _all_groups(corpus: str, params: dict) -> dict:
+    """Every group of one shard; a shard's top page alone would drop groups that rank high overall."""
+    page = {**params, "first": 0, "number": GROUP_PAGE_SIZE}
+    data = _request(corpus, page)
+    groups = list(data.get("hitGroups", []) or [])
+    total = int((data.get("summary", {}) or {}).get("numberOfGroups", len(groups)) or 0)
+    while len(groups) < total:
+        more = _request(corpus, {**page, "first": len(groups)}).get("hitGroups", []) or []
+        if not more:
+            break
+        groups.extend(more)
+    return {**data, "hitGroups": groups}
+
+
+def _total_hits(data: dict) -> int:
+    summary = data.get("summary", {}) or {}
+    total = summary.get("numberOfHits")
+    if total is None:
+        total = (summary.get("resultsStats", {}) or {}).get("hits", 0)
+    return int(total or 0)
+
+
+def _shard_params(corpora: list[str], params: dict) -> dict[str, dict]:
+    """
+    Parameters per shard. A ``samplenum`` sample is split across the shards
+    in proportion to their unsampled totals; shards with no share are left out.
+    """
+    number = params.get("samplenum")
+    if number is None or len(corpora) < 2:
+        return {corpus: params for corpus in corpora}
+    unsampled = {k: v for k, v in params.items() if k not in ("samplenum", "sampleseed", "sort", "group")}
+    probe = {**unsampled, "first": 0, "number": 0, "waitfortotal": "true"}
+    totals = [_total_hits(data) for data in _fan_out([(corpus, probe) for corpus in corpora])]
+    shares = split_samplenum(int(number), totals)
+    if not any(shares):
+        return {corpus: params for corpus in corpora}
+    return {corpus: {**params, "samplenum": share} for corpus, share in zip(corpora, shares) if share > 0}
+
+
+def _namespace(corpus: str, data: dict) -> tuple[list[dict], dict]:
+    hits = []
+    for hit in data.get("hits", []) or []:
+        hit = dict(hit)
+        if "docPid" in hit:
+            hit["docPid"] = f"{corpus}:{hit['docPid']}"
+        hits.append(hit)
+    docinfos = {f"{corpus}:{pid}": info for pid, info in (data.get("docInfos", {}) or {}).items()}
+    return hits, docinfos
+
+
+def _merged_summary(results: list[dict], corpora: list[str]) -> dict:
+    summary: dict[str, Any] = {}
+    for data in results:
+        for key, value in (data.get("summary", {}) or {}).items():
+            summary.setdefault(key, value)
+    total = sum(_total_hits(data) for data in results)
+    docs = sum(int((data.get("summary", {}) or {}).get("numberOfDocs", 0) or 0) for data in results)
+    summary["numberOfHits"] = total
+    summary["numberOfDocs"] = docs
+    summary["resultsStats"] = {"hits": total, "docs": docs}
+    summary["shards"] = list(corpora)
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Sorting
+# ---------------------------------------------------------------------------
+
+
+def _sort_properties(sort: str) -> tuple[bool, list[tuple[str, str]]]:
+    """``"-hit:word,field:date"`` -> (descending, [("hit", "word"), ("field", "date")])."""
+    descending = sort.startswith("-")
+    props = []
+    for part in sort.lstrip("-").split(","):
+        kind, _, name = part.strip().partition(":")
+        props.append((kind, name))
+    return descending, props
+
+
+def collation_key(text: str) -> str:
+    """Case- and accent-insensitive key, like BlackLab's default (insensitive) sort."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _sort_value(hit: dict, docinfos: dict, kind: str, name: str) -> str:
+    if kind == "field":
+        info = docinfos.get(hit.get("docPid"), {}) or {}
+        value = (info.get("metadata", info) or {}).get(name, "")
+        if isinstance(value, list):
+            value = value[0] if value else ""
+        return collation_key(str(value))
+    section = {"hit": "match", "left": "left", "right": "right", "before": "left", "after": "right"}.get(kind)
+    if section is None:
+        return ""
+    tokens = list((hit.get(section, {}) or {}).get(name, []) or [])
+    if section == "left":
+        # BlackLab compares the left context from the hit outwards
+        tokens.reverse()
+    return collation_key(" ".join(tokens))
+
+
+def _sort_key(sort: str, docinfos: dict):
+    _, props = _sort_properties(sort)
+    return lambda hit: tuple(_sort_value(hit, docinfos, kind, name) for kind, name in props)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+
+def fetch_hits(corpora: Iterable[str], params: dict) -> dict:
+    """
+    ``/hits`` over several shards; returns one BlackLab-shaped response
+    (``summary``, ``hits``, ``docInfos``) for the requested window.
+    """
+    corpora = list(corpora)
+    if len(corpora) == 1:
+        return _fan_out([(corpora[0], params)])[0]
+    per_shard = _shard_params(corpora, params)
+    corpora = list(per_shard)
+
+    first = int(params.get("first", 0) or 0)
+    number = int(params.get("number", 50) if params.get("number") is not None else 50)
+    sort = params.get("sort")
+
+    if sort:
+        results = _fan_out([(corpus, {**per_shard[corpus], "first": 0, "number": first + number}) for corpus in corpora])
+        docinfos: dict = {}
+        streams = []
+        for corpus, data in zip(corpora, results):
+            hits, infos = _namespace(corpus, data)
+            docinfos.update(infos)
+            streams.append(hits)
+        descending, _ = _sort_properties(sort)
+        merged = heapq.merge(*streams, key=_sort_key(sort, docinfos), reverse=descending)
+        window = list(merged)[first : first + number]
+    else:
+        # Concatenation order: exact totals decide which shards cover the window
+        probe = {"first": 0, "number": 0, "waitfortotal": "true"}
+        counts = _fan_out([(corpus, {**per_shard[corpus], **probe}) for corpus in corpora])
+        requests = []
+        offset = 0
+        for corpus, data in zip(corpora, counts):
+            total = _total_hits(data)
+            lo = max(first, offset)
+            hi = min(first + number, offset + total)
+            if hi > lo:
+                requests.append((corpus, {**per_shard[corpus], "first": lo - offset, "number": hi - lo}))
+            offset += total
+        results = counts
+        window, docinfos = [], {}
+        if requests:
+            for (corpus, _), data in zip(requests, _fan_out(requests)):
+                hits, infos = _namespace(corpus, data)
+                window.extend(hits)
+                docinfos.update(infos)
+
+    used = {hit.get("docPid") for hit in window}
+    return {
+        "summary": _merged_summary(results, corpora),
+        "hits": window,
+        "docInfos": {pid: info for pid, info in docinfos.items() if pid in used},
+    }
+
+
+def fetch_groups(corpora: Iterable[str], params: dict) -> dict:
+    """``/hits?group=...`` over several shards; group sizes are summed per identity."""
+    corpora = list(corpora)
+    if len(corpora) == 1:
+        return _fan_out([(corpora[0], params)])[0]
+    per_shard = _shard_params(corpora, params)
+    corpora = list(per_shard)
+
+    results = _fan_out([(corpus, per_shard[corpus]) for corpus in corpora], fetch=_all_groups)
+    sizes: dict[str, int] = {}
+    for data in results:
+        for group in data.get("hitGroups", []) or []:
+            identity = str(group.get("identity", ""))
+            sizes[identity] = sizes.get(identity, 0) + int(group.get("size", 0) or 0)
+    groups = [{"identity": identity, "size": size} for identity, size in sizes.items()]
+    groups.sort(key=lambda g: (-g["size"], g["identity"]))
+    summary = _merged_summary(results, corpora)
+    summary["numberOfGroups"] = len(groups)
+    first = int(params.get("first", 0) or 0)
+    if params.get("number") is not None:
+        groups = groups[first : first + int(params["number"])]
+    else:
+        groups = groups[first:]
+    return {"summary": summary, "hitGroups": groups}
@@ -0,0 +1,125 @@
+"""
+Streaming of complete hit sets as NDJSON / JSON Lines.
+
+``GET /search/advanced/stream`` (see ``advanced_api``) is meant for scripts
+that want every hit of a query with full metadata, without paging through
+``/data`` envelopes or parsing the CSV export:
+
+    - one canonical hit (the row format of ``/data``) per line, plus its
+      ``offset`` in the unsorted hit list
+    - hits are fetched from BlackLab in windows of ``STREAM_WINDOW`` hits;
+      while one window is written, the next one is already being fetched on
+      the ``stream`` bulkhead, so at most two windows are held in memory
+    - ``offset=<n>`` resumes a stream: hits are in index order, which is
+      stable for one index build
+    - with ``Accept-Encoding: gzip`` the body is gzip-compressed, flushed
+      after every window
+    - an interrupted stream (BlackLab error, ``STREAM_MAX_SECONDS``) ends
+      with ``{"error": ..., "resume_offset": n}``
+
+A stream occupies a sync gunicorn worker for its whole duration (the
+Dockerfile runs 2 workers with ``--timeout 120``), and a worker busy for
+longer than the timeout is killed mid-body. The duration is therefore
+capped below ``GUNICORN_TIMEOUT``, leaving one BlackLab read timeout
+(``BLS_TIMEOUT_MAX``) for the window in flight when the limit is checked;
+clients continue with ``resume_offset``. The ``export`` bulkhead (2:2) is
+per process, so it does not stop two streams or exports, one per worker,
+from blocking every worker for that time.
+
+Configuration (environment):
+    STREAM_WINDOW        Hits per BlackLab request (default 1000)
+    STREAM_MAX_HITS      Max. hits per stream request (default 1000000)
+    STREAM_MAX_SECONDS   Max. duration of one stream request (default and
+                         upper bound: GUNICORN_TIMEOUT - BLS_TIMEOUT_MAX,
+                         90 s with the defaults)
+    GUNICORN_TIMEOUT     Worker timeout the app runs under (default 120,
+                         keep in sync with ``--timeout``)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from concurrent.futures import Future
+from typing import Callable, Iterable, Iterator
+
+GZIP_LEVEL = 6
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def window_size() -> int:
+    return max(1, int(_env_float("STREAM_WINDOW", 1000)))
+
+
+def max_hits() -> int:
+    return max(1, int(_env_float("STREAM_MAX_HITS", 1_000_000)))
+
+
+def max_seconds() -> float:
+    """Stream duration limit, below the gunicorn worker timeout."""
+    limit = max(1.0, _env_float("GUNICORN_TIMEOUT", 120.0) - _env_float("BLS_TIMEOUT_MAX", 30.0))
+    return min(_env_float("STREAM_MAX_SECONDS", limit), limit)
+
+
+def iter_windows(
+    fetch: Callable[[int, int], dict],
+    submit: Callable[..., Future],
+    offset: int,
+    limit: int,
+    size: int,
+) -> Iterator[tuple[int, dict]]:
+    """
+    ``(first, data)`` for consecutive windows of ``fetch(first, number)`` from
+    ``offset`` until ``limit`` hits or a short window. Each window is
+    requested through ``submit`` before the previous one is handed out.
+    """
+    end = offset + limit
+    first = offset
+    pending = submit(fetch, first, min(size, end - first)) if limit > 0 else None
+    try:
+        while pending is not None:
+            number = min(size, end - first)
+            data = pending.result()
+            pending = None
+            received = len(data.get("hits", []) or [])
+            following = first + received
+            if received >= number and following < end:
+                pending = submit(fetch, following, min(size, end - following))
+            yield first, data
+            first = following
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def ndjson_lines(first: int, rows: Iterable[dict]) -> str:
+    """One JSON object per line, each with its ``offset`` in the hit list."""
+    return "".join(json.dumps({"offset": first + i, **row}, ensure_ascii=False, separators=(",", ":")) + "\n" for i, row in enumerate(rows))
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """gzip stream of ``chunks``, flushed after each chunk so clients can read along."""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Client disconnect: close the source stream (frees its windows and slot)
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def error_line(error: dict, resume_offset: int) -> str:
+    """Last line of an interrupted stream: ``error``, ``message`` and where to resume."""
+    return json.dumps({**error, "resume_offset": resume_offset}, ensure_ascii=False) + "\n"
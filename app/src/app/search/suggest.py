@@ -0,0 +1,43 @@
+"""
+Term suggestions for the search forms: ``GET /search/suggest``.
+
+Served from the term dictionaries of the index export (see
+:mod:`.vocabulary`); BlackLab is not contacted.
+
+Query parameters:
+    q           prefix (case- and accent-insensitive)
+    annotation  word | lemma | norm (default: word)
+    limit       number of suggestions (default 10, max 50)
+"""
+
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from ..extensions import limiter
+from .vocabulary import ANNOTATIONS, MAX_SUGGESTIONS, get_vocabulary
+
+bp = Blueprint("search_suggest", __name__, url_prefix="/search")
+
+
+@bp.route("/suggest", methods=["GET"])
+@limiter.limit("120 per minute")
+def suggest():
+    annotation = request.args.get("annotation", "word").strip()
+    if annotation not in ANNOTATIONS:
+        return jsonify({"error": "invalid_annotation", "message": f"annotation must be one of {', '.join(ANNOTATIONS)}"}), 400
+    prefix = request.args.get("q", "").strip()
+    limit = request.args.get("limit", 10, type=int) or 10
+
+    vocabulary = get_vocabulary(annotation)
+    suggestions = vocabulary.suggest(prefix, min(limit, MAX_SUGGESTIONS)) if vocabulary is not None else []
+    response = jsonify(
+        {
+            "q": prefix,
+            "annotation": annotation,
+            "available": vocabulary is not None,
+            "suggestions": suggestions,
+        }
+    )
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
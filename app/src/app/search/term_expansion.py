@@ -0,0 +1,228 @@
+"""
+Expansion of infix and suffix regexes into term alternations.
+
+``[norm=".*cion.*"]`` or ``[word=".*mente"]`` have no literal prefix, so
+BlackLab has to run the regex against every term of the annotation. The term
+dictionary of the index export already knows which terms match: with its
+trigram index (``<annotation>.ngrams.tsv``, written next to the dictionary by
+``src/scripts/blacklab_index_creation.py``) the candidates are the
+intersection of the posting lists of the literal's trigrams, and each
+candidate is verified against the literal. The regex is then replaced by an
+explicit alternation, ``[norm="(accion|cancion|...)"]``, which BlackLab
+resolves with one term lookup per alternative.
+
+Rewritten constraints (``=`` and ``!=`` on word, lemma, norm and bare
+strings):
+
+    ".*lit.*"   terms containing ``lit``
+    ".*lit"     terms ending with ``lit``
+
+``lit`` must be a plain literal of at least ``NGRAM_SIZE`` characters.
+Matching follows the annotation's sensitivity in the BLF configs: ``word``
+and ``lemma`` are case-sensitive, ``norm`` is case- and accent-insensitive.
+
+The regex is kept (fallback) when the expansion has more than
+``TERM_EXPANSION_LIMIT`` terms, when nothing matches (the dictionary may be
+older than the index) or when there is no n-gram index for the annotation.
+``TERM_EXPANSION_LIMIT=0`` disables the expansion.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+from ..runtime_paths import get_vocabulary_dir
+from .cql_canonical import And, Constraint, CQLParseError, Node, Not, Or, parse_token_expression, quote, split_outer, unquote
+from .shards import collation_key
+from .vocabulary import Vocabulary, get_vocabulary
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+# BlackLab's main annotation (bare strings)
+DEFAULT_ANNOTATION = "word"
+SENSITIVE = {"word": True, "lemma": True, "norm": False}
+
+_LITERAL = r"[^.^$*+?()\[\]{}|\\\"]+"
+_EXPANDABLE_RE = re.compile(rf"^\.\*({_LITERAL})(\.\*)?$")
+# Characters with a meaning in BlackLab (Lucene) regexes
+_LUCENE_META_RE = re.compile(r'([.?+*|{}\[\]()"\\#@&<>~^$])')
+
+
+def expansion_limit() -> int:
+    try:
+        return max(0, int(os.environ.get("TERM_EXPANSION_LIMIT", 200)))
+    except (TypeError, ValueError):
+        return 200
+
+
+class NgramIndex:
+    """Trigram posting lists over the folded terms of one :class:`Vocabulary`."""
+
+    def __init__(self, vocabulary: Vocabulary, postings: dict[str, str], n: int = NGRAM_SIZE) -> None:
+        self.vocabulary = vocabulary
+        self.n = n
+        # Posting lists stay delta-encoded strings until a query needs them
+        self._raw = postings
+        self._decoded: dict[str, list[int]] = {}
+
+    @classmethod
+    def load(cls, path, vocabulary: Vocabulary) -> Optional["NgramIndex"]:
+        with open(path, encoding="utf-8") as f:
+            header = f.readline().rstrip("\n").split("\t")
+            if len(header) != 3 or header[0] != "#terms" or int(header[1]) != len(vocabulary):
+                logger.warning("N-gram index %s does not match its term dictionary", path)
+                return None
+            postings = {}
+            for line in f:
+                gram, _, ids = line.rstrip("\n").partition("\t")
+                postings[gram] = ids
+        return cls(vocabulary, postings, int(header[2]))
+
+    def postings(self, gram: str) -> list[int]:
+        decoded = self._decoded.get(gram)
+        if decoded is None:
+            decoded, term_id = [], 0
+            for delta in filter(None, self._raw.get(gram, "").split(",")):
+                term_id += int(delta)
+                decoded.append(term_id)
+            if len(self._decoded) > 4096:
+                self._decoded.clear()
+            self._decoded[gram] = decoded
+        return decoded
+
+    def candidates(self, folded: str) -> Optional[list[int]]:
+        """Ids of the terms that contain all n-grams of ``folded`` (None: literal too short)."""
+        if len(folded) < self.n:
+            return None
+        grams = {folded[i : i + self.n] for i in range(len(folded) - self.n + 1)}
+        lists = sorted((self.postings(gram) for gram in grams), key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+            if not result:
+                break
+        return sorted(result)
+
+    def matching_terms(self, literal: str, suffix: bool, sensitive: bool, limit: int) -> Optional[list[str]]:
+        """Terms containing (``suffix``: ending with) ``literal``; None if more than ``limit``."""
+        candidates = self.candidates(collation_key(literal))
+        if candidates is None:
+            return None
+        terms = self.vocabulary.terms
+        keys = self.vocabulary.keys
+        needle = literal if sensitive else collation_key(literal)
+        matches = []
+        for term_id in candidates:
+            value = terms[term_id] if sensitive else keys[term_id]
+            if value.endswith(needle) if suffix else needle in value:
+                matches.append(terms[term_id])
+                if len(matches) > limit:
+                    return None
+        return matches
+
+
+_CACHE: dict[str, tuple[float, Vocabulary, Optional[NgramIndex]]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_ngram_index(annotation: str) -> Optional[NgramIndex]:
+    """N-gram index of ``annotation`` (reloaded with its dictionary), or None."""
+    vocabulary = get_vocabulary(annotation)
+    if vocabulary is None:
+        return None
+    path = get_vocabulary_dir() / f"{annotation}.ngrams.tsv"
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    cached = _CACHE.get(annotation)
+    if cached is not None and cached[0] == mtime and cached[1] is vocabulary:
+        return cached[2]
+    with _CACHE_LOCK:
+        try:
+            index = NgramIndex.load(path, vocabulary)
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not load n-gram index %s: %s", path, exc)
+            index = None
+        _CACHE[annotation] = (mtime, vocabulary, index)
+        return index
+
+
+def reset_ngram_indexes() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def _alternation(terms: list[str]) -> str:
+    escaped = sorted({_LUCENE_META_RE.sub(r"\\\1", term) for term in terms})
+    return escaped[0] if len(escaped) == 1 else f"({'|'.join(escaped)})"
+
+
+def expand_value(annotation: str, value: str) -> Optional[str]:
+    """Alternation replacing the regex ``value`` of ``annotation``, or None (keep the regex)."""
+    limit = expansion_limit()
+    match = _EXPANDABLE_RE.match(value)
+    if not limit or not match or annotation not in SENSITIVE:
+        return None
+    index = get_ngram_index(annotation)
+    if index is None:
+        return None
+    terms = index.matching_terms(match.group(1), suffix=match.group(2) is None, sensitive=SENSITIVE[annotation], limit=limit)
+    if not terms:
+        return None
+    return _alternation(terms)
+
+
+def _expand_node(node: Optional[Node]) -> Optional[Node]:
+    if isinstance(node, Constraint):
+        expanded = expand_value(node.name or DEFAULT_ANNOTATION, node.value)
+        return node if expanded is None else Constraint(node.name, node.op, expanded)
+    if isinstance(node, Not):
+        return Not(_expand_node(node.child))
+    if isinstance(node, (And, Or)):
+        return type(node)(tuple(_expand_node(child) for child in node.children))
+    return node
+
+
+def expand_cql(cql: str) -> str:
+    """
+    ``cql`` with expandable infix/suffix regexes replaced by term alternations.
+
+    Tokens that cannot be parsed and everything outside token brackets are
+    kept verbatim; without expandable constraints ``cql`` is returned as is.
+    """
+    if not cql or ".*" not in cql or not expansion_limit():
+        return cql
+    out = []
+    changed = False
+    for kind, text in split_outer(cql):
+        if kind == "token":
+            try:
+                node = parse_token_expression(text)
+            except CQLParseError:
+                out.append(f"[{text}]")
+                continue
+            expanded = _expand_node(node)
+            if expanded != node:
+                changed = True
+                out.append(f"[{expanded.render()}]")
+            else:
+                out.append(f"[{text}]")
+        elif kind == "string":
+            value = unquote(text)
+            expanded_value = expand_value(DEFAULT_ANNOTATION, value)
+            if expanded_value is None:
+                out.append(text)
+            else:
+                changed = True
+                out.append(quote(expanded_value))
+        else:
+            out.append(text)
+    if changed:
+        logger.debug("Expanded regex terms: %s", "".join(out))
+    return "".join(out) if changed else cql
@@ -0,0 +1,152 @@
+"""
+Term dictionaries for word, lemma and norm suggestions.
+
+The index export (``src/scripts/blacklab_index_creation.py``) writes one
+dictionary per annotation to ``<docmeta dir>/vocabulary/<annotation>.tsv``
+(``term<TAB>frequency``, sorted by folded term). Here each dictionary is
+loaded once into three parallel arrays sorted by the case- and
+accent-insensitive key (:func:`shards.collation_key`):
+
+    keys    folded terms  ("arbol", "arbol", "arboleda", ...)
+    terms   original terms ("árbol", "Árbol", "arboleda", ...)
+    freqs   corpus frequencies
+
+A prefix is a contiguous range of ``keys`` (two bisections). The top-k terms
+of the range by frequency come from a heap; for one- and two-letter prefixes,
+whose ranges cover large parts of the dictionary, the top
+``MAX_SUGGESTIONS`` are precomputed at load time. A lookup never contacts
+BlackLab and takes well under a millisecond.
+
+The same dictionaries provide corpus frequencies (:meth:`Vocabulary.frequency`,
+:attr:`Vocabulary.total`) for collocation measures and the term lists for
+regex expansion (:mod:`.term_expansion`).
+
+Dictionaries are reloaded when the file changes (new export); a missing
+file means no suggestions for that annotation.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Optional
+
+from ..runtime_paths import get_vocabulary_dir
+from .shards import collation_key
+
+logger = logging.getLogger(__name__)
+
+ANNOTATIONS = ("word", "lemma", "norm")
+MAX_SUGGESTIONS = 50
+# Prefixes up to this length get precomputed top lists
+PRECOMPUTED_PREFIX = 2
+
+
+class Vocabulary:
+    """Sorted term dictionary of one annotation."""
+
+    def __init__(self, entries: list[tuple[str, int]]) -> None:
+        folded = sorted(((collation_key(term), term, freq) for term, freq in entries), key=lambda e: (e[0], e[1]))
+        self.keys = [key for key, _, _ in folded]
+        self.terms = [term for _, term, _ in folded]
+        self.freqs = [freq for _, _, freq in folded]
+        self._top: dict[str, list[int]] = {}
+        self._total: Optional[int] = None
+        self._precompute()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def total(self) -> int:
+        """Corpus size in tokens (sum of all frequencies)."""
+        if self._total is None:
+            self._total = sum(self.freqs)
+        return self._total
+
+    def frequency(self, term: str) -> int:
+        """Corpus frequency of ``term``, case- and accent-insensitive."""
+        key = collation_key(term)
+        lo = bisect_left(self.keys, key)
+        return sum(self.freqs[lo : bisect_right(self.keys, key, lo)])
+
+    @classmethod
+    def load(cls, path: Path) -> "Vocabulary":
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                term, _, freq = line.rstrip("\n").rpartition("\t")
+                if term:
+                    entries.append((term, int(freq)))
+        return cls(entries)
+
+    def _precompute(self) -> None:
+        heaps: dict[str, list[tuple[int, int]]] = {}
+        for i, key in enumerate(self.keys):
+            for length in range(1, min(PRECOMPUTED_PREFIX, len(key)) + 1):
+                heap = heaps.setdefault(key[:length], [])
+                item = (self.freqs[i], -i)
+                if len(heap) < MAX_SUGGESTIONS:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        self._top = {prefix: [-i for _, i in sorted(heap, reverse=True)] for prefix, heap in heaps.items()}
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """Index range ``[lo, hi)`` of the terms whose folded form starts with ``prefix``."""
+        key = collation_key(prefix)
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\U0010ffff", lo)
+        return lo, hi
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """The ``limit`` most frequent terms starting with ``prefix`` (case/accent-insensitive)."""
+        key = collation_key(prefix)
+        limit = max(0, min(limit, MAX_SUGGESTIONS))
+        if not key or not limit:
+            return []
+        if len(key) <= PRECOMPUTED_PREFIX:
+            indexes = self._top.get(key, [])[:limit]
+        else:
+            lo, hi = self.prefix_range(key)
+            indexes = heapq.nsmallest(limit, range(lo, hi), key=lambda i: (-self.freqs[i], i))
+        return [{"term": self.terms[i], "freq": self.freqs[i]} for i in indexes]
+
+
+_CACHE: dict[str, tuple[float, Optional[Vocabulary]]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_vocabulary(annotation: str) -> Optional[Vocabulary]:
+    """Dictionary of ``annotation`` (reloaded when the export changes it), or None."""
+    if annotation not in ANNOTATIONS:
+        raise ValueError(f"No term dictionary for annotation {annotation!r}")
+    path = get_vocabulary_dir() / f"{annotation}.tsv"
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    cached = _CACHE.get(annotation)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _CACHE_LOCK:
+        cached = _CACHE.get(annotation)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            vocabulary: Optional[Vocabulary] = Vocabulary.load(path)
+            logger.info("Loaded %s term dictionary: %d terms", annotation, len(vocabulary))
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not load term dictionary %s: %s", path, exc)
+            vocabulary = None
+        _CACHE[annotation] = (mtime, vocabulary)
+        return vocabulary
+
+
+def reset_vocabularies() -> None:
+    """Forget loaded dictionaries (tests, or after moving the export)."""
+    with _CACHE_LOCK:
+        _CACHE.clear()
@@ -8,6 +8,7 @@ import os
 import shutil
 import subprocess
 import time
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
@@ -31,6 +32,56 @@ logger = logging.getLogger(__name__)
 class AudioProcessingDependencyError(RuntimeError):
     """Raised when snippet generation cannot access an ffmpeg backend."""
 
+
+@dataclass(frozen=True)
+class SnippetFormat:
+    """Output encoding for snippets (file suffix doubles as cache key)."""
+
+    name: str
+    suffix: str
+    mimetype: str
+    encoder: str
+    codec_args: Tuple[str, ...]
+
+
+FORMAT_MP3 = "mp3"
+FORMAT_OPUS = "opus"
+
+SNIPPET_FORMATS = {
+    FORMAT_MP3: SnippetFormat(
+        name=FORMAT_MP3,
+        suffix=".mp3",
+        mimetype="audio/mpeg",
+        encoder="libmp3lame",
+        codec_args=("-acodec", "libmp3lame", "-q:a", "4"),
+    ),
+    # Speech-grade Opus: mono, 24 kbps, roughly a quarter of the MP3 size
+    FORMAT_OPUS: SnippetFormat(
+        name=FORMAT_OPUS,
+        suffix=".webm",
+        mimetype="audio/webm",
+        encoder="libopus",
+        codec_args=(
+            "-acodec",
+            "libopus",
+            "-b:a",
+            "24k",
+            "-ac",
+            "1",
+            "-application",
+            "voip",
+            "-f",
+            "webm",
+        ),
+    ),
+}
+_FORMAT_ALIASES = {
+    "mp3": FORMAT_MP3,
+    "mpeg": FORMAT_MP3,
+    "opus": FORMAT_OPUS,
+    "webm": FORMAT_OPUS,
+}
+
 # Split-file mapping from old webapp: 4-minute chunks with 30s overlap
 SPLIT_TIMES = {
     "_01": (0.0, 240.0),
@@ -98,6 +149,7 @@ def _cache_filename(
     end: float,
     token_id: str | None = None,
     snippet_type: str | None = None,
+    snippet_format: str = FORMAT_MP3,
 ) -> str:
     """
     Generate cache filename with token_id-based naming.
@@ -105,7 +157,24 @@ def _cache_filename(
     Format:
     - Palabra/Resultado (type='pal'): corapan_{token_id}.mp3
     - Contexto (type='ctx'): corapan_{token_id}_contexto.mp3
+
+    Non-MP3 formats swap the suffix (e.g. corapan_{token_id}_pal.webm), so
+    each encoding is cached separately.
     """
+    name = _base_cache_filename(filename, start, end, token_id, snippet_type)
+    suffix = SNIPPET_FORMATS[snippet_format].suffix
+    if suffix != ".mp3":
+        name = name[: -len(".mp3")] + suffix
+    return name
+
+
+def _base_cache_filename(
+    filename: str,
+    start: float,
+    end: float,
+    token_id: str | None,
+    snippet_type: str | None,
+) -> str:
     if token_id and snippet_type:
         # Build filename based on snippet type (use explicit _pal/_ctx suffixes)
         if snippet_type == "ctx":
@@ -139,7 +208,12 @@ def cleanup_old_snippets() -> int:
     current_time = time.time()
     deleted_count = 0
 
-    for snippet_file in temp_dir.glob("*.mp3"):
+    snippet_files = [
+        path
+        for fmt in SNIPPET_FORMATS.values()
+        for path in temp_dir.glob(f"*{fmt.suffix}")
+    ]
+    for snippet_file in snippet_files:
         try:
             file_age = current_time - snippet_file.stat().st_mtime
             if file_age > CLEANUP_THRESHOLD_SECONDS:
@@ -179,6 +253,61 @@ def _resolve_ffmpeg_executable() -> str | None:
     return None
 
 
+@lru_cache(maxsize=8)
+def encoder_available(encoder: str) -> bool:
+    """Whether the resolved ffmpeg build provides ``encoder`` (e.g. libopus)."""
+    ffmpeg_executable = _resolve_ffmpeg_executable()
+    if not ffmpeg_executable:
+        return False
+    try:
+        completed = subprocess.run(
+            [ffmpeg_executable, "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return any(
+        len(parts) > 1 and parts[1] == encoder
+        for parts in (line.split() for line in completed.stdout.splitlines())
+    )
+
+
+def negotiate_format(requested: str | None, accept=None) -> str:
+    """
+    Pick the snippet encoding for a request.
+
+    An explicit ``format`` query value wins; otherwise the Accept header
+    decides (Opus only if ``audio/webm`` is preferred over ``audio/mpeg``).
+    Falls back to MP3 if the ffmpeg build has no Opus encoder.
+
+    Raises:
+        ValueError: If ``requested`` names an unknown format.
+    """
+    if requested:
+        chosen = _FORMAT_ALIASES.get(requested.strip().lower())
+        if chosen is None:
+            raise ValueError(f"Unsupported audio format: {requested}")
+    elif accept is not None:
+        best = accept.best_match(
+            [SNIPPET_FORMATS[FORMAT_MP3].mimetype, SNIPPET_FORMATS[FORMAT_OPUS].mimetype],
+            default=SNIPPET_FORMATS[FORMAT_MP3].mimetype,
+        )
+        chosen = FORMAT_OPUS if best == SNIPPET_FORMATS[FORMAT_OPUS].mimetype else FORMAT_MP3
+    else:
+        chosen = FORMAT_MP3
+
+    if chosen != FORMAT_MP3 and not encoder_available(SNIPPET_FORMATS[chosen].encoder):
+        return FORMAT_MP3
+    return chosen
+
+
+def snippet_mimetype(snippet_format: str) -> str:
+    return SNIPPET_FORMATS[snippet_format].mimetype
+
+
 def _snippet_logger() -> logging.Logger:
     if has_app_context():
         return current_app.logger
@@ -190,6 +319,7 @@ def _extract_snippet_with_ffmpeg(
     target_path: Path,
     start: float,
     end: float,
+    snippet_format: str = FORMAT_MP3,
 ) -> None:
     ffmpeg_executable = _resolve_ffmpeg_executable()
     if not ffmpeg_executable:
@@ -215,10 +345,7 @@ def _extract_snippet_with_ffmpeg(
         "-i",
         str(source_path),
         "-vn",
-        "-acodec",
-        "libmp3lame",
-        "-q:a",
-        "4",
+        *SNIPPET_FORMATS[snippet_format].codec_args,
         str(target_path),
     ]
     completed = subprocess.run(command, capture_output=True, text=True, check=False)
@@ -233,10 +360,14 @@ def build_snippet(
     end: float,
     token_id: str | None = None,
     snippet_type: str | None = None,
+    snippet_format: str = FORMAT_MP3,
 ) -> Path:
     """
     Create (or reuse) an audio snippet for the given window.
 
+    ``snippet_format`` selects the encoding (see SNIPPET_FORMATS); each format
+    has its own cache file.
+
     Performance optimization: Tries to use pre-split files first (4-minute chunks),
     falls back to full audio file if no suitable split is found.
 
@@ -254,7 +385,12 @@ def build_snippet(
     if random.random() < 0.1:
         cleanup_old_snippets()
 
-    cache_name = _cache_filename(filename, start, end, token_id, snippet_type)
+    if snippet_format not in SNIPPET_FORMATS:
+        raise ValueError(f"Unsupported audio format: {snippet_format}")
+
+    cache_name = _cache_filename(
+        filename, start, end, token_id, snippet_type, snippet_format
+    )
     target_path = (temp_dir / cache_name).resolve()
 
     # Return cached snippet if it exists
@@ -287,8 +423,9 @@ def build_snippet(
         source_kind = "full"
 
     active_logger.debug(
-        "Audio snippet build: filename=%s source_kind=%s source_path=%s start=%s end=%s local_start=%s local_end=%s target_path=%s ffmpeg=%s",
+        "Audio snippet build: filename=%s format=%s source_kind=%s source_path=%s start=%s end=%s local_start=%s local_end=%s target_path=%s ffmpeg=%s",
         filename,
+        snippet_format,
         source_kind,
         source_path,
         start,
@@ -299,7 +436,9 @@ def build_snippet(
         _resolve_ffmpeg_executable(),
     )
 
-    _extract_snippet_with_ffmpeg(source_path, target_path, local_start, local_end)
+    _extract_snippet_with_ffmpeg(
+        source_path, target_path, local_start, local_end, snippet_format
+    )
 
     if not target_path.exists() or target_path.stat().st_size == 0:
         raise RuntimeError(f"Audio snippet export produced no output for {filename}")
@@ -20,6 +20,9 @@ from ..extensions.http_client import (
     warn_if_configured_corpus_missing,
 )
 from ..search.cql import build_cql_with_speaker_filter, build_filters
+from ..search.cql_canonical import canonicalize_cql
+from ..search.shards import fetch_hits, select_shards
+from ..search.term_expansion import expand_cql
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +51,9 @@ def _build_simple_cql(query: str, search_mode: str, sensitive: int) -> str:
     """Build a CQL string for a simple one-line query.
 
     This matches legacy behaviour:
-    - `text` -> contains, using `word` or `norm` (regex `.*value.*`)
+    - `text` -> exact token, using `word` or `norm`
+    - `contains` -> contains, using `word` or `norm` (regex `.*value.*`,
+      expanded to a term alternation by `term_expansion.expand_cql`)
     - `text_exact` -> exact, `word="value"`
     - `lemma_exact` / `lemma` -> use `lemma="value"` (exact match)
     """
@@ -62,10 +67,12 @@ def _build_simple_cql(query: str, search_mode: str, sensitive: int) -> str:
     for token in tokens:
         # Use regex for contains (text), equality for exact/lemma
         if search_mode == "text":
-            # Simple text mode: default to exact token match (not regex)
-            # TODO: Implement 'contains' semantics using regex or a suitable CQL operator
+            # Simple text mode: exact token match (not regex)
             field = "word" if sensitive == 1 else "norm"
             val = escape_cql(token)
+        elif search_mode == "contains":
+            field = "word" if sensitive == 1 else "norm"
+            val = f".*{escape_cql(token)}.*"
         elif search_mode == "text_exact":
             field = "word"
             val = escape_cql(token)
@@ -78,7 +85,7 @@ def _build_simple_cql(query: str, search_mode: str, sensitive: int) -> str:
             val = f".*{escape_cql(token)}.*"
 
         parts.append(f'[{field}="{val}"]')
-    return " ".join(parts)
+    return canonicalize_cql(expand_cql(" ".join(parts)))
 
 
 def build_sentence_context(hit: dict[str, Any]) -> dict[str, Any] | None:
@@ -465,7 +472,7 @@ def search_blacklab(params: Any) -> dict[str, Any]:
         {"q": query, "mode": mode, "sensitive": sensitive}, filter_params
     )
     if merged:
-        cql = merged
+        cql = expand_cql(merged)
 
     # Use 'corpora' path segment for BlackLab v5 API via proxy
     bls_url = f"{request.url_root}bls{build_bls_corpus_path('hits')}"
@@ -486,9 +493,14 @@ def search_blacklab(params: Any) -> dict[str, Any]:
     # Not needed: blacklab filter doc-level maybe included in CQL
 
     try:
-        response = http.get(bls_url, params=bls_params)
-        response.raise_for_status()
-        data = response.json()
+        shards = select_shards(filter_params)
+        if shards is not None:
+            # Country shards: direct parallel fan-out instead of the /bls proxy
+            data = fetch_hits(shards, bls_params)
+        else:
+            response = http.get(bls_url, params=bls_params)
+            response.raise_for_status()
+            data = response.json()
     except httpx.HTTPStatusError as e:
         corpus_message = get_corpus_not_found_message(e.response)
         if corpus_message:
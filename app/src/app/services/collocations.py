@@ -1,104 +1,551 @@
 """
-Service for calculating collocations from BlackLab hits.
+Collocation analysis for BlackLab queries.
+
+For a query (the node) the words in a window of ``window`` tokens to the left
+and right of every hit are counted with one BlackLab ``group=context``
+request per position (``context:<annotation>:i:L3-3`` = third token to the
+left), paged in windows of BlackLab's page maximum up to
+``COLLOCATION_MAX_GROUPS`` groups. The counts are compared with the corpus
+frequencies of the term dictionary (:mod:`..search.vocabulary`), which gives
+the usual association measures:
+
+    O             co-occurrences of node and collocate in the window
+    E             f(node) * span * f(collocate) / N   (span = 2 * window)
+    mi            log2(O / E)
+    t_score       (O - E) / sqrt(O)
+    log_likelihood  signed G2 of the 2x2 contingency table
+    log_dice      14 + log2(2 * O / (f(node) + f(collocate)))
+
+Corpus frequencies are those of the whole corpus, also when the query has
+document or speaker filters. Node sets with more than
+``COLLOCATION_MAX_HITS`` hits are analysed on a seeded random sample (same
+seed for the same query, see :mod:`..search.sampling`), so results are
+reproducible. The measures then use the co-occurrences scaled by
+f(node) / sample size, so that O, f(node), f(collocate) and N all refer to
+the whole corpus; ``freq`` stays the count in the sample. With country
+shards the sample is split across the shards in proportion to their totals
+(``search/shards.py``).
+
+An analysis runs as a background job on the ``jobs`` bulkhead: it reports
+its progress (positions done), can be cancelled between requests and its
+result is kept for ``COLLOCATION_TTL`` seconds under the canonical query and
+window (:func:`..search.cql_canonical.query_cache_key`, also the job id).
+Starting the same analysis again returns the running or finished job. Job
+state and results live in ``RESULTS_TEMP_DIR/collocations``, so any gunicorn
+worker can answer ``GET``/``DELETE /collocations/<id>``.
 """
 
-import logging
-from collections import Counter
-from typing import Dict
+from __future__ import annotations
 
-import httpx
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
 
-from ..extensions.http_client import (
-    get_http_client,
-    BLS_BASE_URL,
-    BlackLabCorpusNotFound,
-    build_bls_corpus_path,
-    get_corpus_not_found_message,
-    warn_if_configured_corpus_missing,
-)
+from ..extensions.bls_resilience import BlackLabUnavailable
+from ..extensions.bulkheads import BulkheadFull, get_bulkhead
+from ..search.query_cost import QueryCost, QueryRejected, query_lane
+from ..search.sampling import sample_info, sampling_params
+from ..search.shards import GROUP_PAGE_SIZE, collation_key
+from ..search.vocabulary import get_vocabulary
+from ..runtime_paths import get_results_temp_dir
 
 logger = logging.getLogger(__name__)
 
+MEASURES = ("log_dice", "mi", "t_score", "log_likelihood", "freq")
+MAX_WINDOW = 10
+# Collocates seen fewer times are not kept in the result
+MIN_KEPT_FREQ = 2
+MAX_KEPT_ROWS = 5000
 
-def get_collocations(
-    cql: str, window_size: int = 5, subcorpus_filter: str = ""
-) -> Dict:
-    """
-    Get collocations for a given CQL query.
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Job ids are canonical query keys (hex SHA-256, query_cache_key)
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
 
-    Args:
-        cql: The CQL query to find collocations for.
-        window_size: The number of words to the left and right of the hit to consider.
-        subcorpus_filter: A filter to apply to the search.
 
-    Returns:
-        A dictionary containing collocation statistics.
+class CollocationCancelled(Exception):
+    """The job was cancelled between two BlackLab requests."""
+
+
+class CollocationError(RuntimeError):
+    def __init__(self, code: str, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+# ---------------------------------------------------------------------------
+# Measures
+# ---------------------------------------------------------------------------
+
+
+def _log_likelihood(o11: float, o12: float, o21: float, o22: float) -> float:
+    n = o11 + o12 + o21 + o22
+    rows, cols = (o11 + o12, o21 + o22), (o11 + o21, o12 + o22)
+    g2 = 0.0
+    for observed, row, col in ((o11, 0, 0), (o12, 0, 1), (o21, 1, 0), (o22, 1, 1)):
+        expected = rows[row] * cols[col] / n if n else 0.0
+        if observed > 0 and expected > 0:
+            g2 += observed * math.log(observed / expected)
+    return 2 * g2
+
+
+def association_measures(observed: int, node_freq: int, collocate_freq: int, corpus_size: int, span: int) -> dict[str, Optional[float]]:
+    """Association measures of one collocate (see module docstring)."""
+    collocate_freq = max(collocate_freq, observed)
+    if not observed or not node_freq or not corpus_size:
+        return {"expected": None, "mi": None, "t_score": None, "log_likelihood": None, "log_dice": None}
+    expected = node_freq * span * collocate_freq / corpus_size
+    o12 = max(node_freq * span - observed, 0)
+    o21 = collocate_freq - observed
+    o22 = max(corpus_size - observed - o12 - o21, 0)
+    g2 = _log_likelihood(observed, o12, o21, o22)
+    return {
+        "expected": round(expected, 4),
+        "mi": round(math.log2(observed / expected), 3),
+        "t_score": round((observed - expected) / math.sqrt(observed), 3),
+        "log_likelihood": round(g2 if observed >= expected else -g2, 3),
+        "log_dice": round(14 + math.log2(2 * observed / (node_freq + collocate_freq)), 3),
+    }
+
+
+def rank(rows: list[dict], measure: str = "log_dice", min_freq: int = 3, limit: int = 50) -> list[dict]:
+    """Rows with at least ``min_freq`` co-occurrences, best ``measure`` first."""
+    if measure not in MEASURES:
+        measure = "log_dice"
+    kept = [row for row in rows if row["freq"] >= min_freq and row.get(measure) is not None]
+    kept.sort(key=lambda row: (-row[measure], -row["freq"], row["term"]))
+    return kept[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Computation
+# ---------------------------------------------------------------------------
+
+
+def positions(window: int) -> list[str]:
+    """Context positions ``L1-1`` ... ``Lw-w``, ``R1-1`` ... ``Rw-w``."""
+    return [f"{side}{k}-{k}" for side in "LR" for k in range(1, window + 1)]
+
+
+def _group_term(group: dict) -> str:
+    display = group.get("identityDisplay")
+    if display:
+        return str(display)
+    identity = str(group.get("identity", ""))
+    # e.g. "cws:lemma:i:casa": property prefix, value after the third colon
+    return identity.split(":", 3)[3] if identity.count(":") >= 3 else identity
+
+
+def _top_groups(fetch: Callable[[dict, Optional[list[str]]], dict], params: dict, shards: Optional[list[str]], limit: int) -> list[dict]:
+    """Up to ``limit`` groups, paged in windows of BlackLab's page maximum (``GROUP_PAGE_SIZE``)."""
+    groups: list[dict] = []
+    while len(groups) < limit:
+        number = min(GROUP_PAGE_SIZE, limit - len(groups))
+        data = fetch({**params, "first": len(groups), "number": number}, shards)
+        more = data.get("hitGroups", []) or []
+        groups.extend(more)
+        total = (data.get("summary", {}) or {}).get("numberOfGroups")
+        if len(more) < number or (total is not None and len(groups) >= int(total)):
+            break
+    return groups
+
+
+def compute_collocations(
+    fetch: Callable[[dict, Optional[list[str]]], dict],
+    patt: str,
+    filter_query: str = "",
+    shards: Optional[list[str]] = None,
+    window: int = 5,
+    annotation: str = "lemma",
+    sampling: Optional[dict] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> dict[str, Any]:
+    """
+    Co-occurrence counts and association measures for ``patt``.
+
+    ``fetch(params, shards)`` sends one ``/hits`` request (the advanced search
+    API passes its ``_fetch_hits``).
     """
-    client = get_http_client()
-    warn_if_configured_corpus_missing()
-    colloc_params = {
-        "patt": cql,
-        "wordsaroundhit": window_size,
-        "number": 1000,  # Get a good sample of hits
+    vocabulary = get_vocabulary(annotation)
+    if vocabulary is None or not vocabulary.total:
+        raise CollocationError("vocabulary_missing", f"Sin diccionario de términos para {annotation}; ejecute la exportación del índice.")
+
+    def check() -> None:
+        if cancelled is not None and cancelled.is_set():
+            raise CollocationCancelled()
+
+    base = {"patt": patt, "first": 0, "waitfortotal": "true"}
+    if filter_query:
+        base["filter"] = filter_query
+    def count(extra: dict) -> int:
+        return int((fetch({**base, **extra, "number": 0}, shards).get("summary") or {}).get("numberOfHits", 0) or 0)
+
+    sampling = dict(sampling or {})
+    node_freq = count({})
+    max_hits = int(_env_float("COLLOCATION_MAX_HITS", 20000))
+    if not sampling and max_hits and node_freq > max_hits:
+        # Reproducible sample: the seed is derived from the query
+        sampling = sampling_params({"samplenum": max_hits}, patt, filter_query)
+    sample_size = count(sampling) if sampling else node_freq
+    # Co-occurrences are counted in the sample; the other marginals are not
+    scale = node_freq / sample_size if sample_size else 1.0
+
+    span = 2 * window
+    max_groups = int(_env_float("COLLOCATION_MAX_GROUPS", 5000))
+    counts: dict[str, dict[str, Any]] = {}
+    todo = positions(window)
+    for done, position in enumerate(todo):
+        check()
+        params = {**base, **sampling, "group": f"context:{annotation}:i:{position}", "sort": "size"}
+        for group in _top_groups(fetch, params, shards, max_groups):
+            term = _group_term(group).strip()
+            if not term:
+                continue
+            row = counts.setdefault(collation_key(term), {"term": term, "freq": 0, "left": 0, "right": 0})
+            size = int(group.get("size", 0) or 0)
+            row["freq"] += size
+            row["left" if position[0] == "L" else "right"] += size
+        if on_progress is not None:
+            on_progress((done + 1) / len(todo))
+
+    rows = sorted((row for row in counts.values() if row["freq"] >= MIN_KEPT_FREQ), key=lambda row: -row["freq"])[:MAX_KEPT_ROWS]
+    for row in rows:
+        corpus_freq = vocabulary.frequency(row["term"])
+        row["corpus_freq"] = corpus_freq
+        row.update(association_measures(round(row["freq"] * scale), node_freq, corpus_freq, vocabulary.total, span))
+
+    return {
+        "node_freq": node_freq,
+        "corpus_size": vocabulary.total,
+        "window": window,
+        "span": span,
+        "annotation": annotation,
+        "sample": sample_info(sampling, sample_size) if sampling else None,
+        "rows": rows,
     }
-    if subcorpus_filter:
-        colloc_params["filter"] = subcorpus_filter
 
-    try:
-        # Use the /hits endpoint to get words around the hit
-        response = client.get(
-            f"{BLS_BASE_URL}{build_bls_corpus_path('hits')}", params=colloc_params
-        )
-        response.raise_for_status()
-        data = response.json()
 
-        hits = data.get("hits", [])
-        left_words = Counter()
-        right_words = Counter()
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
 
-        for hit in hits:
-            left_context = hit.get("left", {}).get("word", [])
-            right_context = hit.get("right", {}).get("word", [])
 
-            left_words.update(left_context)
-            right_words.update(right_context)
+class CollocationJob:
+    """
+    One analysis. Its id is the canonical key; state and result are persisted
+    through ``store`` so every gunicorn worker can report and cancel it.
+    """
 
-        total_left = sum(left_words.values())
-        total_right = sum(right_words.values())
+    def __init__(self, key: str, params: dict, store: Optional["CollocationJobs"] = None) -> None:
+        self.id = key
+        self.key = key
+        self.params = params
+        self.state = QUEUED
+        self.progress = 0.0
+        self.result: Optional[dict] = None
+        self.error: Optional[dict] = None
+        self.created = time.time()
+        self.updated = self.created
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._store = store
 
-        return {
-            "left": [
-                {"word": word, "n": count, "p": count / total_left if total_left else 0}
-                for word, count in left_words.most_common(20)
-            ],
-            "right": [
-                {
-                    "word": word,
-                    "n": count,
-                    "p": count / total_right if total_right else 0,
-                }
-                for word, count in right_words.most_common(20)
-            ],
-            "total_hits": data.get("summary", {})
-            .get("resultsStats", {})
-            .get("hits", 0),
-        }
+    @classmethod
+    def from_state(cls, state: dict, result: Optional[dict] = None) -> "CollocationJob":
+        """Read-only view of a persisted job (possibly running in another worker)."""
+        job = cls(state["key"], state.get("params") or {})
+        for name in ("state", "progress", "created", "updated", "finished", "error"):
+            setattr(job, name, state.get(name, getattr(job, name)))
+        job.result = result
+        return job
+
+    def run(self, compute: Callable[["CollocationJob"], dict], cost: Optional[QueryCost] = None) -> None:
+        if self._cancel_requested():
+            self._finish(CANCELLED)
+            return
+        self.state = RUNNING
+        self._save()
+        try:
+            if cost is not None:
+                with query_lane(cost):
+                    result = compute(self)
+            else:
+                result = compute(self)
+        except CollocationCancelled:
+            self._finish(CANCELLED)
+        except CollocationError as exc:
+            self._finish(FAILED, {"error": exc.code, "message": str(exc)})
+        except QueryRejected as exc:
+            self._finish(FAILED, {"error": exc.code, "message": str(exc)})
+        except BlackLabUnavailable as exc:
+            self._finish(FAILED, {"error": "upstream_overloaded", "message": str(exc)})
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Collocation job %s failed", self.id)
+            self._finish(FAILED, {"error": "server_error", "message": str(exc)})
+        else:
+            self.result = result
+            self.progress = 1.0
+            self._finish(DONE)
+
+    def _finish(self, state: str, error: Optional[dict] = None) -> None:
+        self.error = error
+        self.finished = time.time()
+        self.state = state
+        self._save()
+
+    def _save(self) -> None:
+        self.updated = time.time()
+        if self._store is not None:
+            self._store.save(self)
+
+    def _cancel_requested(self) -> bool:
+        # DELETE may have been handled by another worker (cancel marker)
+        if not self.cancel_event.is_set() and self._store is not None and self._store.cancel_requested(self.id):
+            self.cancel_event.set()
+        return self.cancel_event.is_set()
+
+    def _not_run(self, future) -> None:
+        # The bulkhead gave up waiting for a slot: run() was never called
+        if future.exception() is not None and self.state == QUEUED:
+            self._finish(FAILED, {"error": "overloaded", "message": str(future.exception())})
+
+    def set_progress(self, value: float) -> None:
+        self.progress = round(value, 3)
+        # Checked after every position; compute_collocations stops before the next
+        self._cancel_requested()
+        self._save()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+        if self.state == QUEUED:
+            self._finish(CANCELLED)
 
-    except httpx.HTTPStatusError as e:
-        corpus_message = get_corpus_not_found_message(e.response)
-        if corpus_message:
-            logger.warning(corpus_message)
-            return {"error": "corpus_not_found", "message": corpus_message}
-        logger.error(
-            f"BlackLab error fetching collocations: {e.response.status_code} - {e.response.text}"
-        )
+    def state_dict(self) -> dict[str, Any]:
+        return {**self.snapshot(), "key": self.key, "updated": self.updated}
+
+    def snapshot(self) -> dict[str, Any]:
         return {
-            "error": "bls_error",
-            "message": f"BlackLab error: {e.response.status_code}",
+            "id": self.id,
+            "state": self.state,
+            "progress": self.progress,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+            "params": self.params,
         }
-    except BlackLabCorpusNotFound as e:
-        logger.warning(str(e))
-        return {"error": "corpus_not_found", "message": str(e)}
-    except Exception as e:
-        logger.exception("Error fetching collocations")
-        return {"error": "server_error", "message": str(e)}
+
+
+class CollocationJobs:
+    """
+    Running and finished jobs, shared by all worker processes through files
+    in ``directory`` (``<key>.json`` state, ``<key>.result.json`` result,
+    ``<key>.cancel`` cancel request); finished ones double as the result
+    cache.
+
+    A job runs in the worker that started it. It rewrites its state after
+    every context position; a queued or running job whose state has not
+    changed for ``stale_seconds`` is reported as failed (its worker died).
+    Two workers starting the same analysis at the same moment may both run
+    it; the results are identical and the last one written wins.
+    """
+
+    def __init__(self, ttl: float, directory: Path, max_jobs: int = 200, stale_seconds: float = 300.0) -> None:
+        self.ttl = ttl
+        self.directory = directory
+        self.max_jobs = max_jobs
+        self.stale_seconds = stale_seconds
+        # Jobs running or queued in this process
+        self._local: dict[str, CollocationJob] = {}
+        self._lock = threading.Lock()
+
+    # -- files --------------------------------------------------------------
+
+    def _path(self, key: str, suffix: str) -> Optional[Path]:
+        if not _JOB_ID_RE.match(key):
+            return None
+        return self.directory / f"{key}{suffix}"
+
+    def _write(self, path: Path, payload: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _read(self, path: Optional[Path]) -> Optional[dict]:
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _remove(self, key: str) -> None:
+        for suffix in (".json", ".result.json", ".cancel"):
+            path = self._path(key, suffix)
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+    def save(self, job: CollocationJob) -> None:
+        """Persist ``job`` (called by the job on every state change)."""
+        state_path, result_path = self._path(job.key, ".json"), self._path(job.key, ".result.json")
+        if state_path is None or result_path is None:
+            return
+        try:
+            if job.state == DONE and job.result is not None:
+                # Result first: a reader that sees "done" finds it
+                self._write(result_path, job.result)
+            self._write(state_path, job.state_dict())
+        except OSError as exc:
+            logger.warning("Could not store collocation job %s: %s", job.id, exc)
+        if job.finished is not None:
+            with self._lock:
+                if self._local.get(job.key) is job:
+                    del self._local[job.key]
+
+    def cancel_requested(self, key: str) -> bool:
+        path = self._path(key, ".cancel")
+        return path is not None and path.exists()
+
+    # -- jobs ---------------------------------------------------------------
+
+    def _reusable(self, job: CollocationJob, now: float) -> bool:
+        if job.state in (FAILED, CANCELLED):
+            return False
+        return job.finished is None or now - job.finished <= self.ttl
+
+    def start(
+        self, key: str, params: dict, compute: Callable[[CollocationJob], dict], cost: Optional[QueryCost] = None
+    ) -> tuple[CollocationJob, bool]:
+        """Job for ``key``: the running/cached one, or a new one on the ``jobs`` bulkhead."""
+        if self._path(key, ".json") is None:
+            raise ValueError(f"Invalid collocation job key: {key!r}")
+        now = time.time()
+        with self._lock:
+            existing = self.get(key)
+            if existing is not None and self._reusable(existing, now):
+                return existing, False
+            self._remove(key)
+            job = CollocationJob(key, params, store=self)
+            self._local[key] = job
+        job._save()
+        self._evict(now)
+        try:
+            future = get_bulkhead("jobs").submit(job.run, compute, cost)
+        except BulkheadFull:
+            self._drop(job)
+            raise
+        future.add_done_callback(job._not_run)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[CollocationJob]:
+        state = self._read(self._path(job_id, ".json"))
+        if state is None:
+            return None
+        now = time.time()
+        finished = state.get("finished")
+        if finished is not None and now - finished > self.ttl:
+            self._remove(job_id)
+            return None
+        if finished is None and now - float(state.get("updated") or 0) > self.stale_seconds:
+            state.update({"state": FAILED, "finished": now, "error": {"error": "lost", "message": "El análisis se interrumpió."}})
+        result = self._read(self._path(job_id, ".result.json")) if state.get("state") == DONE else None
+        if state.get("state") == DONE and result is None:
+            return None
+        return CollocationJob.from_state(state, result)
+
+    def cancel(self, job_id: str) -> Optional[CollocationJob]:
+        """Cancel a job running in any worker; returns its current state."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.finished is None:
+            self._write(self._path(job_id, ".cancel"), {"requested": time.time()})
+            with self._lock:
+                local = self._local.get(job_id)
+            if local is not None:
+                local.cancel()
+                return local
+        return job
+
+    def _drop(self, job: CollocationJob) -> None:
+        with self._lock:
+            if self._local.get(job.key) is job:
+                del self._local[job.key]
+        self._remove(job.key)
+
+    def _keys(self) -> list[str]:
+        """Keys of all persisted jobs."""
+        return [path.name[: -len(".json")] for path in self.directory.glob("*.json") if not path.name.endswith(".result.json")]
+
+    def _evict(self, now: float) -> None:
+        """Delete expired jobs, and the oldest finished ones beyond ``max_jobs``."""
+        finished = []
+        for key in self._keys():
+            state = self._read(self._path(key, ".json"))
+            if state is None or state.get("finished") is None:
+                continue
+            if now - state["finished"] > self.ttl:
+                self._remove(key)
+            else:
+                finished.append((state["finished"], key))
+        finished.sort()
+        for _, key in finished[: max(0, len(finished) - self.max_jobs)]:
+            self._remove(key)
+
+    def snapshot(self) -> dict[str, int]:
+        states: dict[str, int] = {}
+        for key in self._keys():
+            job = self.get(key)
+            if job is not None:
+                states[job.state] = states.get(job.state, 0) + 1
+        return states
+
+    def clear(self) -> None:
+        with self._lock:
+            for job in self._local.values():
+                job.cancel_event.set()
+            self._local.clear()
+        for key in self._keys():
+            self._remove(key)
+
+
+_JOBS: Optional[CollocationJobs] = None
+_JOBS_LOCK = threading.Lock()
+
+
+def get_collocation_jobs() -> CollocationJobs:
+    global _JOBS
+    with _JOBS_LOCK:
+        if _JOBS is None:
+            _JOBS = CollocationJobs(
+                ttl=_env_float("COLLOCATION_TTL", 3600),
+                directory=get_results_temp_dir() / "collocations",
+            )
+        return _JOBS
+
+
+def reset_collocation_jobs() -> None:
+    """Cancel and forget all jobs (tests, or after reconfiguring)."""
+    global _JOBS
+    with _JOBS_LOCK:
+        jobs, _JOBS = _JOBS, None
+    if jobs is not None:
+        jobs.clear()
@@ -0,0 +1,84 @@
+"""Corpus epoch: one identifier for the data behind search, stats and atlas.
+
+Responses derived from the corpus are cached in several places (the
+``STATS_TEMP_DIR`` JSON files, Flask-Caching, the docmeta lookup in
+``advanced_api``, the corpora list in ``http_client``, materialized result
+sets and collocation jobs). None of them can see a rebuild by itself, so all
+of them fold :func:`corpus_epoch` into their keys or reload when it changes.
+
+The epoch is a short hash of
+
+    - the build stamp of the active BlackLab index (``index.stamp``, written
+      by ``build_blacklab_index.sh`` / ``_prod.sh`` when a new index is
+      activated); without a stamp, the mtime of ``docmeta.jsonl`` exported
+      with the index
+    - the mtimes of the stats DBs (``services.database.DATABASES``)
+
+It is re-checked at most every ``CORPUS_EPOCH_CHECK`` seconds (default 10),
+so a deploy is picked up within that interval without a restart.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from ..runtime_paths import get_docmeta_path, get_index_stamp_path
+from .database import DATABASES
+
+_LOCK = threading.Lock()
+_STATE: dict[str, object] = {"checked": 0.0, "epoch": None}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _index_stamp() -> str:
+    try:
+        return get_index_stamp_path().read_text(encoding="utf-8").strip()
+    except OSError:
+        return f"docmeta:{_mtime_ns(get_docmeta_path())}"
+
+
+def compute_corpus_epoch() -> str:
+    """Epoch of the data on disk right now (uncached)."""
+    parts = {
+        "index": _index_stamp(),
+        "stats": {name: _mtime_ns(path()) for name, path in sorted(DATABASES.items())},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def corpus_epoch() -> str:
+    """Current corpus epoch, re-checked at most every ``CORPUS_EPOCH_CHECK`` seconds."""
+    now = time.monotonic()
+    epoch = _STATE["epoch"]
+    if epoch is not None and now - float(_STATE["checked"]) < _env_float("CORPUS_EPOCH_CHECK", 10.0):
+        return str(epoch)
+    with _LOCK:
+        if _STATE["epoch"] is None or now - float(_STATE["checked"]) >= _env_float("CORPUS_EPOCH_CHECK", 10.0):
+            _STATE["epoch"] = compute_corpus_epoch()
+            _STATE["checked"] = now
+        return str(_STATE["epoch"])
+
+
+def reset_corpus_epoch() -> None:
+    """Forget the cached epoch (tests)."""
+    with _LOCK:
+        _STATE["epoch"] = None
+        _STATE["checked"] = 0.0
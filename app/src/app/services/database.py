@@ -16,6 +16,7 @@ def get_public_db_root() -> Path:
 DATABASES = {
     "stats_files": lambda: get_public_db_root() / "stats_files.db",
     "stats_country": lambda: get_public_db_root() / "stats_country.db",
+    "stats_frequencies": lambda: get_public_db_root() / "stats_frequencies.db",
 }
 
 
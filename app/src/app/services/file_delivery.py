@@ -0,0 +1,136 @@
+"""File delivery with optional front-proxy offload (X-Accel-Redirect / X-Sendfile).
+
+By default files are streamed through Flask with ``send_file``. In production
+the reverse proxy can take over the byte transfer: once auth and path checks
+have passed in Flask, the response carries only headers and the proxy serves
+the file with sendfile, Range and conditional-request support.
+
+Modes (``FILE_OFFLOAD_MODE``):
+
+- ``off``        - stream through Flask (default, dev/test)
+- ``x-accel``    - nginx: ``X-Accel-Redirect: <FILE_OFFLOAD_INTERNAL_PREFIX>/<location>/<relpath>``
+- ``x-sendfile`` - Apache mod_xsendfile / lighttpd: ``X-Sendfile: <absolute path>``
+
+Each served directory is exposed under a named internal location, e.g.::
+
+    location /_protected/media/ {
+        internal;
+        alias /srv/webapps/corapan/runtime/corapan/media/;
+    }
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from flask import Response, current_app, request, send_file
+from werkzeug.utils import send_file as werkzeug_send_file
+
+OFFLOAD_OFF = "off"
+OFFLOAD_X_ACCEL = "x-accel"
+OFFLOAD_X_SENDFILE = "x-sendfile"
+
+_MODE_ALIASES = {
+    "": OFFLOAD_OFF,
+    "off": OFFLOAD_OFF,
+    "none": OFFLOAD_OFF,
+    "false": OFFLOAD_OFF,
+    "x-accel": OFFLOAD_X_ACCEL,
+    "x-accel-redirect": OFFLOAD_X_ACCEL,
+    "nginx": OFFLOAD_X_ACCEL,
+    "x-sendfile": OFFLOAD_X_SENDFILE,
+    "sendfile": OFFLOAD_X_SENDFILE,
+}
+
+# Internal locations (relative to FILE_OFFLOAD_INTERNAL_PREFIX)
+LOCATION_MEDIA = "media"
+LOCATION_STATS = "statistics"
+LOCATION_METADATA = "metadata"
+
+
+def offload_mode() -> str:
+    """Return the normalized offload mode for the current app."""
+    raw = str(current_app.config.get("FILE_OFFLOAD_MODE") or "").strip().lower()
+    mode = _MODE_ALIASES.get(raw)
+    if mode is None:
+        current_app.logger.warning(
+            "Unknown FILE_OFFLOAD_MODE=%r, serving files through Flask", raw
+        )
+        return OFFLOAD_OFF
+    return mode
+
+
+def internal_uri(path: Path, base_dir: Path, location: str) -> Optional[str]:
+    """Map ``path`` (inside ``base_dir``) to its internal proxy URI."""
+    try:
+        rel = path.resolve().relative_to(base_dir.resolve())
+    except (OSError, ValueError):
+        return None
+    prefix = str(
+        current_app.config.get("FILE_OFFLOAD_INTERNAL_PREFIX") or "/_protected"
+    ).rstrip("/")
+    return f"{prefix}/{location}/{quote(rel.as_posix())}"
+
+
+def send_runtime_file(
+    path: Path,
+    *,
+    base_dir: Path,
+    location: str,
+    mimetype: str,
+    as_attachment: bool = False,
+    download_name: Optional[str] = None,
+    max_age: Optional[int] = None,
+) -> Response:
+    """
+    Send a runtime file, delegating the transfer to the proxy if configured.
+
+    Callers must have done all auth and path validation already; ``base_dir``
+    and ``location`` only determine the internal URI for X-Accel-Redirect.
+    Falls back to ``send_file`` if the path cannot be mapped.
+    """
+    mode = offload_mode()
+    header_name = None
+    header_value = None
+    if mode == OFFLOAD_X_ACCEL:
+        header_name = "X-Accel-Redirect"
+        header_value = internal_uri(path, base_dir, location)
+    elif mode == OFFLOAD_X_SENDFILE:
+        header_name = "X-Sendfile"
+        header_value = str(path.resolve())
+
+    if header_value is None:
+        if mode != OFFLOAD_OFF:
+            current_app.logger.warning(
+                "File offload: cannot map %s below %s, serving through Flask",
+                path,
+                base_dir,
+            )
+        return send_file(
+            path,
+            mimetype=mimetype,
+            conditional=True,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            max_age=max_age,
+        )
+
+    # Headers only: Content-Disposition, Last-Modified and ETag are computed
+    # by werkzeug; Range and conditional requests are left to the proxy.
+    response = werkzeug_send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=False,
+        max_age=max_age,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+    )
+    response.headers.pop("X-Sendfile", None)
+    response.headers.pop("Content-Length", None)
+    response.headers[header_name] = header_value
+    return response
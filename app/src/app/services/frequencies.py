@@ -0,0 +1,164 @@
+"""Frequency lists served from the precomputed stats_frequencies.db.
+
+The stats pipeline (``03_build_metadata_stats.py`` via
+``src/scripts/frequency_tables.py``) counts every word, lemma, pos and norm
+value per metadata slice (country x sex x speaker_type x mode). A frequency
+list for a selection of slices is one aggregation over those rows; it is
+ranked once and kept in memory as parallel columns (terms, folded keys,
+frequencies) so that paging, prefix filtering and CSV export of the same
+slice do not touch the database again. BlackLab is never involved.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator, Sequence
+
+from ..search.shards import collation_key
+from .database import DATABASES, open_db
+
+ANNOTATIONS = ("word", "lemma", "pos", "norm")
+# Request dimension -> column in the frequencies table
+DIMENSIONS = ("country", "sex", "speaker_type", "mode")
+MAX_PER_PAGE = 1000
+# Ranked lists kept in memory (one per annotation and slice selection)
+RANKED_CACHE_SIZE = 8
+
+
+class FrequenciesUnavailable(RuntimeError):
+    """stats_frequencies.db has not been built."""
+
+
+@dataclass(slots=True)
+class FrequencyParams:
+    """Selection of a frequency list; empty dimensions mean all values."""
+
+    annotation: str = "lemma"
+    countries: Sequence[str] = ()
+    sexes: Sequence[str] = ()
+    speaker_types: Sequence[str] = ()
+    modes: Sequence[str] = ()
+    prefix: str = ""
+
+    def slices(self) -> tuple[tuple[str, tuple[str, ...]], ...]:
+        """Normalised (column, values) pairs of the restricted dimensions."""
+        selected = zip(DIMENSIONS, (self.countries, self.sexes, self.speaker_types, self.modes))
+        result = []
+        for column, values in selected:
+            cleaned = sorted({v.strip() for v in values if v and v.strip() and v.strip().lower() != "all"})
+            if cleaned:
+                result.append((column, tuple(cleaned)))
+        return tuple(result)
+
+
+class RankedList:
+    """Terms of one slice selection, by descending frequency (columnar)."""
+
+    def __init__(self, rows: list[tuple[str, str, int]]) -> None:
+        self.terms = [term for term, _, _ in rows]
+        self.folded = [folded for _, folded, _ in rows]
+        self.freqs = array("q", (freq for _, _, freq in rows))
+        self.tokens = sum(self.freqs)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def indexes(self, prefix: str = "") -> list[int] | range:
+        """Positions (ranks - 1) of the terms whose folded form starts with ``prefix``."""
+        if not prefix:
+            return range(len(self.terms))
+        return [i for i, key in enumerate(self.folded) if key.startswith(prefix)]
+
+
+_RANKED: OrderedDict[tuple, RankedList] = OrderedDict()
+_RANKED_LOCK = threading.Lock()
+
+
+def _db_stamp() -> float:
+    try:
+        return DATABASES["stats_frequencies"]().stat().st_mtime
+    except OSError as exc:
+        raise FrequenciesUnavailable("stats_frequencies.db not found; run 03_build_metadata_stats.py") from exc
+
+
+def _load_ranked(annotation: str, slices: tuple) -> RankedList:
+    params: list[str] = [annotation]
+    if not slices:
+        sql = "SELECT term, folded, freq FROM terms WHERE annotation = ? ORDER BY freq DESC, folded, term"
+    else:
+        conditions = ["t.annotation = ?"]
+        for column, values in slices:
+            conditions.append(f"f.{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+        sql = (
+            "SELECT t.term, t.folded, SUM(f.freq) AS n FROM frequencies f "
+            "JOIN terms t ON t.id = f.term_id "
+            f"WHERE {' AND '.join(conditions)} "
+            "GROUP BY f.term_id ORDER BY n DESC, t.folded, t.term"
+        )
+    with open_db("stats_frequencies") as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return RankedList([tuple(row) for row in rows])
+
+
+def get_ranked_list(params: FrequencyParams) -> RankedList:
+    """Ranked list of ``params`` (from memory unless the DB was rebuilt)."""
+    if params.annotation not in ANNOTATIONS:
+        raise ValueError(f"Unknown annotation {params.annotation!r}")
+    key = (_db_stamp(), params.annotation, params.slices())
+    with _RANKED_LOCK:
+        ranked = _RANKED.get(key)
+        if ranked is not None:
+            _RANKED.move_to_end(key)
+            return ranked
+    ranked = _load_ranked(params.annotation, key[2])
+    with _RANKED_LOCK:
+        _RANKED[key] = ranked
+        while len(_RANKED) > RANKED_CACHE_SIZE:
+            _RANKED.popitem(last=False)
+    return ranked
+
+
+def reset_frequency_cache() -> None:
+    """Forget ranked lists (tests)."""
+    with _RANKED_LOCK:
+        _RANKED.clear()
+
+
+def _row(ranked: RankedList, index: int) -> dict:
+    freq = ranked.freqs[index]
+    per_million = freq * 1_000_000 / ranked.tokens if ranked.tokens else 0.0
+    return {"rank": index + 1, "term": ranked.terms[index], "freq": freq, "per_million": round(per_million, 2)}
+
+
+def query_frequencies(params: FrequencyParams, page: int = 1, per_page: int = 50) -> dict:
+    """
+    One page of the frequency list.
+
+    ``rank`` is the position in the whole slice list (also with a prefix),
+    ``per_million`` is relative to the tokens of the selected slices.
+    """
+    ranked = get_ranked_list(params)
+    indexes = ranked.indexes(collation_key(params.prefix.strip()))
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page = max(1, page)
+    start = (page - 1) * per_page
+    return {
+        "annotation": params.annotation,
+        "filters": {column: list(values) for column, values in params.slices()},
+        "prefix": params.prefix,
+        "tokens": ranked.tokens,
+        "total": len(indexes),
+        "page": page,
+        "per_page": per_page,
+        "items": [_row(ranked, i) for i in indexes[start : start + per_page]],
+    }
+
+
+def iter_frequencies(params: FrequencyParams) -> Iterator[dict]:
+    """All rows of the frequency list (CSV export); the list is loaded before iterating."""
+    ranked = get_ranked_list(params)
+    return (_row(ranked, index) for index in ranked.indexes(collation_key(params.prefix.strip())))
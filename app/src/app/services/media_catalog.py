@@ -0,0 +1,372 @@
+"""In-memory catalog of media files (audio, transcripts, peaks, HLS playlists).
+
+The catalog walks each media directory once, resolves every file against its
+base directory and keeps the result in a dict keyed by the relative path
+(e.g. ``"ARG/2023-08-10_ARG_Mitre.mp3"``). Request-time path resolution then
+becomes a dict lookup: client-supplied filenames are only ever used as keys,
+never joined onto the filesystem, so the traversal check happens once at build
+time instead of on every request.
+
+Catalogs are rebuilt automatically when the directory signature (mtime of the
+base directory and its country subfolders) changes, or explicitly via
+``flask media-catalog-refresh``. A file replaced in place does not change the
+directory mtime, so a hit re-stats its entry at most once per refresh interval;
+misses re-check the signature at most once per ``miss_refresh_interval`` so
+that 404 probes do not each cost a directory scan.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Minimum interval between directory signature checks on cache hits (seconds).
+DEFAULT_REFRESH_INTERVAL = 5.0
+# Minimum interval between signature checks triggered by misses (seconds).
+DEFAULT_MISS_REFRESH_INTERVAL = 1.0
+
+KIND_FULL = "full"
+KIND_SPLIT = "split"
+KIND_TRANSCRIPTS = "transcripts"
+KIND_PEAKS = "peaks"
+KIND_HLS = "hls"
+
+_KIND_SUFFIXES = {
+    KIND_FULL: (".mp3",),
+    KIND_SPLIT: (".mp3",),
+    # .json.zst transcripts are cataloged under their .json key (see _entry_key)
+    KIND_TRANSCRIPTS: (".json", ".json.zst"),
+    KIND_PEAKS: (".peaks",),
+    # Only playlists are cataloged; segments are resolved next to them.
+    KIND_HLS: (".m3u8",),
+}
+
+_ZST_EXTENSION = ".zst"
+
+# MPEG-1 Layer III bitrates (kbps) indexed by the 4-bit header field
+_MPEG1_L3_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0)
+# MPEG-2/2.5 Layer III bitrates (kbps)
+_MPEG2_L3_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class MediaEntry:
+    """A single cataloged media file."""
+
+    kind: str
+    key: str
+    path: Path
+    size: int
+    mtime: float
+    duration: Optional[float] = None
+
+
+def estimate_mp3_duration(path: Path, size: int) -> Optional[float]:
+    """
+    Estimate the duration of a CBR MP3 from its first frame header.
+
+    The corpus MP3s are CBR (see mp3_prepare_and_split.py), so
+    ``(size - tag) * 8 / bitrate`` is accurate without decoding the file.
+    Returns None if no valid frame header is found in the first few KB.
+    """
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(10)
+            offset = 0
+            if head[:3] == b"ID3" and len(head) == 10:
+                offset = 10 + (
+                    (head[6] & 0x7F) << 21
+                    | (head[7] & 0x7F) << 14
+                    | (head[8] & 0x7F) << 7
+                    | (head[9] & 0x7F)
+                )
+            fh.seek(offset)
+            data = fh.read(8192)
+    except OSError:
+        return None
+
+    for i in range(len(data) - 3):
+        if data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+            continue
+        version_bits = (data[i + 1] >> 3) & 0x03
+        layer_bits = (data[i + 1] >> 1) & 0x03
+        bitrate_index = (data[i + 2] >> 4) & 0x0F
+        if layer_bits != 0x01 or version_bits == 0x01:
+            continue
+        table = _MPEG1_L3_BITRATES if version_bits == 0x03 else _MPEG2_L3_BITRATES
+        bitrate_kbps = table[bitrate_index]
+        if not bitrate_kbps:
+            continue
+        audio_bytes = size - (offset + i)
+        return round(audio_bytes * 8 / (bitrate_kbps * 1000), 3)
+    return None
+
+
+class MediaCatalog:
+    """Catalog of one media directory (mp3-full, mp3-split or transcripts)."""
+
+    def __init__(
+        self,
+        kind: str,
+        base_dir: Path,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        miss_refresh_interval: float = DEFAULT_MISS_REFRESH_INTERVAL,
+    ) -> None:
+        self.kind = kind
+        self.base_dir = Path(base_dir)
+        self.refresh_interval = refresh_interval
+        self.miss_refresh_interval = miss_refresh_interval
+        self._suffixes = _KIND_SUFFIXES.get(kind, ())
+        self._entries: dict[str, MediaEntry] = {}
+        # key -> monotonic time the entry's stat was last confirmed
+        self._validated: dict[str, float] = {}
+        self._signature: tuple | None = None
+        self._checked_at = 0.0
+        self._miss_checked_at = 0.0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Build / refresh
+    # ------------------------------------------------------------------
+
+    def _dir_signature(self) -> tuple:
+        """mtimes of the base directory and its immediate subdirectories."""
+        try:
+            base_stat = os.stat(self.base_dir)
+        except OSError:
+            return ()
+        parts = [("", base_stat.st_mtime_ns)]
+        try:
+            with os.scandir(self.base_dir) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=True):
+                        try:
+                            parts.append(
+                                (entry.name, entry.stat(follow_symlinks=True).st_mtime_ns)
+                            )
+                        except OSError:
+                            continue
+        except OSError:
+            return ()
+        return tuple(sorted(parts))
+
+    def _iter_files(self, base_resolved: Path) -> Iterable[tuple[str, Path]]:
+        visited = {base_resolved}
+        for root, dirs, files in os.walk(base_resolved, followlinks=True):
+            root_path = Path(root)
+            rel_root = root_path.relative_to(base_resolved)
+            # Follow directory symlinks only if they stay inside the base
+            # (and only once, so symlink loops terminate).
+            for name in list(dirs):
+                target = (root_path / name).resolve()
+                inside = target == base_resolved or base_resolved in target.parents
+                if not inside or target in visited:
+                    if not inside:
+                        logger.warning(
+                            "Media catalog: skipping directory %s (symlink outside %s)",
+                            root_path / name,
+                            base_resolved,
+                        )
+                    dirs.remove(name)
+                    continue
+                visited.add(target)
+            for name in files:
+                if not name.lower().endswith(self._suffixes):
+                    continue
+                rel = (rel_root / name).as_posix()
+                yield rel, root_path / name
+
+    def _make_entry(self, key: str, path: Path, stat: os.stat_result) -> MediaEntry:
+        duration = None
+        if self.kind in (KIND_FULL, KIND_SPLIT):
+            duration = estimate_mp3_duration(path, stat.st_size)
+        return MediaEntry(
+            kind=self.kind,
+            key=key,
+            path=path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            duration=duration,
+        )
+
+    def build(self) -> int:
+        """(Re)scan the directory. Returns the number of cataloged files."""
+        with self._lock:
+            signature = self._dir_signature()
+            entries: dict[str, MediaEntry] = {}
+            try:
+                base_resolved = self.base_dir.resolve()
+            except OSError:
+                base_resolved = None
+
+            if base_resolved is not None and base_resolved.is_dir():
+                for rel, candidate in self._iter_files(base_resolved):
+                    path = candidate
+                    if candidate.is_symlink():
+                        path = candidate.resolve()
+                        if (
+                            base_resolved not in path.parents
+                            and path != base_resolved
+                        ):
+                            logger.warning(
+                                "Media catalog: skipping %s (symlink outside %s)",
+                                candidate,
+                                base_resolved,
+                            )
+                            continue
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    key = self._entry_key(rel)
+                    current = entries.get(key)
+                    # <stem>.json and <stem>.json.zst: the newer file wins
+                    if current is not None and current.mtime >= stat.st_mtime:
+                        continue
+                    entries[key] = self._make_entry(key, path, stat)
+
+            self._entries = entries
+            self._signature = signature
+            self._built_at = self._checked_at = time.monotonic()
+            self._validated = dict.fromkeys(entries, self._built_at)
+
+        logger.info(
+            "Media catalog built: kind=%s base=%s files=%s",
+            self.kind,
+            self.base_dir,
+            len(entries),
+        )
+        return len(entries)
+
+    def refresh_if_stale(self, force_check: bool = False) -> bool:
+        """Rebuild if the directory signature changed. Returns True if rebuilt."""
+        now = time.monotonic()
+        if (
+            self._signature is not None
+            and not force_check
+            and now - self._checked_at < self.refresh_interval
+        ):
+            return False
+        self._checked_at = now
+        if self._signature is not None and self._dir_signature() == self._signature:
+            return False
+        self.build()
+        return True
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _entry_key(self, rel: str) -> str:
+        """Catalog key of a relative path (compressed transcripts -> ``.json``)."""
+        if self.kind == KIND_TRANSCRIPTS and rel.lower().endswith(_ZST_EXTENSION):
+            return rel[: -len(_ZST_EXTENSION)]
+        return rel
+
+    def _normalize_key(self, filename: str) -> Optional[str]:
+        key = filename.replace("\\", "/").strip("/")
+        if not key:
+            return None
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            return None
+        return self._entry_key(key)
+
+    def _find(
+        self, key: str, country_resolver: Callable[[str], Optional[str]]
+    ) -> Optional[MediaEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            country = country_resolver(key)
+            if country:
+                basename = key.rsplit("/", 1)[-1]
+                entry = self._entries.get(f"{country}/{basename}")
+        if entry is not None:
+            entry = self._revalidate(entry)
+        return entry
+
+    def _revalidate(self, entry: MediaEntry) -> Optional[MediaEntry]:
+        """Re-stat ``entry`` if it was not confirmed within the refresh interval."""
+        now = time.monotonic()
+        if now - self._validated.get(entry.key, 0.0) < self.refresh_interval:
+            return entry
+        try:
+            stat = entry.path.stat()
+        except OSError:
+            self._entries.pop(entry.key, None)
+            self._validated.pop(entry.key, None)
+            return None
+        if stat.st_size != entry.size or stat.st_mtime != entry.mtime:
+            entry = self._make_entry(entry.key, entry.path, stat)
+            self._entries[entry.key] = entry
+        self._validated[entry.key] = now
+        return entry
+
+    def lookup(
+        self,
+        filename: str,
+        country_resolver: Callable[[str], Optional[str]] = lambda _: None,
+    ) -> Optional[MediaEntry]:
+        """
+        Resolve a client filename to a cataloged entry.
+
+        Tries the relative path as given, then ``<country>/<basename>`` using
+        ``country_resolver``. A miss triggers a signature check (at most once
+        per ``miss_refresh_interval``) so freshly added files are found without
+        waiting for the refresh interval.
+        """
+        key = self._normalize_key(filename)
+        if key is None:
+            return None
+
+        self.refresh_if_stale()
+        entry = self._find(key, country_resolver)
+        if entry is None:
+            now = time.monotonic()
+            if now - self._miss_checked_at >= self.miss_refresh_interval:
+                self._miss_checked_at = now
+                if self.refresh_if_stale(force_check=True):
+                    entry = self._find(key, country_resolver)
+        return entry
+
+    def entries(self) -> list[MediaEntry]:
+        self.refresh_if_stale()
+        return list(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_CATALOGS: dict[tuple[str, str], MediaCatalog] = {}
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(
+    kind: str,
+    base_dir: Path,
+    refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+) -> MediaCatalog:
+    """Return the process-wide catalog for ``(kind, base_dir)``, creating it if needed."""
+    cache_key = (kind, str(base_dir))
+    catalog = _CATALOGS.get(cache_key)
+    if catalog is None:
+        with _CATALOGS_LOCK:
+            catalog = _CATALOGS.get(cache_key)
+            if catalog is None:
+                catalog = MediaCatalog(kind, base_dir, refresh_interval)
+                _CATALOGS[cache_key] = catalog
+    return catalog
+
+
+def clear_catalogs() -> None:
+    """Drop all catalogs (used by tests and the refresh command)."""
+    with _CATALOGS_LOCK:
+        _CATALOGS.clear()
@@ -1,19 +1,36 @@
-"""Media storage helpers with intelligent country subfolder detection."""
+"""Media storage helpers with intelligent country subfolder detection.
+
+Path resolution is backed by the in-memory media catalog (see media_catalog).
+"""
 
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
 from flask import current_app, has_app_context
 
 from ..config import BaseConfig
+from .media_catalog import (
+    DEFAULT_REFRESH_INTERVAL,
+    KIND_FULL,
+    KIND_HLS,
+    KIND_PEAKS,
+    KIND_SPLIT,
+    KIND_TRANSCRIPTS,
+    MediaCatalog,
+    MediaEntry,
+    get_catalog,
+)
 from ..runtime_paths import (
     get_audio_full_dir,
     get_audio_split_dir,
     get_audio_temp_dir,
+    get_hls_dir,
     get_media_root,
+    get_peaks_dir,
     get_transcripts_dir,
 )
 
@@ -54,6 +71,24 @@ def transcripts_dir() -> Path:
     return get_transcripts_dir()
 
 
+def hls_dir() -> Path:
+    if has_app_context():
+        configured = current_app.config.get("HLS_DIR")
+        return Path(configured) if configured else media_root() / "hls"
+    return get_hls_dir()
+
+
+def peaks_dir() -> Path:
+    if has_app_context():
+        configured = current_app.config.get("PEAKS_DIR")
+        return Path(configured) if configured else media_root() / "peaks"
+    return get_peaks_dir()
+
+
+_COUNTRY_CODE_RE = re.compile(r"\d{4}-\d{2}-\d{2}_([A-Z]{3}(?:-[A-Z]{3})?)")
+
+
+@lru_cache(maxsize=4096)
 def extract_country_code(filename: str) -> Optional[str]:
     """
     Extract country code from filename.
@@ -76,13 +111,142 @@ def extract_country_code(filename: str) -> Optional[str]:
     # - 3-letter codes: ARG, BOL, CHL, COL, CRI, CUB, DOM, ECU, ESP, GTM, HND,
     #                   MEX, NIC, PAN, PER, PRY, SLV, URY, VEN, USA
     # - Regional codes: ARG-CBA, ARG-CHU, ARG-SDE, ESP-CAN, ESP-SEV
-    match = re.match(r"\d{4}-\d{2}-\d{2}_([A-Z]{3}(?:-[A-Z]{3})?)", Path(filename).name)
+    match = _COUNTRY_CODE_RE.match(Path(filename).name)
     if match:
         return match.group(1)
 
     return None
 
 
+def _refresh_interval() -> float:
+    if has_app_context():
+        return float(
+            current_app.config.get(
+                "MEDIA_CATALOG_REFRESH_SECONDS", DEFAULT_REFRESH_INTERVAL
+            )
+        )
+    return DEFAULT_REFRESH_INTERVAL
+
+
+def full_catalog() -> MediaCatalog:
+    return get_catalog(KIND_FULL, audio_full_dir(), _refresh_interval())
+
+
+def split_catalog() -> MediaCatalog:
+    return get_catalog(KIND_SPLIT, audio_split_dir(), _refresh_interval())
+
+
+def transcript_catalog() -> MediaCatalog:
+    return get_catalog(KIND_TRANSCRIPTS, transcripts_dir(), _refresh_interval())
+
+
+def peaks_catalog() -> MediaCatalog:
+    return get_catalog(KIND_PEAKS, peaks_dir(), _refresh_interval())
+
+
+def hls_catalog() -> MediaCatalog:
+    return get_catalog(KIND_HLS, hls_dir(), _refresh_interval())
+
+
+def all_catalogs() -> list[MediaCatalog]:
+    return [
+        full_catalog(),
+        split_catalog(),
+        transcript_catalog(),
+        peaks_catalog(),
+        hls_catalog(),
+    ]
+
+
+def lookup_audio_full(filename: str) -> Optional[MediaEntry]:
+    """Catalog entry (path, size, mtime, duration) for a full recording."""
+    return full_catalog().lookup(filename, extract_country_code)
+
+
+def lookup_audio_split(filename: str) -> Optional[MediaEntry]:
+    """Catalog entry for a split chunk."""
+    return split_catalog().lookup(filename, extract_country_code)
+
+
+def lookup_transcript(filename: str) -> Optional[MediaEntry]:
+    """
+    Catalog entry for a transcript; ``entry.path`` may be the ``.json`` or the
+    newer ``.json.zst`` file (read it with ``src/scripts/transcript_io.py``).
+    """
+    return transcript_catalog().lookup(filename, extract_country_code)
+
+
+def lookup_peaks(filename: str) -> Optional[MediaEntry]:
+    """Catalog entry for a waveform peaks file (``.peaks`` or the ``.mp3`` name)."""
+    stem, dot, suffix = filename.rpartition(".")
+    if dot and suffix.lower() == "mp3":
+        filename = f"{stem}.peaks"
+    return peaks_catalog().lookup(filename, extract_country_code)
+
+
+HLS_PLAYLIST_NAME = "index.m3u8"
+_HLS_SEGMENT_RE = re.compile(r"seg_\d{5}\.mp3")
+
+
+def lookup_hls_playlist(recording: str) -> Optional[MediaEntry]:
+    """
+    Catalog entry for the streaming playlist of a recording.
+
+    ``recording`` is the MP3 stem with or without country folder
+    ("ARG/2023-08-10_ARG_Mitre" or "2023-08-10_ARG_Mitre"; a trailing
+    ".mp3" is ignored).
+    """
+    recording = recording.strip("/")
+    if recording.lower().endswith(".mp3"):
+        recording = recording[:-4]
+    if "/" not in recording:
+        country = extract_country_code(recording)
+        if country:
+            recording = f"{country}/{recording}"
+    return hls_catalog().lookup(f"{recording}/{HLS_PLAYLIST_NAME}")
+
+
+def hls_version(playlist: MediaEntry) -> str:
+    """Version of a streaming directory: changes whenever the pipeline rewrites it."""
+    return f"{int(playlist.mtime * 1_000_000):x}{playlist.size:x}"
+
+
+def versioned_playlist(playlist: MediaEntry) -> str:
+    """
+    Playlist text with ``?v=<version>`` appended to every segment URI.
+
+    Segment names repeat across pipeline runs; the version makes each run's
+    segments distinct URLs, so they can be cached for a long time without
+    mixing with the segments of another run.
+    """
+    version = hls_version(playlist)
+    lines = []
+    for line in playlist.path.read_text(encoding="utf-8").splitlines():
+        if _HLS_SEGMENT_RE.fullmatch(line.strip()):
+            line = f"{line.strip()}?v={version}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def safe_hls_file(recording: str, name: str) -> Optional[Path]:
+    """
+    Resolve a playlist or segment file of a recording's streaming directory.
+
+    Only the playlist is cataloged; segment names must match ``seg_NNNNN.mp3``
+    and are resolved next to it, so no client input reaches the filesystem
+    unchecked.
+    """
+    playlist = lookup_hls_playlist(recording)
+    if playlist is None:
+        return None
+    if name == HLS_PLAYLIST_NAME:
+        return playlist.path
+    if not _HLS_SEGMENT_RE.fullmatch(name):
+        return None
+    segment = playlist.path.parent / name
+    return segment if segment.is_file() else None
+
+
 def audio_full_path(filename: str) -> Path:
     return (audio_full_dir() / filename).resolve()
 
@@ -110,31 +274,13 @@ def safe_audio_full_path(filename: str) -> Optional[Path]:
     """
     Find audio file in mp3-full, with intelligent country subfolder detection.
 
-    Tries:
+    Tries (as catalog lookups, no filesystem access per request):
     1. Direct path if filename contains '/' (e.g., "VEN/2022-01-18_VEN_RCR.mp3")
     2. With country code subfolder (e.g., "2022-01-18_VEN_RCR.mp3" -> "VEN/...")
     3. Without subfolder (fallback for flat structure)
     """
-    try:
-        # Try 1: Direct path
-        candidate = audio_full_path(filename)
-        base_dir = audio_full_dir()
-        ensure_within(base_dir, candidate)
-        if candidate.exists():
-            return candidate
-
-        # Try 2: With country subfolder
-        country_code = extract_country_code(filename)
-        if country_code:
-            # Get just the filename without any existing path
-            base_filename = Path(filename).name
-            candidate_with_country = base_dir / country_code / base_filename
-            ensure_within(base_dir, candidate_with_country)
-            if candidate_with_country.exists():
-                return candidate_with_country
-    except ValueError:
-        return None
-    return None
+    entry = lookup_audio_full(filename)
+    return entry.path if entry else None
 
 
 def safe_audio_split_path(filename: str) -> Optional[Path]:
@@ -142,47 +288,13 @@ def safe_audio_split_path(filename: str) -> Optional[Path]:
     Find audio file in mp3-split, with intelligent country subfolder detection.
     Same logic as safe_audio_full_path but for split files.
     """
-    try:
-        # Try 1: Direct path
-        candidate = audio_split_path(filename)
-        base_dir = audio_split_dir()
-        ensure_within(base_dir, candidate)
-        if candidate.exists():
-            return candidate
-
-        # Try 2: With country subfolder
-        country_code = extract_country_code(filename)
-        if country_code:
-            base_filename = Path(filename).name
-            candidate_with_country = base_dir / country_code / base_filename
-            ensure_within(base_dir, candidate_with_country)
-            if candidate_with_country.exists():
-                return candidate_with_country
-    except ValueError:
-        return None
-    return None
+    entry = lookup_audio_split(filename)
+    return entry.path if entry else None
 
 
 def safe_transcript_path(filename: str) -> Optional[Path]:
     """
     Find transcript file in transcripts, with intelligent country subfolder detection.
     """
-    try:
-        # Try 1: Direct path
-        candidate = transcript_path(filename)
-        base_dir = transcripts_dir()
-        ensure_within(base_dir, candidate)
-        if candidate.exists():
-            return candidate
-
-        # Try 2: With country subfolder
-        country_code = extract_country_code(filename)
-        if country_code:
-            base_filename = Path(filename).name
-            candidate_with_country = base_dir / country_code / base_filename
-            ensure_within(base_dir, candidate_with_country)
-            if candidate_with_country.exists():
-                return candidate_with_country
-    except ValueError:
-        return None
-    return None
+    entry = lookup_transcript(filename)
+    return entry.path if entry else None
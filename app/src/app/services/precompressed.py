@@ -0,0 +1,211 @@
+"""Cache of final response bodies with precompressed gzip/brotli variants.
+
+Used for responses that are derived deterministically from one immutable
+runtime file (transcript JSON, columnar transcripts). Entries are keyed by
+source path, mtime and size plus a variant name, so a changed file simply
+produces a new key. The ETag is derived from the same key, which lets
+``If-None-Match`` revalidations be answered after a single ``stat`` call,
+without building or even looking up the body.
+
+Brotli comes from the ``Brotli`` package (``requirements.in``); without it
+(e.g. a bare script environment) only gzip and identity are offered.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from flask import Request, Response, current_app
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+ENCODING_IDENTITY = "identity"
+ENCODING_GZIP = "gzip"
+ENCODING_BROTLI = "br"
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+# Bump when the way bodies are derived from source files changes, so that
+# clients do not revalidate against ETags of the old representation.
+BODY_VERSION = "1"
+
+# Default memory budget for all cached variants (bytes).
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class SourceKey:
+    """Identity of a source file version plus the derived representation."""
+
+    path: Path
+    mtime_ns: int
+    size: int
+    variant: str
+
+    @classmethod
+    def for_path(cls, path: Path, variant: str) -> "SourceKey":
+        stat = Path(path).stat()
+        return cls(Path(path), stat.st_mtime_ns, stat.st_size, variant)
+
+    def etag(self, encoding: str = ENCODING_IDENTITY) -> str:
+        digest = hashlib.sha256(
+            f"{self.path}\0{self.mtime_ns}\0{self.size}\0{self.variant}\0{BODY_VERSION}".encode(
+                "utf-8"
+            )
+        ).hexdigest()[:32]
+        # Content-codings are distinct representations: distinct strong ETags
+        return digest if encoding == ENCODING_IDENTITY else f"{digest}-{encoding}"
+
+
+@dataclass(slots=True)
+class _Entry:
+    bodies: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+def available_encodings() -> list[str]:
+    """Content-codings this process can produce, in order of preference."""
+    encodings = [ENCODING_BROTLI] if brotli is not None else []
+    return encodings + [ENCODING_GZIP, ENCODING_IDENTITY]
+
+
+def negotiate_encoding(request: Request) -> str:
+    """Best available content-coding accepted by the client."""
+    accepted = request.accept_encodings
+    for encoding in available_encodings():
+        if encoding == ENCODING_IDENTITY:
+            break
+        if accepted[encoding]:
+            return encoding
+    return ENCODING_IDENTITY
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == ENCODING_BROTLI and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return body
+
+
+class PrecompressedCache:
+    """LRU of response bodies (all encodings) bounded by total size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[SourceKey, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: SourceKey, encoding: str, build: Callable[[], bytes]) -> bytes:
+        """Body of ``key`` in ``encoding``; builds/compresses on first use."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                body = entry.bodies.get(encoding)
+                if body is not None:
+                    return body
+                identity = entry.bodies.get(ENCODING_IDENTITY)
+            else:
+                identity = None
+
+        # Build/compress outside the lock; concurrent misses may duplicate work
+        if identity is None:
+            identity = build()
+        body = _compress(identity, encoding)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Older versions of the same source are unreachable now
+                for stale in [
+                    k
+                    for k in self._entries
+                    if k.path == key.path and k.variant == key.variant
+                ]:
+                    self._bytes -= self._entries.pop(stale).nbytes
+                entry = self._entries[key] = _Entry()
+            for name, data in ((ENCODING_IDENTITY, identity), (encoding, body)):
+                if name not in entry.bodies:
+                    entry.bodies[name] = data
+                    self._bytes += len(data)
+            self._entries.move_to_end(key)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_CACHE: Optional[PrecompressedCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache() -> PrecompressedCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            max_mb = float(
+                current_app.config.get("PRECOMPRESSED_CACHE_MB", DEFAULT_MAX_BYTES >> 20)
+            )
+            _CACHE = PrecompressedCache(int(max_mb * 1024 * 1024))
+        return _CACHE
+
+
+def clear_cache() -> None:
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.clear()
+
+
+def send_cached(
+    request: Request,
+    path: Path,
+    variant: str,
+    build: Callable[[], bytes],
+    *,
+    mimetype: str,
+    public: bool,
+) -> Response:
+    """
+    Respond with the cached body derived from ``path`` (``build`` on miss).
+
+    Answers ``If-None-Match`` with 304 before touching the body, negotiates
+    brotli/gzip via ``Accept-Encoding`` and sets a strong ETag per encoding.
+    Responses are revalidated on every use (``no-cache``).
+    """
+    key = SourceKey.for_path(path, variant)
+    encoding = negotiate_encoding(request)
+
+    if request.if_none_match.contains_weak(key.etag(encoding)):
+        response = current_app.response_class(status=304)
+    else:
+        body = _cache().get(key, encoding, build)
+        response = current_app.response_class(body, mimetype=mimetype)
+        if encoding != ENCODING_IDENTITY:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(key.etag(encoding))
+    response.vary.add("Accept-Encoding")
+    response.cache_control.no_cache = True
+    response.cache_control.public = bool(public)
+    response.cache_control.private = not public
+    return response
@@ -0,0 +1,190 @@
+"""Compact columnar transcript representation for the player.
+
+The transcript JSON repeats every key (``token_id``, ``start_ms``, ``lemma``,
+``pos``, ``morph`` ...) for every token. The columnar form stores each segment's
+words as parallel arrays and replaces repetitive string values (speakers, POS,
+lemmas and other annotation labels) with indexes into per-document tables::
+
+    {
+      "format": "columnar", "version": 1,
+      "filename": "...", "country": "...",          # top-level metadata
+      "tables": {"speaker": [...], "pos": [...], "lemma": [...], ...},
+      "segments": [
+        {"speaker_code": 0, "utt_start_ms": 0, "utt_end_ms": 5120,
+         "words": {"n": 12, "token_id": [...], "start_ms": [...], "pos": [3, 0, ...]}}
+      ]
+    }
+
+Word columns that are absent for every word of a segment are omitted; missing
+values inside a column are ``null``. Words that carry an explicit ``null`` are
+listed per key in ``words.nulls`` (``{"lemma": [4, 9]}``), so ``decode``
+restores the original document exactly (up to key order); the browser
+counterpart lives in
+``static/js/player/modules/transcript-columnar.js``.
+
+Encoded documents are built on first request; the route caches the body
+(and its compressed variants) via ``services/precompressed.py``.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from .transcript_files import transcript_io
+
+FORMAT_NAME = "columnar"
+FORMAT_VERSION = 1
+
+# Segment fields -> table name
+SEGMENT_TABLE_FIELDS = {"speaker": "speaker", "speaker_code": "speaker"}
+# Word fields -> table name (low-cardinality annotation labels)
+WORD_TABLE_FIELDS = {
+    "lemma": "lemma",
+    "pos": "pos",
+    "morph": "morph",
+    "dep": "dep",
+    "past_type": "tense",
+    "future_type": "tense",
+}
+
+
+class _Tables:
+    """Per-document dictionaries (value -> index, insertion ordered)."""
+
+    def __init__(self) -> None:
+        self._tables: dict[str, dict[Any, int]] = {}
+
+    def code(self, table: str, value: Any) -> Any:
+        # Only scalar strings are dictionary-encoded; anything else passes through
+        if not isinstance(value, str):
+            return value
+        entries = self._tables.setdefault(table, {})
+        index = entries.get(value)
+        if index is None:
+            index = entries[value] = len(entries)
+        return index
+
+    def as_lists(self) -> dict[str, list[Any]]:
+        return {name: list(entries) for name, entries in self._tables.items()}
+
+
+def _encode_words(words: list[Any], tables: _Tables) -> dict[str, Any]:
+    words = [word for word in words if isinstance(word, dict)]
+    columns: dict[str, list[Any]] = {}
+    # key -> positions of words with an explicit null (vs. key absent)
+    nulls: dict[str, list[int]] = {}
+    for position, word in enumerate(words):
+        for key, value in word.items():
+            if key not in columns:
+                # Backfill nulls for earlier words that lacked this key
+                columns[key] = [None] * position
+            if value is None:
+                nulls.setdefault(key, []).append(position)
+        for key, column in columns.items():
+            value = word.get(key)
+            table = WORD_TABLE_FIELDS.get(key)
+            column.append(tables.code(table, value) if table and value is not None else value)
+    encoded: dict[str, Any] = {"n": len(words)}
+    encoded.update(columns)
+    if nulls:
+        encoded["nulls"] = nulls
+    return encoded
+
+
+def encode_segments(segments: Iterable[Any]) -> dict[str, Any]:
+    """Encode a list of segments; returns ``{"tables": ..., "segments": ...}``."""
+    tables = _Tables()
+    encoded_segments = []
+    for segment in segments:
+        if not isinstance(segment, dict):
+            continue
+        encoded: dict[str, Any] = {}
+        for key, value in segment.items():
+            if key == "words" and isinstance(value, list):
+                encoded["words"] = _encode_words(value, tables)
+            elif key in SEGMENT_TABLE_FIELDS:
+                encoded[key] = tables.code(SEGMENT_TABLE_FIELDS[key], value)
+            else:
+                encoded[key] = value
+        encoded_segments.append(encoded)
+    return {"tables": tables.as_lists(), "segments": encoded_segments}
+
+
+def encode(document: dict[str, Any]) -> dict[str, Any]:
+    """Columnar form of a full transcript document."""
+    result: dict[str, Any] = {"format": FORMAT_NAME, "version": FORMAT_VERSION}
+    result.update(
+        {key: value for key, value in document.items() if key != "segments"}
+    )
+    result.update(encode_segments(document.get("segments") or []))
+    return result
+
+
+def _decode_value(tables: dict[str, list[Any]], table: str | None, value: Any) -> Any:
+    if table is None or not isinstance(value, int) or isinstance(value, bool):
+        return value
+    values = tables.get(table)
+    if values is None or not 0 <= value < len(values):
+        return value
+    return values[value]
+
+
+def decode(encoded: dict[str, Any]) -> dict[str, Any]:
+    """Restore the original document shape from ``encode`` output."""
+    tables = encoded.get("tables") or {}
+    document = {
+        key: value
+        for key, value in encoded.items()
+        if key not in ("format", "version", "tables", "segments")
+    }
+    segments = []
+    for encoded_segment in encoded.get("segments") or []:
+        segment: dict[str, Any] = {}
+        for key, value in encoded_segment.items():
+            if key == "words" and isinstance(value, dict):
+                count = value.get("n", 0)
+                nulls = value.get("nulls") or {}
+                columns = {k: v for k, v in value.items() if k not in ("n", "nulls")}
+                words = []
+                for i in range(count):
+                    word = {}
+                    for name, column in columns.items():
+                        item = column[i]
+                        if item is not None:
+                            word[name] = _decode_value(
+                                tables, WORD_TABLE_FIELDS.get(name), item
+                            )
+                    words.append(word)
+                for name, positions in nulls.items():
+                    for i in positions:
+                        words[i][name] = None
+                segment["words"] = words
+            else:
+                segment[key] = _decode_value(
+                    tables, SEGMENT_TABLE_FIELDS.get(key), value
+                )
+        segments.append(segment)
+    document["segments"] = segments
+    return document
+
+
+def dumps(encoded: dict[str, Any]) -> bytes:
+    """Compact JSON bytes (no whitespace) for the wire."""
+    return json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def encode_file(
+    path: Path, augment: Optional[Callable[[dict[str, Any]], None]] = None
+) -> bytes:
+    """
+    Columnar JSON body for a transcript file. ``augment`` may add derived
+    top-level fields (e.g. ``country_display``) before encoding.
+    """
+    document = transcript_io.read_transcript(path)
+    if augment is not None:
+        augment(document)
+    return dumps(encode(document))
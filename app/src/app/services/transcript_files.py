@@ -0,0 +1,34 @@
+"""Transcript file access (``.json`` / ``.json.zst``) for the web app.
+
+The player, segment index, columnar encoder and editor read transcripts with
+the same module as the pipelines, ``src/scripts/transcript_io.py``. It is
+loaded by path (as in ``_1_metadata/export_metadata.py``) because the app is
+imported both as ``src.app`` and as top-level ``app``, where ``src.scripts``
+is not a package.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+TRANSCRIPT_IO_PY = Path(__file__).resolve().parents[2] / "scripts" / "transcript_io.py"
+_MODULE_NAME = "corapan_transcript_io"
+
+
+def load_transcript_io() -> ModuleType:
+    module = sys.modules.get(_MODULE_NAME)
+    if module is not None:
+        return module
+    spec = importlib.util.spec_from_file_location(_MODULE_NAME, TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[_MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
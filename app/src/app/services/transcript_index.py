@@ -0,0 +1,255 @@
+"""Per-file segment offset index for transcript JSON files.
+
+Transcripts are one JSON object per recording with a (large) ``segments``
+array. To serve only the segments a player needs, each file is scanned once
+and the byte span of every segment inside the file is recorded together with
+its start/end time (from the word ``start_ms``/``end_ms``) and the token ids it
+contains. Range requests then read just the bytes of the selected segments
+from disk; the parsed segments are never kept in memory.
+
+Indexes are cached per path and invalidated when the file's mtime or size
+changes. ``.json.zst`` transcripts are indexed on their decompressed bytes;
+a range read decompresses the file again instead of seeking.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from .transcript_files import transcript_io
+
+# Number of file indexes kept in memory (LRU).
+DEFAULT_CACHE_SIZE = 64
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+@dataclass(slots=True)
+class TranscriptIndex:
+    """Segment offsets and timing for one transcript file."""
+
+    path: Path
+    mtime_ns: int
+    size: int
+    meta: dict[str, Any]
+    # Byte span [start, end) of each segment object in the file
+    spans: list[tuple[int, int]] = field(default_factory=list)
+    starts_ms: list[int] = field(default_factory=list)
+    ends_ms: list[int] = field(default_factory=list)
+    # Lowercased token_id -> segment index
+    tokens: dict[str, int] = field(default_factory=dict)
+    # Monotonic helpers for time lookups (robust against slightly unordered segments)
+    _max_end_prefix: list[int] = field(default_factory=list)
+    _min_start_suffix: list[int] = field(default_factory=list)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self.spans)
+
+    @property
+    def duration_ms(self) -> int:
+        return self._max_end_prefix[-1] if self._max_end_prefix else 0
+
+    def window_for_time(self, t0_ms: int, t1_ms: int) -> tuple[int, int]:
+        """Half-open segment window ``[start, end)`` overlapping ``[t0_ms, t1_ms]``."""
+        start = bisect_left(self._max_end_prefix, t0_ms)
+        end = bisect_right(self._min_start_suffix, t1_ms)
+        return start, max(start, end)
+
+    def segment_for_token(self, token_id: str) -> Optional[int]:
+        return self.tokens.get(token_id.strip().lower())
+
+    def read_segments(self, start: int, end: int) -> bytes:
+        """Raw JSON array (``[...]``) with segments ``start`` to ``end - 1``."""
+        start = max(0, start)
+        end = min(end, self.segment_count)
+        if start >= end:
+            return b"[]"
+        first = self.spans[start][0]
+        last = self.spans[end - 1][1]
+        if transcript_io.is_compressed(self.path):
+            chunk = transcript_io.read_transcript_bytes(self.path)[first:last]
+        else:
+            with open(self.path, "rb") as fh:
+                fh.seek(first)
+                chunk = fh.read(last - first)
+        # The chunk is the original array slice: segments plus their separators.
+        return b"[" + chunk + b"]"
+
+    def _finalize(self) -> None:
+        running = 0
+        self._max_end_prefix = []
+        for end in self.ends_ms:
+            running = max(running, end)
+            self._max_end_prefix.append(running)
+        suffix: list[int] = []
+        running_start: Optional[int] = None
+        for start in reversed(self.starts_ms):
+            running_start = start if running_start is None else min(running_start, start)
+            suffix.append(running_start)
+        suffix.reverse()
+        self._min_start_suffix = suffix
+
+
+def _skip_ws(text: str, idx: int) -> int:
+    return _WS.match(text, idx).end()
+
+
+def _segment_timing(segment: Any, previous_end: int) -> tuple[int, int]:
+    """(start_ms, end_ms) of a segment; segments without words sit at ``previous_end``."""
+    words = segment.get("words") if isinstance(segment, dict) else None
+    starts = []
+    ends = []
+    for word in words or ():
+        if not isinstance(word, dict):
+            continue
+        try:
+            if word.get("start_ms") is not None:
+                starts.append(int(float(word["start_ms"])))
+            if word.get("end_ms") is not None:
+                ends.append(int(float(word["end_ms"])))
+        except (TypeError, ValueError):
+            continue
+    if not starts and not ends:
+        return previous_end, previous_end
+    start = min(starts) if starts else min(ends)
+    end = max(ends) if ends else max(starts)
+    return start, max(start, end)
+
+
+def _segment_tokens(segment: Any) -> list[str]:
+    words = segment.get("words") if isinstance(segment, dict) else None
+    return [
+        str(word["token_id"]).strip().lower()
+        for word in words or ()
+        if isinstance(word, dict) and word.get("token_id")
+    ]
+
+
+def build_index(path: Path) -> TranscriptIndex:
+    """
+    Scan a transcript file and record the byte span of every segment.
+
+    The top-level object is walked key by key; every value except ``segments``
+    is decoded into ``meta``. Raises ``ValueError`` for files that are not a
+    JSON object.
+    """
+    path = Path(path)
+    stat = path.stat()
+    raw = transcript_io.read_transcript_bytes(path)
+    text = raw.decode("utf-8-sig")
+    # Byte offset of text position 0 (non-zero if the file starts with a BOM)
+    bom = len(raw) - len(text.encode("utf-8"))
+
+    index = TranscriptIndex(
+        path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size, meta={}
+    )
+
+    # Character -> byte offsets, advanced incrementally (files are UTF-8)
+    char_pos = 0
+    byte_pos = bom
+
+    def to_bytes(pos: int) -> int:
+        nonlocal char_pos, byte_pos
+        byte_pos += len(text[char_pos:pos].encode("utf-8"))
+        char_pos = pos
+        return byte_pos
+
+    idx = _skip_ws(text, 0)
+    if text[idx : idx + 1] != "{":
+        raise ValueError(f"{path.name}: transcript is not a JSON object")
+    idx = _skip_ws(text, idx + 1)
+
+    while idx < len(text) and text[idx] != "}":
+        if text[idx] != '"':
+            raise ValueError(f"{path.name}: unexpected character at {idx}")
+        key, idx = json.decoder.scanstring(text, idx + 1)
+        idx = _skip_ws(text, idx)
+        if text[idx : idx + 1] != ":":
+            raise ValueError(f"{path.name}: expected ':' at {idx}")
+        idx = _skip_ws(text, idx + 1)
+
+        if key == "segments" and text[idx : idx + 1] == "[":
+            idx = _skip_ws(text, idx + 1)
+            previous_end = 0
+            while text[idx : idx + 1] != "]":
+                segment, end = _DECODER.raw_decode(text, idx)
+                seg_index = len(index.spans)
+                index.spans.append((to_bytes(idx), to_bytes(end)))
+                start_ms, end_ms = _segment_timing(segment, previous_end)
+                index.starts_ms.append(start_ms)
+                index.ends_ms.append(end_ms)
+                previous_end = max(previous_end, end_ms)
+                for token_id in _segment_tokens(segment):
+                    index.tokens.setdefault(token_id, seg_index)
+                idx = _skip_ws(text, end)
+                if text[idx : idx + 1] == ",":
+                    idx = _skip_ws(text, idx + 1)
+                elif text[idx : idx + 1] != "]":
+                    raise ValueError(f"{path.name}: malformed segments array")
+            idx += 1
+        else:
+            value, idx = _DECODER.raw_decode(text, idx)
+            index.meta[key] = value
+
+        idx = _skip_ws(text, idx)
+        if text[idx : idx + 1] == ",":
+            idx = _skip_ws(text, idx + 1)
+
+    index._finalize()
+    return index
+
+
+class TranscriptIndexCache:
+    """Thread-safe LRU of :class:`TranscriptIndex` objects keyed by file path."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Path, TranscriptIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> TranscriptIndex:
+        """Index for ``path``, rebuilt if the file changed since it was cached."""
+        path = Path(path)
+        stat = path.stat()
+        with self._lock:
+            cached = self._entries.get(path)
+            if (
+                cached is not None
+                and cached.mtime_ns == stat.st_mtime_ns
+                and cached.size == stat.st_size
+            ):
+                self._entries.move_to_end(path)
+                return cached
+
+        index = build_index(path)
+        with self._lock:
+            self._entries[path] = index
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_CACHE = TranscriptIndexCache()
+
+
+def get_index(path: Path) -> TranscriptIndex:
+    """Cached segment index for a transcript file."""
+    return _CACHE.get(path)
+
+
+def clear_cache() -> None:
+    _CACHE.clear()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark document-metadata filters against per-token CQL constraints.
+
+Runs the advanced-search query mix against two BlackLab corpora built from
+the same transcripts:
+
+    --legacy-corpus   index from the default export (document fields on every token)
+    --docmeta-corpus  index from `blacklab_index_creation --doc-metadata`
+                      (corapan-tsv-docmeta.blf.yaml)
+
+Each query is built exactly like /search/advanced/data builds it
+(build_blacklab_query_from_request with BLS_DOC_METADATA off/on), so the
+legacy corpus gets token constraints and the docmeta corpus a Lucene
+`filter=`. Reports median/p95 latency per query and corpus, checks that
+both return the same number of hits, and (with --index-dir) the on-disk
+index sizes.
+
+Usage:
+    python -m src.scripts.benchmark_doc_filters \
+        --bls http://localhost:8081/blacklab-server \
+        --legacy-corpus corapan --docmeta-corpus corapan_docmeta \
+        --index-dir ../data/blacklab/index --index-dir ../data/blacklab/index_docmeta \
+        --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+logger = logging.getLogger(__name__)
+
+# (label, request args) - mirrors typical /search/advanced form submissions
+QUERY_MIX: list[tuple[str, list[tuple[str, str]]]] = [
+    ("lemma, default (national)", [("q", "casa"), ("mode", "lemma")]),
+    ("lemma, 1 country", [("q", "casa"), ("mode", "lemma"), ("country_code", "ARG")]),
+    (
+        "lemma, 3 countries",
+        [
+            ("q", "casa"),
+            ("mode", "lemma"),
+            ("country_code", "ARG"),
+            ("country_code", "MEX"),
+            ("country_code", "ESP"),
+        ],
+    ),
+    (
+        "forma, country + radio",
+        [("q", "pues"), ("mode", "forma"), ("country_code", "VEN"), ("radio", "Unión Radio")],
+    ),
+    (
+        "forma, country + speaker",
+        [("q", "pues"), ("mode", "forma"), ("country_code", "COL"), ("sex", "f")],
+    ),
+    ("2 tokens, incl. regional", [("q", "no sé"), ("mode", "forma"), ("include_regional", "1")]),
+    ("pos only, 1 country", [("q", "VERB"), ("mode", "pos"), ("country_code", "CHL")]),
+]
+
+
+def build_query(args: list[tuple[str, str]], doc_metadata: bool) -> dict[str, Any]:
+    """BlackLab params for one query, as the app would send them."""
+    from src.app.search.advanced_api import build_blacklab_query_from_request
+
+    app = Flask(__name__)
+    app.config["BLS_DOC_METADATA"] = doc_metadata
+    with app.app_context():
+        info = build_blacklab_query_from_request(MultiDict(args))
+    params = dict(info["params_base"])
+    params.update({"patt": info["patt"], "first": 0, "number": 50, "waitfortotal": "true"})
+    if info["filter"]:
+        params["filter"] = info["filter"]
+    return params
+
+
+def run_query(
+    client: httpx.Client, base_url: str, corpus: str, params: dict, repeat: int
+) -> dict[str, Any]:
+    timings = []
+    hits = None
+    url = f"{base_url}/corpora/{corpus}/hits"
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, params=params, headers={"Accept": "application/json"})
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        hits = response.json().get("summary", {}).get("numberOfHits")
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+    return {"median_ms": statistics.median(timings), "p95_ms": p95, "hits": hits}
+
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bls", default="http://localhost:8081/blacklab-server")
+    parser.add_argument("--legacy-corpus", required=True)
+    parser.add_argument("--docmeta-corpus", required=True)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--index-dir",
+        action="append",
+        type=Path,
+        default=[],
+        help="Index directory to report the size of (repeatable)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    base_url = args.bls.rstrip("/")
+    results = []
+    with httpx.Client(timeout=httpx.Timeout(120.0, connect=5.0)) as client:
+        for label, query_args in QUERY_MIX:
+            row: dict[str, Any] = {"query": label}
+            for key, corpus, doc_metadata in (
+                ("legacy", args.legacy_corpus, False),
+                ("docmeta", args.docmeta_corpus, True),
+            ):
+                params = build_query(query_args, doc_metadata)
+                # Warm-up, so both corpora are measured with warm caches
+                run_query(client, base_url, corpus, params, 1)
+                row[key] = run_query(client, base_url, corpus, params, args.repeat)
+            row["same_hits"] = row["legacy"]["hits"] == row["docmeta"]["hits"]
+            results.append(row)
+
+    sizes = {str(path): directory_size(path) for path in args.index_dir}
+
+    if args.json:
+        print(json.dumps({"queries": results, "index_bytes": sizes}, indent=2))
+        return 0
+
+    print(f"{'query':<28} {'legacy ms':>10} {'docmeta ms':>11} {'p95 L/D':>15} {'hits':>9}")
+    for row in results:
+        legacy, docmeta = row["legacy"], row["docmeta"]
+        hits = legacy["hits"] if row["same_hits"] else f"{legacy['hits']}!={docmeta['hits']}"
+        print(
+            f"{row['query']:<28} {legacy['median_ms']:>10.1f} {docmeta['median_ms']:>11.1f} "
+            f"{legacy['p95_ms']:>7.0f}/{docmeta['p95_ms']:<7.0f} {hits!s:>9}"
+        )
+    for path, size in sizes.items():
+        print(f"index {path}: {size / 1024 / 1024:.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
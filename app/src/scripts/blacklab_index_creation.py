@@ -10,6 +10,18 @@ Usage:
         --docmeta /data/bl_input/docmeta.jsonl \
         --workers 4
 
+With --doc-metadata, document-scoped fields (country, scope, city, radio,
+date, audio_path) are not repeated on every token. The TSV keeps the token
+and speaker columns plus file_id; the document fields are written to one
+linked JSON file per document (<docmeta dir>/metadata/<doc>.json), which
+corapan-tsv-docmeta.blf.yaml indexes as document metadata.
+
+Alongside docmeta.jsonl the export writes a term dictionary per annotation
+(<docmeta dir>/vocabulary/{word,lemma,norm}.tsv: term and frequency, sorted
+case- and accent-insensitively), used by the /search/suggest endpoint, and a
+trigram index of the terms (<annotation>.ngrams.tsv) used to expand infix and
+suffix regexes into term alternations.
+
 Features:
     - Idempotent: skips unchanged files (hash-based)
     - Validates mandatory token fields
@@ -26,18 +38,62 @@ import hashlib
 import json
 import logging
 import sys
+import threading
 import unicodedata
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
 
+from . import transcript_io
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 logger = logging.getLogger(__name__)
 
+TSV_COLUMNS = (
+    "word",
+    "norm",
+    "lemma",
+    "pos",
+    "tense",
+    "mood",
+    "person",
+    "number",
+    "aspect",
+    "PastType",
+    "FutureType",
+    "tokid",
+    "start_ms",
+    "end_ms",
+    "sentence_id",
+    "utterance_id",
+    "speaker_code",
+    "speaker_type",
+    "speaker_sex",
+    "speaker_mode",
+    "speaker_discourse",
+    "file_id",
+    "country_code",
+    "country_scope",
+    "country_parent_code",
+    "country_region_code",
+    "city",
+    "radio",
+    "date",
+    "audio_path",
+)
+# Columns that are identical for every token of a document (omitted with --doc-metadata)
+DOC_LEVEL_COLUMNS = TSV_COLUMNS[TSV_COLUMNS.index("country_code") :]
+TOKEN_TSV_COLUMNS = TSV_COLUMNS[: TSV_COLUMNS.index("country_code")]
+# Annotations with a term dictionary (vocabulary/<annotation>.tsv)
+VOCABULARY_ANNOTATIONS = ("word", "lemma", "norm")
+# Character n-gram size of the term expansion index (<annotation>.ngrams.tsv)
+NGRAM_SIZE = 3
+
 
 @dataclass
 class TokenMeta:
@@ -82,42 +138,43 @@ class TokenFull:
     date: str = ""
     audio_path: str = ""
 
-    def to_tsv_row(self) -> str:
-        """Export to TSV row."""
-        return "\t".join(
-            [
-                self.text,
-                self.meta.norm,
-                self.meta.lemma,
-                self.meta.pos,
-                self.tense,
-                self.mood,
-                self.person,
-                self.number,
-                self.aspect,
-                self.PastType,
-                self.FutureType,
-                self.meta.token_id,
-                str(self.meta.start_ms),
-                str(self.meta.end_ms),
-                self.meta.sentence_id,
-                self.meta.utterance_id,
-                self.speaker_code,
-                self.speaker_type,
-                self.speaker_sex,
-                self.speaker_mode,
-                self.speaker_discourse,
-                self.file_id,
-                self.country_code,
-                self.country_scope,
-                self.country_parent_code,
-                self.country_region_code,
-                self.city,
-                self.radio,
-                self.date,
-                self.audio_path,
-            ]
-        )
+    def to_tsv_row(self, doc_metadata: bool = False) -> str:
+        """Export to TSV row (without document-level columns if ``doc_metadata``)."""
+        values = [
+            self.text,
+            self.meta.norm,
+            self.meta.lemma,
+            self.meta.pos,
+            self.tense,
+            self.mood,
+            self.person,
+            self.number,
+            self.aspect,
+            self.PastType,
+            self.FutureType,
+            self.meta.token_id,
+            str(self.meta.start_ms),
+            str(self.meta.end_ms),
+            self.meta.sentence_id,
+            self.meta.utterance_id,
+            self.speaker_code,
+            self.speaker_type,
+            self.speaker_sex,
+            self.speaker_mode,
+            self.speaker_discourse,
+            self.file_id,
+            self.country_code,
+            self.country_scope,
+            self.country_parent_code,
+            self.country_region_code,
+            self.city,
+            self.radio,
+            self.date,
+            self.audio_path,
+        ]
+        if doc_metadata:
+            values = values[: len(TOKEN_TSV_COLUMNS)]
+        return "\t".join(values)
 
 
 def _normalize_unicode(s: str) -> str:
@@ -301,8 +358,7 @@ def _compute_content_hash(corpus_doc: dict[str, Any]) -> str:
 def _load_json_corpus(json_file: Path) -> Optional[dict[str, Any]]:
     """Load JSON corpus document."""
     try:
-        with open(json_file, encoding="utf-8") as f:
-            return json.load(f)
+        return transcript_io.read_transcript(json_file)
     except (json.JSONDecodeError, UnicodeDecodeError) as e:
         logger.error(f"Failed to load {json_file}: {e}")
         return None
@@ -313,9 +369,17 @@ def export_to_tsv(
     json_file: Path,
     output_dir: Path,
     skip_cache: dict[str, str],
+    doc_metadata: bool = False,
+    vocabulary: Optional["TermCounter"] = None,
 ) -> tuple[bool, str]:
-    """Export corpus document to TSV; return (success, message)."""
-    file_id = json_file.stem  # e.g., "2023-08-10_ARG_Mitre"
+    """
+    Export corpus document to TSV; return (success, message).
+
+    With ``doc_metadata`` the document-level columns are left out (they are
+    indexed from the linked metadata file instead). Term frequencies of the
+    exported tokens are added to ``vocabulary``.
+    """
+    file_id = transcript_io.transcript_stem(json_file)  # e.g., "2023-08-10_ARG_Mitre"
 
     # Check idempotency
     content_hash = _compute_content_hash(corpus_doc)
@@ -377,20 +441,17 @@ def export_to_tsv(
 
     # Write TSV
     tsv_file = output_dir / f"{file_id}.tsv"
+    columns = TOKEN_TSV_COLUMNS if doc_metadata else TSV_COLUMNS
     try:
         with open(tsv_file, "w", encoding="utf-8") as f:
-            # Header with all new fields
-            f.write(
-                "word\tnorm\tlemma\tpos\ttense\tmood\tperson\tnumber\taspect\tPastType\tFutureType\t"
-                "tokid\tstart_ms\tend_ms\tsentence_id\tutterance_id\t"
-                "speaker_code\tspeaker_type\tspeaker_sex\tspeaker_mode\tspeaker_discourse\t"
-                "file_id\tcountry_code\tcountry_scope\tcountry_parent_code\tcountry_region_code\tcity\tradio\tdate\taudio_path\n"
-            )
+            f.write("\t".join(columns) + "\n")
             # Data rows
             for token in tokens:
-                f.write(token.to_tsv_row() + "\n")
+                f.write(token.to_tsv_row(doc_metadata) + "\n")
 
         skip_cache[file_id] = content_hash
+        if vocabulary is not None:
+            vocabulary.add_tokens(tokens)
         logger.info(f"Created {tsv_file} ({len(tokens)} tokens)")
         return (True, f"Created {file_id}.tsv ({len(tokens)} tokens)")
 
@@ -399,12 +460,91 @@ def export_to_tsv(
         return (False, f"Write error: {e}")
 
 
+def fold_term(term: str) -> str:
+    """Case- and accent-insensitive sort key (same as the app's collation_key)."""
+    decomposed = unicodedata.normalize("NFKD", term)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class TermCounter:
+    """Term frequencies per annotation, shared by the export workers."""
+
+    def __init__(self) -> None:
+        self.counts: dict[str, Counter] = {name: Counter() for name in VOCABULARY_ANNOTATIONS}
+        self._lock = threading.Lock()
+
+    def add_tokens(self, tokens: list[TokenFull]) -> None:
+        local = {name: Counter() for name in VOCABULARY_ANNOTATIONS}
+        for token in tokens:
+            local["word"][token.text] += 1
+            local["lemma"][token.meta.lemma] += 1
+            local["norm"][token.meta.norm] += 1
+        with self._lock:
+            for name, counter in local.items():
+                counter.pop("", None)
+                self.counts[name].update(counter)
+
+
+def _write_atomic(target: Path, lines) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+    tmp.replace(target)
+
+
+def ngram_postings(keys: list[str], n: int = NGRAM_SIZE) -> dict[str, list[int]]:
+    """Term ids (positions in ``keys``) per character n-gram of the folded terms."""
+    postings: dict[str, list[int]] = {}
+    for term_id, key in enumerate(keys):
+        for gram in {key[i : i + n] for i in range(len(key) - n + 1)}:
+            postings.setdefault(gram, []).append(term_id)
+    return postings
+
+
+def write_vocabulary(vocabulary_dir: Path, vocabulary: TermCounter) -> list[Path]:
+    """
+    Write ``<annotation>.tsv`` (term, frequency) sorted by folded term, and
+    ``<annotation>.ngrams.tsv``: for every n-gram of the folded terms the
+    ascending line numbers of the terms containing it (delta-encoded).
+    """
+    vocabulary_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, counter in vocabulary.counts.items():
+        terms = sorted(counter, key=lambda t: (fold_term(t), t))
+        target = vocabulary_dir / f"{name}.tsv"
+        _write_atomic(target, (f"{term}\t{counter[term]}" for term in terms))
+        written.append(target)
+
+        postings = ngram_postings([fold_term(term) for term in terms])
+
+        def ngram_lines():
+            yield f"#terms\t{len(terms)}\t{NGRAM_SIZE}"
+            for gram in sorted(postings):
+                ids = postings[gram]
+                deltas = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+                yield f"{gram}\t{','.join(map(str, deltas))}"
+
+        target = vocabulary_dir / f"{name}.ngrams.tsv"
+        _write_atomic(target, ngram_lines())
+        written.append(target)
+    return written
+
+
+def write_linked_metadata(metadata_dir: Path, docmeta: dict[str, Any]) -> Path:
+    """Write the per-document metadata JSON linked from the TSV (``<doc>.json``)."""
+    metadata_dir.mkdir(parents=True, exist_ok=True)
+    target = metadata_dir / f"{docmeta['doc']}.json"
+    target.write_text(json.dumps(docmeta, ensure_ascii=False), encoding="utf-8")
+    return target
+
+
 def collect_json_files(in_dir: Path) -> list[Path]:
-    """Collect all *.json files recursively (sorted alphabetically)."""
+    """Collect all *.json / *.json.zst files recursively (sorted alphabetically)."""
     # Resolve relative paths from project root
     in_dir = Path(in_dir).resolve()
 
-    json_files = sorted(in_dir.rglob("*.json"))
+    json_files = transcript_io.iter_transcript_files(in_dir, recursive=True)
     logger.info(f"Found {len(json_files)} JSON files in {in_dir}")
     return json_files
 
@@ -417,9 +557,12 @@ def run_export(
     workers: int,
     limit: Optional[int],
     dry_run: bool,
+    doc_metadata: bool = False,
 ) -> dict[str, Any]:
     """Run export; return summary."""
     out_dir.mkdir(parents=True, exist_ok=True)
+    metadata_dir = docmeta_file.parent / "metadata"
+    vocabulary = TermCounter()
 
     json_files = collect_json_files(in_dir)
     if limit:
@@ -442,10 +585,17 @@ def run_export(
             return (False, f"Failed to load {json_file}", None)
 
         # TSV export (TSV-only format)
-        success, msg = export_to_tsv(corpus_doc, json_file, out_dir, skip_cache)
+        success, msg = export_to_tsv(
+            corpus_doc,
+            json_file,
+            out_dir,
+            skip_cache,
+            doc_metadata=doc_metadata,
+            vocabulary=vocabulary,
+        )
 
         # Build docmeta with new country fields
-        file_id = json_file.stem
+        file_id = transcript_io.transcript_stem(json_file)
         docmeta = {
             "doc": file_id,
             "file_id": corpus_doc.get("file_id", file_id),
@@ -465,6 +615,8 @@ def run_export(
             return (True, msg, None)  # No docmeta update for skipped
 
         if success:
+            if doc_metadata:
+                write_linked_metadata(metadata_dir, docmeta)
             return (True, msg, docmeta)
         else:
             error_log.append({"file": str(json_file), "error": msg})
@@ -476,7 +628,7 @@ def run_export(
             corpus_doc = _load_json_corpus(json_file)
             if corpus_doc:
                 logger.info(
-                    f"  {json_file.stem}: {len(corpus_doc.get('segments', []))} segments"
+                    f"  {transcript_io.transcript_stem(json_file)}: {len(corpus_doc.get('segments', []))} segments"
                 )
                 if corpus_doc.get("segments"):
                     tokens = corpus_doc["segments"][0].get("words", [])[:3]
@@ -519,6 +671,16 @@ def run_export(
             logger.error(f"Failed to write docmeta: {e}")
             errors += 1
 
+    # Write term dictionaries (only after a full export, a partial one would
+    # replace the dictionaries with a subset)
+    if created and not skipped and not limit:
+        try:
+            paths = write_vocabulary(docmeta_file.parent / "vocabulary", vocabulary)
+            logger.info(f"Wrote term dictionaries: {', '.join(p.name for p in paths)}")
+        except OSError as e:
+            logger.error(f"Failed to write term dictionaries: {e}")
+            errors += 1
+
     # Write error log if any
     if error_log:
         error_file = out_dir / "export_errors.jsonl"
@@ -572,6 +734,12 @@ def main() -> int:
     parser.add_argument(
         "--dry-run", action="store_true", help="Dry-run mode (no writes)"
     )
+    parser.add_argument(
+        "--doc-metadata",
+        action="store_true",
+        help="Write document fields as linked metadata instead of TSV columns "
+        "(index with corapan-tsv-docmeta.blf.yaml, run the app with BLS_DOC_METADATA=true)",
+    )
 
     args = parser.parse_args()
 
@@ -603,6 +771,7 @@ def main() -> int:
         workers=args.workers,
         limit=args.limit,
         dry_run=args.dry_run,
+        doc_metadata=args.doc_metadata,
     )
 
     logger.info(f"Export complete: {result}")
@@ -0,0 +1,138 @@
+"""
+Frequency tables: token counts per annotation value and metadata slice.
+
+Built by the stats pipeline (``maintenance_pipelines/_0_json/03_build_metadata_stats.py``)
+from the annotated transcripts and written to ``stats_frequencies.db`` next to
+the other public stats DBs. The app serves them from ``/api/frequencies``
+(``src/app/services/frequencies.py``) without contacting BlackLab.
+
+Schema::
+
+    terms(id, annotation, term, folded, freq)    one row per distinct value,
+                                                 freq = count over the whole corpus
+    frequencies(term_id, country, sex, speaker_type, mode, freq)
+                                                 count per metadata slice
+    meta(key, value)                             build stamp, documents, tokens
+
+Every annotation value of a token is counted once per slice
+(country x speaker_sex x speaker_type x speaker_mode of its segment); empty
+values are skipped. The module only uses the standard library so the pipeline
+can load it by path (like ``transcript_io``).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+# Annotation -> key in the transcript word objects
+ANNOTATIONS = {"word": "text", "lemma": "lemma", "pos": "pos", "norm": "norm"}
+# Slice column -> key in the segment speaker object (country comes from the document)
+SPEAKER_DIMENSIONS = {"sex": "speaker_sex", "speaker_type": "speaker_type", "mode": "speaker_mode"}
+DIMENSIONS = ("country", *SPEAKER_DIMENSIONS)
+
+
+def fold_term(term: str) -> str:
+    """Case- and accent-insensitive key (same as the app's collation_key)."""
+    decomposed = unicodedata.normalize("NFKD", term)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class FrequencyCounter:
+    """Counts of (annotation, term, country, sex, speaker_type, mode)."""
+
+    def __init__(self) -> None:
+        self.counts: Counter = Counter()
+        self.documents = 0
+        self.tokens = 0
+
+    def add_document(self, data: dict[str, Any], country_code: str) -> None:
+        local: Counter = Counter()
+        for segment in data.get("segments", []):
+            speaker = segment.get("speaker", {})
+            if not isinstance(speaker, dict):
+                speaker = {}
+            slice_key = (country_code, *(str(speaker.get(key, "") or "") for key in SPEAKER_DIMENSIONS.values()))
+            for word in segment.get("words", []):
+                self.tokens += 1
+                for annotation, key in ANNOTATIONS.items():
+                    value = unicodedata.normalize("NFKC", str(word.get(key, "") or "")).strip()
+                    if value:
+                        local[(annotation, value, *slice_key)] += 1
+        self.counts.update(local)
+        self.documents += 1
+
+
+def write_frequency_db(db_path: Path, counter: FrequencyCounter) -> dict[str, int]:
+    """
+    Write ``counter`` to ``db_path`` (replaced atomically) and return the
+    number of distinct terms per annotation.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    term_ids: dict[tuple[str, str], int] = {}
+    totals: Counter = Counter()
+    for (annotation, term, *_), freq in counter.counts.items():
+        totals[(annotation, term)] += freq
+    for annotation, term in sorted(totals, key=lambda k: (k[0], fold_term(k[1]), k[1])):
+        term_ids[(annotation, term)] = len(term_ids) + 1
+
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE terms (
+                id INTEGER PRIMARY KEY,
+                annotation TEXT NOT NULL,
+                term TEXT NOT NULL,
+                folded TEXT NOT NULL,
+                freq INTEGER NOT NULL
+            );
+            CREATE TABLE frequencies (
+                term_id INTEGER NOT NULL,
+                country TEXT NOT NULL,
+                sex TEXT NOT NULL,
+                speaker_type TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                freq INTEGER NOT NULL
+            );
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO terms (id, annotation, term, folded, freq) VALUES (?, ?, ?, ?, ?)",
+            ((term_id, ann, term, fold_term(term), totals[(ann, term)]) for (ann, term), term_id in term_ids.items()),
+        )
+        conn.executemany(
+            "INSERT INTO frequencies (term_id, country, sex, speaker_type, mode, freq) VALUES (?, ?, ?, ?, ?, ?)",
+            sorted((term_ids[(ann, term)], *slice_key, freq) for (ann, term, *slice_key), freq in counter.counts.items()),
+        )
+        conn.executescript(
+            """
+            CREATE INDEX idx_terms_rank ON terms (annotation, freq DESC);
+            CREATE INDEX idx_terms_folded ON terms (annotation, folded);
+            CREATE INDEX idx_frequencies_term ON frequencies (term_id);
+            CREATE INDEX idx_frequencies_country ON frequencies (country, term_id);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("built_at", datetime.now(timezone.utc).isoformat()),
+                ("documents", str(counter.documents)),
+                ("tokens", str(counter.tokens)),
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    tmp_path.replace(db_path)
+
+    per_annotation = Counter(annotation for annotation, _ in term_ids)
+    return {annotation: per_annotation[annotation] for annotation in ANNOTATIONS}
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Transcript I/O: read and write transcript JSON as plain ``.json`` or ``.json.zst``.
+
+Full-corpus passes (pipelines 01-04, export_metadata.py,
+blacklab_index_creation.py) are dominated by reading large pretty-printed
+JSON files. Zstandard-compressed transcripts are a fraction of the size and
+decompress faster than the disk can deliver the plain file. A dictionary
+trained on the corpus improves the ratio further, because every transcript
+repeats the same keys and annotation labels.
+
+All readers go through this module (pipelines directly; the web app via the
+media catalog, ``services/transcript_index.py``, ``transcript_columnar.py``
+and the editor), so each transcript may exist as either ``<stem>.json`` or
+``<stem>.json.zst``. If both exist, the newer file wins (the web editor
+writes plain JSON next to a compressed original).
+
+Dictionary: passed explicitly or via ``CORAPAN_ZSTD_DICT`` (path to a file
+created with ``train-dict``). Files compressed with a dictionary can only be
+read with the same dictionary.
+
+Usage:
+    python -m src.scripts.transcript_io compress   media/transcripts [--dict D] [--level 19] [--remove-source]
+    python -m src.scripts.transcript_io decompress media/transcripts [--dict D] [--remove-source]
+    python -m src.scripts.transcript_io train-dict media/transcripts --out transcripts.zdict [--size 112640]
+
+Pipeline scripts outside ``app/`` load this file via
+``importlib.util.spec_from_file_location`` (same pattern as ``countries.py``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional for plain-JSON setups
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+JSON_SUFFIX = ".json"
+ZST_SUFFIX = ".json.zst"
+DICT_ENV = "CORAPAN_ZSTD_DICT"
+
+DEFAULT_LEVEL = 19
+DEFAULT_DICT_SIZE = 112_640
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise RuntimeError(
+            "Reading/writing .json.zst transcripts requires the 'zstandard' package "
+            "(pip install zstandard)"
+        )
+
+
+def is_transcript_file(path: Path) -> bool:
+    name = path.name.lower()
+    return name.endswith(ZST_SUFFIX) or name.endswith(JSON_SUFFIX)
+
+
+def transcript_stem(path: Path) -> str:
+    """File stem without ``.json`` / ``.json.zst``."""
+    name = path.name
+    lower = name.lower()
+    if lower.endswith(ZST_SUFFIX):
+        return name[: -len(ZST_SUFFIX)]
+    if lower.endswith(JSON_SUFFIX):
+        return name[: -len(JSON_SUFFIX)]
+    return path.stem
+
+
+def iter_transcript_files(directory: Path, recursive: bool = False) -> list[Path]:
+    """
+    Transcript files in ``directory`` (sorted by stem), one per transcript.
+
+    ``<stem>.json`` and ``<stem>.json.zst`` are the same transcript; the more
+    recently modified file is returned.
+    """
+    directory = Path(directory)
+    candidates: Iterable[Path] = (
+        directory.rglob("*") if recursive else directory.glob("*")
+    )
+    chosen: dict[tuple[Path, str], Path] = {}
+    for path in candidates:
+        if not path.is_file() or not is_transcript_file(path):
+            continue
+        key = (path.parent, transcript_stem(path))
+        current = chosen.get(key)
+        if current is None or path.stat().st_mtime > current.stat().st_mtime:
+            chosen[key] = path
+    return [chosen[key] for key in sorted(chosen, key=lambda k: (str(k[0]), k[1]))]
+
+
+@lru_cache(maxsize=4)
+def _load_dictionary_bytes(path: str) -> bytes:
+    return Path(path).read_bytes()
+
+
+def load_dictionary(path: Optional[Path | str] = None) -> Optional["zstandard.ZstdCompressionDict"]:
+    """Dictionary from ``path`` or ``$CORAPAN_ZSTD_DICT`` (None if neither is set)."""
+    path = path or os.environ.get(DICT_ENV)
+    if not path:
+        return None
+    _require_zstandard()
+    return zstandard.ZstdCompressionDict(_load_dictionary_bytes(str(path)))
+
+
+def is_compressed(path: Path) -> bool:
+    return Path(path).name.lower().endswith(ZST_SUFFIX)
+
+
+def read_transcript_bytes(path: Path, dictionary=None) -> bytes:
+    """Raw JSON bytes of a ``.json`` or ``.json.zst`` transcript."""
+    path = Path(path)
+    raw = path.read_bytes()
+    if not is_compressed(path):
+        return raw
+    _require_zstandard()
+    if dictionary is None:
+        dictionary = load_dictionary()
+    return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(raw)
+
+
+def read_transcript(path: Path, dictionary=None) -> Any:
+    """Parse a ``.json`` or ``.json.zst`` transcript."""
+    return json.loads(read_transcript_bytes(path, dictionary).decode("utf-8-sig"))
+
+
+def resolve_transcript(path: Path) -> Optional[Path]:
+    """
+    Existing file of the transcript ``path`` names (``.json`` or ``.json.zst``
+    spelling); the newer one if both exist, None if neither does.
+    """
+    path = Path(path)
+    best: Optional[Path] = None
+    best_mtime = -1
+    for candidate in (plain_path(path), compressed_path(path)):
+        try:
+            stat = candidate.stat()
+        except OSError:
+            continue
+        if candidate.is_file() and stat.st_mtime_ns > best_mtime:
+            best, best_mtime = candidate, stat.st_mtime_ns
+    return best
+
+
+def encode_bytes(
+    data: Any,
+    *,
+    compress: bool,
+    indent: Optional[int] = 2,
+    level: int = DEFAULT_LEVEL,
+    dictionary=None,
+) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+    if not compress:
+        return payload
+    _require_zstandard()
+    cctx = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    return cctx.compress(payload)
+
+
+def write_transcript(
+    path: Path,
+    data: Any,
+    *,
+    indent: Optional[int] = 2,
+    level: int = DEFAULT_LEVEL,
+    dictionary=None,
+) -> None:
+    """
+    Atomically write a transcript; compressed if ``path`` ends in ``.json.zst``.
+
+    Compressed files are written without indentation (whitespace only costs
+    compression time); ``decompress`` restores readable JSON.
+    """
+    path = Path(path)
+    compress = path.name.lower().endswith(ZST_SUFFIX)
+    if compress and dictionary is None:
+        dictionary = load_dictionary()
+    payload = encode_bytes(
+        data,
+        compress=compress,
+        indent=None if compress else indent,
+        level=level,
+        dictionary=dictionary,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+
+def compressed_path(path: Path) -> Path:
+    return path.with_name(transcript_stem(path) + ZST_SUFFIX)
+
+
+def plain_path(path: Path) -> Path:
+    return path.with_name(transcript_stem(path) + JSON_SUFFIX)
+
+
+def train_dictionary(paths: Iterable[Path], size: int = DEFAULT_DICT_SIZE) -> bytes:
+    """Train a zstd dictionary on the (plain JSON) bytes of ``paths``."""
+    _require_zstandard()
+    samples = [
+        encode_bytes(read_transcript(path), compress=False, indent=None)
+        for path in paths
+    ]
+    if not samples:
+        raise ValueError("No transcripts to train a dictionary on")
+    return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+def _convert(
+    directory: Path,
+    *,
+    to_compressed: bool,
+    dictionary,
+    level: int,
+    remove_source: bool,
+) -> int:
+    converted = 0
+    for path in iter_transcript_files(directory, recursive=True):
+        # Editor backups (<country>/backup/) stay plain JSON
+        if "backup" in path.relative_to(directory).parts:
+            continue
+        if is_compressed(path) == to_compressed:
+            continue
+        target = compressed_path(path) if to_compressed else plain_path(path)
+        data = read_transcript(path, dictionary=dictionary)
+        write_transcript(target, data, level=level, dictionary=dictionary)
+        os.utime(target, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns))
+        if remove_source:
+            path.unlink()
+        converted += 1
+    return converted
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("compress", "decompress"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("directory", type=Path)
+        cmd.add_argument("--dict", dest="dictionary", type=Path, default=None)
+        cmd.add_argument("--level", type=int, default=DEFAULT_LEVEL)
+        cmd.add_argument(
+            "--remove-source",
+            action="store_true",
+            help="Delete the source file after a successful conversion",
+        )
+    train = sub.add_parser("train-dict")
+    train.add_argument("directory", type=Path)
+    train.add_argument("--out", type=Path, required=True)
+    train.add_argument("--size", type=int, default=DEFAULT_DICT_SIZE)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if args.command == "train-dict":
+        data = train_dictionary(
+            iter_transcript_files(args.directory, recursive=True), size=args.size
+        )
+        args.out.write_bytes(data)
+        logger.info("Dictionary written: %s (%d bytes)", args.out, len(data))
+        return 0
+
+    dictionary = load_dictionary(args.dictionary)
+    converted = _convert(
+        args.directory,
+        to_compressed=args.command == "compress",
+        dictionary=dictionary,
+        level=args.level,
+        remove_source=args.remove_source,
+    )
+    logger.info("%s: %d file(s) converted", args.command, converted)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
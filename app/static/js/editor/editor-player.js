@@ -6,6 +6,7 @@
 
 import AudioPlayer from "../player/modules/audio.js";
 import TranscriptionManager from "../player/modules/transcription.js";
+import WaveformOverview from "../player/modules/waveform.js";
 import { WordEditor } from "./word-editor.js";
 import BookmarkManager from "./bookmark-manager.js";
 import { HistoryPanel } from "./history-panel.js";
@@ -14,6 +15,7 @@ export class EditorPlayer {
   constructor(config) {
     this.config = config;
     this.audio = null;
+    this.waveform = null;
     this.transcription = null;
     this.editor = null;
     this.bookmarks = null;
@@ -35,6 +37,10 @@ export class EditorPlayer {
       const audioPath = `/media/full/${this.config.audioFile}`;
       this.audio.init(audioPath);
 
+      // Waveform overview from precomputed peaks (non-blocking, optional)
+      this.waveform = new WaveformOverview(this.audio);
+      this.waveform.init(audioPath);
+
       // Initialize transcription manager
       this.transcription = new TranscriptionManager(this.audio, null); // No token collector
 
@@ -5,6 +5,18 @@
 import { MEDIA_ENDPOINT } from "../search/config.js";
 import { trackAudioPlay } from "../analytics.js";
 
+/**
+ * Opus/WebM snippets are ~4x smaller than MP3; request them where supported.
+ * Downloads stay MP3 for compatibility.
+ */
+const OPUS_SUPPORTED = (() => {
+  try {
+    return new Audio().canPlayType('audio/webm; codecs="opus"') !== "";
+  } catch (e) {
+    return false;
+  }
+})();
+
 export class AdvancedAudioManager {
   constructor() {
     this.currentAudio = null;
@@ -171,6 +183,7 @@ export class AdvancedAudioManager {
     let audioUrl = `${MEDIA_ENDPOINT}/play_audio/${filename}?start=${start}&end=${end}&t=${timestamp}`;
     if (tokenId) audioUrl += `&token_id=${encodeURIComponent(tokenId)}`;
     if (snippetType) audioUrl += `&type=${encodeURIComponent(snippetType)}`;
+    if (OPUS_SUPPORTED) audioUrl += "&format=opus";
     this.currentAudio = new Audio(audioUrl);
     try {
       this.currentAudio.volume = 1.0;
@@ -16,6 +16,26 @@ export function escapeHtml(text) {
   return String(text).replace(/[&<>"']/g, (m) => map[m]);
 }
 
+/**
+ * Summary note for sampled results (``sample`` block of the backend response)
+ * @param {Object|null} sample - {percentage, number, seed, size, estimated_total, estimated_total_ci}
+ * @returns {string} HTML ("" if the results are not sampled)
+ */
+export function formatSampleNote(sample) {
+  if (!sample) return "";
+  const fmt = (n) => Number(n).toLocaleString("es-ES");
+  let text =
+    sample.mode === "percentage"
+      ? `Muestra aleatoria del ${fmt(sample.percentage)} %`
+      : `Muestra aleatoria de ${fmt(sample.number)} resultados`;
+  text += ` (semilla ${escapeHtml(sample.seed)}), recuentos aproximados`;
+  if (sample.estimated_total != null && sample.estimated_total_ci) {
+    const [low, high] = sample.estimated_total_ci;
+    text += ` · total estimado ≈ ${fmt(sample.estimated_total)} (IC 95 %: ${fmt(low)}–${fmt(high)})`;
+  }
+  return ` <span class="md3-advanced__summary-separator">|</span> <span class="md3-advanced__summary-filters" title="Los recuentos se calculan sobre una muestra; repetir la búsqueda con la misma semilla da el mismo resultado">${text}</span>`;
+}
+
 function extractCountryCode(base) {
   const match = base.match(/\d{4}-\d{2}-\d{2}_([A-Z]{3}(?:-[A-Z]{3})?)/);
   return match ? match[1] : "";
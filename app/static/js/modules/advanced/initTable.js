@@ -23,6 +23,7 @@ let currentParams = null;
 import {
   makeBaseConfig,
   escapeHtml,
+  formatSampleNote,
   renderAudioButtons,
   renderFileLink,
 } from "./datatableFactory.js";
@@ -388,6 +389,24 @@ function handleBackendError(json) {
         "The search backend took too long to respond. Please try again or simplify your query.",
       severity: "warning",
     },
+    upstream_overloaded: {
+      icon: "hourglass_empty",
+      title: "Búsqueda sobrecargada",
+      message: errorMessage,
+      severity: "warning",
+    },
+    query_too_expensive: {
+      icon: "speed",
+      title: "Consulta demasiado costosa",
+      message: errorMessage,
+      severity: "warning",
+    },
+    slow_lane_busy: {
+      icon: "hourglass_empty",
+      title: "Búsqueda sobrecargada",
+      message: errorMessage,
+      severity: "warning",
+    },
     upstream_error: {
       icon: "cloud_queue",
       title: "Backend Error",
@@ -475,6 +494,16 @@ function handleDataTablesError(xhr) {
 
   try {
     const response = JSON.parse(xhr.responseText);
+    if (
+      ["upstream_overloaded", "query_too_expensive", "slow_lane_busy"].includes(
+        response.error,
+      )
+    ) {
+      // 503 from the BlackLab circuit breaker / slow lane, 400 from the
+      // query cost estimator: explain instead of a generic error
+      handleBackendError(response);
+      return;
+    }
     if (response.error === "invalid_cql") {
       errorType = "cql_syntax";
       errorMsg = `Sintaxis CQL inválida: ${response.message}`;
@@ -630,6 +659,9 @@ export function updateSummary(data, queryParams, initialLoad = false) {
     html += ` <span class="md3-advanced__summary-separator">|</span> <span class="md3-advanced__summary-filters">${activeFilters.join(", ")}</span>`;
   }
 
+  // Sampled results: counts are approximate
+  html += formatSampleNote(data.sample);
+
   // Update summary box content
   summaryBox.innerHTML = html;
   summaryBox.hidden = false;
@@ -9,6 +9,7 @@ import { initRegionalToggle } from "./regional-toggle.js";
 import { initSearchMode } from "./searchMode.js";
 import { SearchFilters } from "./filters.js";
 import { CqlBuilder } from "./cqlBuilder.js";
+import { initSuggest } from "./suggest.js";
 
 // Import modules that have side-effects (auto-init) or are dependencies
 import "./config.js";
@@ -24,6 +25,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initStatsTabAdvanced();
     initRegionalToggle();
     initSearchMode();
+    initSuggest();
 
     // Initialize filters for both forms
     const formSimple = document.getElementById('form-simple');
@@ -66,7 +66,7 @@ export function validateQuery(query) {
  * Build CQL preview (client-side, simplified)
  * @param {Object} params - Form parameters
  * @param {string} params.q - Query
- * @param {string} params.mode - Mode (forma, forma_exacta, lemma)
+ * @param {string} params.mode - Mode (forma, forma_exacta, contains, lemma)
  * @param {boolean} params.ci - Case insensitive
  * @param {boolean} params.da - Diacritics agnostic
  * @param {string} params.pos - POS tags (comma-separated)
@@ -93,6 +93,9 @@ export function buildCQLPreview(params) {
     } else if (mode === "lemma") {
       field = "lemma";
       value = token.toLowerCase();
+    } else if (mode === "contains") {
+      field = ci || da ? "norm" : "word";
+      value = `.*${ci || da ? token.toLowerCase() : token}.*`;
     } else {
       // forma
       if (ci || da) {
@@ -103,6 +103,11 @@ function focusTokenResults() {
   }
 }
 function handleTokenDataTablesError(xhr) {
+  if (xhr.status === 503 && xhr.responseJSON && xhr.responseJSON.message) {
+    // BlackLab circuit breaker open: show the friendly message
+    handleTokenBackendError(xhr.responseJSON);
+    return;
+  }
   const errorMsg = `DataTables Error: HTTP ${xhr.status}`;
   console.error("[Token]", errorMsg);
   alert(`Error loading results: ${errorMsg}`);
@@ -296,6 +296,12 @@ export class SearchUI {
     const ignoreAdvanced = document.getElementById('ignore-accents-advanced');
     if (ignoreAdvanced) ignoreAdvanced.checked = ignore;
 
+    const sampled = Boolean(params.get("sample"));
+    ["sample-simple", "sample-advanced"].forEach((id) => {
+      const sampleBox = document.getElementById(id);
+      if (sampleBox) sampleBox.checked = sampled;
+    });
+
     const regional = params.get("include_regional") === "1" || params.get("include_regional") === "true";
     const regSimple = document.getElementById('include-regional-simple');
     if (regSimple) {
@@ -514,6 +520,8 @@ export class SearchUI {
           params.set("mode", "forma");
         } else if (uiSearchType === "forma_exacta") {
           params.set("mode", "forma_exacta");
+        } else if (uiSearchType === "contiene") {
+          params.set("mode", "contains");
         } else {
           params.set("mode", "simple"); // Default fallback
         }
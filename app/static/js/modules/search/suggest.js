@@ -0,0 +1,78 @@
+/**
+ * Term suggestions for the simple search field.
+ * Completes the last word of the query from /search/suggest (term dictionary
+ * of the index export, no BlackLab request) via a <datalist>.
+ */
+
+const ANNOTATION_BY_TYPE = {
+  forma: "norm",
+  forma_exacta: "word",
+  lema: "lemma",
+};
+const DEBOUNCE_MS = 150;
+const MIN_PREFIX = 2;
+
+export function initSuggest(
+  inputId = "q",
+  typeSelectId = "search_type_simple",
+) {
+  const input = document.getElementById(inputId);
+  if (!input || input.dataset.suggestBound) return;
+  input.dataset.suggestBound = "1";
+
+  const typeSelect = document.getElementById(typeSelectId);
+  const datalist = document.createElement("datalist");
+  datalist.id = `${inputId}-suggestions`;
+  input.after(datalist);
+  input.setAttribute("list", datalist.id);
+  input.setAttribute("autocomplete", "off");
+
+  let timer = null;
+  let controller = null;
+
+  async function update() {
+    const value = input.value;
+    const cut = value.search(/\S+$/);
+    const prefix = cut >= 0 ? value.slice(cut) : "";
+    // No prefix completion for "contiene" (infix search)
+    const annotation = ANNOTATION_BY_TYPE[typeSelect?.value || "forma"];
+    if (
+      !annotation ||
+      prefix.length < MIN_PREFIX ||
+      /[*?.\[\]"]/.test(prefix)
+    ) {
+      datalist.replaceChildren();
+      return;
+    }
+    const params = new URLSearchParams({ q: prefix, annotation, limit: "10" });
+
+    controller?.abort();
+    controller = new AbortController();
+    try {
+      const response = await fetch(`/search/suggest?${params}`, {
+        signal: controller.signal,
+      });
+      if (!response.ok) return;
+      const data = await response.json();
+      const head = value.slice(0, cut);
+      datalist.replaceChildren(
+        ...(data.suggestions || []).map((s) => {
+          const option = document.createElement("option");
+          option.value = head + s.term;
+          option.label = `${s.term} (${s.freq})`;
+          return option;
+        }),
+      );
+    } catch (error) {
+      if (error.name !== "AbortError") {
+        console.warn("[Suggest] Could not load suggestions:", error);
+      }
+    }
+  }
+
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(update, DEBOUNCE_MS);
+  });
+  typeSelect?.addEventListener("change", update);
+}
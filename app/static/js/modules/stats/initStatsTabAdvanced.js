@@ -13,7 +13,10 @@ import {
   disposeChart,
   updateChartTheme,
 } from "./renderBar.js";
-import { escapeHtml } from "../advanced/datatableFactory.js";
+import {
+  escapeHtml,
+  formatSampleNote,
+} from "../advanced/datatableFactory.js";
 
 // State management
 let isLoading = false;
@@ -77,8 +80,10 @@ function showError() {
 
 /**
  * Update total count display
+ * @param {number} total - Total hits (sample size when sampled)
+ * @param {Object|null} sample - Sample description from the backend
  */
-function updateTotal(total) {
+function updateTotal(total, sample = null) {
   const summaryBox = document.getElementById("stats-summary");
   if (!summaryBox) return;
 
@@ -128,6 +133,9 @@ function updateTotal(total) {
     html += ` <span class="md3-advanced__summary-separator">|</span> <span class="md3-advanced__summary-filters">${activeFilters.join(", ")}</span>`;
   }
 
+  // Sampled statistics: counts are approximate
+  html += formatSampleNote(sample);
+
   summaryBox.innerHTML = html;
 }
 
@@ -241,7 +249,7 @@ function renderCharts(data) {
   });
 
   // Update total (backend returns total_hits)
-  updateTotal(data.total_hits || data.total || 0);
+  updateTotal(data.total_hits || data.total || 0, data.sample);
 
   // Render country chart (Horizontal)
   const countryContainer = document.getElementById("chart-country");
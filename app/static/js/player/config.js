@@ -17,6 +17,23 @@ export const PLAYER_CONFIG = {
 
   // Media endpoints
   MEDIA_ENDPOINT: "/media",
+  PEAKS_ENDPOINT: "/media/peaks",
+  HLS_ENDPOINT: "/media/hls",
+  TRANSCRIPT_SEGMENTS_ENDPOINT: "/media/transcript-segments",
+  TRANSCRIPT_COLUMNS_ENDPOINT: "/media/transcript-columns",
+
+  // Lazy transcript loading (player page): segments per request and how far
+  // ahead of the playhead segments must be loaded
+  LAZY_TRANSCRIPT: true,
+  // Compact columnar transcript format (parallel arrays + label tables)
+  COLUMNAR_TRANSCRIPT: true,
+  TRANSCRIPT_WINDOW_SEGMENTS: 100,
+  TRANSCRIPT_LOOKAHEAD_SECONDS: 60,
+
+  // Segmented streaming (used when /media/hls/... exists for a recording)
+  USE_SEGMENTED_STREAM: true,
+  STREAM_LOOKAHEAD_SECONDS: 30,
+  STREAM_BACK_BUFFER_SECONDS: 120,
 
   // Responsive breakpoints
   MOBILE_SMALL: 400,
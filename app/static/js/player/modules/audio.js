@@ -5,10 +5,12 @@
  */
 
 import { PLAYER_CONFIG } from "../config.js";
+import SegmentedStream from "./segmented-stream.js";
 
 export class AudioPlayer {
   constructor() {
     this.audioElement = null;
+    this.stream = null; // SegmentedStream if HLS segments are used
     this.controls = {};
     this.ctrlSpaceActive = false;
     this.onPlay = null; // Callback for play event
@@ -43,8 +45,7 @@ export class AudioPlayer {
         ? audioFile
         : `${PLAYER_CONFIG.MEDIA_ENDPOINT}/${audioFile}`;
 
-    this.audioElement.src = audioPath;
-    console.log("[Audio] Loading audio from:", audioPath);
+    this._setSource(audioPath);
 
     // Error handling
     this.audioElement.addEventListener("error", (e) => {
@@ -74,6 +75,36 @@ export class AudioPlayer {
     document.querySelector(".custom-audio-player").prepend(this.audioElement);
   }
 
+  /**
+   * Use the segmented stream if available, otherwise the MP3 itself
+   * @private
+   */
+  _setSource(audioPath) {
+    const useDirect = () => {
+      this.audioElement.src = audioPath;
+      console.log("[Audio] Loading audio from:", audioPath);
+    };
+    if (!PLAYER_CONFIG.USE_SEGMENTED_STREAM) {
+      useDirect();
+      return;
+    }
+
+    const stream = new SegmentedStream();
+    stream
+      .attach(this.audioElement, audioPath)
+      .then((attached) => {
+        if (attached) {
+          this.stream = stream;
+        } else {
+          useDirect();
+        }
+      })
+      .catch((error) => {
+        console.warn("[Audio] Segmented stream failed, using MP3:", error);
+        useDirect();
+      });
+  }
+
   /**
    * Get all control elements from DOM
    * @private
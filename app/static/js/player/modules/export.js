@@ -78,6 +78,8 @@ export class ExportManager {
     }
 
     try {
+      // Lazy-loaded transcriptions: fetch the remaining segments first
+      await this.transcriptionManager.ensureComplete?.();
       const jsonString = JSON.stringify(
         this.transcriptionManager.transcriptionData,
         null,
@@ -112,6 +114,8 @@ export class ExportManager {
     }
 
     try {
+      // Lazy-loaded transcriptions: fetch the remaining segments first
+      await this.transcriptionManager.ensureComplete?.();
       const txtContent = this._generateTextContent();
       const blob = new Blob([txtContent], { type: "text/plain" });
       const url = URL.createObjectURL(blob);
@@ -0,0 +1,252 @@
+/**
+ * Segmented Stream Module
+ * Plays full recordings from HLS-style MP3 segments (/media/hls/...) instead
+ * of one large MP3, so startup and seek latency depend on segment size.
+ * @module player/modules/segmented-stream
+ *
+ * - Safari: native HLS (audio.src = playlist)
+ * - Other browsers: Media Source Extensions with an "audio/mpeg" SourceBuffer;
+ *   segments around the playhead are fetched on demand
+ * - No playlist or no MSE support: caller falls back to /media/full
+ */
+
+import { PLAYER_CONFIG } from "../config.js";
+
+const HLS_MIME = "application/vnd.apple.mpegurl";
+const SEGMENT_MIME = "audio/mpeg";
+
+export class SegmentedStream {
+  constructor() {
+    this.audio = null;
+    this.playlistUrl = null;
+    this.segments = []; // [{ url, start, duration }]
+    this.mediaSource = null;
+    this.sourceBuffer = null;
+    this.appended = new Set();
+    this.pumping = false;
+    this.generation = 0;
+  }
+
+  /**
+   * Derive the playlist URL for a /media/full/... audio path.
+   * @param {string} audioPath
+   * @returns {string|null}
+   */
+  static playlistUrlFor(audioPath) {
+    const fullPrefix = `${PLAYER_CONFIG.MEDIA_ENDPOINT}/full/`;
+    if (!audioPath || !audioPath.startsWith(fullPrefix)) return null;
+    const recording = audioPath
+      .slice(fullPrefix.length)
+      .split("?")[0]
+      .replace(/\.mp3$/i, "");
+    return `${PLAYER_CONFIG.HLS_ENDPOINT}/${recording}/index.m3u8`;
+  }
+
+  /**
+   * Attach the segmented stream to an audio element.
+   * @param {HTMLAudioElement} audio
+   * @param {string} audioPath - /media/full/... URL of the recording
+   * @returns {Promise<boolean>} false if the caller should use audioPath directly
+   */
+  async attach(audio, audioPath) {
+    this.playlistUrl = SegmentedStream.playlistUrlFor(audioPath);
+    if (!this.playlistUrl) return false;
+
+    const nativeHls = audio.canPlayType(HLS_MIME) !== "";
+    const mse =
+      window.MediaSource && window.MediaSource.isTypeSupported(SEGMENT_MIME);
+    if (!nativeHls && !mse) return false;
+
+    let playlistText;
+    try {
+      const response = await fetch(this.playlistUrl, {
+        credentials: "same-origin",
+      });
+      if (!response.ok) return false;
+      playlistText = await response.text();
+    } catch (error) {
+      console.warn("[Stream] Playlist unavailable:", error);
+      return false;
+    }
+
+    this.segments = this._parsePlaylist(playlistText);
+    if (!this.segments.length) return false;
+
+    this.audio = audio;
+    if (nativeHls) {
+      console.log("[Stream] Using native HLS:", this.playlistUrl);
+      audio.src = this.playlistUrl;
+      return true;
+    }
+
+    console.log(
+      `[Stream] Using MSE with ${this.segments.length} segments:`,
+      this.playlistUrl,
+    );
+    this._attachMediaSource();
+    return true;
+  }
+
+  /**
+   * Parse #EXTINF durations and segment URIs (relative to the playlist).
+   * @private
+   */
+  _parsePlaylist(text) {
+    const segments = [];
+    let pendingDuration = null;
+    let start = 0;
+    for (const rawLine of text.split(/\r?\n/)) {
+      const line = rawLine.trim();
+      if (!line) continue;
+      if (line.startsWith("#EXTINF:")) {
+        pendingDuration = parseFloat(line.slice(8));
+      } else if (!line.startsWith("#") && pendingDuration !== null) {
+        segments.push({
+          url: new URL(line, new URL(this.playlistUrl, window.location.href))
+            .href,
+          start,
+          duration: pendingDuration,
+        });
+        start += pendingDuration;
+        pendingDuration = null;
+      }
+    }
+    return segments;
+  }
+
+  /**
+   * @private
+   */
+  _attachMediaSource() {
+    this.mediaSource = new MediaSource();
+    this.audio.src = URL.createObjectURL(this.mediaSource);
+
+    this.mediaSource.addEventListener("sourceopen", () => {
+      this.sourceBuffer = this.mediaSource.addSourceBuffer(SEGMENT_MIME);
+      const last = this.segments[this.segments.length - 1];
+      this.mediaSource.duration = last.start + last.duration;
+      this._pump();
+    });
+
+    this.audio.addEventListener("seeking", () => {
+      this.generation += 1;
+      this._pump();
+    });
+    this.audio.addEventListener("timeupdate", () => this._pump());
+  }
+
+  /**
+   * Index of the segment containing `time`.
+   * @private
+   */
+  _segmentIndexAt(time) {
+    let lo = 0;
+    let hi = this.segments.length - 1;
+    while (lo < hi) {
+      const mid = (lo + hi + 1) >> 1;
+      if (this.segments[mid].start <= time) lo = mid;
+      else hi = mid - 1;
+    }
+    return lo;
+  }
+
+  /**
+   * Append missing segments from the playhead up to the lookahead window.
+   * @private
+   */
+  async _pump() {
+    if (this.pumping || !this.sourceBuffer) return;
+    this.pumping = true;
+    try {
+      let generation = this.generation;
+      let index = this._segmentIndexAt(this.audio.currentTime);
+      while (index < this.segments.length) {
+        if (generation !== this.generation) {
+          // Seek happened: restart from the new playhead
+          generation = this.generation;
+          index = this._segmentIndexAt(this.audio.currentTime);
+          continue;
+        }
+        const segment = this.segments[index];
+        if (
+          segment.start >
+          this.audio.currentTime + PLAYER_CONFIG.STREAM_LOOKAHEAD_SECONDS
+        ) {
+          break;
+        }
+        if (!this.appended.has(index)) {
+          await this._evictBehindPlayhead();
+          await this._appendSegment(index);
+        }
+        index += 1;
+      }
+      if (
+        this.appended.size === this.segments.length &&
+        this.mediaSource.readyState === "open"
+      ) {
+        this.mediaSource.endOfStream();
+      }
+    } catch (error) {
+      console.error("[Stream] Segment loading failed:", error);
+    } finally {
+      this.pumping = false;
+    }
+  }
+
+  /**
+   * @private
+   */
+  async _appendSegment(index) {
+    const segment = this.segments[index];
+    const response = await fetch(segment.url, { credentials: "same-origin" });
+    if (!response.ok) {
+      throw new Error(`Segment ${index} failed: HTTP ${response.status}`);
+    }
+    const data = await response.arrayBuffer();
+    this.sourceBuffer.timestampOffset = segment.start;
+    await this._whenUpdated(() => this.sourceBuffer.appendBuffer(data));
+    this.appended.add(index);
+  }
+
+  /**
+   * Keep the SourceBuffer bounded: drop media far behind the playhead.
+   * @private
+   */
+  async _evictBehindPlayhead() {
+    const keepFrom =
+      this.audio.currentTime - PLAYER_CONFIG.STREAM_BACK_BUFFER_SECONDS;
+    const buffered = this.sourceBuffer.buffered;
+    if (!buffered.length || buffered.start(0) >= keepFrom || keepFrom <= 0) {
+      return;
+    }
+    await this._whenUpdated(() => this.sourceBuffer.remove(0, keepFrom));
+    for (const index of [...this.appended]) {
+      const segment = this.segments[index];
+      if (segment.start + segment.duration <= keepFrom) {
+        this.appended.delete(index);
+      }
+    }
+  }
+
+  /**
+   * Run a SourceBuffer operation and wait for `updateend`.
+   * @private
+   */
+  _whenUpdated(operation) {
+    return new Promise((resolve, reject) => {
+      const onEnd = () => {
+        this.sourceBuffer.removeEventListener("error", onError);
+        resolve();
+      };
+      const onError = (event) => {
+        this.sourceBuffer.removeEventListener("updateend", onEnd);
+        reject(event);
+      };
+      this.sourceBuffer.addEventListener("updateend", onEnd, { once: true });
+      this.sourceBuffer.addEventListener("error", onError, { once: true });
+      operation();
+    });
+  }
+}
+
+export default SegmentedStream;
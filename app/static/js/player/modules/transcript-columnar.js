@@ -0,0 +1,86 @@
+/**
+ * Columnar Transcript Decoder
+ * Restores the regular transcript shape from the compact columnar form
+ * served by /media/transcript-columns and /media/transcript-segments?format=columnar.
+ * @module player/modules/transcript-columnar
+ *
+ * Format (see src/app/services/transcript_columnar.py):
+ *   tables:   { speaker: [...], pos: [...], lemma: [...], ... }
+ *   segments: [{ speaker_code: <table index>, ..., words: { n, token_id: [...], pos: [...] } }]
+ *   words.nulls (optional): { key: [positions] } of words with an explicit null
+ */
+
+export const COLUMNAR_FORMAT = "columnar";
+
+const SEGMENT_TABLE_FIELDS = { speaker: "speaker", speaker_code: "speaker" };
+const WORD_TABLE_FIELDS = {
+  lemma: "lemma",
+  pos: "pos",
+  morph: "morph",
+  dep: "dep",
+  past_type: "tense",
+  future_type: "tense",
+};
+
+function decodeValue(tables, table, value) {
+  if (!table || !Number.isInteger(value)) return value;
+  const values = tables[table];
+  return values && value >= 0 && value < values.length ? values[value] : value;
+}
+
+/**
+ * Decode the words column block of one segment.
+ * @private
+ */
+function decodeWords(tables, block) {
+  const count = block.n || 0;
+  const names = Object.keys(block).filter((name) => name !== "n" && name !== "nulls");
+  const words = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const word = {};
+    for (const name of names) {
+      const item = block[name][i];
+      if (item !== null && item !== undefined) {
+        word[name] = decodeValue(tables, WORD_TABLE_FIELDS[name], item);
+      }
+    }
+    words[i] = word;
+  }
+  for (const [name, positions] of Object.entries(block.nulls || {})) {
+    for (const i of positions) words[i][name] = null;
+  }
+  return words;
+}
+
+/**
+ * Decode segments encoded against `tables`.
+ * @param {Object} tables
+ * @param {Array} segments
+ * @returns {Array}
+ */
+export function decodeSegments(tables, segments) {
+  return (segments || []).map((encoded) => {
+    const segment = {};
+    for (const [key, value] of Object.entries(encoded)) {
+      if (key === "words" && value && !Array.isArray(value)) {
+        segment.words = decodeWords(tables, value);
+      } else {
+        segment[key] = decodeValue(tables, SEGMENT_TABLE_FIELDS[key], value);
+      }
+    }
+    return segment;
+  });
+}
+
+/**
+ * Decode a columnar document (no-op for documents in the regular format).
+ * @param {Object} data
+ * @returns {Object}
+ */
+export function decodeColumnar(data) {
+  if (!data || data.format !== COLUMNAR_FORMAT) return data;
+  const { format, version, tables, segments, ...meta } = data;
+  return { ...meta, segments: decodeSegments(tables || {}, segments) };
+}
+
+export default decodeColumnar;
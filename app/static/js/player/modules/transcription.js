@@ -5,6 +5,8 @@
  */
 
 import { formatMorphLeipzig } from "../../morph_formatter.js";
+import { PLAYER_CONFIG } from "../config.js";
+import { decodeColumnar, COLUMNAR_FORMAT } from "./transcript-columnar.js";
 
 export class TranscriptionManager {
   constructor(audioPlayer, tokenCollector) {
@@ -23,6 +25,18 @@ export class TranscriptionManager {
 
     // Feature flag: disable click-to-play (for editor mode)
     this.disableClickPlay = false;
+
+    // Lazy loading via /media/transcript-segments (player only; the editor
+    // needs the complete document)
+    this.lazyLoad = false;
+    // Request the compact columnar transcript format (player only)
+    this.columnar = false;
+    this.segmentsUrl = null;
+    this.segmentCount = 0;
+    this.loadedUntilMs = 0;
+    this._pendingWindow = null;
+    this._lazySentinel = null;
+    this._lazyObserver = null;
   }
 
   /**
@@ -43,35 +57,11 @@ export class TranscriptionManager {
     });
 
     try {
-      // Ensure relative URL for same-origin requests (avoids CORS issues)
-      const url = new URL(transcriptionFile, location.origin);
-      console.log("[Transcription] Resolved URL:", url.toString());
-
-      const response = await fetch(url, {
-        credentials: "same-origin",
-        cache: "no-store",
-      });
-
-      console.log(
-        "[Transcription] Fetch response status:",
-        response.status,
-        response.statusText,
-      );
-
-      if (!response.ok) {
-        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      const loadedLazily =
+        this.lazyLoad && (await this._loadLazy(transcriptionFile));
+      if (!loadedLazily) {
+        await this._loadFull(transcriptionFile);
       }
-
-      this.transcriptionData = await response.json();
-      console.log(
-        "[Transcription] JSON parsed successfully, segments:",
-        this.transcriptionData.segments?.length || "unknown",
-      );
-
-      // Prefer server-provided display name (field `country_display`). Do not
-      // attempt client-side lookup — rely on server augmentation.
-      this._updateMetadata();
-      this._renderSegments();
       // If we have a target token but no direct match in the rendered markup,
       // perform a DOM query to ensure the element exists and scroll to it.
       if (this.targetTokenId) {
@@ -129,6 +119,252 @@ export class TranscriptionManager {
     }
   }
 
+  /**
+   * Fetch the whole transcription JSON and render it.
+   * @private
+   */
+  async _loadFull(transcriptionFile) {
+    // Ensure relative URL for same-origin requests (avoids CORS issues)
+    const columnsUrl = this.columnar
+      ? TranscriptionManager.columnsUrlFor(transcriptionFile)
+      : null;
+    const url = new URL(columnsUrl || transcriptionFile, location.origin);
+    console.log("[Transcription] Resolved URL:", url.toString());
+
+    const response = await fetch(url, {
+      credentials: "same-origin",
+      cache: "no-cache", // revalidate via ETag (304) instead of refetching
+    });
+
+    console.log(
+      "[Transcription] Fetch response status:",
+      response.status,
+      response.statusText,
+    );
+
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    this.transcriptionData = decodeColumnar(await response.json());
+    console.log(
+      "[Transcription] JSON parsed successfully, segments:",
+      this.transcriptionData.segments?.length || "unknown",
+    );
+
+    // Prefer server-provided display name (field `country_display`). Do not
+    // attempt client-side lookup — rely on server augmentation.
+    this._updateMetadata();
+    this._renderSegments();
+  }
+
+  /**
+   * Segment range URL for a /media/transcripts/... path (null for other URLs).
+   * @param {string} transcriptionFile
+   * @returns {string|null}
+   */
+  static segmentsUrlFor(transcriptionFile) {
+    const prefix = `${PLAYER_CONFIG.MEDIA_ENDPOINT}/transcripts/`;
+    const path = new URL(transcriptionFile, location.origin).pathname;
+    if (!path.startsWith(prefix)) return null;
+    return `${PLAYER_CONFIG.TRANSCRIPT_SEGMENTS_ENDPOINT}/${path.slice(prefix.length)}`;
+  }
+
+  /**
+   * Columnar transcript URL for a /media/transcripts/... path.
+   * @param {string} transcriptionFile
+   * @returns {string|null}
+   */
+  static columnsUrlFor(transcriptionFile) {
+    const prefix = `${PLAYER_CONFIG.MEDIA_ENDPOINT}/transcripts/`;
+    const path = new URL(transcriptionFile, location.origin).pathname;
+    if (!path.startsWith(prefix)) return null;
+    return `${PLAYER_CONFIG.TRANSCRIPT_COLUMNS_ENDPOINT}/${path.slice(prefix.length)}`;
+  }
+
+  /**
+   * Load the transcription window by window from /media/transcript-segments.
+   * Renders the first window (or everything up to the target token) and
+   * appends further windows while the user scrolls or playback advances.
+   * @private
+   * @returns {Promise<boolean>} false if the caller should load the full file
+   */
+  async _loadLazy(transcriptionFile) {
+    this.segmentsUrl = TranscriptionManager.segmentsUrlFor(transcriptionFile);
+    if (!this.segmentsUrl) return false;
+
+    let first;
+    try {
+      first = await this._fetchSegmentWindow({
+        start: 0,
+        count: PLAYER_CONFIG.TRANSCRIPT_WINDOW_SEGMENTS,
+      });
+    } catch (error) {
+      console.warn("[Transcription] Segment endpoint unavailable:", error);
+      return false;
+    }
+
+    const { segments, ...meta } = first;
+    this.segmentCount = meta.segment_count;
+    // Keep transcriptionData shaped like the full JSON document
+    for (const key of ["segment_count", "duration_ms", "start", "end"]) {
+      delete meta[key];
+    }
+    this.transcriptionData = { ...meta, segments: [] };
+    this.loadedUntilMs = 0;
+    this._updateMetadata();
+
+    const container = document.getElementById("transcriptionContainer");
+    if (container) container.innerHTML = "";
+    this._appendSegments(segments);
+
+    if (this.targetTokenId) {
+      try {
+        const hit = await this._fetchSegmentWindow({
+          token: this.targetTokenId,
+          count: 1,
+        });
+        await this._loadThrough(
+          hit.start + PLAYER_CONFIG.TRANSCRIPT_WINDOW_SEGMENTS,
+        );
+      } catch (error) {
+        console.debug("[Transcription] Target token not indexed:", error);
+      }
+    }
+
+    this._observeLazyLoading();
+    console.log(
+      `[Transcription] Lazy loading: ${this.transcriptionData.segments.length}/${this.segmentCount} segments`,
+    );
+    return true;
+  }
+
+  /**
+   * @private
+   */
+  async _fetchSegmentWindow(params) {
+    const query = new URLSearchParams(params);
+    if (this.columnar) query.set("format", COLUMNAR_FORMAT);
+    const response = await fetch(`${this.segmentsUrl}?${query}`, {
+      credentials: "same-origin",
+    });
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    return decodeColumnar(await response.json());
+  }
+
+  /**
+   * Whether all segments have been loaded (always true for full loads).
+   */
+  isComplete() {
+    return (
+      !this.segmentsUrl ||
+      !this.transcriptionData ||
+      this.transcriptionData.segments.length >= this.segmentCount
+    );
+  }
+
+  /**
+   * Load the next window of segments (no-op if complete or already loading).
+   * @returns {Promise<void>}
+   */
+  loadNextWindow() {
+    if (this.isComplete()) return Promise.resolve();
+    if (!this._pendingWindow) {
+      this._pendingWindow = this._fetchSegmentWindow({
+        start: this.transcriptionData.segments.length,
+        count: PLAYER_CONFIG.TRANSCRIPT_WINDOW_SEGMENTS,
+      })
+        .then((page) => this._appendSegments(page.segments))
+        .finally(() => {
+          this._pendingWindow = null;
+        });
+    }
+    return this._pendingWindow;
+  }
+
+  /**
+   * Load segments until index `segmentIndex` (exclusive) is available.
+   * @private
+   */
+  async _loadThrough(segmentIndex) {
+    while (
+      !this.isComplete() &&
+      this.transcriptionData.segments.length < segmentIndex
+    ) {
+      await this.loadNextWindow();
+    }
+  }
+
+  /**
+   * Load all remaining segments (e.g. before exporting the transcription).
+   */
+  async ensureComplete() {
+    await this._loadThrough(Infinity);
+  }
+
+  /**
+   * Append segments to transcriptionData and the DOM.
+   * @private
+   */
+  _appendSegments(segments) {
+    const container = document.getElementById("transcriptionContainer");
+    const offset = this.transcriptionData.segments.length;
+    segments.forEach((segment, i) => {
+      this.transcriptionData.segments.push(segment);
+      const words = segment.words || [];
+      if (words.length) {
+        this.loadedUntilMs = Math.max(
+          this.loadedUntilMs,
+          words[words.length - 1].end_ms || 0,
+        );
+      }
+      if (container) this._renderSegment(container, segment, offset + i);
+    });
+    if (container && this._lazySentinel) container.appendChild(this._lazySentinel);
+  }
+
+  /**
+   * Load further windows near the end of the scroll area and ahead of playback.
+   * @private
+   */
+  _observeLazyLoading() {
+    if (this.isComplete()) return;
+
+    const container = document.getElementById("transcriptionContainer");
+    if (container && window.IntersectionObserver) {
+      this._lazySentinel = document.createElement("div");
+      this._lazySentinel.className = "transcription-lazy-sentinel";
+      container.appendChild(this._lazySentinel);
+      this._lazyObserver = new IntersectionObserver(
+        (entries) => {
+          if (entries.some((entry) => entry.isIntersecting)) {
+            this.loadNextWindow().catch((error) =>
+              console.error("[Transcription] Window failed:", error),
+            );
+          }
+        },
+        { rootMargin: "800px 0px" },
+      );
+      this._lazyObserver.observe(this._lazySentinel);
+    }
+
+    const audio = this.audioPlayer?.audioElement;
+    if (audio) {
+      audio.addEventListener("timeupdate", () => {
+        const ahead =
+          audio.currentTime * 1000 +
+          PLAYER_CONFIG.TRANSCRIPT_LOOKAHEAD_SECONDS * 1000;
+        if (!this.isComplete() && ahead > this.loadedUntilMs) {
+          this.loadNextWindow().catch((error) =>
+            console.error("[Transcription] Window failed:", error),
+          );
+        }
+      });
+    }
+  }
+
   /**
    * Update metadata display
    * @private
@@ -245,20 +481,28 @@ export class TranscriptionManager {
 
     container.innerHTML = "";
 
-    this.transcriptionData.segments.forEach((segment, segmentIndex) => {
-      const speakerCode = segment.speaker_code;
-      const words = segment.words;
+    this.transcriptionData.segments.forEach((segment, segmentIndex) =>
+      this._renderSegment(container, segment, segmentIndex),
+    );
+  }
 
-      if (!speakerCode || !words || words.length === 0) {
-        console.warn(
-          `Segment ${segmentIndex} wird übersprungen (fehlende Sprecher- oder Wortdaten).`,
-        );
-        return;
-      }
+  /**
+   * Render one segment into the container (skips incomplete segments)
+   * @private
+   */
+  _renderSegment(container, segment, segmentIndex) {
+    const speakerCode = segment.speaker_code;
+    const words = segment.words;
 
-      const segmentElement = this._createSegmentElement(segment, segmentIndex);
-      container.appendChild(segmentElement);
-    });
+    if (!speakerCode || !words || words.length === 0) {
+      console.warn(
+        `Segment ${segmentIndex} wird übersprungen (fehlende Sprecher- oder Wortdaten).`,
+      );
+      return;
+    }
+
+    const segmentElement = this._createSegmentElement(segment, segmentIndex);
+    container.appendChild(segmentElement);
   }
 
   /**
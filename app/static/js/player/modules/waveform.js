@@ -0,0 +1,257 @@
+/**
+ * Waveform Overview Module
+ * Draws a navigable waveform from precomputed peaks (/media/peaks/...)
+ * without downloading or decoding the full MP3.
+ * @module player/modules/waveform
+ *
+ * Peaks file format (see maintenance_pipelines/_0_mp3/mp3_waveform_peaks.py):
+ *   header:  "CPK1", uint16 version, uint16 levels, uint32 sampleRate, uint32 totalSamples
+ *   table:   levels x (uint32 samplesPerBucket, uint32 bucketCount, uint32 byteOffset)
+ *   data:    per level, bucketCount x (int8 min, int8 max)
+ */
+
+import { PLAYER_CONFIG } from "../config.js";
+
+const HEADER_SIZE = 16;
+const LEVEL_ENTRY_SIZE = 12;
+const HEADER_FETCH_BYTES = 1024;
+
+export class WaveformOverview {
+  /**
+   * @param {import("./audio.js").AudioPlayer} audioPlayer
+   */
+  constructor(audioPlayer) {
+    this.audioPlayer = audioPlayer;
+    this.peaksUrl = null;
+    this.header = null;
+    this.level = null;
+    this.peaks = null; // Int8Array of interleaved min/max
+    this._fullBuffer = null; // set if the server ignored the Range header
+    this.canvas = null;
+    this.resizeObserver = null;
+  }
+
+  /**
+   * Derive the peaks URL for a /media/full/... audio path.
+   * @param {string} audioPath
+   * @returns {string|null}
+   */
+  static peaksUrlFor(audioPath) {
+    const fullPrefix = `${PLAYER_CONFIG.MEDIA_ENDPOINT}/full/`;
+    if (!audioPath || !audioPath.startsWith(fullPrefix)) return null;
+    const relative = audioPath
+      .slice(fullPrefix.length)
+      .split("?")[0]
+      .replace(/\.mp3$/i, ".peaks");
+    return `${PLAYER_CONFIG.PEAKS_ENDPOINT}/${relative}`;
+  }
+
+  /**
+   * Load peaks and render the overview. Silently does nothing if no peaks
+   * file exists for the recording.
+   * @param {string} audioPath - Audio URL passed to AudioPlayer.init
+   */
+  async init(audioPath) {
+    this.peaksUrl = WaveformOverview.peaksUrlFor(audioPath);
+    if (!this.peaksUrl || !this.audioPlayer?.audioElement) return;
+
+    try {
+      const headerBuffer = await this._fetchRange(0, HEADER_FETCH_BYTES - 1);
+      if (!headerBuffer) return;
+      this.header = this._parseHeader(headerBuffer);
+      if (!this.header) return;
+
+      this._createCanvas();
+      await this._loadLevelFor(this.canvas.clientWidth);
+      this._setupEventListeners();
+      this.draw();
+    } catch (error) {
+      console.warn("[Waveform] Peaks unavailable:", error);
+      this.destroy();
+    }
+  }
+
+  /**
+   * Fetch a byte range. Returns an ArrayBuffer of exactly the requested
+   * bytes (also if the server ignores Range and answers 200), or null on 4xx.
+   * @private
+   */
+  async _fetchRange(start, end) {
+    const response = await fetch(this.peaksUrl, {
+      headers: { Range: `bytes=${start}-${end}` },
+      credentials: "same-origin",
+    });
+    if (!response.ok) return null;
+    const buffer = await response.arrayBuffer();
+    if (response.status === 206) return buffer;
+    this._fullBuffer = buffer;
+    return buffer.slice(start, end + 1);
+  }
+
+  /**
+   * @private
+   */
+  _parseHeader(buffer) {
+    if (buffer.byteLength < HEADER_SIZE) return null;
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(
+      view.getUint8(0),
+      view.getUint8(1),
+      view.getUint8(2),
+      view.getUint8(3),
+    );
+    if (magic !== "CPK1") return null;
+
+    const levelCount = view.getUint16(6, true);
+    const header = {
+      version: view.getUint16(4, true),
+      sampleRate: view.getUint32(8, true),
+      totalSamples: view.getUint32(12, true),
+      levels: [],
+    };
+    if (HEADER_SIZE + levelCount * LEVEL_ENTRY_SIZE > buffer.byteLength) {
+      return null;
+    }
+    for (let i = 0; i < levelCount; i++) {
+      const base = HEADER_SIZE + i * LEVEL_ENTRY_SIZE;
+      header.levels.push({
+        samplesPerBucket: view.getUint32(base, true),
+        bucketCount: view.getUint32(base + 4, true),
+        byteOffset: view.getUint32(base + 8, true),
+      });
+    }
+    header.duration = header.sampleRate
+      ? header.totalSamples / header.sampleRate
+      : 0;
+    return header.levels.length ? header : null;
+  }
+
+  /**
+   * Pick the coarsest level that still has at least one bucket per pixel
+   * and fetch only that level.
+   * @private
+   */
+  async _loadLevelFor(pixelWidth) {
+    const width = Math.max(1, Math.round(pixelWidth * (window.devicePixelRatio || 1)));
+    const levels = this.header.levels;
+    let chosen = levels[0];
+    for (const level of levels) {
+      if (level.bucketCount >= width) chosen = level;
+    }
+    if (this.level === chosen && this.peaks) return;
+
+    const start = chosen.byteOffset;
+    const end = start + chosen.bucketCount * 2 - 1;
+    let buffer;
+    if (this._fullBuffer) {
+      buffer = this._fullBuffer.slice(start, end + 1);
+    } else {
+      buffer = await this._fetchRange(start, end);
+    }
+    if (!buffer) throw new Error("Peaks level not available");
+
+    this.level = chosen;
+    this.peaks = new Int8Array(buffer);
+  }
+
+  /**
+   * @private
+   */
+  _createCanvas() {
+    const controls = document.querySelector(".custom-audio-player .player-controls");
+    if (!controls) throw new Error("Audio player controls not found");
+
+    this.canvas = document.createElement("canvas");
+    this.canvas.className = "waveform-overview";
+    this.canvas.setAttribute("role", "presentation");
+    controls.prepend(this.canvas);
+  }
+
+  /**
+   * @private
+   */
+  _setupEventListeners() {
+    const audio = this.audioPlayer.audioElement;
+
+    this.canvas.addEventListener("click", (event) => {
+      const rect = this.canvas.getBoundingClientRect();
+      const ratio = (event.clientX - rect.left) / rect.width;
+      const duration = audio.duration || this.header.duration;
+      if (duration) {
+        audio.currentTime = Math.max(0, Math.min(duration, ratio * duration));
+      }
+    });
+
+    audio.addEventListener("timeupdate", () => this.draw());
+    audio.addEventListener("seeked", () => this.draw());
+
+    if (window.ResizeObserver) {
+      this.resizeObserver = new ResizeObserver(async () => {
+        await this._loadLevelFor(this.canvas.clientWidth);
+        this.draw();
+      });
+      this.resizeObserver.observe(this.canvas);
+    }
+  }
+
+  /**
+   * Render the peaks, coloring the played part with the primary color.
+   */
+  draw() {
+    if (!this.canvas || !this.peaks) return;
+
+    const dpr = window.devicePixelRatio || 1;
+    const width = Math.max(1, Math.round(this.canvas.clientWidth * dpr));
+    const height = Math.max(1, Math.round(this.canvas.clientHeight * dpr));
+    if (this.canvas.width !== width || this.canvas.height !== height) {
+      this.canvas.width = width;
+      this.canvas.height = height;
+    }
+
+    const ctx = this.canvas.getContext("2d");
+    const styles = getComputedStyle(this.canvas);
+    const playedColor =
+      styles.getPropertyValue("--md-sys-color-primary").trim() || "#6750a4";
+    const restColor =
+      styles.getPropertyValue("--md-sys-color-outline-variant").trim() ||
+      "#cac4d0";
+
+    const audio = this.audioPlayer.audioElement;
+    const duration = audio.duration || this.header.duration;
+    const playedX = duration ? (audio.currentTime / duration) * width : 0;
+
+    const buckets = this.peaks.length / 2;
+    const bucketsPerPixel = buckets / width;
+    const mid = height / 2;
+    const scale = mid / 128;
+
+    ctx.clearRect(0, 0, width, height);
+    for (let x = 0; x < width; x++) {
+      const from = Math.floor(x * bucketsPerPixel);
+      const to = Math.max(from + 1, Math.floor((x + 1) * bucketsPerPixel));
+      let min = 0;
+      let max = 0;
+      for (let b = from; b < to && b < buckets; b++) {
+        const lo = this.peaks[b * 2];
+        const hi = this.peaks[b * 2 + 1];
+        if (lo < min) min = lo;
+        if (hi > max) max = hi;
+      }
+      ctx.fillStyle = x < playedX ? playedColor : restColor;
+      const top = mid - max * scale;
+      ctx.fillRect(x, top, 1, Math.max(1, (max - min) * scale));
+    }
+  }
+
+  /**
+   * Remove the canvas and observers.
+   */
+  destroy() {
+    if (this.resizeObserver) this.resizeObserver.disconnect();
+    if (this.canvas) this.canvas.remove();
+    this.canvas = null;
+    this.peaks = null;
+  }
+}
+
+export default WaveformOverview;
@@ -11,6 +11,8 @@ import HighlightingManager from "./modules/highlighting.js";
 import ExportManager from "./modules/export.js";
 import UIManager from "./modules/ui.js";
 import MobileHandler from "./modules/mobile.js";
+import WaveformOverview from "./modules/waveform.js";
+import { PLAYER_CONFIG } from "./config.js";
 
 console.log("[Player Init] Module loaded");
 
@@ -22,6 +24,7 @@ let highlightingManager = null;
 let exportManager = null;
 let uiManager = null;
 let mobileHandler = null;
+let waveformOverview = null;
 
 /**
  * Load and render transcription
@@ -74,6 +77,10 @@ async function initializePlayer() {
       );
       audioPlayer = new AudioPlayer();
       audioPlayer.init(config.audio);
+
+      // Waveform overview from precomputed peaks (non-blocking, optional)
+      waveformOverview = new WaveformOverview(audioPlayer);
+      waveformOverview.init(config.audio);
     }
 
     // Initialize transcription manager with token collector
@@ -82,6 +89,8 @@ async function initializePlayer() {
       audioPlayer,
       tokenCollector,
     );
+    transcriptionManager.lazyLoad = PLAYER_CONFIG.LAZY_TRANSCRIPT;
+    transcriptionManager.columnar = PLAYER_CONFIG.COLUMNAR_TRANSCRIPT;
 
     // Connect audio playback events to word highlighting
     if (audioPlayer) {
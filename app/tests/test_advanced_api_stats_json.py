@@ -87,3 +87,35 @@ def test_stats_json_aggregates_group_identities(client):
         counts = {item["key"]: item["n"] for item in data["by_sex"]}
         assert counts.get("m") == 7
         assert counts.get("f") == 7
+
+
+def test_stats_json_uses_document_metadata_when_enabled(app, client):
+    """With BLS_DOC_METADATA, country is filtered via filter= and grouped by field:."""
+    app.config["BLS_DOC_METADATA"] = True
+    seen = []
+
+    def side_effect(url, params):
+        seen.append(dict(params))
+        resp = MagicMock()
+        if params.get("group") == "field:country_code":
+            resp.json.return_value = {"hitGroups": [{"identity": "str:ARG", "size": 5}]}
+        else:
+            resp.json.return_value = {"summary": {"numberOfHits": 5}, "hitGroups": []}
+        return resp
+
+    with patch(
+        "src.app.search.advanced_api._make_bls_request", side_effect=side_effect
+    ):
+        rv = client.get(
+            "/search/advanced/stats?q=casa&mode=lemma&country_code=ARG&sex=f"
+        )
+
+    assert rv.status_code == 200
+    assert rv.get_json()["by_country"] == [{"key": "ARG", "n": 5}]
+    count_params = next(p for p in seen if not p.get("group"))
+    assert count_params["filter"] == '+country_code:"ARG"'
+    assert "country_code" not in count_params["patt"]
+    assert 'speaker_sex="f"' in count_params["patt"]
+    groups = {p["group"] for p in seen if p.get("group")}
+    assert "field:country_code" in groups
+    assert "hit:speaker_sex" in groups
@@ -5,6 +5,7 @@ import subprocess
 from pathlib import Path
 
 import imageio_ffmpeg
+import pytest
 from flask import Flask
 
 
@@ -137,3 +138,37 @@ def test_play_audio_route_returns_503_when_ffmpeg_backend_missing(monkeypatch, t
 
     assert response.status_code == 503
     assert b"Audio snippet backend unavailable" in response.data
+
+
+def test_play_audio_route_negotiates_opus_variant(monkeypatch, tmp_path):
+    app, media_root, audio_snippets, _ = _make_app(monkeypatch, tmp_path)
+    filename = _prepare_audio_tree(media_root)
+    audio_snippets._resolve_ffmpeg_executable.cache_clear()
+    audio_snippets.encoder_available.cache_clear()
+    if not audio_snippets.encoder_available("libopus"):
+        pytest.skip("ffmpeg build without libopus")
+
+    client = app.test_client()
+    url = f"/media/play_audio/DOM/{filename}?start=2.0&end=3.5&token_id=dom_demo&type=ctx"
+
+    response = client.get(url + "&format=opus")
+    assert response.status_code == 200
+    assert response.mimetype == "audio/webm"
+    assert "Accept" in response.headers["Vary"]
+    assert (media_root / "mp3-temp" / "corapan_dom_demo_ctx.webm").exists()
+
+    response = client.get(url, headers={"Accept": "audio/webm,audio/*;q=0.9"})
+    assert response.mimetype == "audio/webm"
+
+    response = client.get(url, headers={"Accept": "*/*"})
+    assert response.mimetype == "audio/mpeg"
+    assert (media_root / "mp3-temp" / "corapan_dom_demo_ctx.mp3").exists()
+
+    assert client.get(url + "&format=flac").status_code == 400
+
+
+def test_negotiate_format_falls_back_to_mp3_without_opus_encoder(monkeypatch, tmp_path):
+    _, _, audio_snippets, _ = _make_app(monkeypatch, tmp_path)
+    monkeypatch.setattr(audio_snippets, "encoder_available", lambda _: False)
+
+    assert audio_snippets.negotiate_format("opus") == audio_snippets.FORMAT_MP3
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions.bulkheads import reset_bulkheads
+from src.app.search import advanced_api
+from src.app.search.advanced_api import bp
+from src.app.search.batch import merge_args, run_unique
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    reset_bulkheads()
+    yield
+    reset_bulkheads()
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+def test_merge_args_query_overrides_shared_filters():
+    args = merge_args({"country_code": ["ARG", "CHL"], "mode": "forma"}, {"q": "casa", "mode": "lemma"})
+    assert args.getlist("country_code") == ["ARG", "CHL"]
+    assert (args.get("mode"), args.get("q")) == ("lemma", "casa")
+
+
+def test_batch_deduplicates_and_returns_counts_and_hits(monkeypatch, client):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch(params, shards=None):
+        with lock:
+            calls.append(dict(params))
+        hits = [{"docPid": "1", "match": {"word": ["casa"]}}] if params["number"] else []
+        return {"summary": {"numberOfHits": 42 if "casa" in params["patt"] else 7}, "hits": hits, "docInfos": {}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    rv = client.post(
+        "/search/advanced/batch",
+        json={
+            "filters": {"country_code": ["ARG"], "include_regional": "1"},
+            "queries": [
+                {"q": "casa", "mode": "lemma"},
+                {"q": "hogar", "mode": "lemma"},
+                {"q": "casa", "mode": "lemma"},
+                "casa",
+            ],
+            "hits": 1,
+        },
+    )
+
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert (data["unique"], data["deduplicated"]) == (2, 1)
+    assert len(calls) == 2
+    assert all(call["number"] == 1 and 'country_code="ARG"' in call["patt"] for call in calls)
+    totals = [result.get("total") for result in data["results"]]
+    assert totals == [42, 7, 42, None]
+    assert len(data["results"][0]["hits"]) == 1
+    assert data["results"][3]["error"] == "invalid_query"
+
+
+def test_batch_reports_per_query_errors_and_limits(monkeypatch, client):
+    def fake_fetch(params, shards=None):
+        if "hogar" in params["patt"]:
+            raise RuntimeError("boom")
+        return {"summary": {"numberOfHits": 3}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    data = client.post(
+        "/search/advanced/batch",
+        json={"queries": [{"q": "casa"}, {"q": "hogar"}, {"q": "[]{1,10}", "mode": "cql"}]},
+    ).get_json()
+    assert data["results"][0]["total"] == 3 and "hits" not in data["results"][0]
+    assert data["results"][1]["error"] == "search_failed"
+    assert data["results"][2]["error"] == "query_too_expensive"
+
+    monkeypatch.setenv("BATCH_MAX_QUERIES", "2")
+    rv = client.post("/search/advanced/batch", json={"queries": [{"q": "a"}, {"q": "b"}, {"q": "c"}]})
+    assert rv.status_code == 400 and rv.get_json()["error"] == "too_many_queries"
+    assert client.post("/search/advanced/batch", json={"queries": []}).status_code == 400
+
+
+def test_run_unique_bounds_concurrency_and_time(monkeypatch):
+    monkeypatch.setenv("BATCH_CONCURRENCY", "2")
+    monkeypatch.setenv("BATCH_TIMEOUT", "0.3")
+    active = []
+    peak = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def task(seconds):
+        def run():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            if seconds is None:
+                release.wait(2)
+            else:
+                time.sleep(seconds)
+            with lock:
+                active.pop()
+            return {"total": 1}
+
+        return run
+
+    tasks = {f"k{i}": task(0.01) for i in range(6)}
+    tasks["slow"] = task(None)
+    results = run_unique(tasks, lambda exc: {"error": str(exc)})
+    release.set()
+
+    assert max(peak) <= 2
+    assert results["slow"]["error"] == "budget_exceeded"
+    assert all(results[f"k{i}"] == {"total": 1} for i in range(6))
@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions import bls_resilience
+from src.app.extensions.bls_replicas import ReplicaPool, affinity_key
+from src.app.extensions.bls_resilience import get_resilience, reset_resilience
+from src.app.extensions.http_client import BLS_BASE_URL
+
+REPLICAS = ["http://bls1/blacklab-server", "http://bls2/blacklab-server", "http://bls3/blacklab-server"]
+
+
+@pytest.fixture(autouse=True)
+def replicas_env(monkeypatch):
+    monkeypatch.setattr(bls_resilience.time, "sleep", lambda s: None)
+    monkeypatch.setenv("BLS_REPLICAS", ",".join(REPLICAS))
+    reset_resilience()
+    yield
+    reset_resilience()
+
+
+def test_affinity_ignores_paging_and_sort():
+    base = {"patt": '[lemma="casa"]', "filter": "+country_code:ARG"}
+    page1 = affinity_key({**base, "first": 0, "number": 25})
+    page2 = affinity_key({**base, "first": 25, "number": 25, "sort": "hit:word"})
+    assert page1 == page2
+    assert affinity_key({**base, "patt": '[lemma="ir"]'}) != page1
+    assert affinity_key({"number": 1}) is None
+    # Proxy passes request.args.to_dict(flat=False)
+    assert affinity_key({"patt": ['[lemma="casa"]'], "filter": ["+country_code:ARG"]}) == page1
+
+
+def test_pinned_query_stays_on_one_replica():
+    pool = ReplicaPool(REPLICAS, primary=BLS_BASE_URL)
+    key = affinity_key({"patt": '[word="pues"]'})
+    chosen = {pool.choose(key).url for _ in range(20)}
+    assert len(chosen) == 1
+
+
+def test_unpinned_requests_prefer_less_busy_replica():
+    pool = ReplicaPool(REPLICAS[:2], primary=BLS_BASE_URL)
+    busy = pool.choose()
+    other = pool.choose()
+    assert busy is not other
+    pool.release(other, ok=True)
+    assert pool.choose() is other
+
+
+def test_failing_replica_is_ejected_and_pinned_query_moves():
+    pool = ReplicaPool(REPLICAS, eject_failures=2, eject_seconds=60, primary=BLS_BASE_URL)
+    key = affinity_key({"patt": '[word="pues"]'})
+    pinned = pool.choose(key)
+    pool.release(pinned, ok=False)
+    pool.release(pool.choose(key), ok=False)
+
+    moved = pool.choose(key)
+    assert moved is not pinned
+    assert pool.snapshot()[pool.replicas.index(pinned)]["ejections"] == 1
+
+    # Every replica ejected: fall back to all of them instead of failing
+    for replica in pool.replicas:
+        replica.ejected_until = float("inf")
+    assert pool.choose(key) is pinned
+
+
+def test_send_rewrites_url_and_retries_on_other_replica():
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.url.host)
+        if len(hosts) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    url = f"{BLS_BASE_URL}/corpora/corapan/hits"
+    response = get_resilience().send(client, "GET", url, params={"patt": '[word="a"]'})
+
+    assert response.status_code == 200
+    assert len(hosts) == 2
+    assert hosts[0] != hosts[1]
+    assert set(hosts) <= {"bls1", "bls2", "bls3"}
@@ -0,0 +1,228 @@
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions import bls_resilience
+from src.app.extensions.bls_resilience import (
+    BlackLabResilience,
+    BlackLabUnavailable,
+    CircuitBreaker,
+    endpoint_key,
+    get_resilience,
+    reset_resilience,
+    slow_calls,
+)
+from src.app.extensions.bulkheads import Bulkhead
+from src.app.search.advanced_api import bp
+
+HITS_URL = "http://bls.test/blacklab-server/corpora/corapan/hits"
+
+
+@pytest.fixture(autouse=True)
+def fresh_resilience(monkeypatch):
+    monkeypatch.setattr(bls_resilience.time, "sleep", lambda s: None)
+    reset_resilience()
+    yield
+    reset_resilience()
+
+
+def _client(handler):
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def test_endpoint_key():
+    assert endpoint_key(HITS_URL) == "hits"
+    assert endpoint_key("http://x/blacklab-server/corpora/corapan/docs/abc") == "docs"
+    assert endpoint_key("http://x/blacklab-server/corpora/corapan/") == "corpus"
+    assert endpoint_key("http://x/blacklab-server/") == "blacklab-server"
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_FAILURES", "3")
+    res = BlackLabResilience()
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = _client(handler)
+    for _ in range(3):
+        assert res.send(client, "GET", HITS_URL).status_code == 500
+    assert res.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(BlackLabUnavailable) as excinfo:
+        res.send(client, "GET", HITS_URL)
+    assert len(calls) == 3
+    assert excinfo.value.retry_after >= 1
+    assert res.snapshot()["breaker"]["fast_failures"] == 1
+
+
+def test_half_open_probe_closes_breaker(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_FAILURES", "1")
+    res = BlackLabResilience()
+    status = {"code": 500}
+    client = _client(lambda request: httpx.Response(status["code"]))
+
+    res.send(client, "GET", HITS_URL)
+    assert res.breaker.state == CircuitBreaker.OPEN
+
+    # Open period elapsed: exactly one probe is let through
+    res.breaker.opened_at -= res.breaker.open_seconds
+    status["code"] = 200
+    assert res.send(client, "GET", HITS_URL).status_code == 200
+    assert res.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_unexpected_error_releases_half_open_probe(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_FAILURES", "1")
+    res = BlackLabResilience()
+    mode = {"value": "fail"}
+
+    def handler(request):
+        if mode["value"] == "redirects":
+            raise httpx.TooManyRedirects("loop", request=request)
+        return httpx.Response(500 if mode["value"] == "fail" else 200)
+
+    client = _client(handler)
+    res.send(client, "GET", HITS_URL)
+    assert res.breaker.state == CircuitBreaker.OPEN
+
+    res.breaker.opened_at -= res.breaker.open_seconds
+    mode["value"] = "redirects"
+    with pytest.raises(httpx.TooManyRedirects):
+        res.send(client, "GET", HITS_URL)
+    assert res.breaker.state == CircuitBreaker.HALF_OPEN
+
+    # The next request may probe again and closes the breaker
+    mode["value"] = "ok"
+    assert res.send(client, "GET", HITS_URL).status_code == 200
+    assert res.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_use_own_timeout_and_skip_breaker(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_FAILURES", "1")
+    res = BlackLabResilience()
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        raise httpx.ReadTimeout("slow", request=request)
+
+    client = _client(handler)
+    with slow_calls(90.0):
+        for _ in range(3):
+            with pytest.raises(httpx.ReadTimeout):
+                res.send(client, "GET", HITS_URL)
+        # Bulkhead tasks started in the block are slow calls too
+        pool = Bulkhead("test", 2, 2)
+        with pytest.raises(httpx.ReadTimeout):
+            pool.submit(res.send, client, "GET", HITS_URL).result()
+    assert timeouts == [90.0] * 4
+    assert res.breaker.state == CircuitBreaker.CLOSED
+    assert "hits" not in res.histograms
+    assert res.snapshot()["slow_endpoints"]["hits"]["count"] == 4
+
+    # Outside the block the adaptive timeout and the breaker apply again
+    with pytest.raises(httpx.ReadTimeout):
+        res.send(client, "GET", HITS_URL)
+    assert timeouts[-1] == res.timeout_max
+    assert res.breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_errors_do_not_count_as_failures(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_FAILURES", "2")
+    res = BlackLabResilience()
+    client = _client(lambda request: httpx.Response(400))
+    for _ in range(5):
+        res.send(client, "GET", HITS_URL)
+    assert res.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_on_high_p95(monkeypatch):
+    monkeypatch.setenv("BLS_BREAKER_SLOW_P95_MS", "100")
+    res = BlackLabResilience()
+    for _ in range(bls_resilience.MIN_SAMPLES):
+        res.histograms.setdefault("hits", bls_resilience.LatencyHistogram()).observe(500)
+    client = _client(lambda request: httpx.Response(200))
+    res.send(client, "GET", HITS_URL)
+    assert res.breaker.state == CircuitBreaker.OPEN
+    assert "p95" in res.breaker.reason
+
+
+def test_retry_only_get_and_within_budget():
+    res = BlackLabResilience()
+    attempts = {"GET": 0, "POST": 0}
+
+    def handler(request):
+        attempts[request.method] += 1
+        if attempts[request.method] == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    client = _client(handler)
+    assert res.send(client, "GET", HITS_URL).status_code == 200
+    assert attempts["GET"] == 2
+
+    with pytest.raises(httpx.ConnectError):
+        res.send(client, "POST", HITS_URL)
+    assert attempts["POST"] == 1
+
+    res.budget.balance = 0.0
+    attempts["GET"] = 0
+    with pytest.raises(httpx.ConnectError):
+        res.send(client, "GET", HITS_URL)
+    assert attempts["GET"] == 1
+    assert res.budget.denied == 1
+
+
+def test_read_timeouts_are_not_retried():
+    res = BlackLabResilience()
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    with pytest.raises(httpx.ReadTimeout):
+        res.send(_client(handler), "GET", HITS_URL)
+    assert len(attempts) == 1
+
+
+def test_adaptive_read_timeout_follows_p99(monkeypatch):
+    monkeypatch.setenv("BLS_TIMEOUT_MIN", "2")
+    monkeypatch.setenv("BLS_TIMEOUT_MAX", "30")
+    res = BlackLabResilience()
+    assert res.read_timeout("hits") == 30.0
+
+    histogram = res.histograms.setdefault("hits", bls_resilience.LatencyHistogram())
+    for _ in range(bls_resilience.MIN_SAMPLES):
+        histogram.observe(1500)
+    assert res.read_timeout("hits") == pytest.approx(4.5)
+    assert res.timeout_for("hits").read == pytest.approx(4.5)
+
+    # Fast endpoint: clamped to the lower bound once the window has rolled over
+    for _ in range(bls_resilience.WINDOW_SIZE):
+        histogram.observe(100)
+    assert res.read_timeout("hits") == 2.0
+
+
+def test_datatable_returns_503_while_breaker_open():
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    get_resilience().breaker.trip(bls_resilience.time.monotonic(), "test")
+
+    rv = app.test_client().get("/search/advanced/data?q=casa&mode=lemma&draw=3")
+    assert rv.status_code == 503
+    assert rv.headers["Retry-After"]
+    data = rv.get_json()
+    assert data["error"] == "upstream_overloaded"
+    assert data["draw"] == 3
+    assert data["message"]
@@ -0,0 +1,144 @@
+import os
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.search import shards
+from src.app.search.advanced_api import bp
+
+SHARDS = "corapan_arg=ARG;corapan_esp=ESP;corapan_rest=*"
+
+
+def _hit(pid, word):
+    return {"docPid": str(pid), "match": {"word": [word]}, "left": {}, "right": {}}
+
+
+# Three small "indexes"; docPids repeat across shards on purpose
+CORPORA = {
+    "corapan_arg": [_hit(1, "casa"), _hit(1, "perro"), _hit(2, "árbol")],
+    "corapan_esp": [_hit(1, "bici"), _hit(3, "zorro")],
+    "corapan_rest": [_hit(1, "gato")],
+}
+
+
+def fake_request(corpus, params):
+    hits = CORPORA[corpus]
+    if params.get("samplenum"):
+        hits = hits[: params["samplenum"]]
+    if params.get("group"):
+        # Group by word length, so identities repeat across shards
+        groups = {}
+        for hit in hits:
+            key = str(len(hit["match"]["word"][0]))
+            groups[key] = groups.get(key, 0) + 1
+        ranked = [{"identity": k, "size": v} for k, v in sorted(groups.items(), key=lambda kv: -kv[1])]
+        first, number = int(params.get("first", 0)), int(params.get("number", 50))
+        return {
+            "summary": {"numberOfHits": len(hits), "numberOfGroups": len(ranked)},
+            "hitGroups": ranked[first : first + number],
+        }
+    ordered = list(hits)
+    sort = params.get("sort")
+    if sort:
+        ordered.sort(key=lambda h: shards.collation_key(h["match"]["word"][0]), reverse=sort.startswith("-"))
+    first, number = int(params.get("first", 0)), int(params.get("number", 50))
+    window = ordered[first : first + number]
+    return {
+        "summary": {"numberOfHits": len(hits), "numberOfDocs": len({h["docPid"] for h in hits})},
+        "hits": window,
+        "docInfos": {h["docPid"]: {"metadata": {"file_id": f"{corpus}-{h['docPid']}"}} for h in window},
+    }
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    monkeypatch.setenv("BLS_SHARDS", SHARDS)
+    calls = []
+
+    def recording(corpus, params):
+        calls.append((corpus, dict(params)))
+        return fake_request(corpus, params)
+
+    monkeypatch.setattr(shards, "_request", recording)
+    return calls
+
+
+def test_shard_selection(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    assert shards.select_shards({"country_code": ["ARG"]}) is None
+
+    monkeypatch.setenv("BLS_SHARDS", SHARDS)
+    assert shards.select_shards({}) == ["corapan_arg", "corapan_esp", "corapan_rest"]
+    assert shards.select_shards({"country_code": ["ARG-CBA"]}) == ["corapan_arg"]
+    assert shards.select_shards({"country_code": ["MEX", "ESP"]}) == ["corapan_esp", "corapan_rest"]
+    assert shards.select_shards({"country_parent_code": ["ARG"]}) == ["corapan_arg"]
+
+
+def test_unsorted_window_spans_shards(sharded):
+    data = shards.fetch_hits(["corapan_arg", "corapan_esp", "corapan_rest"], {"first": 2, "number": 3})
+    assert [h["match"]["word"][0] for h in data["hits"]] == ["árbol", "bici", "zorro"]
+    assert data["summary"]["numberOfHits"] == 6
+    assert data["summary"]["numberOfDocs"] == 5
+    # Window requests only go to shards that hold part of the window
+    windows = sorted((c, p["first"], p["number"]) for c, p in sharded if p["number"])
+    assert windows == [("corapan_arg", 2, 1), ("corapan_esp", 0, 2)]
+    # Count probes wait for exact totals, whatever the caller asked for
+    probes = [p for _, p in sharded if p["number"] == 0]
+    assert len(probes) == 3 and all(p["waitfortotal"] == "true" for p in probes)
+
+
+def test_sorted_hits_are_merge_sorted_with_unique_doc_pids(sharded):
+    data = shards.fetch_hits(["corapan_arg", "corapan_esp", "corapan_rest"], {"first": 0, "number": 4, "sort": "hit:word"})
+    assert [h["match"]["word"][0] for h in data["hits"]] == ["árbol", "bici", "casa", "gato"]
+    pids = [h["docPid"] for h in data["hits"]]
+    assert pids == ["corapan_arg:2", "corapan_esp:1", "corapan_arg:1", "corapan_rest:1"]
+    assert set(data["docInfos"]) == set(pids)
+
+
+def test_group_counts_are_summed(sharded):
+    data = shards.fetch_groups(["corapan_arg", "corapan_esp"], {"group": "hit:word"})
+    sizes = {g["identity"]: g["size"] for g in data["hitGroups"]}
+    assert sizes == {"4": 2, "5": 3}
+    assert data["hitGroups"][0] == {"identity": "5", "size": 3}
+    assert data["summary"]["numberOfHits"] == 5
+
+
+def test_groups_beyond_each_shards_top_page_are_merged(sharded, monkeypatch):
+    monkeypatch.setattr(shards, "GROUP_PAGE_SIZE", 1)
+    # Each shard returns one group per page; sizes still cover every group
+    data = shards.fetch_groups(["corapan_arg", "corapan_esp"], {"group": "hit:word"})
+    assert {g["identity"]: g["size"] for g in data["hitGroups"]} == {"4": 2, "5": 3}
+    # The caller's window is cut from the merged list
+    data = shards.fetch_groups(["corapan_arg", "corapan_esp"], {"group": "hit:word", "first": 1, "number": 1})
+    assert data["hitGroups"] == [{"identity": "4", "size": 2}]
+    assert data["summary"]["numberOfGroups"] == 2
+    pages = [(c, p["first"]) for c, p in sharded]
+    assert ("corapan_arg", 1) in pages and ("corapan_esp", 1) in pages
+
+
+def test_samplenum_is_split_across_shards(sharded):
+    data = shards.fetch_hits(
+        ["corapan_arg", "corapan_esp", "corapan_rest"], {"first": 0, "number": 10, "samplenum": 4, "sampleseed": 1}
+    )
+    # 3 : 2 : 1 hits -> 2 : 1 : 1 of 4, not 4 per shard
+    assert data["summary"]["numberOfHits"] == 4
+    sampled = {c: p["samplenum"] for c, p in sharded if p.get("samplenum")}
+    assert sampled == {"corapan_arg": 2, "corapan_esp": 1, "corapan_rest": 1}
+    # Shares come from probes without sampling
+    assert all("samplenum" not in p for c, p in sharded[:3])
+
+
+def test_datatable_queries_only_selected_shard(sharded):
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    rv = app.test_client().get("/search/advanced/data?q=casa&mode=forma&country_code=ESP&start=0&length=10")
+    data = rv.get_json()
+    assert rv.status_code == 200
+    assert {corpus for corpus, _ in sharded} == {"corapan_esp"}
+    assert data["recordsTotal"] == 2
+    assert [row["filename"] for row in data["data"]] == ["corapan_esp-1", "corapan_esp-3"]
@@ -0,0 +1,111 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions import bulkheads
+from src.app.extensions.bulkheads import Bulkhead, BulkheadFull, get_bulkhead, reset_bulkheads
+from src.app.search import advanced_api
+from src.app.search.advanced_api import bp
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    reset_bulkheads()
+    yield
+    reset_bulkheads()
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv("BULKHEAD_EXPORT", "3:1")
+    assert (get_bulkhead("export").concurrency, get_bulkhead("export").queue) == (3, 1)
+    assert get_bulkhead("stats").concurrency == bulkheads.DEFAULT_LIMITS["stats"][0]
+    with pytest.raises(ValueError):
+        get_bulkhead("nope")
+
+
+def test_map_keeps_order_and_caps_concurrency():
+    bulkhead = Bulkhead("search", concurrency=2, queue=10)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work(n):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.01)
+        with lock:
+            running[0] -= 1
+        return n * n
+
+    assert bulkhead.map(work, range(6)) == [0, 1, 4, 9, 16, 25]
+    assert peak[0] <= 2
+    assert bulkhead.snapshot()["admitted"] == 6
+    bulkhead.shutdown()
+
+
+def test_full_bulkhead_rejects_without_queueing():
+    bulkhead = Bulkhead("export", concurrency=1, queue=1, queue_timeout=0)
+    ticket = bulkhead.acquire()
+    # A batch larger than the free capacity is rejected as a whole
+    with pytest.raises(BulkheadFull):
+        bulkhead.submit_all([lambda: 1, lambda: 2])
+    # Admitted to the queue, but no running slot within the queue timeout
+    with pytest.raises(BulkheadFull):
+        bulkhead.acquire()
+    ticket.release()
+    ticket.release()  # idempotent
+    with bulkhead.slot():
+        pass
+
+    stats = bulkhead.snapshot()
+    assert (stats["rejected_full"], stats["rejected_timeout"]) == (1, 1)
+    assert (stats["active"], stats["queued"]) == (0, 0)
+
+
+def test_stats_endpoint_returns_503_when_stats_bulkhead_is_full(monkeypatch):
+    monkeypatch.setenv("BULKHEAD_STATS", "1:0")
+    monkeypatch.setattr(advanced_api, "_fetch_hits", lambda params, shards=None: {"summary": {"numberOfHits": 3}})
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+
+    rv = app.test_client().get("/search/advanced/stats?q=casa&mode=forma")
+
+    assert rv.status_code == 503
+    assert rv.get_json()["error"] == "upstream_overloaded"
+    assert rv.headers["Retry-After"]
+    assert get_bulkhead("stats").snapshot()["rejected_full"] == 1
+
+
+def test_unsharded_datatable_search_holds_a_search_slot(monkeypatch):
+    seen = []
+
+    def fake(params, shards=None):
+        seen.append(get_bulkhead("search").snapshot()["active"])
+        return {"summary": {"numberOfHits": 0}, "hits": []}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    client = app.test_client()
+
+    assert client.get("/search/advanced/data?q=casa&mode=forma").status_code == 200
+    assert seen == [1]
+    assert get_bulkhead("search").snapshot()["active"] == 0
+
+    # A full search bulkhead turns the request away instead of queueing it
+    monkeypatch.setenv("BULKHEAD_SEARCH", "1:0")
+    reset_bulkheads()
+    ticket = get_bulkhead("search").acquire()
+    try:
+        rv = client.get("/search/advanced/data?q=perro&mode=forma")
+    finally:
+        ticket.release()
+    assert rv.status_code == 503
+    assert rv.get_json()["error"] == "upstream_overloaded"
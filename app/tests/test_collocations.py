@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions.bulkheads import reset_bulkheads
+from src.app.search import advanced_api
+from src.app.search.advanced_api import bp
+from src.app.search.vocabulary import reset_vocabularies
+from src.app.services.collocations import (
+    CollocationCancelled,
+    CollocationJobs,
+    association_measures,
+    compute_collocations,
+    rank,
+    reset_collocation_jobs,
+)
+from src.scripts.blacklab_index_creation import TermCounter, write_vocabulary
+
+# Corpus of 10000 tokens: "el" is frequent everywhere, "agua" is rare but
+# always next to the node
+LEMMAS = Counter({"el": 1000, "agua": 20, "beber": 50, "casa": 8930})
+CONTEXT = {"L1-1": {"beber": 30, "el": 40}, "R1-1": {"agua": 15, "el": 30}}
+
+
+@pytest.fixture(autouse=True)
+def vocabulary(monkeypatch, tmp_path):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    monkeypatch.setenv("CORAPAN_VOCABULARY_DIR", str(tmp_path))
+    monkeypatch.setenv("RESULTS_TEMP_DIR", str(tmp_path / "results"))
+    counter = TermCounter()
+    counter.counts["lemma"] = LEMMAS
+    write_vocabulary(tmp_path, counter)
+    reset_vocabularies()
+    reset_bulkheads()
+    reset_collocation_jobs()
+    yield
+    reset_collocation_jobs()
+    reset_bulkheads()
+
+
+def fake_fetch(calls, gate=None, fraction=1.0):
+    """BlackLab with a node of 100 hits; ``samplenum`` returns ``fraction`` of them."""
+
+    def fetch(params, shards=None):
+        calls.append(dict(params))
+        if gate is not None:
+            gate.wait(1)
+        factor = fraction if params.get("samplenum") else 1.0
+        total = round(100 * factor)
+        group = params.get("group")
+        if not group:
+            return {"summary": {"numberOfHits": total}}
+        position = group.rsplit(":", 1)[1]
+        groups = [{"identity": f"cws:lemma:i:{term}", "size": round(n * factor)} for term, n in CONTEXT.get(position, {}).items()]
+        return {"summary": {"numberOfHits": total}, "hitGroups": groups}
+
+    return fetch
+
+
+def test_association_measures():
+    m = association_measures(observed=20, node_freq=100, collocate_freq=50, corpus_size=10000, span=2)
+    assert m["expected"] == 1.0
+    assert m["mi"] == pytest.approx(4.322, abs=1e-3)
+    assert m["t_score"] == pytest.approx(19 / 20**0.5, abs=1e-3)
+    assert m["log_dice"] == pytest.approx(12.093, abs=1e-3)
+    assert m["log_likelihood"] > 50
+    # Fewer co-occurrences than expected: negative association
+    assert association_measures(1, 100, 5000, 10000, 2)["log_likelihood"] < 0
+
+
+def test_function_words_rank_below_real_collocates():
+    calls = []
+    result = compute_collocations(fake_fetch(calls), '[lemma="tomar"]', window=1, annotation="lemma")
+
+    assert [c["group"] for c in calls if "group" in c] == ["context:lemma:i:L1-1", "context:lemma:i:R1-1"]
+    assert (result["node_freq"], result["corpus_size"], result["span"]) == (100, 10000, 2)
+    el = next(row for row in result["rows"] if row["term"] == "el")
+    assert (el["freq"], el["left"], el["right"], el["corpus_freq"]) == (70, 40, 30, 1000)
+
+    by_frequency = [row["term"] for row in rank(result["rows"], "freq")]
+    assert by_frequency[0] == "el"
+    assert [row["term"] for row in rank(result["rows"], "log_dice")][:2] == ["beber", "agua"]
+    assert rank(result["rows"], "mi")[-1]["term"] == "el"
+
+
+def test_groups_are_paged_below_the_blacklab_page_maximum(monkeypatch):
+    monkeypatch.setattr("src.app.services.collocations.GROUP_PAGE_SIZE", 1)
+    calls = []
+    fetch = fake_fetch(calls)
+
+    def paged(params, shards=None):
+        # BlackLab caps ``number`` at pageSize.max (here 1)
+        data = fetch(params, shards)
+        if "group" not in params:
+            return data
+        groups = data["hitGroups"]
+        first = params["first"]
+        return {"summary": {"numberOfGroups": len(groups)}, "hitGroups": groups[first : first + min(params["number"], 1)]}
+
+    result = compute_collocations(paged, '[lemma="tomar"]', window=1, annotation="lemma")
+
+    pages = [(c["group"][-4:], c["first"], c["number"]) for c in calls if "group" in c]
+    assert pages == [("L1-1", 0, 1), ("L1-1", 1, 1), ("R1-1", 0, 1), ("R1-1", 1, 1)]
+    el = next(row for row in result["rows"] if row["term"] == "el")
+    assert (el["freq"], el["left"], el["right"]) == (70, 40, 30)
+
+
+def test_large_node_sets_use_a_reproducible_sample(monkeypatch):
+    monkeypatch.setenv("COLLOCATION_MAX_HITS", "10")
+    calls = []
+    compute_collocations(fake_fetch(calls), '[lemma="tomar"]', window=1)
+    again = []
+    compute_collocations(fake_fetch(again), '[lemma="tomar"]', window=1)
+
+    assert "samplenum" not in calls[0] and calls[1]["samplenum"] == 10
+    assert all(call["sampleseed"] == calls[1]["sampleseed"] for call in calls[1:])
+    assert calls == again
+
+
+def test_sampled_counts_are_scaled_to_the_whole_node_set(monkeypatch):
+    full = compute_collocations(fake_fetch([]), '[lemma="tomar"]', window=1)
+    monkeypatch.setenv("COLLOCATION_MAX_HITS", "50")
+    sampled = compute_collocations(fake_fetch([], fraction=0.5), '[lemma="tomar"]', window=1)
+
+    assert sampled["node_freq"] == 100 and sampled["sample"]["size"] == 50
+    in_full = next(row for row in full["rows"] if row["term"] == "beber")
+    in_sample = next(row for row in sampled["rows"] if row["term"] == "beber")
+    assert (in_full["freq"], in_sample["freq"]) == (30, 15)
+    for measure in ("expected", "mi", "t_score", "log_likelihood", "log_dice"):
+        assert in_sample[measure] == in_full[measure]
+
+
+def test_job_endpoint_runs_in_background_caches_and_cancels(monkeypatch):
+    calls = []
+    gate = threading.Event()
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch(calls, gate))
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    client = app.test_client()
+    query = "/search/advanced/collocations?q=tomar&mode=lemma&window=1&include_regional=1"
+
+    rv = client.post(query)
+    assert rv.status_code == 202
+    job_id = rv.get_json()["job"]["id"]
+    # Same canonical query and window: same job
+    assert client.post(query).get_json()["job"]["id"] == job_id
+
+    gate.set()
+    for _ in range(100):
+        data = client.get(f"/search/advanced/collocations/{job_id}?measure=log_dice&limit=2").get_json()
+        if data["job"]["state"] == "done":
+            break
+        time.sleep(0.01)
+    assert data["job"]["progress"] == 1.0
+    assert [row["term"] for row in data["result"]["collocates"]] == ["beber", "agua"]
+
+    requests_sent = len(calls)
+    rv = client.post(query)
+    assert rv.status_code == 200
+    assert len(calls) == requests_sent
+
+    gate.clear()
+    rv = client.post(query.replace("window=1", "window=2"))
+    other = rv.get_json()["job"]["id"]
+    assert client.delete(f"/search/advanced/collocations/{other}").status_code == 200
+    gate.set()
+    for _ in range(100):
+        state = client.get(f"/search/advanced/collocations/{other}").get_json()["job"]["state"]
+        if state == "cancelled":
+            break
+        time.sleep(0.01)
+    assert state == "cancelled"
+    assert client.get("/search/advanced/collocations/nope").status_code == 404
+
+
+def test_jobs_are_visible_and_cancellable_from_another_worker(tmp_path):
+    # Two workers: separate processes sharing the runtime directory
+    started, other = CollocationJobs(ttl=60, directory=tmp_path), CollocationJobs(ttl=60, directory=tmp_path)
+    gate = threading.Event()
+    key = "a" * 64
+
+    def compute(job):
+        job.set_progress(0.5)
+        gate.wait(1)
+        # The cancel request of the other worker is seen at the next position
+        job.set_progress(1.0)
+        if job.cancel_event.is_set():
+            raise CollocationCancelled()
+        return {"rows": []}
+
+    job, created = started.start(key, {"window": 1}, compute)
+    assert created and job.id == key
+    for _ in range(100):
+        seen = other.get(key)
+        if seen is not None and seen.progress == 0.5:
+            break
+        time.sleep(0.01)
+    assert (seen.state, seen.params) == ("running", {"window": 1})
+    # Starting the same analysis in the other worker reuses the job
+    reused, created = other.start(key, {"window": 1}, compute)
+    assert not created and reused.id == key
+
+    other.cancel(key)
+    gate.set()
+    for _ in range(100):
+        if other.get(key).state == "cancelled":
+            break
+        time.sleep(0.01)
+    assert other.get(key).state == "cancelled"
+    assert other.get("../../etc/passwd") is None
@@ -0,0 +1,103 @@
+import os
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions import http_client
+from src.app.routes import stats as stats_routes
+from src.app.search import advanced_api
+from src.app.services import database
+from src.app.services.corpus_epoch import corpus_epoch, reset_corpus_epoch
+
+
+@pytest.fixture
+def corpus(monkeypatch, tmp_path):
+    stamp = tmp_path / "index.stamp"
+    stamp.write_text("2026-01-01_120000 1\n", encoding="utf-8")
+    db_path = tmp_path / "stats_country.db"
+    db_path.write_bytes(b"")
+    monkeypatch.setenv("CORAPAN_INDEX_STAMP_PATH", str(stamp))
+    monkeypatch.setenv("CORPUS_EPOCH_CHECK", "0")
+    monkeypatch.setitem(database.DATABASES, "stats_country", lambda: db_path)
+    reset_corpus_epoch()
+    yield stamp, db_path
+    reset_corpus_epoch()
+
+
+def test_epoch_follows_index_stamp_and_stats_dbs(corpus, monkeypatch):
+    stamp, db_path = corpus
+    first = corpus_epoch()
+    assert first == corpus_epoch()
+
+    stamp.write_text("2026-02-01_120000 2\n", encoding="utf-8")
+    second = corpus_epoch()
+    assert second != first
+
+    os.utime(db_path, ns=(10**18, 10**18))
+    assert corpus_epoch() != second
+
+    # Within the check interval the cached epoch is kept
+    monkeypatch.setenv("CORPUS_EPOCH_CHECK", "3600")
+    current = corpus_epoch()
+    stamp.write_text("2026-03-01_120000 3\n", encoding="utf-8")
+    assert corpus_epoch() == current
+
+
+def test_stats_cache_keys_and_files_change_with_epoch(corpus, monkeypatch, tmp_path):
+    stamp, _ = corpus
+    cache_dir = tmp_path / "stats_temp"
+    monkeypatch.setattr(stats_routes, "_stats_cache_dir", lambda: cache_dir)
+    params = {"query": "casa", "countries": ["ARG"]}
+
+    old_key = stats_routes._compute_cache_key(params)
+    stats_routes._save_cached_response(old_key, {"total": 1})
+    assert stats_routes._get_cached_response(old_key)[0] == {"total": 1}
+
+    stamp.write_text("rebuilt\n", encoding="utf-8")
+    new_key = stats_routes._compute_cache_key(params)
+    assert new_key != old_key and new_key.startswith(f"{corpus_epoch()}-")
+    stats_routes._save_cached_response(new_key, {"total": 2})
+    assert [p.name for p in cache_dir.glob("*.json")] == [f"{new_key}.json"]
+
+
+def test_docmeta_and_corpora_reload_on_new_epoch(corpus, monkeypatch):
+    stamp, _ = corpus
+    loads = []
+
+    def fake_load():
+        loads.append(1)
+        return {"ARG_001": {"file_id": "ARG_001", "build": len(loads)}}, {}
+
+    monkeypatch.setattr(advanced_api, "_load_docmeta", fake_load)
+    monkeypatch.setattr(advanced_api, "_DOCMETA_EPOCH", None)
+    assert advanced_api._docmeta()["ARG_001"]["build"] == 1
+    assert advanced_api._docmeta()["ARG_001"]["build"] == 1
+    stamp.write_text("rebuilt\n", encoding="utf-8")
+    assert advanced_api._docmeta()["ARG_001"]["build"] == 2
+
+    fetched = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            fetched.append(1)
+            return {"corpora": {"corapan": {}}}
+
+    class FakeClient:
+        def get(self, *args, **kwargs):
+            return FakeResponse()
+
+    monkeypatch.setattr(http_client, "get_http_client", lambda: FakeClient())
+    monkeypatch.setattr(http_client, "_CORPORA_CACHE", {"ts": 0.0, "corpora": None, "epoch": None})
+    assert http_client.get_available_corpora() == ["corapan"]
+    assert http_client.get_available_corpora() == ["corapan"]
+    assert len(fetched) == 1
+    stamp.write_text("rebuilt again\n", encoding="utf-8")
+    http_client.get_available_corpora()
+    assert len(fetched) == 2
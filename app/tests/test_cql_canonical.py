@@ -0,0 +1,58 @@
+import pytest
+
+from src.app.search.cql_canonical import (
+    CQLParseError,
+    add_token_constraints,
+    canonicalize_cql,
+    parse_token_expression,
+    query_cache_key,
+)
+
+
+@pytest.mark.parametrize(
+    "variant",
+    ['[lemma="ir"]', '[ lemma = "ir" ]', "[lemma='ir']", '  [lemma="ir"]  '],
+)
+def test_whitespace_and_quote_variants_are_equal(variant):
+    assert canonicalize_cql(variant) == '[lemma="ir"]'
+
+
+def test_commutative_terms_sorted_and_deduplicated():
+    assert canonicalize_cql('[pos="VERB" & lemma="ir" & pos="VERB"]') == (
+        '[lemma="ir" & pos="VERB"]'
+    )
+    assert canonicalize_cql('[tokid="b" | tokid="a" | tokid="b"]') == (
+        '[tokid="a" | tokid="b"]'
+    )
+    assert canonicalize_cql('[c="(VEN|ARG)"]') == canonicalize_cql('[c="(ARG|VEN)"]')
+
+
+def test_grouping_and_negation_are_preserved():
+    assert canonicalize_cql('[(c="3" | b="2") & a="1"]') == (
+        '[a="1" & (b="2" | c="3")]'
+    )
+    assert canonicalize_cql('[!(a="x")]') == '[a!="x"]'
+    assert canonicalize_cql('[!!a="x"]') == '[a="x"]'
+
+
+def test_structure_outside_tokens_is_kept():
+    cql = '[a="1"][]{1,3}  [b="2"] within <s/>'
+    assert canonicalize_cql(cql) == '[a="1"] []{1,3} [b="2"] within <s/>'
+
+
+def test_unparseable_token_is_kept_verbatim():
+    with pytest.raises(CQLParseError):
+        parse_token_expression('word="a" &')
+    assert canonicalize_cql('[word="a  b" &]') == '[word="a  b" &]'
+
+
+def test_add_token_constraints_scopes_alternatives():
+    cql = add_token_constraints('[word="a" | word="b"] []', ['speaker_sex="f"'])
+    assert cql == '[speaker_sex="f" & (word="a" | word="b")] [speaker_sex="f"]'
+
+
+def test_cache_key_ignores_formatting_and_param_order():
+    assert query_cache_key('[ a = "1" ]', "", first=0, number=50) == query_cache_key(
+        '[a="1"]', None, number=50, first=0
+    )
+    assert query_cache_key('[a="1"]') != query_cache_key('[a="2"]')
@@ -1,4 +1,4 @@
-from src.app.search.cql import build_cql_with_speaker_filter
+from src.app.search.cql import build_cql_with_speaker_filter, build_document_filter
 
 
 def test_cql_excludes_country_code_when_doc_level_filter_present():
@@ -16,3 +16,24 @@ def test_cql_includes_country_code_when_no_doc_level_filter():
     filters = {"country_code": ["ARG"]}
     cql_with_country = build_cql_with_speaker_filter(params, filters)
     assert "country_code" in cql_with_country
+
+
+def test_document_filter_for_doc_level_fields():
+    filters = {
+        "country_code": ["ARG", "VEN"],
+        "country_scope": "national",
+        "radio": 'Radio "Mitre"',
+        "sex": ["f"],
+    }
+    query = build_document_filter(filters)
+    assert query == (
+        '+country_code:("ARG" "VEN") +country_scope:"national" '
+        '+radio:"Radio \\"Mitre\\""'
+    )
+
+
+def test_document_filter_exclusions_need_positive_clause():
+    assert build_document_filter({"exclude_country_code": ["ARG-CBA"]}) == (
+        '*:* -country_code:"ARG-CBA"'
+    )
+    assert build_document_filter({}) == ""
@@ -46,3 +46,41 @@ def test_header_contains_required_fields(tmp_path: Path):
         "audio_path",
     ):
         assert col in header
+
+
+def test_doc_metadata_mode_omits_document_columns(tmp_path: Path):
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    doc = {
+        "file_id": "fileY",
+        "country_code": "ARG",
+        "radio": "Mitre",
+        "segments": [
+            {
+                "speaker": {"code": "lib-pf", "speaker_sex": "f"},
+                "words": [
+                    {
+                        "token_id": "t1",
+                        "start_ms": 0,
+                        "end_ms": 10,
+                        "lemma": "x",
+                        "pos": "NOUN",
+                        "norm": "x",
+                        "sentence_id": "s1",
+                        "utterance_id": "u1",
+                        "text": "X",
+                    }
+                ],
+            }
+        ],
+    }
+
+    ok, msg = export_to_tsv(doc, Path("fileY.json"), out_dir, {}, doc_metadata=True)
+    assert ok, msg
+    header, row = (out_dir / "fileY.tsv").read_text(encoding="utf-8").splitlines()
+    columns = header.split("\t")
+    assert columns[-1] == "file_id"
+    for col in ("country_code", "radio", "date", "audio_path"):
+        assert col not in columns
+    assert len(row.split("\t")) == len(columns)
+    assert row.split("\t")[columns.index("speaker_sex")] == "f"
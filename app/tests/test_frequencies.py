@@ -0,0 +1,88 @@
+import csv
+import io
+import os
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+
+from src.app.routes.stats import blueprint
+from src.app.services import database
+from src.app.services.frequencies import reset_frequency_cache
+from src.scripts.frequency_tables import FrequencyCounter, write_frequency_db
+
+
+def _document(speaker: dict, words: list[tuple[str, str, str]]) -> dict:
+    return {
+        "segments": [
+            {
+                "speaker": speaker,
+                "words": [{"text": text, "lemma": lemma, "pos": pos, "norm": text.lower()} for text, lemma, pos in words],
+            }
+        ]
+    }
+
+
+LIBRE_M = {"speaker_type": "pro", "speaker_sex": "m", "speaker_mode": "libre"}
+LECTURA_F = {"speaker_type": "otro", "speaker_sex": "f", "speaker_mode": "lectura"}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    counter = FrequencyCounter()
+    counter.add_document(_document(LIBRE_M, [("Casa", "casa", "NOUN"), ("casas", "casa", "NOUN"), ("es", "ser", "AUX")]), "ARG")
+    counter.add_document(_document(LECTURA_F, [("es", "ser", "AUX"), ("Ésta", "este", "PRON"), ("", "", "")]), "ARG")
+    counter.add_document(_document(LIBRE_M, [("soy", "ser", "AUX"), ("casado", "casar", "VERB")]), "ESP")
+    db_path = tmp_path / "stats_frequencies.db"
+    write_frequency_db(db_path, counter)
+    monkeypatch.setitem(database.DATABASES, "stats_frequencies", lambda: db_path)
+    reset_frequency_cache()
+
+    app = Flask(__name__)
+    app.register_blueprint(blueprint)
+    yield app.test_client()
+    reset_frequency_cache()
+
+
+def test_whole_corpus_list_is_ranked_with_relative_frequencies(client):
+    data = client.get("/api/frequencies?annotation=lemma").get_json()
+
+    assert data["tokens"] == 7 and data["total"] == 4
+    assert [(row["rank"], row["term"], row["freq"]) for row in data["items"]] == [
+        (1, "ser", 3),
+        (2, "casa", 2),
+        (3, "casar", 1),
+        (4, "este", 1),
+    ]
+    assert data["items"][0]["per_million"] == pytest.approx(3 / 7 * 1e6, abs=0.01)
+
+
+def test_slices_filter_and_paging(client):
+    rv = client.get("/api/frequencies?annotation=lemma&pais=arg&modo=libre&per_page=1&page=2")
+    data = rv.get_json()
+
+    assert data["filters"] == {"country": ["ARG"], "mode": ["libre"]}
+    assert (data["tokens"], data["total"]) == (3, 2)
+    assert data["items"] == [{"rank": 2, "term": "ser", "freq": 1, "per_million": pytest.approx(333333.33)}]
+
+    data = client.get("/api/frequencies?annotation=pos&sexo=m&speaker=pro").get_json()
+    assert [(row["term"], row["freq"]) for row in data["items"]] == [("AUX", 2), ("NOUN", 2), ("VERB", 1)]
+
+
+def test_prefix_keeps_ranks_and_ignores_case_and_accents(client):
+    data = client.get("/api/frequencies?annotation=word&q=ES").get_json()
+    assert [(row["rank"], row["term"]) for row in data["items"]] == [(1, "es"), (5, "Ésta")]
+
+
+def test_csv_export_and_errors(client, monkeypatch, tmp_path):
+    rv = client.get("/api/frequencies?annotation=lemma&pais=ESP&format=csv")
+    assert rv.status_code == 200 and rv.mimetype == "text/csv"
+    rows = list(csv.reader(io.StringIO(rv.get_data(as_text=True))))
+    assert rows == [["rank", "lemma", "freq", "per_million"], ["1", "casar", "1", "500000.0"], ["2", "ser", "1", "500000.0"]]
+
+    assert client.get("/api/frequencies?annotation=tense").status_code == 400
+    monkeypatch.setitem(database.DATABASES, "stats_frequencies", lambda: tmp_path / "missing.db")
+    rv = client.get("/api/frequencies?format=csv")
+    assert rv.status_code == 503 and rv.get_json()["error"] == "frequencies_unavailable"
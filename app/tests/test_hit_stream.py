@@ -0,0 +1,125 @@
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions.bls_resilience import BlackLabUnavailable
+from src.app.extensions.bulkheads import get_bulkhead, reset_bulkheads
+from src.app.search import advanced_api, streaming
+from src.app.search.advanced_api import bp
+
+TOTAL = 25
+
+
+def _hit(n: int) -> dict:
+    return {"docPid": "1", "match": {"word": [f"w{n}"], "tokid": [f"ARG{n:05d}"]}}
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    monkeypatch.setenv("STREAM_WINDOW", "10")
+    reset_bulkheads()
+    yield
+    reset_bulkheads()
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def fake_fetch(params, shards=None):
+        with lock:
+            calls.append((params["first"], params["number"]))
+        first, number = params["first"], params["number"]
+        hits = [_hit(n) for n in range(first, min(first + number, TOTAL))]
+        return {"summary": {"numberOfHits": TOTAL}, "hits": hits, "docInfos": {}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    return calls
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app.test_client()
+
+
+def _lines(body: bytes) -> list[dict]:
+    return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def test_stream_emits_all_hits_in_windows(calls, client):
+    rv = client.get("/search/advanced/stream?q=casa&include_regional=1")
+
+    assert rv.status_code == 200
+    assert rv.mimetype == "application/x-ndjson"
+    assert rv.headers["X-Total-Hits"] == "25"
+    lines = _lines(rv.get_data())
+    assert [line["offset"] for line in lines] == list(range(TOTAL))
+    assert lines[3]["token_id"] == "ARG00003"
+    assert sorted(calls) == [(0, 10), (10, 10), (20, 10)]
+    # The stream released its export slot
+    assert get_bulkhead("export").snapshot()["active"] == 0
+
+
+def test_stream_resumes_at_offset_with_limit_and_gzip(calls, client):
+    rv = client.get(
+        "/search/advanced/stream?q=casa&include_regional=1&offset=12&limit=5&format=jsonl",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert rv.mimetype == "application/jsonl"
+    assert rv.headers["Content-Encoding"] == "gzip"
+    lines = _lines(gzip.decompress(rv.get_data()))
+    assert [line["offset"] for line in lines] == [12, 13, 14, 15, 16]
+    assert calls == [(12, 5)]
+
+
+def test_stream_errors(monkeypatch, calls, client):
+    fetch = advanced_api._fetch_hits
+
+    def failing_after_first_window(params, shards=None):
+        if params["first"] >= 10:
+            raise BlackLabUnavailable("circuit open", retry_after=5)
+        return fetch(params, shards)
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", failing_after_first_window)
+    lines = _lines(client.get("/search/advanced/stream?q=casa&include_regional=1").get_data())
+    assert len(lines) == 11
+    assert lines[-1]["error"] == "upstream_overloaded" and lines[-1]["resume_offset"] == 10
+
+    def unavailable(params, shards=None):
+        raise BlackLabUnavailable("circuit open", retry_after=5)
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", unavailable)
+    rv = client.get("/search/advanced/stream?q=casa&include_regional=1")
+    assert rv.status_code == 503 and rv.headers["Retry-After"] == "5"
+
+    rv = client.get("/search/advanced/stream?q=[]{1,10}&mode=cql")
+    assert rv.status_code == 400 and rv.get_json()["error"] == "query_too_expensive"
+
+
+def test_stream_duration_stays_below_worker_timeout(monkeypatch):
+    monkeypatch.delenv("STREAM_MAX_SECONDS", raising=False)
+    monkeypatch.delenv("GUNICORN_TIMEOUT", raising=False)
+    monkeypatch.delenv("BLS_TIMEOUT_MAX", raising=False)
+    assert streaming.max_seconds() == 90.0
+
+    monkeypatch.setenv("STREAM_MAX_SECONDS", "600")
+    assert streaming.max_seconds() == 90.0
+    monkeypatch.setenv("STREAM_MAX_SECONDS", "45")
+    assert streaming.max_seconds() == 45.0
+    monkeypatch.setenv("GUNICORN_TIMEOUT", "600")
+    monkeypatch.setenv("STREAM_MAX_SECONDS", "600")
+    assert streaming.max_seconds() == 570.0
@@ -0,0 +1,169 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.search import advanced_api, materialized
+from src.app.search.advanced_api import bp
+from src.app.search.materialized import ResultSet, ResultStore, get_result_store, reset_result_store
+
+ROWS = [
+    {"text": "casa", "country_code": "arg", "token_id": "t1", "start_ms": 30},
+    {"text": "Árbol", "country_code": "esp", "token_id": "t2", "start_ms": 10},
+    {"text": "bici", "country_code": "arg", "token_id": "t3", "start_ms": 20},
+]
+
+
+def _hit(i, word, country):
+    return {"docPid": str(i), "match": {"word": [word], "country_code": [country], "tokid": [f"t{i}"]}, "left": {}, "right": {}}
+
+
+HITS = [_hit(1, "casa", "ARG"), _hit(2, "árbol", "ESP"), _hit(3, "bici", "ARG"), _hit(4, "zorro", "MEX")]
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch, tmp_path):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    monkeypatch.setenv("RESULTS_TEMP_DIR", str(tmp_path))
+    reset_result_store()
+    yield
+    reset_result_store()
+
+
+def test_result_set_is_columnar_and_sorts_like_blacklab():
+    result_set = ResultSet.from_rows("k", ROWS, {"numberOfHits": 3})
+    assert result_set.tables["country_code"] == ["arg", "esp"]
+    assert result_set.columns["country_code"] == [0, 1, 0]
+
+    indexes = result_set.select()
+    assert [result_set.value("text", i) for i in result_set.order(indexes, "text")] == ["Árbol", "bici", "casa"]
+    assert result_set.order(indexes, "start_ms", descending=True) == [0, 2, 1]
+    assert result_set.select(["ARG"]) == [0, 2]
+    assert result_set.facets(indexes)["country_code"] == {"arg": 2, "esp": 1}
+
+    restored = ResultSet.from_json(result_set.to_json())
+    assert [restored.row(i) for i in indexes] == ROWS
+
+
+def test_store_spills_over_budget_and_expires(tmp_path):
+    first = ResultSet.from_rows("a", ROWS, {})
+    store = ResultStore(memory_budget=first.nbytes, disk_budget=10**6, ttl=60, spill_dir=tmp_path)
+    store.put(first)
+    store.put(ResultSet.from_rows("b", ROWS, {}))
+
+    assert store.snapshot()["disk_sets"] == 1
+    assert list(tmp_path.glob("*.json.gz"))
+    assert store.get("a").row(0) == ROWS[0]
+    # Loading "a" back spilled "b"
+    assert store.snapshot()["memory_sets"] == 1
+
+    store.ttl = 0
+    time.sleep(0.01)
+    assert store.get("a") is None
+    assert store.get("b") is None
+    assert not list(tmp_path.glob("*.json.gz"))
+
+
+def test_noted_candidates_expire_and_are_capped(monkeypatch, tmp_path):
+    monkeypatch.setattr(materialized, "MAX_NOTED", 3)
+    store = ResultStore(memory_budget=10**6, disk_budget=0, ttl=60, spill_dir=tmp_path)
+    for i in range(5):
+        store.note(f"q{i}", 10)
+    assert store.snapshot()["noted"] == 3
+    assert store.claim("q0") is None
+    assert store.claim("q4") == 10
+
+    store.ttl = 0
+    time.sleep(0.01)
+    store.note("fresh", 10)
+    assert store.snapshot()["noted"] == 1
+
+
+def test_second_request_materializes_and_later_ones_stay_local(monkeypatch):
+    calls = []
+
+    def fake_fetch(params, shards=None):
+        calls.append(dict(params))
+        first, number = int(params.get("first", 0)), int(params.get("number", 50))
+        return {"summary": {"numberOfHits": len(HITS)}, "hits": HITS[first : first + number], "docInfos": {}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    client = app.test_client()
+    base = "/search/advanced/data?q=casa&mode=forma&include_regional=1&length=2"
+
+    rv = client.get(base + "&start=0")
+    assert rv.get_json()["recordsTotal"] == 4
+    assert len(calls) == 1
+
+    # Page flip with a new sort: one full fetch, then sorted locally
+    rv = client.get(base + "&start=2&order[0][column]=2&order[0][dir]=asc")
+    data = rv.get_json()
+    assert len(calls) == 2
+    assert (calls[1]["first"], calls[1]["number"], "sort" in calls[1]) == (0, 4, False)
+    assert data["materialized"] is True
+    assert [row["text"] for row in data["data"]] == ["casa", "zorro"]
+
+    rv = client.get(base + "&start=0&order[0][column]=2&order[0][dir]=desc")
+    assert [row["text"] for row in rv.get_json()["data"]] == ["zorro", "casa"]
+
+    # Narrowing by country is served from the "all countries" set
+    rv = client.get(base + "&start=0&country_code=ARG")
+    data = rv.get_json()
+    assert [row["text"] for row in data["data"]] == ["casa", "bici"]
+    assert data["recordsTotal"] == 2
+    assert data["facets"]["country_code"] == {"arg": 2}
+    assert len(calls) == 2
+    assert get_result_store().snapshot()["hits"] == 2
+
+    # Without include_regional the narrowed query is national-only: BlackLab
+    client.get("/search/advanced/data?q=casa&mode=forma&length=2&start=0&country_code=ARG")
+    assert len(calls) == 3
+
+
+def test_materialization_pages_through_the_blacklab_page_maximum(monkeypatch):
+    calls = []
+    hits = list(HITS)
+
+    def fake_fetch(params, shards=None):
+        # BlackLab silently caps ``number`` at pageSize.max (here 3)
+        calls.append((int(params.get("first", 0)), int(params.get("number", 50))))
+        first, number = calls[-1][0], min(calls[-1][1], 3)
+        return {"summary": {"numberOfHits": len(hits)}, "hits": hits[first : first + number], "docInfos": {}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    monkeypatch.setattr(advanced_api, "GROUP_PAGE_SIZE", 3)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    client = app.test_client()
+    base = "/search/advanced/data?q=casa&mode=forma&include_regional=1&length=2"
+
+    client.get(base + "&start=0")
+    rv = client.get(base + "&start=2&order[0][column]=2&order[0][dir]=asc")
+    assert rv.get_json()["materialized"] is True
+    assert calls[1:] == [(0, 3), (3, 1)]
+
+    # A fetch that comes back short drops the stale total; the BlackLab
+    # fallback notes the current one and the next request materializes it
+    calls.clear()
+    other = "/search/advanced/data?q=bici&mode=forma&include_regional=1&length=2"
+    client.get(other + "&start=0")
+    del hits[3:]
+    rv = client.get(other + "&start=2")
+    assert "materialized" not in rv.get_json()
+    rv = client.get(other + "&start=0")
+    assert rv.get_json()["materialized"] is True
+    assert calls == [(0, 2), (0, 3), (3, 1), (2, 2), (0, 3)]
+
+    store = get_result_store()
+    store.note("stale", 3)
+    assert store.claim("stale") == 3
+    store.forget("stale")
+    assert store.claim("stale") is None
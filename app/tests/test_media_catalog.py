@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import imageio_ffmpeg
+
+from src.app.services import media_catalog
+from src.app.services.media_store import extract_country_code
+
+
+def _write(path: Path, data: bytes = b"x") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_lookup_resolves_direct_and_country_subfolder(tmp_path):
+    base = tmp_path / "mp3-full"
+    target = _write(base / "ARG" / "2023-08-10_ARG_Mitre.mp3", b"ID3abc")
+
+    catalog = media_catalog.MediaCatalog(media_catalog.KIND_FULL, base)
+
+    for filename in ("ARG/2023-08-10_ARG_Mitre.mp3", "2023-08-10_ARG_Mitre.mp3"):
+        entry = catalog.lookup(filename, extract_country_code)
+        assert entry is not None
+        assert entry.path == target.resolve()
+        assert entry.size == 6
+
+
+def test_lookup_rejects_traversal_and_unknown_suffix(tmp_path):
+    base = tmp_path / "transcripts"
+    _write(base / "ARG" / "2023-08-10_ARG_Mitre.json", b"{}")
+    _write(tmp_path / "secret.json", b"{}")
+
+    catalog = media_catalog.MediaCatalog(media_catalog.KIND_TRANSCRIPTS, base)
+
+    assert catalog.lookup("../secret.json") is None
+    assert catalog.lookup("ARG/../../secret.json") is None
+    assert catalog.lookup("ARG/2023-08-10_ARG_Mitre.mp3") is None
+    assert catalog.lookup("ARG/2023-08-10_ARG_Mitre.json") is not None
+
+
+def test_lookup_miss_picks_up_new_files(tmp_path):
+    base = tmp_path / "mp3-split"
+    _write(base / "VEN" / "2022-01-18_VEN_RCR_01.mp3")
+    catalog = media_catalog.MediaCatalog(
+        media_catalog.KIND_SPLIT, base, refresh_interval=3600, miss_refresh_interval=0
+    )
+    assert len(catalog.entries()) == 1
+
+    _write(base / "VEN" / "2022-01-18_VEN_RCR_02.mp3")
+
+    entry = catalog.lookup("2022-01-18_VEN_RCR_02.mp3", extract_country_code)
+    assert entry is not None
+    assert len(catalog) == 2
+
+
+def test_misses_rescan_at_most_once_per_interval(tmp_path, monkeypatch):
+    base = tmp_path / "mp3-split"
+    _write(base / "VEN" / "2022-01-18_VEN_RCR_01.mp3")
+    catalog = media_catalog.MediaCatalog(
+        media_catalog.KIND_SPLIT, base, refresh_interval=3600, miss_refresh_interval=3600
+    )
+    catalog.build()
+    scans = []
+    real_signature = catalog._dir_signature
+    monkeypatch.setattr(catalog, "_dir_signature", lambda: scans.append(1) or real_signature())
+
+    for _ in range(5):
+        assert catalog.lookup("VEN/missing.mp3") is None
+    assert len(scans) == 1
+
+
+def test_in_place_replacement_updates_entry(tmp_path):
+    base = tmp_path / "transcripts"
+    target = _write(base / "ARG" / "a.json", b"{}")
+    catalog = media_catalog.MediaCatalog(media_catalog.KIND_TRANSCRIPTS, base, refresh_interval=0)
+    assert catalog.lookup("ARG/a.json").size == 2
+
+    target.write_bytes(b'{"x": 1}')
+    assert catalog.lookup("ARG/a.json").size == 8
+    target.unlink()
+    assert catalog.lookup("ARG/a.json") is None
+
+
+def test_directory_symlinks_outside_base_are_skipped(tmp_path):
+    base = tmp_path / "transcripts"
+    _write(base / "ARG" / "a.json", b"{}")
+    _write(tmp_path / "outside" / "secret.json", b"{}")
+    (base / "LEAK").symlink_to(tmp_path / "outside", target_is_directory=True)
+    (base / "ARG" / "loop").symlink_to(base, target_is_directory=True)
+
+    catalog = media_catalog.MediaCatalog(media_catalog.KIND_TRANSCRIPTS, base)
+
+    assert catalog.lookup("LEAK/secret.json") is None
+    assert sorted(entry.key for entry in catalog.entries()) == ["ARG/a.json"]
+
+
+def test_compressed_transcripts_share_the_json_key_and_newer_wins(tmp_path):
+    import os
+
+    base = tmp_path / "transcripts"
+    packed = _write(base / "ARG" / "2023-08-10_ARG_Mitre.json.zst", b"zst")
+    plain = _write(base / "ARG" / "2023-08-10_ARG_Mitre.json", b"{}")
+    os.utime(plain, (1_000_000, 1_000_000))
+
+    catalog = media_catalog.MediaCatalog(media_catalog.KIND_TRANSCRIPTS, base)
+
+    assert [entry.key for entry in catalog.entries()] == ["ARG/2023-08-10_ARG_Mitre.json"]
+    for filename in (
+        "ARG/2023-08-10_ARG_Mitre.json",
+        "ARG/2023-08-10_ARG_Mitre.json.zst",
+        "2023-08-10_ARG_Mitre.json",
+    ):
+        assert catalog.lookup(filename, extract_country_code).path == packed.resolve()
+
+    os.utime(plain, None)
+    os.utime(packed, (1_000_000, 1_000_000))
+    catalog.build()
+    assert catalog.lookup("ARG/2023-08-10_ARG_Mitre.json").path == plain.resolve()
+
+
+def test_estimate_mp3_duration_for_cbr_file(tmp_path):
+    target = tmp_path / "tone.mp3"
+    subprocess.run(
+        [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            "sine=frequency=440:duration=6",
+            "-b:a",
+            "64k",
+            str(target),
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+    duration = media_catalog.estimate_mp3_duration(target, target.stat().st_size)
+
+    assert duration is not None
+    assert abs(duration - 6.0) < 0.5
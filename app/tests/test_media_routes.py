@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import gzip
 import importlib
 import json
 from pathlib import Path
 
+import brotli
 from flask import Flask
 
 
@@ -92,4 +94,292 @@ def test_transcript_route_resolves_flat_and_nested_paths(monkeypatch, tmp_path):
         payload = response.get_json()
         assert payload["country"] == transcript_payload["country"]
         assert payload["segments"] == transcript_payload["segments"]
-        assert payload["country_display"]
\ No newline at end of file
+        assert payload["country_display"]
+
+
+def test_transcript_route_serves_gzip_with_strong_etag(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    audio_filename, _, transcript_payload = _write_sample_media(media_root)
+    url = f"/media/transcripts/{audio_filename.replace('.mp3', '.json')}"
+
+    app = _make_app(media_root)
+    client = app.test_client()
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    payload = json.loads(gzip.decompress(response.data))
+    assert payload["segments"] == transcript_payload["segments"]
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    response = client.get(
+        url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # Identity is a different representation with its own ETag
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] != etag
+
+def test_transcript_route_serves_brotli_with_own_etag(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    audio_filename, _, transcript_payload = _write_sample_media(media_root)
+    url = f"/media/transcripts/{audio_filename.replace('.mp3', '.json')}"
+
+    client = _make_app(media_root).test_client()
+    gzip_etag = client.get(url, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "br"
+    payload = json.loads(brotli.decompress(response.data))
+    assert payload["segments"] == transcript_payload["segments"]
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert etag.endswith('-br"') and etag != gzip_etag
+
+    response = client.get(url, headers={"Accept-Encoding": "br", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_media_full_route_offloads_to_x_accel_redirect(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    audio_filename, _, _ = _write_sample_media(media_root)
+
+    app = _make_app(media_root)
+    app.config.update(
+        FILE_OFFLOAD_MODE="x-accel", FILE_OFFLOAD_INTERNAL_PREFIX="/_protected"
+    )
+    client = app.test_client()
+
+    response = client.get(f"/media/full/{audio_filename}?download=1")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.mimetype == "audio/mpeg"
+    assert (
+        response.headers["X-Accel-Redirect"]
+        == f"/_protected/media/mp3-full/ARG/{audio_filename}"
+    )
+    assert "attachment" in response.headers["Content-Disposition"]
+
+
+def test_media_full_route_offloads_to_x_sendfile(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    audio_filename, _, _ = _write_sample_media(media_root)
+
+    app = _make_app(media_root)
+    app.config.update(FILE_OFFLOAD_MODE="x-sendfile")
+    client = app.test_client()
+
+    response = client.get(f"/media/full/{audio_filename}")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["X-Sendfile"] == str(
+        (media_root / "mp3-full" / "ARG" / audio_filename).resolve()
+    )
+    assert "X-Accel-Redirect" not in response.headers
+
+
+def test_peaks_route_serves_ranges_with_cache_headers(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    peaks_bytes = b"CPK1" + bytes(range(60))
+    peaks_path = media_root / "peaks" / "ARG" / "2023-08-10_ARG_Mitre.peaks"
+    peaks_path.parent.mkdir(parents=True, exist_ok=True)
+    peaks_path.write_bytes(peaks_bytes)
+
+    app = _make_app(media_root)
+    client = app.test_client()
+
+    for url in (
+        "/media/peaks/2023-08-10_ARG_Mitre.peaks",
+        "/media/peaks/ARG/2023-08-10_ARG_Mitre.mp3",
+    ):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.data == peaks_bytes
+        assert response.headers["ETag"]
+        assert "max-age=86400" in response.headers["Cache-Control"]
+
+    response = client.get(
+        "/media/peaks/2023-08-10_ARG_Mitre.peaks", headers={"Range": "bytes=0-15"}
+    )
+    assert response.status_code == 206
+    assert response.data == peaks_bytes[:16]
+
+    assert client.get("/media/peaks/2023-08-10_ARG_Missing.peaks").status_code == 404
+
+
+def test_hls_route_serves_playlist_and_segments(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    recording_dir = media_root / "hls" / "ARG" / "2023-08-10_ARG_Mitre"
+    recording_dir.mkdir(parents=True)
+    (recording_dir / "index.m3u8").write_text(
+        "#EXTM3U\n#EXTINF:6.0,\nseg_00000.mp3\n#EXT-X-ENDLIST\n", encoding="utf-8"
+    )
+    (recording_dir / "seg_00000.mp3").write_bytes(b"\xff\xfbsegment")
+    (media_root / "hls" / "ARG" / "secret.mp3").write_bytes(b"nope")
+
+    app = _make_app(media_root)
+    client = app.test_client()
+
+    for recording in ("ARG/2023-08-10_ARG_Mitre", "2023-08-10_ARG_Mitre"):
+        response = client.get(f"/media/hls/{recording}/index.m3u8")
+        assert response.status_code == 200
+        assert response.mimetype == "application/vnd.apple.mpegurl"
+        assert "max-age=60" in response.headers["Cache-Control"]
+    segment_uri = response.get_data(as_text=True).splitlines()[2]
+    assert segment_uri.startswith("seg_00000.mp3?v=")
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/media/hls/ARG/2023-08-10_ARG_Mitre/index.m3u8", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = client.get(f"/media/hls/ARG/2023-08-10_ARG_Mitre/{segment_uri}")
+    assert response.status_code == 200
+    assert response.data == b"\xff\xfbsegment"
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert "immutable" in response.headers["Cache-Control"]
+
+    # Unversioned or outdated segment URLs are revalidated
+    for url in (
+        "/media/hls/ARG/2023-08-10_ARG_Mitre/seg_00000.mp3",
+        "/media/hls/ARG/2023-08-10_ARG_Mitre/seg_00000.mp3?v=old",
+    ):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert "no-cache" in response.headers["Cache-Control"]
+
+    for url in (
+        "/media/hls/ARG/2023-08-10_ARG_Mitre/seg_00001.mp3",
+        "/media/hls/ARG/2023-08-10_ARG_Mitre/..%2Fsecret.mp3",
+        "/media/hls/ARG/2023-08-10_ARG_Other/index.m3u8",
+    ):
+        assert client.get(url).status_code == 404
+
+
+def test_transcript_segments_route_returns_time_and_index_windows(
+    monkeypatch, tmp_path
+):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    segments = [
+        {
+            "speaker_code": "lib-pm",
+            "words": [
+                {
+                    "token_id": f"ARGa{i:04d}",
+                    "text": "señal" if i % 2 else "hola",
+                    "start_ms": i * 1000,
+                    "end_ms": i * 1000 + 900,
+                }
+            ],
+        }
+        for i in range(10)
+    ]
+    transcript = media_root / "transcripts" / "ARG" / "2023-08-10_ARG_Mitre.json"
+    transcript.parent.mkdir(parents=True)
+    transcript.write_text(
+        json.dumps(
+            {"filename": "2023-08-10_ARG_Mitre", "country": "ARG", "segments": segments},
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+    app = _make_app(media_root)
+    client = app.test_client()
+    url = "/media/transcript-segments/2023-08-10_ARG_Mitre.json"
+
+    payload = client.get(f"{url}?t0=2.5&t1=4.5").get_json()
+    assert (payload["start"], payload["end"]) == (2, 5)
+    assert payload["segments"] == segments[2:5]
+    assert payload["segment_count"] == 10
+    assert payload["duration_ms"] == 9900
+    assert payload["filename"] == "2023-08-10_ARG_Mitre"
+    assert payload["country_display"]
+
+    payload = client.get(f"{url}?start=8&count=5").get_json()
+    assert (payload["start"], payload["end"]) == (8, 10)
+    assert payload["segments"] == segments[8:]
+
+    payload = client.get(f"{url}?token=arga0006&count=2").get_json()
+    assert payload["segments"] == segments[6:8]
+
+    assert client.get(f"{url}?token=missing").status_code == 404
+    assert client.get(f"{url}?t0=abc").status_code == 400
+
+    payload = client.get(f"{url}?start=0&count=3&format=columnar").get_json()
+    assert payload["format"] == "columnar"
+    assert payload["segments"][1]["words"]["token_id"] == ["ARGa0001"]
+    assert payload["tables"]["speaker"] == ["lib-pm"]
+
+
+def test_transcript_columns_route_serves_columnar_document(monkeypatch, tmp_path):
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    audio_filename, _, transcript_payload = _write_sample_media(media_root)
+
+    app = _make_app(media_root)
+    client = app.test_client()
+
+    response = client.get(
+        f"/media/transcript-columns/{audio_filename.replace('.mp3', '.json')}"
+    )
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["format"] == "columnar"
+    assert payload["country"] == transcript_payload["country"]
+    assert payload["country_display"]
+    assert payload["segments"] == transcript_payload["segments"]
+
+
+def test_transcript_routes_read_compressed_transcripts(monkeypatch, tmp_path):
+    from src.scripts import transcript_io
+
+    runtime_root = tmp_path / "workspace"
+    media_root = runtime_root / "media"
+    _setup_env(monkeypatch, runtime_root, media_root)
+    segments = [
+        {"words": [{"token_id": f"ARGz{i}", "start_ms": i * 1000, "end_ms": i * 1000 + 500}]}
+        for i in range(4)
+    ]
+    document = {"filename": "2023-08-10_ARG_Mitre", "country": "ARG", "segments": segments}
+    transcript_io.write_transcript(
+        media_root / "transcripts" / "ARG" / "2023-08-10_ARG_Mitre.json.zst", document
+    )
+
+    app = _make_app(media_root)
+    client = app.test_client()
+
+    payload = client.get("/media/transcripts/ARG/2023-08-10_ARG_Mitre.json").get_json()
+    assert payload["segments"] == segments
+    payload = client.get(
+        "/media/transcript-segments/2023-08-10_ARG_Mitre.json?start=1&count=2"
+    ).get_json()
+    assert payload["segments"] == segments[1:3]
+    assert payload["filename"] == "2023-08-10_ARG_Mitre"
+    payload = client.get("/media/transcript-columns/2023-08-10_ARG_Mitre.json").get_json()
+    assert payload["segments"][3]["words"]["token_id"] == ["ARGz3"]
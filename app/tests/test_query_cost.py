@@ -0,0 +1,120 @@
+import os
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions import bls_resilience
+from src.app.search import query_cost
+from src.app.search.advanced_api import bp
+from src.app.search.query_cost import (
+    CHEAP,
+    REFUSED,
+    SLOW,
+    SlowLaneBusy,
+    estimate_query_cost,
+    filter_selectivity,
+    query_lane,
+)
+
+DOCMETA = {
+    "a": {"country_code": "ARG"},
+    "b": {"country_code": "ARG-CBA", "country_parent_code": "ARG"},
+    "c": {"country_code": "ESP"},
+    "d": {"country_code": "MEX"},
+}
+
+
+@pytest.fixture(autouse=True)
+def lanes(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    query_cost.reset()
+    yield
+    query_cost.reset()
+
+
+@pytest.mark.parametrize(
+    "cql, lane",
+    [
+        ('[lemma="casa"]', CHEAP),
+        ('"casa" "blanca"', CHEAP),
+        ('[word="cas.*"]', CHEAP),
+        ('[word=".*ción"]', SLOW),
+        ('[word=".*a.*"]', SLOW),
+        ('[word=".*a.*"]+', REFUSED),
+        ('[lemma="ir"] []{1,10} [word=".*ar"]', CHEAP),
+        ("[]{1,10}", REFUSED),
+        ('[pos="VERB"] [pos="NOUN"]', CHEAP),
+    ],
+)
+def test_lanes(cql, lane):
+    assert estimate_query_cost(cql).lane == lane
+
+
+def test_filters_scale_cost():
+    assert filter_selectivity({"country_code": ["ARG"]}, DOCMETA) == 0.5
+    assert filter_selectivity({"country_code": ["ESP"], "exclude_country_code": ["ESP"]}, DOCMETA) == 0.0
+
+    broad = estimate_query_cost('[word=".*ción"]')
+    narrow = estimate_query_cost('[word=".*ción"]', {"country_code": ["ESP"]}, DOCMETA)
+    assert narrow.score < broad.score
+    assert narrow.lane == CHEAP
+    assert broad.reasons
+
+
+def test_slow_lane_rejects_when_busy(monkeypatch):
+    monkeypatch.setenv("QUERY_SLOW_LANE_WAIT", "0")
+    cost = estimate_query_cost('[word=".*ción"]')
+    entered, release = threading.Event(), threading.Event()
+
+    def hold():
+        with query_lane(cost):
+            entered.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    entered.wait(5)
+    try:
+        with pytest.raises(SlowLaneBusy):
+            with query_lane(cost):
+                pass
+        # Cheap queries do not wait for the slow lane
+        with query_lane(estimate_query_cost('[lemma="casa"]')):
+            pass
+    finally:
+        release.set()
+        worker.join()
+
+    stats = query_cost.snapshot()
+    assert stats[SLOW]["rejected"] == 1
+    assert stats[SLOW]["run"]["count"] == 1
+    assert stats[CHEAP]["run"]["count"] == 1
+
+
+def test_slow_lane_marks_blacklab_calls_slow(monkeypatch):
+    monkeypatch.setenv("QUERY_SLOW_TIMEOUT", "75")
+    with query_lane(estimate_query_cost('[word=".*ción"]')):
+        assert bls_resilience._SLOW_READ_TIMEOUT.get() == 75.0
+    with query_lane(estimate_query_cost('[lemma="casa"]')):
+        assert bls_resilience._SLOW_READ_TIMEOUT.get() is None
+    assert bls_resilience._SLOW_READ_TIMEOUT.get() is None
+
+
+def test_datatable_refuses_expensive_query():
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    with patch("src.app.search.advanced_api._fetch_hits") as fetch:
+        rv = app.test_client().get("/search/advanced/data?q=[]{1,10}&mode=cql&draw=3")
+    fetch.assert_not_called()
+    data = rv.get_json()
+    assert rv.status_code == 400
+    assert data["error"] == "query_too_expensive"
+    assert data["draw"] == 3
+    assert query_cost.snapshot()[REFUSED]["rejected"] == 1
@@ -0,0 +1,80 @@
+import os
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions.bulkheads import reset_bulkheads
+from src.app.search import advanced_api
+from src.app.search.advanced_api import bp
+from src.app.search.materialized import reset_result_store
+from src.app.search.sampling import sample_info, sampling_params, split_samplenum, wilson_interval
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    reset_result_store()
+    reset_bulkheads()
+    yield
+    reset_bulkheads()
+
+
+def test_sampling_params_and_reproducible_seed():
+    assert sampling_params({}) == {}
+    assert sampling_params({"sample": "100"}) == {}
+    assert sampling_params({"sample": "abc"}) == {}
+
+    first = sampling_params({"sample": "5"}, '[pos="DET"]')
+    assert first["sample"] == "5"
+    assert first == sampling_params({"sample": "5.0"}, '[pos="DET"]')
+    assert first["sampleseed"] != sampling_params({"sample": "5"}, '[pos="ADJ"]')["sampleseed"]
+
+    assert sampling_params({"samplenum": "1000", "sampleseed": "7"}) == {"samplenum": 1000, "sampleseed": 7}
+
+
+def test_wilson_interval_and_estimated_total():
+    low, high = wilson_interval(50, 100)
+    assert (round(low, 3), round(high, 3)) == (0.404, 0.596)
+    assert wilson_interval(0, 0) == (0.0, 0.0)
+
+    info = sample_info({"sample": "10", "sampleseed": 3}, 1000)
+    assert info["estimated_total"] == 10000
+    low, high = info["estimated_total_ci"]
+    assert low < 10000 < high
+
+
+def test_split_samplenum_is_proportional():
+    assert split_samplenum(100, [900, 100]) == [90, 10]
+    assert split_samplenum(10, [1, 1, 1]) == [1, 1, 1]
+    shares = split_samplenum(10, [5, 5, 5])
+    assert sum(shares) == 10 and max(shares) - min(shares) <= 1
+    assert split_samplenum(3, [0, 7, 0]) == [0, 3, 0]
+
+
+def test_stats_are_computed_on_the_sample(monkeypatch):
+    calls = []
+
+    def fake_fetch(params, shards=None):
+        calls.append(dict(params))
+        if params.get("group"):
+            return {"hitGroups": [{"identity": "ARG", "size": 60}, {"identity": "ESP", "size": 40}]}
+        return {"summary": {"numberOfHits": 100}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+
+    rv = app.test_client().get("/search/advanced/stats?q=el&mode=forma&sample=1&sampleseed=42")
+    data = rv.get_json()
+
+    assert rv.status_code == 200
+    assert all(call["sample"] == "1" and call["sampleseed"] == 42 for call in calls)
+    assert data["sample"]["estimated_total"] == 10000
+    arg = data["by_country"][0]
+    assert (arg["key"], arg["n"], arg["p"]) == ("ARG", 60, 0.6)
+    assert arg["p_low"] < 0.6 < arg["p_high"]
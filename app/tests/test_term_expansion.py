@@ -0,0 +1,81 @@
+import os
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.extensions.bulkheads import reset_bulkheads
+from src.app.search import advanced_api
+from src.app.search.advanced_api import bp
+from src.app.search.materialized import reset_result_store
+from src.app.search.query_cost import CHEAP, estimate_query_cost
+from src.app.search.term_expansion import expand_cql, reset_ngram_indexes
+from src.app.search.vocabulary import reset_vocabularies
+from src.scripts.blacklab_index_creation import TermCounter, write_vocabulary
+
+NORMS = ["accion", "cancion", "canciones", "nacional", "rapidamente", "mente", "casa"]
+WORDS = ["Acción", "acción", "canción", "Canciones", "rápidamente", "mente", "casa"]
+
+
+@pytest.fixture(autouse=True)
+def vocabulary(monkeypatch, tmp_path):
+    monkeypatch.delenv("BLS_SHARDS", raising=False)
+    monkeypatch.setenv("CORAPAN_VOCABULARY_DIR", str(tmp_path))
+    counter = TermCounter()
+    counter.counts["norm"] = Counter(NORMS)
+    counter.counts["word"] = Counter(WORDS)
+    write_vocabulary(tmp_path, counter)
+    reset_vocabularies()
+    reset_ngram_indexes()
+    reset_result_store()
+    reset_bulkheads()
+    yield tmp_path
+    reset_vocabularies()
+    reset_ngram_indexes()
+    reset_bulkheads()
+
+
+def test_infix_and_suffix_regexes_become_alternations():
+    assert expand_cql('[norm=".*cion.*"]') == '[norm="(accion|cancion|canciones|nacional)"]'
+    assert expand_cql('[norm=".*mente"] [pos="ADV"]') == '[norm="(mente|rapidamente)"] [pos="ADV"]'
+    # word is case- and accent-sensitive: "Canciones" does not contain "ción"
+    assert expand_cql('[word=".*ción.*" & pos="NOUN"]') == '[word="(Acción|acción|canción)" & pos="NOUN"]'
+    assert expand_cql('".*mente"') == '"(mente|rápidamente)"'
+
+
+def test_regex_is_kept_when_expansion_is_not_possible(monkeypatch):
+    # Literal shorter than a trigram, prefix regex, no match, unknown annotation
+    for cql in ('[norm=".*on.*"]', '[norm="can.*"]', '[norm=".*xyz.*"]', '[pos=".*NOU.*"]', '[norm=".*c[io]on.*"]'):
+        assert expand_cql(cql) == cql
+    monkeypatch.setenv("TERM_EXPANSION_LIMIT", "3")
+    assert expand_cql('[norm=".*cion.*"]') == '[norm=".*cion.*"]'
+
+
+def test_expansion_without_dictionary_keeps_regex(monkeypatch, tmp_path):
+    monkeypatch.setenv("CORAPAN_VOCABULARY_DIR", str(tmp_path / "missing"))
+    reset_vocabularies()
+    assert expand_cql('[norm=".*cion.*"]') == '[norm=".*cion.*"]'
+
+
+def test_contains_search_sends_expanded_pattern_in_cheap_lane(monkeypatch):
+    calls = []
+
+    def fake_fetch(params, shards=None):
+        calls.append(dict(params))
+        return {"summary": {"numberOfHits": 0}, "hits": [], "docInfos": {}}
+
+    monkeypatch.setattr(advanced_api, "_fetch_hits", fake_fetch)
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+
+    rv = app.test_client().get("/search/advanced/data?q=Ción&mode=contains&sensitive=0&include_regional=1")
+
+    assert rv.status_code == 200
+    assert calls[0]["patt"] == '[norm="(accion|cancion|canciones|nacional)"]'
+    assert estimate_query_cost(calls[0]["patt"], {}, {}).lane == CHEAP
+    assert estimate_query_cost('[norm=".*cion.*"]', {}, {}).lane != CHEAP
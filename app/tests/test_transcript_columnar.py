@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+
+from src.app.services import transcript_columnar
+
+
+def _document(segment_count: int = 20) -> dict:
+    segments = []
+    for s in range(segment_count):
+        words = []
+        for w in range(8):
+            word = {
+                "token_id": f"ARGa{s:03d}{w}",
+                "text": "hablamos" if w % 2 else "de",
+                "start_ms": s * 10_000 + w * 400,
+                "end_ms": s * 10_000 + w * 400 + 350,
+                "lemma": "hablar" if w % 2 else "de",
+                "pos": "VERB" if w % 2 else "ADP",
+                "morph": "Mood=Ind|Number=Plur" if w % 2 else "",
+                "norm": "hablamos" if w % 2 else "de",
+            }
+            if w == 3:
+                word["past_type"] = "simplePast"
+            if w == 5:
+                word["lemma"] = None
+            words.append(word)
+        segments.append(
+            {
+                "speaker": "spk1" if s % 2 else "spk2",
+                "speaker_code": "lib-pm" if s % 2 else "lec-pf",
+                "utt_start_ms": s * 10_000,
+                "utt_end_ms": s * 10_000 + 3_150,
+                "words": words,
+            }
+        )
+    return {"filename": "2023-08-10_ARG_Mitre", "country": "ARG", "segments": segments}
+
+
+def test_encode_decode_round_trip():
+    document = _document()
+
+    encoded = transcript_columnar.encode(document)
+
+    assert encoded["format"] == "columnar"
+    assert encoded["tables"]["pos"] == ["ADP", "VERB"]
+    assert encoded["tables"]["speaker"] == ["spk2", "lec-pf", "spk1", "lib-pm"]
+    words = encoded["segments"][0]["words"]
+    assert words["n"] == 8
+    assert words["past_type"] == [None, None, None, 0, None, None, None, None]
+    assert words["nulls"] == {"lemma": [5]}
+    assert transcript_columnar.decode(encoded) == document
+
+
+def test_encoded_body_is_much_smaller(tmp_path):
+    document = _document(200)
+    path = tmp_path / "2023-08-10_ARG_Mitre.json"
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    body = transcript_columnar.encode_file(path)
+
+    assert len(body) < path.stat().st_size / 2
+    assert transcript_columnar.decode(json.loads(body)) == document
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import os
+
+from src.scripts import transcript_io
+
+
+def _transcript(index: int) -> dict:
+    return {
+        "file_id": f"2023-08-10_ARG_Mitre_{index}",
+        "country_code": "ARG",
+        "segments": [
+            {
+                "speaker_code": "lib-pm",
+                "words": [
+                    {"token_id": f"ARG{index}{w}", "text": "hola", "lemma": "hola", "pos": "INTJ"}
+                    for w in range(50)
+                ],
+            }
+        ],
+    }
+
+
+def test_round_trip_plain_and_compressed(tmp_path):
+    data = _transcript(1)
+    plain = tmp_path / "ARG" / "a.json"
+    packed = tmp_path / "ARG" / "a.json.zst"
+
+    transcript_io.write_transcript(plain, data)
+    transcript_io.write_transcript(packed, data)
+
+    assert json.loads(plain.read_text(encoding="utf-8")) == data
+    assert transcript_io.read_transcript(packed) == data
+    assert packed.stat().st_size < plain.stat().st_size / 5
+    assert transcript_io.transcript_stem(packed) == "a"
+
+
+def test_iter_prefers_newer_variant(tmp_path):
+    older = tmp_path / "b.json.zst"
+    newer = tmp_path / "b.json"
+    transcript_io.write_transcript(older, _transcript(1))
+    transcript_io.write_transcript(newer, _transcript(2))
+    os.utime(older, (1_000_000, 1_000_000))
+    transcript_io.write_transcript(tmp_path / "a.json.zst", _transcript(3))
+
+    files = transcript_io.iter_transcript_files(tmp_path)
+
+    assert [p.name for p in files] == ["a.json.zst", "b.json"]
+
+
+def test_cli_compress_with_dictionary_and_decompress(tmp_path):
+    corpus = tmp_path / "transcripts"
+    for i in range(20):
+        transcript_io.write_transcript(corpus / "ARG" / f"doc_{i}.json", _transcript(i))
+    transcript_io.write_transcript(corpus / "ARG" / "backup" / "doc_0_original.json", _transcript(0))
+    dictionary = tmp_path / "transcripts.zdict"
+
+    assert transcript_io.main(["train-dict", str(corpus), "--out", str(dictionary), "--size", "4096"]) == 0
+    assert transcript_io.main(
+        ["compress", str(corpus), "--dict", str(dictionary), "--remove-source"]
+    ) == 0
+
+    packed = corpus / "ARG" / "doc_3.json.zst"
+    assert not (corpus / "ARG" / "doc_3.json").exists()
+    assert (corpus / "ARG" / "backup" / "doc_0_original.json").exists()
+    zdict = transcript_io.load_dictionary(dictionary)
+    assert transcript_io.read_transcript(packed, dictionary=zdict) == _transcript(3)
+
+    assert transcript_io.main(["decompress", str(corpus), "--dict", str(dictionary)]) == 0
+    assert json.loads((corpus / "ARG" / "doc_3.json").read_text(encoding="utf-8")) == _transcript(3)
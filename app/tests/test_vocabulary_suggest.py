@@ -0,0 +1,87 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("CORAPAN_RUNTIME_ROOT", str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("BLS_BASE_URL", "http://localhost:8081/blacklab-server")
+os.environ.setdefault("BLS_CORPUS", "corapan")
+
+from src.app.search import advanced_api
+from src.app.search.suggest import bp
+from src.app.search.vocabulary import Vocabulary, get_vocabulary, reset_vocabularies
+from src.scripts.blacklab_index_creation import TermCounter, export_to_tsv, write_vocabulary
+
+
+def _word(i, text, lemma):
+    return {
+        "token_id": f"t{i}",
+        "start_ms": i * 10,
+        "end_ms": i * 10 + 5,
+        "lemma": lemma,
+        "pos": "NOUN",
+        "norm": text.lower(),
+        "sentence_id": "s1",
+        "utterance_id": "u1",
+        "text": text,
+    }
+
+
+WORDS = [("Árbol", "árbol"), ("árbol", "árbol"), ("arboles", "árbol"), ("arena", "arena"), ("casa", "casa")]
+
+
+@pytest.fixture(autouse=True)
+def vocabulary_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("CORAPAN_VOCABULARY_DIR", str(tmp_path / "vocabulary"))
+    reset_vocabularies()
+    yield tmp_path / "vocabulary"
+    reset_vocabularies()
+
+
+def _export(tmp_path, vocabulary_dir):
+    counter = TermCounter()
+    doc = {"file_id": "doc1", "segments": [{"speaker": {"code": "none"}, "words": [_word(i, *w) for i, w in enumerate(WORDS)]}]}
+    ok, msg = export_to_tsv(doc, Path("doc1.json"), tmp_path, {}, vocabulary=counter)
+    assert ok, msg
+    return write_vocabulary(vocabulary_dir, counter)
+
+
+def test_export_writes_sorted_term_dictionaries(tmp_path, vocabulary_dir):
+    paths = _export(tmp_path, vocabulary_dir)
+
+    assert sorted(p.name for p in paths if p.name.count(".") == 1) == ["lemma.tsv", "norm.tsv", "word.tsv"]
+    assert (vocabulary_dir / "lemma.tsv").read_text(encoding="utf-8").splitlines() == ["árbol\t3", "arena\t1", "casa\t1"]
+    assert get_vocabulary("word").terms == ["Árbol", "árbol", "arboles", "arena", "casa"]
+
+
+def test_prefix_lookup_is_accent_insensitive_and_ranked_by_frequency():
+    vocabulary = Vocabulary([("árbol", 30), ("arboleda", 5), ("árboles", 12), ("arena", 40), ("casa", 99)])
+
+    assert [s["term"] for s in vocabulary.suggest("ARBO")] == ["árbol", "árboles", "arboleda"]
+    # Short prefixes come from the precomputed top lists
+    assert [s["term"] for s in vocabulary.suggest("ar", limit=2)] == ["arena", "árbol"]
+    assert vocabulary.suggest("ä") == vocabulary.suggest("a")
+    assert vocabulary.suggest("x") == []
+    assert vocabulary.suggest("") == []
+
+
+def test_suggest_endpoint_does_not_contact_blacklab(monkeypatch, tmp_path, vocabulary_dir):
+    monkeypatch.setattr(advanced_api, "_fetch_hits", lambda *a, **k: pytest.fail("BlackLab contacted"))
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    client = app.test_client()
+
+    rv = client.get("/search/suggest?q=arb&annotation=lemma")
+    assert (rv.status_code, rv.get_json()["available"]) == (200, False)
+
+    _export(tmp_path, vocabulary_dir)
+    started = time.perf_counter()
+    rv = client.get("/search/suggest?q=Arb&annotation=lemma&limit=5")
+    data = rv.get_json()
+
+    assert data["available"] is True
+    assert data["suggestions"] == [{"term": "árbol", "freq": 3}]
+    assert time.perf_counter() - started < 0.5
+    assert client.get("/search/suggest?q=a&annotation=pos").status_code == 400
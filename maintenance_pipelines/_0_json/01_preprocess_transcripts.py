@@ -30,6 +30,7 @@ Copyright (c) 2025 CO.RA.PAN Project
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import json
 import logging
 import re
@@ -47,6 +48,22 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 INPUT_DIR = SCRIPT_DIR / "json-pre"
 OUTPUT_DIR = SCRIPT_DIR / "json-ready"
 
+# Gemeinsame Transkript-I/O (.json / .json.zst, optional mit zstd-Dictionary)
+TRANSCRIPT_IO_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "transcript_io.py"
+
+
+def load_transcript_io():
+    spec = importlib.util.spec_from_file_location("corapan_transcript_io", TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_transcript_io"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
+
 # Regex für (foreign)-Tag
 FOREIGN_TAG_RE = re.compile(r"\(foreign\)", re.IGNORECASE)
 
@@ -573,8 +590,7 @@ def process_file(
         True wenn erfolgreich
     """
     try:
-        with open(input_path, "r", encoding="utf-8-sig") as f:
-            data = json.load(f)
+        data = transcript_io.read_transcript(input_path)
     except json.JSONDecodeError as e:
         msg = f"{input_path.name}: JSON-Syntaxfehler: {e}"
         logger.error(msg)
@@ -614,8 +630,7 @@ def process_file(
     
     # Datei schreiben
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        transcript_io.write_transcript(output_path, data)
         stats.files_written += 1
         return True
     except Exception as e:
@@ -704,7 +719,7 @@ def main() -> int:
         return 1
     
     # JSON-Dateien sammeln
-    json_files = sorted(args.input.glob("*.json"))
+    json_files = transcript_io.iter_transcript_files(args.input)
     
     if not json_files:
         logger.error(f"Keine JSON-Dateien in '{args.input}' gefunden.")
@@ -67,6 +67,22 @@ COUNTRIES_PY_CANDIDATES = (
 )
 COUNTRIES_PY = next((path for path in COUNTRIES_PY_CANDIDATES if path.exists()), COUNTRIES_PY_CANDIDATES[-1])
 
+# Gemeinsame Transkript-I/O (.json / .json.zst, optional mit zstd-Dictionary)
+TRANSCRIPT_IO_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "transcript_io.py"
+
+
+def load_transcript_io():
+    spec = importlib.util.spec_from_file_location("corapan_transcript_io", TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_transcript_io"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
+
 LOG_DIR = SCRIPT_DIR / "logs" / "annotation"
 PROGRESS_DIR = SCRIPT_DIR / "logs"
 STATE_DB = SCRIPT_DIR / "state" / "annotation" / "annotation_state.sqlite"
@@ -208,11 +224,13 @@ def resolve_path(path_arg: str) -> Path:
 
 
 def read_json(path: Path) -> dict[str, Any]:
-    with path.open("r", encoding="utf-8-sig") as fh:
-        return json.load(fh)
+    return transcript_io.read_transcript(path)
 
 
 def atomic_write_json(path: Path, data: dict[str, Any]) -> None:
+    if path.name.lower().endswith(transcript_io.ZST_SUFFIX):
+        transcript_io.write_transcript(path, data)
+        return
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = Path(str(path) + ".tmp")
     tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
@@ -1442,7 +1460,7 @@ def collect_json_files(country: str | None = None, file_arg: str | None = None)
     for country_dir in sorted(path for path in TRANSCRIPTS_DIR.iterdir() if path.is_dir()):
         if country and normalize_country_code(country_dir.name) != normalize_country_code(country):
             continue
-        for json_file in sorted(country_dir.glob("*.json")):
+        for json_file in transcript_io.iter_transcript_files(country_dir):
             files.append((json_file, project_rel(json_file)))
     return files
 
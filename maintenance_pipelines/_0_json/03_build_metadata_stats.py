@@ -11,6 +11,8 @@ EINGABEPFAD:  media/transcripts/<country>/*.json
 AUSGABEDATEIEN:
     data/db/public/stats_country.db        - Statistiken pro Land
     data/db/public/stats_files.db          - Metadaten pro Datei
+    data/db/public/stats_frequencies.db    - Frequenzlisten (word, lemma, pos, norm
+                                             x Land, Geschlecht, Sprechertyp, Modus)
 
 HINWEIS:
     transcription.db wird NICHT mehr erstellt.
@@ -87,6 +89,38 @@ def load_country_normalizer():
 
 normalize_country_code = load_country_normalizer()
 
+# Gemeinsame Transkript-I/O (.json / .json.zst, optional mit zstd-Dictionary)
+TRANSCRIPT_IO_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "transcript_io.py"
+
+
+def load_transcript_io():
+    spec = importlib.util.spec_from_file_location("corapan_transcript_io", TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_transcript_io"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
+
+# Frequenztabellen (app/src/scripts/frequency_tables.py, nur Standardbibliothek)
+FREQUENCY_TABLES_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "frequency_tables.py"
+
+
+def load_frequency_tables():
+    spec = importlib.util.spec_from_file_location("corapan_frequency_tables", FREQUENCY_TABLES_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load frequency table module: {FREQUENCY_TABLES_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_frequency_tables"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+frequency_tables = load_frequency_tables()
+
 # ==============================================================================
 # LOGGING
 # ==============================================================================
@@ -209,7 +243,7 @@ def collect_json_files(country: str | None = None) -> list[Path]:
             continue
         
         # Sortierte JSON-Dateien
-        country_files = sorted(country_dir.glob("*.json"))
+        country_files = transcript_io.iter_transcript_files(country_dir)
         json_files.extend(country_files)
     
     logger.info(f"Gefunden: {len(json_files)} JSON-Dateien in {len(country_dirs)} Ländern")
@@ -230,7 +264,7 @@ def build_stats_country(json_files: list[Path]) -> bool:
     """
     logger.info("")
     logger.info("=" * 70)
-    logger.info("1/2 → Erstelle stats_country.db")
+    logger.info("1/3 → Erstelle stats_country.db")
     logger.info("=" * 70)
     
     PUBLIC_DB_DIR.mkdir(parents=True, exist_ok=True)
@@ -264,8 +298,7 @@ def build_stats_country(json_files: list[Path]) -> bool:
     
     for jf in json_files:
         try:
-            with open(jf, "r", encoding="utf-8-sig") as f:
-                data = json.load(f)
+            data = transcript_io.read_transcript(jf)
             
             # Land aus JSON oder Ordnername
             country_code = data.get("country_code", "")
@@ -324,7 +357,7 @@ def build_stats_files(json_files: list[Path]) -> bool:
     """
     logger.info("")
     logger.info("=" * 70)
-    logger.info("2/2 → Erstelle stats_files.db")
+    logger.info("2/3 → Erstelle stats_files.db")
     logger.info("=" * 70)
     
     PUBLIC_DB_DIR.mkdir(parents=True, exist_ok=True)
@@ -361,8 +394,7 @@ def build_stats_files(json_files: list[Path]) -> bool:
     
     for idx, jf in enumerate(json_files, 1):
         try:
-            with open(jf, "r", encoding="utf-8-sig") as f:
-                data = json.load(f)
+            data = transcript_io.read_transcript(jf)
             
             # Country-Code
             country_code = data.get("country_code", "")
@@ -372,7 +404,7 @@ def build_stats_files(json_files: list[Path]) -> bool:
             # Filename (MP3, nicht JSON)
             filename = data.get("filename", "")
             if not filename:
-                file_id = data.get("file_id") or f"{country_code}_{jf.stem}"
+                file_id = data.get("file_id") or f"{country_code}_{transcript_io.transcript_stem(jf)}"
                 filename = f"{file_id}.mp3"
             
             # Metadaten
@@ -414,6 +446,62 @@ def build_stats_files(json_files: list[Path]) -> bool:
     
     return True
 
+# ==============================================================================
+# 3) stats_frequencies.db - Frequenzlisten pro Annotation und Metadaten-Schnitt
+# ==============================================================================
+
+def build_stats_frequencies(json_files: list[Path]) -> bool:
+    """
+    Erstellt stats_frequencies.db mit Frequenztabellen.
+
+    Gezählt wird jeder Wert von word, lemma, pos und norm pro Schnitt
+    (Land x speaker_sex x speaker_type x speaker_mode). Die App liefert die
+    Tabellen über /api/frequencies aus, ohne BlackLab.
+
+    Tabellen (siehe app/src/scripts/frequency_tables.py):
+        - terms: Annotation, Wert, gefalteter Wert, Gesamtfrequenz
+        - frequencies: term_id, country, sex, speaker_type, mode, freq
+        - meta: Build-Zeitpunkt, Dateien, Tokens
+    """
+    logger.info("")
+    logger.info("=" * 70)
+    logger.info("3/3 → Erstelle stats_frequencies.db")
+    logger.info("=" * 70)
+
+    counter = frequency_tables.FrequencyCounter()
+    errors = 0
+
+    for idx, jf in enumerate(json_files, 1):
+        try:
+            data = transcript_io.read_transcript(jf)
+
+            country_code = data.get("country_code", "")
+            if not country_code:
+                country_code = normalize_country_code(jf.parent.name)
+
+            counter.add_document(data, country_code)
+
+        except Exception as e:
+            logger.warning(f"Fehler bei {jf.name}: {e}")
+            errors += 1
+            continue
+
+        if idx % 50 == 0 or idx == len(json_files):
+            logger.info(f"  {idx}/{len(json_files)} Dateien verarbeitet")
+
+    db_path = PUBLIC_DB_DIR / "stats_frequencies.db"
+    terms = frequency_tables.write_frequency_db(db_path, counter)
+
+    logger.info("")
+    logger.info(f"✅ stats_frequencies.db erstellt:")
+    logger.info(f"   Tokens: {counter.tokens:,}, Zeilen: {len(counter.counts):,}")
+    for annotation, count in terms.items():
+        logger.info(f"     {annotation}: {count:,} Werte")
+    if errors > 0:
+        logger.warning(f"   Fehler: {errors} Dateien übersprungen")
+
+    return True
+
 # ==============================================================================
 # VERIFY-ONLY MODE
 # ==============================================================================
@@ -457,6 +545,19 @@ def verify_databases() -> bool:
     else:
         logger.error(f"❌ stats_files.db nicht gefunden: {stats_files_path}")
         all_ok = False
+
+    # stats_frequencies.db
+    stats_frequencies_path = PUBLIC_DB_DIR / "stats_frequencies.db"
+    if stats_frequencies_path.exists():
+        conn = sqlite3.connect(str(stats_frequencies_path))
+        cursor = conn.cursor()
+        cursor.execute("SELECT annotation, COUNT(*) FROM terms GROUP BY annotation")
+        counts = ", ".join(f"{ann}={n}" for ann, n in cursor.fetchall())
+        conn.close()
+        logger.info(f"✅ stats_frequencies.db: {counts}")
+    else:
+        logger.error(f"❌ stats_frequencies.db nicht gefunden: {stats_frequencies_path}")
+        all_ok = False
     
     # Hinweis auf transcription.db
     transcription_path = PUBLIC_DB_DIR / "transcription.db"
@@ -493,6 +594,7 @@ Beispiele:
 Ausgabedateien:
     data/db/public/stats_country.db        - Statistiken pro Land
     data/db/public/stats_files.db          - Metadaten pro Datei
+    data/db/public/stats_frequencies.db    - Frequenzlisten
 
 HINWEIS: transcription.db wird NICHT mehr erstellt!
          Token-Suche erfolgt über BlackLab direkt aus den JSONs.
@@ -573,6 +675,9 @@ def main() -> int:
     
     if not build_stats_files(json_files):
         success = False
+
+    if not build_stats_frequencies(json_files):
+        success = False
     
     # Zeitmessung
     elapsed = time.time() - start_time
@@ -590,6 +695,7 @@ def main() -> int:
     logger.info("Erstellte DBs:")
     logger.info(f"  • {PUBLIC_DB_DIR / 'stats_country.db'}")
     logger.info(f"  • {PUBLIC_DB_DIR / 'stats_files.db'}")
+    logger.info(f"  • {PUBLIC_DB_DIR / 'stats_frequencies.db'}")
     logger.info("")
     logger.info("ℹ️  HINWEISE:")
     logger.info("   • transcription.db wird nicht mehr erstellt (BlackLab nutzt JSONs direkt)")
@@ -93,6 +93,22 @@ def load_country_normalizer():
 
 normalize_country_code = load_country_normalizer()
 
+# Gemeinsame Transkript-I/O (.json / .json.zst, optional mit zstd-Dictionary)
+TRANSCRIPT_IO_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "transcript_io.py"
+
+
+def load_transcript_io():
+    spec = importlib.util.spec_from_file_location("corapan_transcript_io", TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_transcript_io"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
+
 # ==============================================================================
 # HELPER FUNCTIONS
 # ==============================================================================
@@ -150,7 +166,7 @@ def collect_json_files(countries: list[str] | None = None, limit_files: int | No
                 continue
         
         # Sortierte JSON-Dateien
-        country_files = sorted(country_dir.glob("*.json"))
+        country_files = transcript_io.iter_transcript_files(country_dir)
         json_files.extend(country_files)
     
     # Limit anwenden
@@ -188,8 +204,7 @@ def load_data_from_json(countries: list[str] | None = None, limit_files: int | N
     
     for jf in json_files:
         try:
-            with open(jf, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
+            data = transcript_io.read_transcript(jf)
             
             # Country code bestimmen
             country_code = data.get("country_code")
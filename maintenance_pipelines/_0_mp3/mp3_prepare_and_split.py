@@ -21,10 +21,18 @@ This script provides a standardized workflow for corpus MP3 preprocessing:
    - Preserves directory structure from source to target
    - Pads final chunk with silence if needed
 
+4. Streaming Segments (HLS-style)
+   - Cuts each normalized file into short, non-overlapping segments
+     (default 6 seconds) without re-encoding (stream copy on frame boundaries)
+   - Writes an m3u8 playlist per recording (index.m3u8)
+   - Served by the webapp under /media/hls/<country>/<basename>/ so the
+     player can start and seek by fetching single segments
+
 FOLDER STRUCTURE
 ================
 - Source (mp3-full):      ../../media/mp3-full
 - Target (mp3-split):     ../../media/mp3-split
+- Target (hls):           ../../media/hls/<relative_path>/<basename>/{index.m3u8,seg_00000.mp3,...}
 
 The target directory mirrors the source directory structure.
 Chunk filenames follow the pattern: BASENAME_01.mp3, BASENAME_02.mp3, etc.
@@ -64,6 +72,12 @@ python mp3_prepare_and_split.py --loudness-i -16.0 --loudness-lra 9.0
 # Custom chunk duration and overlap:
 python mp3_prepare_and_split.py --chunk-duration-seconds 300 --overlap-seconds 15
 
+# Skip the streaming segments:
+python mp3_prepare_and_split.py --skip-hls
+
+# Custom segment length for streaming:
+python mp3_prepare_and_split.py --hls-segment-seconds 10
+
 # Custom source and target directories:
 python mp3_prepare_and_split.py --source ./my-source --target ./my-splits
 """
@@ -106,9 +120,15 @@ _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Default paths relative to the script location
 DEFAULT_SOURCE_DIR = os.path.normpath(os.path.join(_SCRIPT_DIR, "../../media/mp3-full"))
 DEFAULT_TARGET_DIR = os.path.normpath(os.path.join(_SCRIPT_DIR, "../../media/mp3-split"))
+DEFAULT_HLS_DIR = os.path.normpath(os.path.join(_SCRIPT_DIR, "../../media/hls"))
 
 DEFAULT_CHUNK_DURATION_MS = 4 * 60 * 1000  # 4 minutes in milliseconds
 DEFAULT_OVERLAP_MS = 30 * 1000  # 30 seconds in milliseconds
+DEFAULT_HLS_SEGMENT_SECONDS = 6  # streaming segment length
+
+# Streaming segment naming (the webapp only serves names matching this pattern)
+HLS_PLAYLIST_NAME = "index.m3u8"
+HLS_SEGMENT_PATTERN = "seg_%05d.mp3"
 
 # Loudness normalization defaults (EBU R128 speech-friendly)
 DEFAULT_LOUDNESS_I = -18.0  # Integrated loudness target (LUFS)
@@ -684,6 +704,84 @@ def split_audio(
         logger.error(f"Splitting failed for {file_path}: {e}")
         return False
 
+# =============================================================================
+# Streaming Segment Functions
+# =============================================================================
+
+def segment_for_streaming(
+    file_path: str,
+    relative_path: str,
+    file_name: str,
+    hls_dir: str,
+    segment_seconds: int,
+    dry_run: bool = False
+) -> bool:
+    """
+    Cut an MP3 into short non-overlapping segments plus an m3u8 playlist.
+
+    Uses ffmpeg's segment muxer with stream copy, so segments are cut on MP3
+    frame boundaries without re-encoding. Segments carry no ID3/Xing headers
+    and can be appended back-to-back by the player. The output directory is
+    replaced atomically, so the webapp never sees a half-written playlist.
+
+    Args:
+        file_path: Full path to the (normalized) source file
+        relative_path: Relative path from source dir (e.g. country code)
+        file_name: Original filename
+        hls_dir: Base directory for streaming segments
+        segment_seconds: Target segment duration in seconds
+        dry_run: If True, only log what would be done
+
+    Returns:
+        True if segmenting was successful
+    """
+    basename = os.path.splitext(file_name)[0]
+    parent_dir = os.path.join(hls_dir, relative_path) if relative_path else hls_dir
+    target_dir = os.path.join(parent_dir, basename)
+
+    if dry_run:
+        logger.debug(f"[DRY-RUN] Would segment: {file_path} -> {target_dir}/{HLS_PLAYLIST_NAME}")
+        return True
+
+    os.makedirs(parent_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f".{basename}.", dir=parent_dir)
+    try:
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", file_path,
+            "-map", "0:a:0", "-c:a", "copy", "-map_metadata", "-1",
+            "-f", "segment",
+            "-segment_time", str(segment_seconds),
+            "-segment_format", "mp3",
+            "-segment_format_options", "write_xing=0:id3v2_version=0",
+            "-segment_list", os.path.join(work_dir, HLS_PLAYLIST_NAME),
+            "-segment_list_type", "m3u8",
+            os.path.join(work_dir, HLS_SEGMENT_PATTERN),
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error(f"Segmenting failed for {file_path}: {result.stderr.strip()[:500]}")
+            return False
+
+        # Swap in the new directory (old one removed only after success)
+        old_dir = None
+        if os.path.exists(target_dir):
+            old_dir = target_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(target_dir, old_dir)
+        os.replace(work_dir, target_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        logger.debug(f"Segmented: {file_path} -> {target_dir}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Segmenting failed for {file_path}: {e}")
+        return False
+    finally:
+        if os.path.isdir(work_dir):
+            shutil.rmtree(work_dir, ignore_errors=True)
+
 # =============================================================================
 # Overwrite Check Functions
 # =============================================================================
@@ -778,13 +876,17 @@ def process_mp3_files(
     loudness_lra: float,
     loudness_tp: float,
     skip_normalize: bool,
-    dry_run: bool
+    dry_run: bool,
+    hls_dir: str = DEFAULT_HLS_DIR,
+    hls_segment_seconds: int = DEFAULT_HLS_SEGMENT_SECONDS,
+    skip_hls: bool = False
 ) -> None:
     """
     Main processing function that orchestrates the entire pipeline.
     """
     source_dir = os.path.abspath(source_dir)
     target_dir = os.path.abspath(target_dir)
+    hls_dir = os.path.abspath(hls_dir)
     
     if not os.path.exists(source_dir):
         logger.error(f"Source directory does not exist: {source_dir}")
@@ -814,6 +916,7 @@ def process_mp3_files(
     logger.info(f"Overlap:        {overlap_ms / 1000}s")
     logger.info(f"Loudness:       I={loudness_i}, LRA={loudness_lra}, TP={loudness_tp}")
     logger.info(f"Skip normalize: {skip_normalize}")
+    logger.info(f"HLS segments:   {'skipped' if skip_hls else f'{hls_segment_seconds}s -> {hls_dir}'}")
     logger.info(f"Dry run:        {dry_run}")
     logger.info("=" * 60)
     
@@ -876,6 +979,14 @@ def process_mp3_files(
                 chunk_duration_ms, overlap_ms, bitrate_kbps, dry_run
             )
             
+            # Step 4: Streaming segments
+            if success and not skip_hls:
+                progress.update_step("Segment")
+                success = segment_for_streaming(
+                    file_path, relative_path, file_name, hls_dir,
+                    hls_segment_seconds, dry_run
+                )
+            
             if success:
                 progress.finish_file("ok")
             else:
@@ -959,6 +1070,25 @@ Examples:
         help="Skip loudness normalization (only CBR conversion + split)"
     )
     
+    parser.add_argument(
+        "--hls-target",
+        default=DEFAULT_HLS_DIR,
+        help=f"Target directory for streaming segments (default: {DEFAULT_HLS_DIR})"
+    )
+    
+    parser.add_argument(
+        "--hls-segment-seconds",
+        type=int,
+        default=DEFAULT_HLS_SEGMENT_SECONDS,
+        help=f"Streaming segment duration in seconds (default: {DEFAULT_HLS_SEGMENT_SECONDS})"
+    )
+    
+    parser.add_argument(
+        "--skip-hls",
+        action="store_true",
+        help="Skip writing streaming segments and m3u8 playlists"
+    )
+    
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -987,5 +1117,8 @@ if __name__ == "__main__":
         loudness_lra=args.loudness_lra,
         loudness_tp=args.loudness_tp,
         skip_normalize=args.skip_normalize,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        hls_dir=args.hls_target,
+        hls_segment_seconds=args.hls_segment_seconds,
+        skip_hls=args.skip_hls
     )
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+mp3_waveform_peaks.py - Precomputed waveform peaks for player and editor
+
+WORKFLOW OVERVIEW
+=================
+Runs after mp3_prepare_and_split.py (on the normalized mp3-full files):
+
+1. Decode each MP3 with ffmpeg to mono 16-bit PCM at a low analysis rate
+   (default 8000 Hz), streamed through a pipe - the full recording is never
+   held in memory.
+2. Compute min/max per bucket at the finest resolution (default 256 samples
+   = 32 ms per bucket).
+3. Derive coarser levels by merging 4 buckets at a time until a level has
+   fewer than --min-buckets buckets.
+4. Write all levels into one compact binary .peaks file.
+
+The webapp serves these files from /media/peaks/<country>/<basename>.peaks.
+The browser fetches the header plus the single level that matches the canvas
+width (HTTP Range), so no audio has to be downloaded or decoded client-side.
+
+FOLDER STRUCTURE
+================
+- Source (mp3-full):  ../../media/mp3-full
+- Target (peaks):     ../../media/peaks
+
+The target directory mirrors the source directory structure:
+    mp3-full/ARG/2023-08-10_ARG_Mitre.mp3 -> peaks/ARG/2023-08-10_ARG_Mitre.peaks
+
+FILE FORMAT (little-endian)
+===========================
+    offset  type     field
+    0       4s       magic b"CPK1"
+    4       uint16   version (1)
+    6       uint16   level count N
+    8       uint32   analysis sample rate (Hz)
+    12      uint32   total analysed samples (duration = samples / rate)
+    16      N x (uint32 samples_per_bucket, uint32 bucket_count, uint32 byte_offset)
+    ...     per level: bucket_count x (int8 min, int8 max), interleaved
+
+Levels are ordered finest first. byte_offset is relative to the file start.
+
+DEPENDENCIES
+============
+- numpy
+- ffmpeg (system PATH)
+
+EXAMPLE USAGE
+=============
+# Generate peaks for all recordings (skips up-to-date files):
+python mp3_waveform_peaks.py
+
+# Regenerate everything:
+python mp3_waveform_peaks.py --force
+
+# Dry-run:
+python mp3_waveform_peaks.py --dry-run
+"""
+
+import argparse
+import logging
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("ERROR: numpy is required. Install with: pip install numpy")
+    sys.exit(1)
+
+# =============================================================================
+# Constants (Defaults)
+# =============================================================================
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SOURCE_DIR = os.path.normpath(os.path.join(_SCRIPT_DIR, "../../media/mp3-full"))
+DEFAULT_TARGET_DIR = os.path.normpath(os.path.join(_SCRIPT_DIR, "../../media/peaks"))
+
+DEFAULT_SAMPLE_RATE = 8000  # Hz, enough for an amplitude envelope
+DEFAULT_BASE_BUCKET = 256  # samples per bucket at the finest level (32 ms @ 8 kHz)
+DEFAULT_MIN_BUCKETS = 512  # stop adding levels below this many buckets
+LEVEL_FACTOR = 4  # each level merges 4 buckets of the previous one
+
+PEAKS_MAGIC = b"CPK1"
+PEAKS_VERSION = 1
+PEAKS_SUFFIX = ".peaks"
+_HEADER = struct.Struct("<4sHHII")
+_LEVEL_ENTRY = struct.Struct("<III")
+
+# Samples read from ffmpeg per iteration (must be a multiple of the base bucket)
+_READ_BUCKETS = 4096
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Peak Computation
+# =============================================================================
+
+def check_ffmpeg_available(ffmpeg: str) -> bool:
+    """Check if ffmpeg is available."""
+    try:
+        result = subprocess.run([ffmpeg, "-version"], capture_output=True, text=True)
+        return result.returncode == 0
+    except FileNotFoundError:
+        return False
+
+
+def _bucket_min_max(samples: np.ndarray, bucket: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Min/max per bucket; the last partial bucket is padded with zeros."""
+    remainder = len(samples) % bucket
+    if remainder:
+        samples = np.concatenate([samples, np.zeros(bucket - remainder, dtype=samples.dtype)])
+    frames = samples.reshape(-1, bucket)
+    return frames.min(axis=1), frames.max(axis=1)
+
+
+def decode_base_level(
+    file_path: str,
+    ffmpeg: str,
+    sample_rate: int,
+    base_bucket: int,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Stream-decode an MP3 and compute the finest min/max level.
+
+    Returns:
+        Tuple of (mins, maxs, total_samples) with int16 mins/maxs
+    """
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        "-i", file_path,
+        "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "-",
+    ]
+    chunk_bytes = base_bucket * _READ_BUCKETS * 2
+    mins: List[np.ndarray] = []
+    maxs: List[np.ndarray] = []
+    total_samples = 0
+    pending = b""
+
+    # stderr goes to a temp file: a corrupt MP3 can log more than a pipe buffer
+    # before stdout is drained, which would block ffmpeg and this loop.
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - (len(data) % (base_bucket * 2))
+            pending = data[usable:]
+            if not usable:
+                continue
+            samples = np.frombuffer(data[:usable], dtype="<i2")
+            total_samples += len(samples)
+            lo, hi = _bucket_min_max(samples, base_bucket)
+            mins.append(lo)
+            maxs.append(hi)
+        if pending:
+            samples = np.frombuffer(pending[: len(pending) - len(pending) % 2], dtype="<i2")
+            total_samples += len(samples)
+            if len(samples):
+                lo, hi = _bucket_min_max(samples, base_bucket)
+                mins.append(lo)
+                maxs.append(hi)
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors="replace")
+        stderr_file.close()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr.strip()[:500]}")
+
+    if not mins:
+        empty = np.zeros(0, dtype=np.int16)
+        return empty, empty, 0
+    return np.concatenate(mins), np.concatenate(maxs), total_samples
+
+
+def build_levels(
+    base_mins: np.ndarray,
+    base_maxs: np.ndarray,
+    base_bucket: int,
+    min_buckets: int,
+) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """Build the level pyramid: [(samples_per_bucket, mins, maxs), ...] finest first."""
+    levels = [(base_bucket, base_mins, base_maxs)]
+    bucket, mins, maxs = base_bucket, base_mins, base_maxs
+    while len(mins) > min_buckets:
+        pad = (-len(mins)) % LEVEL_FACTOR
+        if pad:
+            mins = np.concatenate([mins, np.zeros(pad, dtype=mins.dtype)])
+            maxs = np.concatenate([maxs, np.zeros(pad, dtype=maxs.dtype)])
+        mins = mins.reshape(-1, LEVEL_FACTOR).min(axis=1)
+        maxs = maxs.reshape(-1, LEVEL_FACTOR).max(axis=1)
+        bucket *= LEVEL_FACTOR
+        levels.append((bucket, mins, maxs))
+    return levels
+
+
+def encode_peaks(
+    levels: List[Tuple[int, np.ndarray, np.ndarray]],
+    sample_rate: int,
+    total_samples: int,
+) -> bytes:
+    """Serialize levels into the .peaks binary format (int8 min/max pairs)."""
+    header_size = _HEADER.size + _LEVEL_ENTRY.size * len(levels)
+    table = []
+    payloads = []
+    offset = header_size
+    for bucket, mins, maxs in levels:
+        pairs = np.empty(len(mins) * 2, dtype=np.int8)
+        pairs[0::2] = (mins.astype(np.int32) >> 8).astype(np.int8)
+        pairs[1::2] = (maxs.astype(np.int32) >> 8).astype(np.int8)
+        payload = pairs.tobytes()
+        table.append(_LEVEL_ENTRY.pack(bucket, len(mins), offset))
+        payloads.append(payload)
+        offset += len(payload)
+
+    header = _HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, len(levels), sample_rate, total_samples)
+    return header + b"".join(table) + b"".join(payloads)
+
+
+def write_peaks_file(
+    file_path: str,
+    target_path: str,
+    ffmpeg: str,
+    sample_rate: int,
+    base_bucket: int,
+    min_buckets: int,
+) -> int:
+    """Compute peaks for one MP3 and write them atomically. Returns file size."""
+    mins, maxs, total_samples = decode_base_level(file_path, ffmpeg, sample_rate, base_bucket)
+    levels = build_levels(mins, maxs, base_bucket, min_buckets)
+    blob = encode_peaks(levels, sample_rate, total_samples)
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=PEAKS_SUFFIX, dir=os.path.dirname(target_path))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(blob)
+        os.replace(temp_path, target_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(blob)
+
+# =============================================================================
+# Main Processing Function
+# =============================================================================
+
+def collect_mp3_files(source_dir: str) -> list:
+    """Collect (file_path, relative_path, file_name) for all MP3s."""
+    files_list = []
+    for root, _dirs, files in os.walk(source_dir):
+        relative_path = os.path.relpath(root, source_dir)
+        if relative_path == ".":
+            relative_path = ""
+        for file_name in sorted(files):
+            if file_name.lower().endswith(".mp3"):
+                files_list.append((os.path.join(root, file_name), relative_path, file_name))
+    return files_list
+
+
+def _is_up_to_date(source_path: str, target_path: str) -> bool:
+    try:
+        return os.path.getmtime(target_path) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def process_peaks(
+    source_dir: str,
+    target_dir: str,
+    ffmpeg: str,
+    sample_rate: int,
+    base_bucket: int,
+    min_buckets: int,
+    force: bool,
+    dry_run: bool,
+) -> int:
+    """Generate .peaks files for all MP3s below source_dir. Returns error count."""
+    source_dir = os.path.abspath(source_dir)
+    target_dir = os.path.abspath(target_dir)
+
+    if not os.path.isdir(source_dir):
+        logger.error(f"Source directory does not exist: {source_dir}")
+        return 1
+    if not check_ffmpeg_available(ffmpeg):
+        logger.error("ffmpeg is not available in PATH. Please install ffmpeg.")
+        return 1
+
+    mp3_files = collect_mp3_files(source_dir)
+    logger.info("=" * 60)
+    logger.info("MP3 Waveform Peaks")
+    logger.info("=" * 60)
+    logger.info(f"Source:        {source_dir}")
+    logger.info(f"Target:        {target_dir}")
+    logger.info(f"Total files:   {len(mp3_files)}")
+    logger.info(f"Analysis rate: {sample_rate} Hz, base bucket {base_bucket} samples")
+    logger.info("=" * 60)
+
+    processed = skipped = errors = 0
+    for index, (file_path, relative_path, file_name) in enumerate(mp3_files, start=1):
+        basename = os.path.splitext(file_name)[0]
+        target_path = os.path.join(target_dir, relative_path, basename + PEAKS_SUFFIX)
+        display = os.path.join(relative_path, file_name) if relative_path else file_name
+
+        if not force and _is_up_to_date(file_path, target_path):
+            skipped += 1
+            continue
+        if dry_run:
+            logger.info(f"[DRY-RUN] [{index}/{len(mp3_files)}] Would write {target_path}")
+            processed += 1
+            continue
+        try:
+            size = write_peaks_file(
+                file_path, target_path, ffmpeg, sample_rate, base_bucket, min_buckets
+            )
+            processed += 1
+            logger.info(f"[{index}/{len(mp3_files)}] {display} -> {size / 1024:.1f} KB")
+        except Exception as e:
+            errors += 1
+            logger.error(f"Error processing {file_path}: {e}")
+
+    logger.info("=" * 60)
+    logger.info(f"Processed: {processed}  Skipped (up to date): {skipped}  Errors: {errors}")
+    return errors
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compute multi-resolution waveform peaks (.peaks) for corpus MP3s",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--source", default=DEFAULT_SOURCE_DIR,
+                        help=f"Source directory (default: {DEFAULT_SOURCE_DIR})")
+    parser.add_argument("--target", default=DEFAULT_TARGET_DIR,
+                        help=f"Target directory for .peaks files (default: {DEFAULT_TARGET_DIR})")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE,
+                        help=f"Analysis sample rate in Hz (default: {DEFAULT_SAMPLE_RATE})")
+    parser.add_argument("--base-bucket", type=int, default=DEFAULT_BASE_BUCKET,
+                        help=f"Samples per bucket at the finest level (default: {DEFAULT_BASE_BUCKET})")
+    parser.add_argument("--min-buckets", type=int, default=DEFAULT_MIN_BUCKETS,
+                        help=f"Stop adding coarser levels below this size (default: {DEFAULT_MIN_BUCKETS})")
+    parser.add_argument("--ffmpeg", default="ffmpeg", help="ffmpeg executable (default: ffmpeg)")
+    parser.add_argument("--force", action="store_true", help="Regenerate up-to-date files")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be done")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    error_count = process_peaks(
+        source_dir=args.source,
+        target_dir=args.target,
+        ffmpeg=args.ffmpeg,
+        sample_rate=args.sample_rate,
+        base_bucket=args.base_bucket,
+        min_buckets=args.min_buckets,
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+    sys.exit(1 if error_count else 0)
@@ -77,6 +77,22 @@ else:
     def normalize_country_code(code: str) -> str:
         return code.upper() if code else ""
 
+# Gemeinsame Transkript-I/O (.json / .json.zst, optional mit zstd-Dictionary)
+TRANSCRIPT_IO_PY = SCRIPT_DIR.parent.parent / "app" / "src" / "scripts" / "transcript_io.py"
+
+
+def load_transcript_io():
+    spec = importlib.util.spec_from_file_location("corapan_transcript_io", TRANSCRIPT_IO_PY)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Cannot load transcript I/O module: {TRANSCRIPT_IO_PY}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["corapan_transcript_io"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+transcript_io = load_transcript_io()
+
 # ==============================================================================
 # LOGGING CONFIGURATION
 # ==============================================================================
@@ -294,8 +310,7 @@ def get_all_json_files() -> list[Path]:
         if country_dir.name.startswith("."):
             continue
         # Sort JSON files alphabetically within each country
-        country_files = sorted(country_dir.glob("*.json"), 
-                              key=lambda p: p.name)
+        country_files = transcript_io.iter_transcript_files(country_dir)
         json_files.extend(country_files)
     
     logger.info(f"Found {len(json_files)} JSON files in {len(countries)} country folders")
@@ -856,8 +871,7 @@ def run_export(corpus_version: str, release_date: str) -> bool:
     
     for jf in json_files:
         try:
-            with open(jf, "r", encoding="utf-8-sig") as f:
-                data = json.load(f)
+            data = transcript_io.read_transcript(jf)
             
             record = extract_record(data, corpus_version, created_at)
             records.append(record)